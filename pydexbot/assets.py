@@ -0,0 +1,232 @@
+"""
+Fixed-point assets and exact integer price and band decisions for the trade path
+"""
+from decimal import Decimal
+from fractions import Fraction
+from functools import lru_cache
+
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+CORRECTION_BAND_MULTIPLIER = Decimal("2.0")
+# Decimal's default context keeps 28 significant digits, so the Decimal price and
+# band formulas are within about 1e-27 (relative) of the exact values. Integer
+# comparisons closer than 1 / CLOSE_MARGIN are decided by those formulas instead,
+# which keeps every decision identical to them.
+CLOSE_MARGIN = 10 ** 24
+
+
+class Asset:
+    """
+    An EOSIO asset: amount in the smallest unit (int64), precision and symbol code.
+    """
+
+    __slots__ = ("amount", "precision", "symbol", "_decimal")
+
+    def __init__(self, amount, precision, symbol):
+        if not INT64_MIN <= amount <= INT64_MAX:
+            raise ValueError(f"asset amount out of int64 range: {amount}")
+        self.amount = amount
+        self.precision = precision
+        self.symbol = symbol
+        self._decimal = None
+
+    @classmethod
+    def parse(cls, value):
+        """
+        "13.68536925 FLON" -> Asset(1368536925, 8, "FLON").
+        """
+        text, symbol = str(value).split()
+        whole, _, fraction = text.partition(".")
+        if not fraction or fraction.isdigit():
+            try:
+                return cls(int(whole + fraction), len(fraction), symbol)
+            except ValueError:
+                pass
+        # Exponent forms such as "0E-8"
+        sign, digits, exponent = Decimal(text).as_tuple()
+        precision = max(0, -exponent)
+        amount = int("".join(map(str, digits)) or "0") * 10 ** (exponent + precision)
+        return cls(-amount if sign else amount, precision, symbol)
+
+    @property
+    def decimal(self):
+        """
+        The amount as the Decimal that Decimal(text) gives.
+        """
+        if self._decimal is None:
+            self._decimal = Decimal(self.amount).scaleb(-self.precision)
+        return self._decimal
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, Asset)
+            and (self.amount, self.precision, self.symbol) == (other.amount, other.precision, other.symbol)
+        )
+
+    def __hash__(self):
+        return hash((self.amount, self.precision, self.symbol))
+
+    def __repr__(self):
+        return f"Asset({self.amount}, {self.precision}, {self.symbol!r})"
+
+    def __str__(self):
+        sign = "-" if self.amount < 0 else ""
+        whole, fraction = divmod(abs(self.amount), 10 ** self.precision)
+        if not self.precision:
+            return f"{sign}{whole} {self.symbol}"
+        return f"{sign}{whole}.{fraction:0{self.precision}d} {self.symbol}"
+
+
+@lru_cache(maxsize=8192)
+def cached_asset(value):
+    """
+    Asset.parse memoized by the quantity string, so unchanged rows are parsed once.
+    Assets are shared; do not modify them.
+    """
+    return Asset.parse(value)
+
+
+_POW10 = [10 ** exponent for exponent in range(64)]
+
+
+@lru_cache(maxsize=8192)
+def _ratio(text):
+    value = Decimal(text)
+    sign, digits, exponent = value.as_tuple()
+    numerator = int("".join(map(str, digits)) or "0") * (-1 if sign else 1)
+    if exponent >= 0:
+        return numerator * 10 ** exponent, 1, value
+    return numerator, 10 ** -exponent, value
+
+
+class _Undecided(Exception):
+    pass
+
+
+def _threshold(target, ratio, sign):
+    """
+    target * (1 + sign * ratio) as (numerator, denominator, |target| * denominator).
+    """
+    target_n, target_d = target
+    ratio_n, ratio_d = ratio
+    return target_n * (ratio_d + sign * ratio_n), target_d * ratio_d, abs(target_n) * ratio_d
+
+
+class PriceBands:
+    """
+    Price thresholds of one market config, as exact fractions.
+
+    The deadband applies only with a positive target: a price outside
+    target * (1 +/- deadband) is forced back toward the target. Otherwise a price
+    outside target * (1 +/- min(fluctuation * CORRECTION_BAND_MULTIPLIER, 1)) is
+    forced back into the correction band. checks lists (threshold, side, below) in
+    the order the Decimal formulas test them; with a positive target and
+    non-negative ratios they collapse to the tighter lower and upper threshold.
+    The Decimal inputs are kept for near-ties.
+    """
+
+    __slots__ = ("checks", "decimals")
+
+    def __init__(self, target_price, fluctuation_ratio, deadband_ratio=None):
+        target_n, target_d, target = _ratio(str(target_price))
+        fluctuation_n, fluctuation_d, fluctuation = _ratio(str(fluctuation_ratio))
+        target_fraction = (target_n, target_d)
+        checks = []
+        deadband = None
+        if deadband_ratio is not None:
+            deadband_n, deadband_d, deadband = _ratio(str(deadband_ratio))
+            if target_n > 0:
+                # A negative deadband forces every price off the target, like 0 does
+                deadband_fraction = (max(deadband_n, 0), deadband_d)
+                checks.append((_threshold(target_fraction, deadband_fraction, -1), "right", True))
+                checks.append((_threshold(target_fraction, deadband_fraction, 1), "left", False))
+        multiplier_n, multiplier_d = CORRECTION_BAND_MULTIPLIER.as_integer_ratio()
+        correction = (fluctuation_n * multiplier_n, fluctuation_d * multiplier_d)
+        if correction[0] >= correction[1]:
+            correction = (1, 1)
+        checks.append((_threshold(target_fraction, correction, -1), "right", True))
+        checks.append((_threshold(target_fraction, correction, 1), "left", False))
+        if target_n > 0 and correction[0] >= 0 and len(checks) == 4:
+            # Every lower threshold is <= target <= every upper one
+            low = max(checks[0][0], checks[2][0], key=lambda t: Fraction(t[0], t[1]))
+            high = min(checks[1][0], checks[3][0], key=lambda t: Fraction(t[0], t[1]))
+            checks = [(low, "right", True), (high, "left", False)]
+        self.checks = tuple(checks)
+        self.decimals = (target, fluctuation, deadband)
+
+
+@lru_cache(maxsize=8192)
+def price_bands(target_price, fluctuation_ratio, deadband_ratio=None):
+    """
+    PriceBands memoized by their config values.
+    """
+    return PriceBands(target_price, fluctuation_ratio, deadband_ratio)
+
+
+def _forced_side_exact(price_n, price_d, bands):
+    """
+    Raises _Undecided when the price is within the Decimal error margin of a threshold.
+    """
+    for (threshold_n, threshold_d, target_scale), side, below in bands.checks:
+        a = price_n * threshold_d
+        b = threshold_n * price_d
+        if abs(a - b) * CLOSE_MARGIN <= a + abs(b) + target_scale * price_d:
+            raise _Undecided
+        if (a < b) == below:
+            return side
+    return None
+
+
+def _forced_side_decimal(left, right, bands):
+    target_price, fluctuation_ratio, deadband_ratio = bands.decimals
+    left_price = right.decimal / left.decimal
+    if deadband_ratio is not None and target_price > 0:
+        target_gap_ratio = abs(left_price - target_price) / target_price
+        if target_gap_ratio > deadband_ratio and left_price < target_price:
+            return "right"
+        if target_gap_ratio > deadband_ratio and left_price > target_price:
+            return "left"
+    correction_ratio = min(fluctuation_ratio * CORRECTION_BAND_MULTIPLIER, Decimal("1"))
+    min_price = target_price * (Decimal("1") - correction_ratio)
+    max_price = target_price * (Decimal("1") + correction_ratio)
+    if left_price < min_price:
+        return "right"
+    if left_price > max_price:
+        return "left"
+    return None
+
+
+def forced_side(left, right, bands):
+    """
+    Side the pool price forces, before any candle plan: "right" (buy) below the
+    deadband or correction band, "left" (sell) above it, None inside.
+
+    left and right are the positive pool Assets. The price right / left is compared
+    with each threshold as an exact integer cross product; a tie or near-tie within
+    1 / CLOSE_MARGIN is decided by the Decimal formulas instead, so the result
+    always equals theirs.
+    """
+    price_n = right.amount * _POW10[left.precision]
+    price_d = left.amount * _POW10[right.precision]
+    try:
+        return _forced_side_exact(price_n, price_d, bands)
+    except _Undecided:
+        return _forced_side_decimal(left, right, bands)
+
+
+def quote_required_amount(min_left, left, right, precision):
+    """
+    min_left (left units) priced at the pool price right / left, as a Decimal in
+    right units.
+
+    Rounded up to `precision` decimals: balances hold whole units, so a balance
+    covers the exact amount exactly when it covers the rounded-up one. Exact
+    multiples and near-ties fall back to the Decimal product the balance checks
+    used before, which is equivalent for those checks.
+    """
+    numerator = min_left.amount * right.amount * _POW10[left.precision + precision]
+    denominator = _POW10[min_left.precision + right.precision] * left.amount
+    units, remainder = divmod(numerator, denominator)
+    if remainder == 0 or min(remainder, denominator - remainder) * CLOSE_MARGIN <= numerator:
+        return min_left.decimal * (right.decimal / left.decimal)
+    return Decimal(units + 1).scaleb(-precision)
@@ -0,0 +1,293 @@
+"""
+Offline backtest: replay predict_trade_side decisions against simulated constant-product pools.
+
+Every pair trades once per interval; each trade picks its side the way
+bot_service.predict_trade_side does (target deadband, then correction band, then
+the candle plan or side segment) and is applied as a swap with the DEX fee. All
+pairs advance together as NumPy arrays, so days of 5-minute candles for
+thousands of pairs take seconds. Prices are float64, not the bot's Decimals.
+
+Usage:
+  python -m pydexbot.backtest --pairs 2000 --days 3
+  python -m pydexbot.backtest --config config/.config.yaml --markets markets.json \\
+      --candle-seconds 300,600 --side-segment-seconds 900 --deadband-ratio 0.004,0.006,0.01
+"""
+import argparse
+import itertools
+import json
+import sys
+import time
+
+import yaml
+
+from pydexbot.candle_plan import pair_seed, plan_arrays, plan_side_array
+from pydexbot.optional import load_numpy
+
+np = load_numpy()
+
+# Same as assets.CORRECTION_BAND_MULTIPLIER
+CORRECTION_BAND_MULTIPLIER = 2.0
+SWAP_FEE_RATIO = 0.003
+SIDE_REASONS = ("plan", "band", "deadband")
+
+
+def synthetic_pair_names(count):
+    """
+    Distinct valid names for synthetic markets: simaaaa.usdt, simaaab.usdt, ...
+    """
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["sim" + "".join(letters[index // 26 ** power % 26] for power in (3, 2, 1, 0)) + ".usdt"
+            for index in range(count)]
+
+
+def synthetic_markets(trade_pairs, fluctuation_ratio=0.02, seed=1):
+    """
+    Markets for trade_pairs with random reserves, targets and starting gaps of up to 2%.
+    """
+    rng = np.random.default_rng(seed)
+    markets = []
+    for trade_pair in trade_pairs:
+        left_reserve = 1_000_000 * rng.uniform(0.5, 2.0)
+        target_price = 10 ** rng.uniform(-3, 2)
+        markets.append({
+            "trade_pair": trade_pair,
+            "left_reserve": left_reserve,
+            "right_reserve": left_reserve * target_price * (1 + rng.uniform(-0.02, 0.02)),
+            "target_price": target_price,
+            "fluctuation_ratio": fluctuation_ratio,
+            "min_trade_amount": left_reserve * 0.0002,
+        })
+    return markets
+
+
+def swap(left, right, sell_left, amount_in, fee_ratio):
+    """
+    Apply one swap per pair in place; sell_left selects the left -> right direction.
+    """
+    net_in = amount_in * (1 - fee_ratio)
+    reserve_in = np.where(sell_left, left, right)
+    reserve_out = np.where(sell_left, right, left)
+    amount_out = net_in * reserve_out / (reserve_in + net_in)
+    left += np.where(sell_left, net_in, -amount_out)
+    right += np.where(sell_left, -amount_out, net_in)
+
+
+def run_backtest(markets, start, end, interval_seconds=8.0, candle_seconds=300, side_segment_seconds=900,
+                 deadband_ratio=0.006, deadband_ratios=None, candle_plan_enabled=True, interval_jitter_ratio=0.0,
+                 fee_ratio=SWAP_FEE_RATIO, trade_scale=(1.0, 1.5), external_flow_ratio=0.0, seed=1, chunk_ticks=256):
+    """
+    Simulate [start, end) and return per-pair statistics as arrays.
+
+    markets are dicts with trade_pair, left_reserve, right_reserve, target_price,
+    fluctuation_ratio and min_trade_amount (left units). Each trade spends
+    min_trade_amount times a random scale in trade_scale, like the contract.
+    external_flow_ratio adds one outside swap per tick of normally distributed size
+    (in units of min_trade_amount) before the bot trades.
+    """
+    if np is None:
+        raise RuntimeError("the backtest needs numpy")
+    deadband_ratios = deadband_ratios or {}
+    rng = np.random.default_rng(seed)
+    count = len(markets)
+    trade_pairs = [market["trade_pair"] for market in markets]
+    seeds = np.array([pair_seed(trade_pair) for trade_pair in trade_pairs], dtype=np.uint64)
+
+    def column(key):
+        return np.array([float(market[key]) for market in markets])
+
+    left, right = column("left_reserve"), column("right_reserve")
+    target = column("target_price")
+    min_amount = column("min_trade_amount")
+    deadband = np.array([float(market.get("deadband_ratio", deadband_ratios.get(market["trade_pair"], deadband_ratio)))
+                         for market in markets])
+    correction = np.minimum(column("fluctuation_ratio") * CORRECTION_BAND_MULTIPLIER, 1.0)
+    low, high = target * (1 - correction), target * (1 + correction)
+    has_target = target > 0
+    safe_target = np.where(has_target, target, 1.0)
+    plan_seconds = candle_seconds if candle_plan_enabled else 0
+
+    trades = np.zeros(count, dtype=np.int64)
+    reasons = np.zeros((len(SIDE_REASONS), count), dtype=np.int64)
+    gap_sum = np.zeros(count)
+    gap_max = np.zeros(count)
+    outside = np.zeros(count, dtype=np.int64)
+    candles = np.zeros(count, dtype=np.int64)
+    body_matches = np.zeros(count, dtype=np.int64)
+    candle_index = np.full(count, -1, dtype=np.int64)
+    candle_open, candle_close = np.zeros(count), np.zeros(count)
+
+    ticks = int((end - start) // interval_seconds)
+    offsets = rng.uniform(0, interval_seconds, count)
+    for chunk_start in range(0, ticks, chunk_ticks):
+        steps = np.arange(chunk_start, min(ticks, chunk_start + chunk_ticks))
+        times = start + offsets[:, None] + steps[None, :] * interval_seconds
+        if interval_jitter_ratio:
+            times += rng.uniform(-0.5, 0.5, times.shape) * interval_seconds * interval_jitter_ratio
+        seconds = np.floor(times).astype(np.int64)
+        planned_sides, _ = plan_arrays(seeds, seconds, plan_seconds, side_segment_seconds)
+        planned_sides = planned_sides.astype(bool)
+        scales = rng.uniform(trade_scale[0], trade_scale[1], times.shape)
+        flows = rng.normal(0, external_flow_ratio, times.shape) * min_amount[:, None] if external_flow_ratio else None
+        candle_indexes = seconds // candle_seconds if candle_seconds > 0 else None
+
+        for j in range(len(steps)):
+            if flows is not None:
+                flow = flows[:, j]
+                swap(left, right, flow > 0, np.abs(flow) * np.where(flow > 0, 1.0, right / left), fee_ratio)
+            price = right / left
+            gap = np.abs(price - target) / safe_target
+            forced = has_target & (gap > deadband)
+            below, above = price < low, price > high
+            banded = ~forced & (below | above)
+            buy = np.where(forced, price < target, np.where(below, True, np.where(above, False, planned_sides[:, j])))
+            reasons[0] += ~forced & ~banded
+            reasons[1] += banded
+            reasons[2] += forced
+            outside += forced
+            gap_sum += gap
+            np.maximum(gap_max, gap, out=gap_max)
+
+            swap(left, right, ~buy, min_amount * scales[:, j] * np.where(buy, price, 1.0), fee_ratio)
+            trades += 1
+            if candle_indexes is None:
+                continue
+            index = candle_indexes[:, j]
+            rolled = index != candle_index
+            finished = rolled & (candle_index >= 0)
+            if finished.any() and plan_seconds:
+                body_buy = plan_side_array(seeds, np.maximum(candle_index, 0)).astype(bool)
+                body_matches += finished & ((candle_close > candle_open) == body_buy)
+            candles += finished
+            candle_open = np.where(rolled, price, candle_open)
+            candle_close = right / left
+            candle_index = index
+
+    return {
+        "trade_pairs": trade_pairs,
+        "ticks": ticks,
+        "trades": trades,
+        "reasons": reasons,
+        "mean_gap_ratio": gap_sum / max(ticks, 1),
+        "max_gap_ratio": gap_max,
+        "outside_deadband_ratio": outside / max(ticks, 1),
+        "final_gap_ratio": np.abs(right / left - target) / safe_target,
+        "candles": candles,
+        "body_match_ratio": np.where(candles > 0, body_matches / np.maximum(candles, 1), np.nan) if plan_seconds else None,
+        "final_price": right / left,
+    }
+
+
+def summarize(result):
+    """
+    Totals and cross-pair aggregates of a run_backtest result.
+    """
+    trades = int(result["trades"].sum())
+    reasons = result["reasons"].sum(axis=1)
+    summary = {
+        "pairs": len(result["trade_pairs"]),
+        "ticks": result["ticks"],
+        "trades": trades,
+        "side_reasons": {reason: round(int(value) / trades, 4) if trades else 0 for reason, value in zip(SIDE_REASONS, reasons)},
+        "mean_gap_ratio": round(float(result["mean_gap_ratio"].mean()), 6),
+        "p95_pair_gap_ratio": round(float(np.percentile(result["mean_gap_ratio"], 95)), 6),
+        "max_gap_ratio": round(float(result["max_gap_ratio"].max()), 6),
+        "outside_deadband_ratio": round(float(result["outside_deadband_ratio"].mean()), 4),
+        "final_gap_ratio": round(float(result["final_gap_ratio"].mean()), 6),
+        "candles": int(result["candles"].sum()),
+    }
+    if result["body_match_ratio"] is not None:
+        candles = result["candles"]
+        matched = np.nansum(result["body_match_ratio"] * candles)
+        summary["body_match_ratio"] = round(float(matched / candles.sum()), 4) if candles.sum() else None
+    return summary
+
+
+def pair_rows(result):
+    """
+    Per-pair statistics as plain dicts.
+    """
+    rows = []
+    for i, trade_pair in enumerate(result["trade_pairs"]):
+        row = {
+            "trade_pair": trade_pair,
+            "trades": int(result["trades"][i]),
+            "mean_gap_ratio": float(result["mean_gap_ratio"][i]),
+            "max_gap_ratio": float(result["max_gap_ratio"][i]),
+            "outside_deadband_ratio": float(result["outside_deadband_ratio"][i]),
+            "final_price": float(result["final_price"][i]),
+        }
+        if result["body_match_ratio"] is not None:
+            row["body_match_ratio"] = float(result["body_match_ratio"][i])
+        rows.append(row)
+    return rows
+
+
+def parse_list(value, cast):
+    return [cast(item) for item in str(value).split(",") if item.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1], formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     epilog="\n".join(__doc__.splitlines()[8:]))
+    parser.add_argument("--config", help="bot config; its candle, side segment and deadband settings become the defaults")
+    parser.add_argument("--markets", help="JSON list of markets (see run_backtest); synthetic markets otherwise")
+    parser.add_argument("--pairs", type=int, default=100, help="synthetic market count")
+    parser.add_argument("--fluctuation-ratio", type=float, default=0.02, help="synthetic markets' fluctuation_ratio")
+    parser.add_argument("--days", type=float, default=1.0)
+    parser.add_argument("--start", type=int, help="start time as unix seconds (default: now minus --days)")
+    parser.add_argument("--interval", type=float, default=8.0, help="seconds between trades of a pair")
+    parser.add_argument("--interval-jitter-ratio", type=float, default=0.0)
+    parser.add_argument("--candle-seconds", help="comma-separated values to sweep; 0 disables the candle plan")
+    parser.add_argument("--side-segment-seconds", help="comma-separated values to sweep")
+    parser.add_argument("--deadband-ratio", help="comma-separated default target deadband ratios to sweep")
+    parser.add_argument("--external-flow-ratio", type=float, default=0.0,
+                        help="stddev of one outside swap per tick, in min_trade_amount units")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--top", type=int, default=5, help="worst pairs to list per run")
+    parser.add_argument("--json", help="write summaries and per-pair rows here")
+    options = parser.parse_args(argv)
+
+    if np is None:
+        sys.exit("the backtest needs numpy: poetry install --extras numpy")
+    config = {}
+    if options.config:
+        with open(options.config) as f:
+            config = yaml.safe_load(f) or {}
+    candle_plan_enabled = bool(config.get("candle_plan_enabled", True))
+    candle_values = parse_list(options.candle_seconds or config.get("candle_seconds", 300), int)
+    segment_values = parse_list(options.side_segment_seconds or config.get("side_segment_seconds", 900), int)
+    deadband_values = parse_list(options.deadband_ratio or config.get("target_side_deadband_ratio", "0.006"), float)
+    deadband_ratios = {str(pair): float(value) for pair, value in config.get("target_side_deadband_ratios", {}).items()}
+
+    if options.markets:
+        with open(options.markets) as f:
+            markets = json.load(f)
+    else:
+        markets = synthetic_markets(synthetic_pair_names(options.pairs), options.fluctuation_ratio, options.seed)
+    end = (options.start + int(options.days * 86400)) if options.start else int(time.time())
+    start = options.start or end - int(options.days * 86400)
+
+    runs = []
+    for candle_seconds, side_segment_seconds, deadband_ratio in itertools.product(candle_values, segment_values, deadband_values):
+        started = time.perf_counter()
+        result = run_backtest(
+            markets, start, end, options.interval, candle_seconds, side_segment_seconds, deadband_ratio, deadband_ratios,
+            candle_plan_enabled, options.interval_jitter_ratio, external_flow_ratio=options.external_flow_ratio,
+            seed=options.seed,
+        )
+        summary = summarize(result)
+        summary.update(candle_seconds=candle_seconds, side_segment_seconds=side_segment_seconds,
+                       deadband_ratio=deadband_ratio, elapsed_seconds=round(time.perf_counter() - started, 2))
+        rows = pair_rows(result)
+        runs.append({"summary": summary, "pairs": rows})
+        print(json.dumps(summary))
+        for row in sorted(rows, key=lambda row: row["mean_gap_ratio"], reverse=True)[:options.top]:
+            print(f"  {row['trade_pair']:<14} mean_gap={row['mean_gap_ratio']:.4%} max_gap={row['max_gap_ratio']:.4%}"
+                  f" outside={row['outside_deadband_ratio']:.1%}")
+    if options.json:
+        with open(options.json, "w") as f:
+            json.dump(runs, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
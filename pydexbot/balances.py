@@ -0,0 +1,182 @@
+"""
+Concurrent bot balance lookups shared by all pair workers
+"""
+import contextvars
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class _Lookup:
+    __slots__ = ("future", "stale")
+
+    def __init__(self):
+        self.future = None
+        self.stale = False
+
+
+class BalanceFetcher:
+    """
+    Fetch token balances over one bounded thread pool.
+
+    Results are kept for ttl_seconds keyed by (contract, symbol, account), so pair
+    workers trading the same token reuse each other's lookups within a round.
+    Concurrent misses for the same key share a single in-flight request. An
+    invalidation also discards the result of a lookup already in flight, so a read
+    sent before our own trade cannot put the old balance back. Least recently used
+    balances are evicted once max_entries is reached. Balances remember when they
+    were read for export() to a warm-start snapshot, and put() takes them back
+    with that read time, so they expire as if this process had read them.
+    """
+
+    def __init__(self, fetch_balance, max_workers=8, ttl_seconds=2.0, max_entries=16384):
+        self._fetch_balance = fetch_balance
+        self._max_workers = max(1, int(max_workers or 1))
+        self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="balance")
+        self._ttl_seconds = max(float(ttl_seconds or 0), 0)
+        self._max_entries = max(1, int(max_entries or 1))
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._pending = {}
+
+    def cached(self, contract, account, symbol):
+        key = (contract, symbol, account)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            expires_at, amount, _ = entry
+            if expires_at < time.monotonic():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return amount
+
+    def put(self, contract, account, symbol, amount, read_at=None):
+        if self._ttl_seconds <= 0:
+            return
+        if read_at is None:
+            read_at = time.monotonic()
+        with self._lock:
+            self._store((contract, symbol, account), (read_at + self._ttl_seconds, amount, read_at))
+
+    def _store(self, key, entry):
+        self._cache[key] = entry
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._max_entries:
+            self._cache.popitem(last=False)
+
+    def export(self):
+        """
+        [(contract, symbol, account, amount, age_seconds)] of every balance still held, expired or not.
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [(*key, amount, now - read_at) for key, (_, amount, read_at) in self._cache.items()]
+
+    def _drop(self, key):
+        # Caller holds the lock. A lookup in flight may have read the balance before the change
+        self._cache.pop(key, None)
+        lookup = self._pending.pop(key, None)
+        if lookup is not None:
+            lookup.stale = True
+
+    def invalidate(self, contract, account, symbol):
+        with self._lock:
+            self._drop((contract, symbol, account))
+
+    def invalidate_account(self, account):
+        with self._lock:
+            for key in [key for key in set(self._cache) | set(self._pending) if key[2] == account]:
+                self._drop(key)
+
+    def get(self, contract, account, symbol):
+        amount = self.cached(contract, account, symbol)
+        if amount is not None:
+            return amount
+        return self._submit(contract, account, symbol).result()
+
+    def get_many(self, contract, symbol, accounts):
+        """
+        {account: amount} for all accounts, looked up concurrently on the pool.
+        """
+        futures = {}
+        amounts = {}
+        for account in accounts:
+            amount = self.cached(contract, account, symbol)
+            if amount is None:
+                futures[account] = self._submit(contract, account, symbol)
+            else:
+                amounts[account] = amount
+        for account, future in futures.items():
+            amounts[account] = future.result()
+        return amounts
+
+    def _submit(self, contract, account, symbol):
+        key = (contract, symbol, account)
+        with self._lock:
+            lookup = self._pending.get(key)
+            if lookup is not None:
+                return lookup.future
+            lookup = self._pending[key] = _Lookup()
+            # Run in the caller's context, so the lookup counts as part of its round
+            lookup.future = self._executor.submit(contextvars.copy_context().run, self._fetch, key, lookup)
+        return lookup.future
+
+    def _fetch(self, key, lookup):
+        contract, symbol, account = key
+        try:
+            amount = self._fetch_balance(contract, account, symbol)
+            now = time.monotonic()
+            with self._lock:
+                if not lookup.stale and self._ttl_seconds > 0:
+                    self._store(key, (now + self._ttl_seconds, amount, now))
+            return amount
+        finally:
+            with self._lock:
+                if self._pending.get(key) is lookup:
+                    del self._pending[key]
+
+    def find_funded(self, contract, symbol, bots, is_funded, want=1):
+        """
+        Look up balances of bots in random order until want bots pass is_funded.
+        Returns (eligible_bots, balances) where balances only holds bots that were checked.
+        At most max_workers lookups are in flight per call; lookups still running when
+        enough bots are found complete in the background and warm the shared cache.
+        """
+        want = max(1, int(want or 1))
+        order = list(bots)
+        random.shuffle(order)
+        eligible = []
+        balances = {}
+        missing = []
+        for bot in order:
+            amount = self.cached(contract, bot, symbol)
+            if amount is None:
+                missing.append(bot)
+                continue
+            balances[bot] = amount
+            if is_funded(amount):
+                eligible.append(bot)
+        if len(eligible) >= want:
+            return eligible, balances
+
+        in_flight = {}
+        next_index = 0
+        while next_index < len(missing) or in_flight:
+            while next_index < len(missing) and len(in_flight) < self._max_workers:
+                bot = missing[next_index]
+                next_index += 1
+                in_flight[self._submit(contract, bot, symbol)] = bot
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                bot = in_flight.pop(future)
+                amount = future.result()
+                balances[bot] = amount
+                if is_funded(amount):
+                    eligible.append(bot)
+            if len(eligible) >= want:
+                break
+        return eligible, balances
@@ -0,0 +1,153 @@
+"""
+Batched submission: trades of different pairs that are ready together go out as one multi-action transaction
+"""
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from pydexbot.metrics import METRICS
+
+FAILURE_ALPHA = 0.05
+
+
+class BatchResultError(Exception):
+    """
+    The batch went through, but its result could not be cut into one result per
+    action, so no action can tell which traces are its own. result is the whole
+    transaction result.
+    """
+
+    def __init__(self, actions, results, result):
+        super().__init__(f"batch of {actions} actions executed, but its result split into {results} parts")
+        self.result = result
+
+
+class ActionBatcher:
+    """
+    Collect actions from many rounds and push them as shared transactions.
+
+    push(action) blocks its round until the action's own result is known. The
+    first action to arrive opens a batch, which is pushed once window_seconds have
+    passed or it holds max_actions, through push_actions(actions) on a pool of
+    max_inflight threads. split_result(result) cuts the transaction result into one
+    result per action, so every round only sees the traces of its own action.
+
+    A transaction is atomic, so when the chain rejects a batch none of it was
+    applied: the batch is split in halves and each half pushed again, down to
+    single actions, and only the actions that fail on their own get the error.
+    Bisecting pays off while failures are rare, so the batcher keeps a moving
+    share of failing actions: batches are capped at about half an expected
+    failure, and a rejected batch expected to hold more than one failing action
+    is pushed one action at a time instead. An error for which is_retryable(exc)
+    is False (a transport error, where the transaction may still have gone
+    through) fails every action in the batch; the batcher does not push it again,
+    though push_actions may itself fail over to another node first. A batch whose
+    result does not split into one result per action fails every action with
+    BatchResultError: it has executed, so it is not pushed again either.
+    """
+
+    def __init__(self, push_actions, split_result, window_seconds=0.02, max_actions=16, max_inflight=4,
+                 is_retryable=lambda exc: True):
+        self._push_actions = push_actions
+        self._split_result = split_result
+        self._window_seconds = max(0.0, float(window_seconds or 0))
+        self._max_actions = max(1, int(max_actions or 1))
+        self._is_retryable = is_retryable
+        self._failure_ratio = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(max_inflight or 1)), thread_name_prefix="batch")
+        self._cond = threading.Condition()
+        self._pending = []
+        self._opened_at = None
+        self._stopped = False
+        self._thread = None
+
+    def push(self, action):
+        return self.submit(action).result()
+
+    def submit(self, action):
+        """
+        Queue one [contract, action_name, packed_args, permissions] entry; returns a Future of its result.
+        """
+        future = Future()
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._dispatch, name="batcher", daemon=True)
+                self._thread.start()
+            self._pending.append((action, future))
+            if len(self._pending) == 1:
+                self._opened_at = time.monotonic()
+            if len(self._pending) == 1 or len(self._pending) >= self.batch_limit():
+                self._cond.notify()
+        return future
+
+    def _dispatch(self):
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    if not self._pending:
+                        self._cond.wait()
+                        continue
+                    remaining = self._opened_at + self._window_seconds - time.monotonic()
+                    if remaining <= 0 or len(self._pending) >= self.batch_limit():
+                        break
+                    self._cond.wait(remaining)
+                if self._stopped and not self._pending:
+                    return
+                limit = self.batch_limit()
+                batch = self._pending[:limit]
+                del self._pending[:limit]
+                self._opened_at = time.monotonic() if self._pending else None
+            self._executor.submit(self._push_batch, batch)
+
+    def batch_limit(self):
+        if self._failure_ratio <= 0:
+            return self._max_actions
+        return max(1, min(self._max_actions, int(0.5 / self._failure_ratio)))
+
+    def _record(self, failed, count=1):
+        # Moving share of failing actions, about the last 20 actions
+        for _ in range(count):
+            self._failure_ratio += FAILURE_ALPHA * ((1.0 if failed else 0.0) - self._failure_ratio)
+
+    def _push_batch(self, batch):
+        METRICS.inc("batch_pushes", size=str(len(batch)))
+        try:
+            result = self._push_actions([action for action, _ in batch])
+        except Exception as e:
+            if len(batch) == 1 or not self._is_retryable(e):
+                if len(batch) == 1 and self._is_retryable(e):
+                    self._record(True)
+                for _, future in batch:
+                    future.set_exception(e)
+                return
+            if len(batch) * self._failure_ratio >= 1:
+                METRICS.inc("batch_splits", mode="single")
+                for item in batch:
+                    self._push_batch([item])
+                return
+            METRICS.inc("batch_splits", mode="bisect")
+            middle = len(batch) // 2
+            self._push_batch(batch[:middle])
+            self._push_batch(batch[middle:])
+            return
+        self._record(False, len(batch))
+        results = self._split_result(result) if len(batch) > 1 else [result]
+        if len(results) != len(batch):
+            METRICS.inc("batch_split_errors")
+            e = BatchResultError(len(batch), len(results), result)
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), own_result in zip(batch, results):
+            future.set_result(own_result)
+
+    def close(self):
+        """
+        Push what is still queued and wait for batches in flight.
+        """
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        self._executor.shutdown(wait=True)
@@ -1,87 +1,471 @@
 import os
-import yaml
-import argparse
+import sys
+import socket
 import time
 import random
 from decimal import Decimal
 from datetime import datetime, timezone
 from zoneinfo import ZoneInfo
-from pyflonkit import eosapi as chainapi, wallet
+from pyflonkit import wallet
 from pydexbot import utils
+from pydexbot.node_pool import RpcError, is_transport_error
+from pydexbot.rpc_governor import RpcShed
+from pydexbot.runtime import get_runtime
+from pydexbot.scheduler import DeadlineScheduler
+from pydexbot.batcher import BatchResultError
+from pydexbot.trace_parser import (
+    parse_fills_from_result, parse_transfers_from_result, format_fill, split_result_by_action,
+)
+from pydexbot.metrics import METRICS, serve_metrics, start_summary
+from pydexbot.candle_plan import candle_state, segment_side
+from pydexbot.preflight import NO_FILL, SwapPreflight
+from pydexbot.profiler import dump_stacks, tag_thread, untag_thread
+from pydexbot.sharding import ShardCoordinator
+from pydexbot.assets import cached_asset, forced_side, price_bands, quote_required_amount
 import threading
 import signal
+import atexit
+
+
+# The config is read and the shared objects are built by configure(), on first use
+RUNTIME = None
+_CONFIGURE_LOCK = threading.Lock()
+
+# Settings, read from the config by configure() (see read_settings)
+CONFIG_DIR = None
+LOG_DIR = None
+SHARD_INDEX = None
+CONFIG_PATH = None
+NODE_URL = None
+NODE_URLS = None
+TRADE_PRIVKEY = None
+TOKENX_MM_CONTRACT = None
+BUYLOWSELLHI_CONTRACT = None
+TRADE_PAIRS = None
+BOT_ADMIN = None
+FEE_PAYER = None
+BOT_MM_CONTRACT = None
+DEX_CONTRACT = None
+TRADE_PERMISSION = None
+MIN_INTERVAL_SECONDS = None
+MAX_INTERVAL_SECONDS = None
+INTERVAL_JITTER_RATIO = None
+RETRY_MIN_INTERVAL_SECONDS = None
+RETRY_MAX_INTERVAL_SECONDS = None
+READY_JITTER_SECONDS = None
+VERBOSE = None
+SIDE_SEGMENT_SECONDS = None
+TARGET_SIDE_DEADBAND_RATIO = None
+TARGET_SIDE_DEADBAND_RATIOS = None
+CANDLE_PLAN_ENABLED = None
+CANDLE_SECONDS = None
+LOG_TIMEZONE = None
+BALANCE_FETCH_WORKERS = None
+BALANCE_CACHE_SECONDS = None
+BALANCE_CACHE_MAX_ENTRIES = None
+BALANCE_PREFILTER_TARGET = None
+PREFLIGHT_MODE = None
+PREFLIGHT_SWAP_FEE_RATIO = None
+PREFLIGHT_INPUT_SCALE_MAX = None
+PREFLIGHT_MAX_SLIPPAGE_RATIO = None
+RPC_TIMEOUT_SECONDS = None
+SCHEDULER_WORKERS = None
+RPC_HEDGE_ENABLED = None
+RPC_HEDGE_MIN_DELAY_MS = None
+NODE_HEALTH_INTERVAL_SECONDS = None
+NODE_MAX_HEAD_LAG_BLOCKS = None
+RPC_RATE_PER_NODE = None
+RPC_BURST = None
+DEFAULT_RPC_QUEUE_SECONDS = None
+RPC_QUEUE_SECONDS = None
+RPC_MIN_RATE_RATIO = None
+RPC_RECOVER_SECONDS = None
+DEFAULT_TABLE_CACHE_TTL_SECONDS = None
+TABLE_CACHE_TTL_SECONDS = None
+TABLE_CACHE_MAX_ENTRIES = None
+LOG_FLUSH_BYTES = None
+LOG_FLUSH_INTERVAL_SECONDS = None
+LOG_MAX_BYTES = None
+LOG_ROTATE_DAILY = None
+LOG_FORMAT = None
+ABI_CACHE_DIR = None
+JOURNAL_ENABLED = None
+JOURNAL_DIR = None
+JOURNAL_FLUSH_SECONDS = None
+WARM_START_ENABLED = None
+WARM_START_PATH = None
+WARM_START_SAVE_SECONDS = None
+DEFAULT_WARM_START_MAX_AGE_SECONDS = None
+WARM_START_MAX_AGE_SECONDS = None
+WARM_START_TABLES = None
+PROFILE_DIR = None
+PROFILE_SECONDS = None
+PROFILE_INTERVAL_MS = None
+PROFILE_INCLUDE_IDLE = None
+SHARD_WORKERS = None
+SHARD_NAME = None
+SHARD_LEASE_FILE = None
+SHARD_LEASE_SECONDS = None
+SHARD_RENEW_SECONDS = None
+SHARD_MEMBER = None
+ACTION_TEMPLATES_ENABLED = None
+TRADE_ACTIONS = None
+LOCAL_SIGNING_ENABLED = None
+SIGNING_WORKERS = None
+TAPOS_REFRESH_SECONDS = None
+TX_EXPIRATION_SECONDS = None
+SUBMIT_MODE = None
+RECONCILE_MAX_INFLIGHT = None
+RECONCILE_BATCH_SIZE = None
+BATCH_WINDOW_MS = None
+BATCH_MAX_ACTIONS = None
+BATCH_MAX_INFLIGHT = None
+METRICS_PORT = None
+METRICS_HOST = None
+METRICS_SUMMARY_SECONDS = None
+MARKET_SNAPSHOT_SECONDS = None
+MARKET_SNAPSHOT_PAGE_LIMIT = None
+MARKET_SNAPSHOT_MAX_PAGES = None
+CHAIN_FOLLOWER_POLL_SECONDS = None
+CHAIN_FOLLOWER_RECONCILE_SECONDS = None
+CHAIN_FOLLOWER_MAX_LAG_BLOCKS = None
+TRADEMARKETS_TABLE = None
+MARKETS_TABLE = None
+BOTMARKETS_TABLE = None
+SCHEDULES_TABLE = None
+BOTGROUPS_TABLE = None
+INVENTORY_LEDGER_ENABLED = None
+INVENTORY_RECONCILE_SECONDS = None
+
+# Objects shared by all pair workers, built by configure() (see build_shared_objects)
+RPC_GOVERNOR = None
+NODE_POOL = None
+TABLE_CACHE = None
+PROFILER = None
+ABI_CACHE = None
+ACTION_PACKER = None
+TX_BUILDER = None
+WARM_START = None
+MARKET_SNAPSHOTS = None
+CHAIN_FOLLOWER = None
+LOG_WRITER = None
+JOURNAL = None
+BALANCE_FETCHER = None
+INVENTORY_LEDGER = None
+ACTION_BATCHER = None
+RECONCILER = None
+SHARD_LEASES = None
+
+def configure(runtime=None):
+    """
+    Read the service settings and build the objects shared by all pair workers
+    into this module's globals, once. Importing the module does neither;
+    run_bot_service and the CLIs call this first. runtime defaults to the
+    process's get_runtime().
+    """
+    global RUNTIME
+    with _CONFIGURE_LOCK:
+        if RUNTIME is None:
+            runtime = runtime or get_runtime()
+            _set_globals(read_settings(runtime))
+            _set_globals(build_shared_objects())
+            RUNTIME = runtime
+    return RUNTIME
+
+def _set_globals(values):
+    undeclared = sorted(name for name in values if name not in globals())
+    if undeclared:
+        raise NameError(f"declare these names at module level: {', '.join(undeclared)}")
+    globals().update(values)
+
+def read_settings(runtime):
+    """
+    {name: value} of the module-level settings read from runtime's config.
+    """
+    CONFIG_DIR = runtime.config_dir
+    LOG_DIR = runtime.log_dir
+    SHARD_INDEX = runtime.shard_index
+    CONFIG_PATH = runtime.config_path
+    config = runtime.config
+
+    NODE_URL = config["node_url"]
+    NODE_URLS = [NODE_URL] if isinstance(NODE_URL, str) else [str(url) for url in NODE_URL]
+    TRADE_PRIVKEY = config.get("trade_privkey")
+    TOKENX_MM_CONTRACT = config.get("tokenx_mm_contract")
+    BUYLOWSELLHI_CONTRACT = config.get("buylowsellhi_contract", "buylowsellhi")
+    TRADE_PAIRS = config.get("trade_pairs", [])
+    BOT_ADMIN = config.get("bot_admin")
+    FEE_PAYER = config.get("fee_payer")
+    BOT_MM_CONTRACT = config.get("bot_mm_contract", "bot.mm")
+    DEX_CONTRACT = config.get("dex_contract", "flon.swap")
+
+    TRADE_PERMISSION = config.get("trade_permission", "trade")
+
+    MIN_INTERVAL_SECONDS = config.get("min_interval_seconds", 4)
+    MAX_INTERVAL_SECONDS = config.get("max_interval_seconds", 12)
+    INTERVAL_JITTER_RATIO = config.get("interval_jitter_ratio", 0.35)
+    RETRY_MIN_INTERVAL_SECONDS = config.get("retry_min_interval_seconds", 10)
+    RETRY_MAX_INTERVAL_SECONDS = config.get("retry_max_interval_seconds", 30)
+    READY_JITTER_SECONDS = config.get("ready_jitter_seconds", 8)
+    VERBOSE = config.get("verbose", False)
+    SIDE_SEGMENT_SECONDS = int(config.get("side_segment_seconds", 900))
+    TARGET_SIDE_DEADBAND_RATIO = Decimal(str(config.get("target_side_deadband_ratio", "0.006")))
+    TARGET_SIDE_DEADBAND_RATIOS = {
+        str(pair): Decimal(str(value))
+        for pair, value in config.get("target_side_deadband_ratios", {}).items()
+    }
+    CANDLE_PLAN_ENABLED = bool(config.get("candle_plan_enabled", True))
+    CANDLE_SECONDS = int(config.get("candle_seconds", 300))
+    LOG_TIMEZONE = config.get("log_timezone", "Asia/Shanghai")
+    BALANCE_FETCH_WORKERS = int(config.get("balance_fetch_workers", 8))
+    BALANCE_CACHE_SECONDS = float(config.get("balance_cache_seconds", 2))
+    BALANCE_CACHE_MAX_ENTRIES = int(config.get("balance_cache_max_entries", 16384))
+    BALANCE_PREFILTER_TARGET = int(config.get("balance_prefilter_target", 1))
+    PREFLIGHT_MODE = str(config.get("preflight_mode", "off")).lower()
+    PREFLIGHT_SWAP_FEE_RATIO = Decimal(str(config.get("preflight_swap_fee_ratio", "0.003")))
+    PREFLIGHT_INPUT_SCALE_MAX = Decimal(str(config.get("preflight_input_scale_max", "1.5")))
+    PREFLIGHT_MAX_SLIPPAGE_RATIO = Decimal(str(config.get("preflight_max_slippage_ratio", "0")))
+    RPC_TIMEOUT_SECONDS = float(config.get("rpc_timeout_seconds", 10))
+    SCHEDULER_WORKERS = int(config.get("scheduler_workers", 0))
+    RPC_HEDGE_ENABLED = bool(config.get("rpc_hedge_enabled", True))
+    RPC_HEDGE_MIN_DELAY_MS = float(config.get("rpc_hedge_min_delay_ms", 50))
+    NODE_HEALTH_INTERVAL_SECONDS = float(config.get("node_health_interval_seconds", 10))
+    NODE_MAX_HEAD_LAG_BLOCKS = int(config.get("node_max_head_lag_blocks", 10))
+    RPC_RATE_PER_NODE = float(config.get("rpc_rate_per_node", 0))
+    RPC_BURST = float(config.get("rpc_burst", 0))
+    DEFAULT_RPC_QUEUE_SECONDS = {
+        "schedule": 2,
+        "market": 1,
+        "balance": 0.5,
+        "background": 0.2,
+    }
+    RPC_QUEUE_SECONDS = {
+        **DEFAULT_RPC_QUEUE_SECONDS,
+        **{str(priority): float(value) for priority, value in (config.get("rpc_queue_seconds") or {}).items()},
+    }
+    RPC_MIN_RATE_RATIO = float(config.get("rpc_min_rate_ratio", 0.1))
+    RPC_RECOVER_SECONDS = float(config.get("rpc_recover_seconds", 30))
+    DEFAULT_TABLE_CACHE_TTL_SECONDS = {
+        "trademarkets": 10,
+        "schedules": 5,
+        "botgroups": 60,
+        "markets": 1,
+        "botmarkets": 1,
+    }
+    TABLE_CACHE_TTL_SECONDS = {
+        **DEFAULT_TABLE_CACHE_TTL_SECONDS,
+        **{str(table): float(value) for table, value in (config.get("table_cache_ttl_seconds") or {}).items()},
+    }
+    TABLE_CACHE_MAX_ENTRIES = int(config.get("table_cache_max_entries", 4096))
+    LOG_FLUSH_BYTES = int(config.get("log_flush_bytes", 64 * 1024))
+    LOG_FLUSH_INTERVAL_SECONDS = float(config.get("log_flush_interval_seconds", 1))
+    LOG_MAX_BYTES = int(config.get("log_max_bytes", 0))
+    LOG_ROTATE_DAILY = bool(config.get("log_rotate_daily", False))
+    LOG_FORMAT = str(config.get("log_format", "text")).lower()
+    ABI_CACHE_DIR = config.get("abi_cache_dir", os.path.join(os.getcwd(), "data", "abi"))
+    JOURNAL_ENABLED = bool(config.get("journal_enabled", False))
+    JOURNAL_DIR = config.get("journal_dir", os.path.join(os.getcwd(), "data", "journal"))
+    JOURNAL_FLUSH_SECONDS = float(config.get("journal_flush_seconds", 1))
+    WARM_START_ENABLED = bool(config.get("warm_start_enabled", False))
+    WARM_START_PATH = config.get("warm_start_path", os.path.join(os.getcwd(), "data", "warm_start.json"))
+    WARM_START_SAVE_SECONDS = float(config.get("warm_start_save_seconds", 30))
+    DEFAULT_WARM_START_MAX_AGE_SECONDS = {
+        "botgroups": 60,
+        "trademarkets": 10,
+        "schedules": 5,
+        "balances": 2,
+    }
+    WARM_START_MAX_AGE_SECONDS = {
+        **DEFAULT_WARM_START_MAX_AGE_SECONDS,
+        **{str(kind): float(value) for kind, value in (config.get("warm_start_max_age_seconds") or {}).items()},
+    }
+    WARM_START_TABLES = ("schedules", "trademarkets", "botgroups")
+    PROFILE_DIR = config.get("profile_dir", os.path.join(os.getcwd(), "data", "profiles"))
+    PROFILE_SECONDS = float(config.get("profile_seconds", 30))
+    PROFILE_INTERVAL_MS = float(config.get("profile_interval_ms", 10))
+    PROFILE_INCLUDE_IDLE = bool(config.get("profile_include_idle", False))
+    SHARD_WORKERS = int(config.get("shard_workers", 0))
+    SHARD_NAME = str(config.get("shard_name") or socket.gethostname())
+    SHARD_LEASE_FILE = config.get("shard_lease_file", os.path.join(os.getcwd(), "data", "shards", "leases.json"))
+    SHARD_LEASE_SECONDS = float(config.get("shard_lease_seconds", 15))
+    SHARD_RENEW_SECONDS = float(config.get("shard_renew_seconds", 5))
+    SHARD_MEMBER = f"{SHARD_NAME}.{SHARD_INDEX}" if SHARD_INDEX is not None else None
+    if SHARD_MEMBER:
+        # Workers journal side by side; `pydexbot journal` reads every member's directory
+        JOURNAL_DIR = os.path.join(JOURNAL_DIR, SHARD_MEMBER)
+        WARM_START_PATH = "{0}.{2}{1}".format(*os.path.splitext(WARM_START_PATH), SHARD_MEMBER)
+        PROFILE_DIR = os.path.join(PROFILE_DIR, SHARD_MEMBER)
+    ACTION_TEMPLATES_ENABLED = bool(config.get("action_templates_enabled", True))
+    TRADE_ACTIONS = ("trade", "buy", "sell")
+    LOCAL_SIGNING_ENABLED = bool(config.get("local_signing_enabled", False))
+    SIGNING_WORKERS = int(config.get("signing_workers", 2))
+    TAPOS_REFRESH_SECONDS = float(config.get("tapos_refresh_seconds", 10))
+    TX_EXPIRATION_SECONDS = int(config.get("tx_expiration_seconds", 60))
+    SUBMIT_MODE = str(config.get("submit_mode", "wait")).lower()
+    RECONCILE_MAX_INFLIGHT = int(config.get("reconcile_max_inflight", 16))
+    RECONCILE_BATCH_SIZE = int(config.get("reconcile_batch_size", 64))
+    BATCH_WINDOW_MS = float(config.get("batch_window_ms", 0))
+    BATCH_MAX_ACTIONS = int(config.get("batch_max_actions", 16))
+    BATCH_MAX_INFLIGHT = int(config.get("batch_max_inflight", 4))
+    METRICS_PORT = int(config.get("metrics_port", 0))
+    METRICS_HOST = config.get("metrics_host", "127.0.0.1")
+    METRICS_SUMMARY_SECONDS = float(config.get("metrics_summary_seconds", 60))
+    if SHARD_MEMBER and METRICS_PORT:
+        METRICS_PORT += 1 + SHARD_INDEX
+    MARKET_SNAPSHOT_SECONDS = float(config.get("market_snapshot_seconds", 0))
+    MARKET_SNAPSHOT_PAGE_LIMIT = int(config.get("market_snapshot_page_limit", 200))
+    MARKET_SNAPSHOT_MAX_PAGES = int(config.get("market_snapshot_max_pages", 10))
+    CHAIN_FOLLOWER_POLL_SECONDS = float(config.get("chain_follower_poll_seconds", 0))
+    CHAIN_FOLLOWER_RECONCILE_SECONDS = float(config.get("chain_follower_reconcile_seconds", 60))
+    CHAIN_FOLLOWER_MAX_LAG_BLOCKS = int(config.get("chain_follower_max_lag_blocks", 10))
+    TRADEMARKETS_TABLE = (BUYLOWSELLHI_CONTRACT, BUYLOWSELLHI_CONTRACT, "trademarkets")
+    MARKETS_TABLE = (DEX_CONTRACT, DEX_CONTRACT, "markets")
+    BOTMARKETS_TABLE = (TOKENX_MM_CONTRACT, TOKENX_MM_CONTRACT, "botmarkets")
+    SCHEDULES_TABLE = (TOKENX_MM_CONTRACT, TOKENX_MM_CONTRACT, "schedules")
+    BOTGROUPS_TABLE = (BOT_MM_CONTRACT, BOT_MM_CONTRACT, "botgroups")
+    INVENTORY_LEDGER_ENABLED = bool(config.get("inventory_ledger_enabled", False))
+    INVENTORY_RECONCILE_SECONDS = float(config.get("inventory_reconcile_seconds", 300))
+    return {name: value for name, value in locals().items() if name.isupper()}
+
+def build_shared_objects():
+    """
+    {name: value} of the node pool, caches, writers and other objects built from the settings.
+    """
+    from pydexbot.balances import BalanceFetcher
+    from pydexbot.batcher import ActionBatcher
+    from pydexbot.chain_follower import ChainFollower
+    from pydexbot.inventory import InventoryLedger
+    from pydexbot.journal import TradeJournal
+    from pydexbot.log_writer import LogWriter
+    from pydexbot.market_snapshot import MarketSnapshotService
+    from pydexbot.node_pool import NodePool
+    from pydexbot.packing import AbiCache, ActionPacker
+    from pydexbot.profiler import SamplingProfiler
+    from pydexbot.reconciler import Reconciler
+    from pydexbot.rpc_governor import RpcGovernor
+    from pydexbot.sharding import LeaseFile, ShardMember
+    from pydexbot.table_cache import TableCache
+    from pydexbot.txbuilder import TransactionBuilder
+    from pydexbot.warm_start import WarmStartSnapshot
+    RPC_GOVERNOR = RpcGovernor(
+        RPC_RATE_PER_NODE,
+        RPC_BURST or None,
+        RPC_QUEUE_SECONDS,
+        RPC_MIN_RATE_RATIO,
+        RPC_RECOVER_SECONDS,
+    ) if RPC_RATE_PER_NODE > 0 else None
+    NODE_POOL = NodePool(
+        NODE_URLS,
+        timeout_seconds=RPC_TIMEOUT_SECONDS,
+        hedge_enabled=RPC_HEDGE_ENABLED,
+        hedge_min_delay_ms=RPC_HEDGE_MIN_DELAY_MS,
+        health_interval_seconds=NODE_HEALTH_INTERVAL_SECONDS,
+        max_head_lag_blocks=NODE_MAX_HEAD_LAG_BLOCKS,
+        governor=RPC_GOVERNOR,
+    )
+    TABLE_CACHE = TableCache(TABLE_CACHE_TTL_SECONDS, TABLE_CACHE_MAX_ENTRIES)
+    PROFILER = SamplingProfiler(PROFILE_DIR, PROFILE_INTERVAL_MS / 1000, PROFILE_INCLUDE_IDLE)
+    ABI_CACHE = AbiCache(ABI_CACHE_DIR, utils.get_abi, utils.get_code_hash, utils.set_abi)
+    ACTION_PACKER = ActionPacker(ABI_CACHE, utils.pack_args)
+    TX_BUILDER = TransactionBuilder(NODE_POOL, SIGNING_WORKERS, TAPOS_REFRESH_SECONDS, TX_EXPIRATION_SECONDS)
+    WARM_START = WarmStartSnapshot(
+        WARM_START_PATH,
+        {"contracts": [TOKENX_MM_CONTRACT, BUYLOWSELLHI_CONTRACT, BOT_MM_CONTRACT, DEX_CONTRACT], "chain_id": None},
+        WARM_START_MAX_AGE_SECONDS,
+    ) if WARM_START_ENABLED else None
+    MARKET_SNAPSHOTS = MarketSnapshotService(
+        NODE_POOL.get_table_rows,
+        TRADE_PAIRS,
+        {
+            (BUYLOWSELLHI_CONTRACT, BUYLOWSELLHI_CONTRACT, "trademarkets"): ("name", "trade_pair_name"),
+            (DEX_CONTRACT, DEX_CONTRACT, "markets"): "tpcode",
+            (TOKENX_MM_CONTRACT, TOKENX_MM_CONTRACT, "botmarkets"): "trade_pair_name",
+        },
+        MARKET_SNAPSHOT_SECONDS,
+        MARKET_SNAPSHOT_PAGE_LIMIT,
+        MARKET_SNAPSHOT_MAX_PAGES,
+    )
+    CHAIN_FOLLOWER = ChainFollower(
+        lambda: NODE_POOL.read("/v1/chain/get_info", {}, hedge=False),
+        lambda block_num: NODE_POOL.read("/v1/chain/get_block", {"block_num_or_id": block_num}, hedge=False),
+        NODE_POOL.get_table_rows,
+        TRADE_PAIRS,
+        {
+            TRADEMARKETS_TABLE: ("name", "trade_pair_name"),
+            MARKETS_TABLE: "tpcode",
+            BOTMARKETS_TABLE: "trade_pair_name",
+            SCHEDULES_TABLE: "trade_pair_name",
+            BOTGROUPS_TABLE: "name",
+        },
+        {
+            TOKENX_MM_CONTRACT: (MARKETS_TABLE, BOTMARKETS_TABLE, SCHEDULES_TABLE),
+            DEX_CONTRACT: (MARKETS_TABLE,),
+            BUYLOWSELLHI_CONTRACT: (TRADEMARKETS_TABLE,),
+            BOT_MM_CONTRACT: (BOTGROUPS_TABLE,),
+        },
+        CHAIN_FOLLOWER_POLL_SECONDS,
+        CHAIN_FOLLOWER_RECONCILE_SECONDS,
+        CHAIN_FOLLOWER_MAX_LAG_BLOCKS,
+        MARKET_SNAPSHOT_PAGE_LIMIT,
+        MARKET_SNAPSHOT_MAX_PAGES,
+        on_row_change=on_followed_row_change,
+        on_account_change=lambda account: BALANCE_FETCHER.invalidate_account(account),
+    )
+    LOG_WRITER = LogWriter(
+        flush_bytes=LOG_FLUSH_BYTES,
+        flush_interval_seconds=LOG_FLUSH_INTERVAL_SECONDS,
+        max_bytes=LOG_MAX_BYTES,
+        rotate_daily=LOG_ROTATE_DAILY,
+        json_lines=LOG_FORMAT == "json",
+        tz=log_timezone(),
+    )
+    atexit.register(LOG_WRITER.close)
+    JOURNAL = TradeJournal(JOURNAL_DIR, JOURNAL_FLUSH_SECONDS) if JOURNAL_ENABLED else None
+    if JOURNAL is not None:
+        atexit.register(JOURNAL.close)
+    BALANCE_FETCHER = BalanceFetcher(get_currency_balance, BALANCE_FETCH_WORKERS, BALANCE_CACHE_SECONDS,
+                                    BALANCE_CACHE_MAX_ENTRIES)
+    INVENTORY_LEDGER = InventoryLedger(BALANCE_FETCHER.get_many, INVENTORY_RECONCILE_SECONDS)
+    ACTION_BATCHER = ActionBatcher(
+        push_packed_actions,
+        split_result_by_action,
+        BATCH_WINDOW_MS / 1000.0,
+        BATCH_MAX_ACTIONS,
+        BATCH_MAX_INFLIGHT,
+        is_retryable=chain_rejected,
+    ) if BATCH_WINDOW_MS > 0 else None
+    RECONCILER = Reconciler(reconcile_trade, RECONCILE_MAX_INFLIGHT, RECONCILE_BATCH_SIZE)
+    SHARD_LEASES = ShardMember(LeaseFile(SHARD_LEASE_FILE), SHARD_MEMBER, TRADE_PAIRS, SHARD_LEASE_SECONDS,
+                               SHARD_RENEW_SECONDS) if SHARD_MEMBER else None
+    return {name: value for name, value in locals().items() if name.isupper()}
+
+def on_followed_row_change(code, scope, table, trade_pair):
+    TABLE_CACHE.invalidate(code, scope, table, trade_pair)
+    MARKET_SNAPSHOTS.mark_dirty(trade_pair)
+    if table == "schedules":
+        forget_trade_ready_at(trade_pair)
+
+def log_timezone():
+    try:
+        return ZoneInfo(LOG_TIMEZONE)
+    except Exception:
+        return None
 
+def log_message(level, msg, log_file=None, *args):
+    """
+    Hand a log line to the writer thread. With args, msg is %-formatted on that thread.
+    """
+    LOG_WRITER.write(level, msg, args, log_file)
 
-# Parse config directory from command line
-parser = argparse.ArgumentParser()
-parser.add_argument('--config-dir', default=os.path.join(os.getcwd(), 'config'), help='Config directory path')
-parser.add_argument('--log-dir', default=os.path.join(os.getcwd(), 'logs'), help='Log directory path')
-args, _ = parser.parse_known_args()
-CONFIG_DIR = args.config_dir
-LOG_DIR = args.log_dir
-
-def get_config_path():
-    # Prefer .config.yaml if exists
-    config_path = os.path.join(CONFIG_DIR, ".config.yaml")
-    if os.path.exists(config_path):
-        return config_path
-    return os.path.join(CONFIG_DIR, "config.example.yaml")
-
-# Load config.example.yaml or override .config.yaml
-CONFIG_PATH = get_config_path()
-with open(CONFIG_PATH, "r") as f:
-    config = yaml.safe_load(f)
-
-NODE_URL = config["node_url"]
-TRADE_PRIVKEY = config.get("trade_privkey")
-TOKENX_MM_CONTRACT = config.get("tokenx_mm_contract")
-BUYLOWSELLHI_CONTRACT = config.get("buylowsellhi_contract", "buylowsellhi")
-TRADE_PAIRS = config.get("trade_pairs", [])
-BOT_ADMIN = config.get("bot_admin")
-FEE_PAYER = config.get("fee_payer")
-BOT_MM_CONTRACT = config.get("bot_mm_contract", "bot.mm")
-DEX_CONTRACT = config.get("dex_contract", "flon.swap")
-
-TRADE_PERMISSION = config.get("trade_permission", "trade")
-
-MIN_INTERVAL_SECONDS = config.get("min_interval_seconds", 4)
-MAX_INTERVAL_SECONDS = config.get("max_interval_seconds", 12)
-INTERVAL_JITTER_RATIO = config.get("interval_jitter_ratio", 0.35)
-RETRY_MIN_INTERVAL_SECONDS = config.get("retry_min_interval_seconds", 10)
-RETRY_MAX_INTERVAL_SECONDS = config.get("retry_max_interval_seconds", 30)
-READY_JITTER_SECONDS = config.get("ready_jitter_seconds", 8)
-VERBOSE = config.get("verbose", False)
-SIDE_SEGMENT_SECONDS = int(config.get("side_segment_seconds", 900))
-CORRECTION_BAND_MULTIPLIER = Decimal("2.0")
-TARGET_SIDE_DEADBAND_RATIO = Decimal(str(config.get("target_side_deadband_ratio", "0.006")))
-TARGET_SIDE_DEADBAND_RATIOS = {
-    str(pair): Decimal(str(value))
-    for pair, value in config.get("target_side_deadband_ratios", {}).items()
-}
-CANDLE_PLAN_ENABLED = bool(config.get("candle_plan_enabled", True))
-CANDLE_SECONDS = int(config.get("candle_seconds", 300))
-LOG_TIMEZONE = config.get("log_timezone", "Asia/Shanghai")
-
-def log_message(level, msg, log_file=None):
-    line = f"[{level}] {msg}"
-    if log_file:
-        log_dir = os.path.dirname(log_file)
-        if log_dir and not os.path.exists(log_dir):
-            os.makedirs(log_dir, exist_ok=True)
-        with open(log_file, "a") as f:
-            f.write(line + "\n")
-    else:
-        print(line)
-
-def debug(msg, log_file=None):
+def debug(msg, log_file=None, *args):
     if VERBOSE:
-        log_message("DEBUG", msg, log_file)
+        log_message("DEBUG", msg, log_file, *args)
 
-def info(msg, log_file=None):
-    log_message("INFO", msg, log_file)
+def info(msg, log_file=None, *args):
+    log_message("INFO", msg, log_file, *args)
 
-def error(msg, log_file=None):
-    log_message("ERROR", msg, log_file)
+def error(msg, log_file=None, *args):
+    log_message("ERROR", msg, log_file, *args)
 
 def format_no_fill_message(exc):
     text = str(exc)
@@ -139,18 +523,10 @@ def next_interval_seconds(min_seconds, max_seconds):
         base = random.uniform(max(1.0, base - jitter_span), base + jitter_span)
     return max(1.0, base)
 
-def sleep_with_jitter(stop_event, min_seconds, max_seconds, log_file=None, reason="next round"):
+def jitter_wait_seconds(min_seconds, max_seconds, log_file=None, reason="next round"):
     sleep_time = next_interval_seconds(min_seconds, max_seconds)
     info(f"wait for {reason}: {sleep_time:.1f}s", log_file)
-    sleep_until(stop_event, sleep_time)
-
-def sleep_until(stop_event, sleep_time):
-    deadline = time.monotonic() + sleep_time
-    while not stop_event.is_set():
-        remaining = deadline - time.monotonic()
-        if remaining <= 0:
-            break
-        time.sleep(min(1.0, remaining))
+    return sleep_time
 
 def parse_chain_time_seconds(value):
     if not value:
@@ -167,49 +543,97 @@ def parse_chain_time_seconds(value):
     return 0
 
 def parse_asset(value):
-    amount, symbol = str(value).strip().split()
-    return Decimal(amount), symbol
+    asset = cached_asset(str(value))
+    return asset.decimal, asset.symbol
 
-def get_currency_balance(contract, account, symbol):
-    resp = chainapi.get_table_rows(True, contract, account, "accounts", symbol, symbol, 1)
-    for row in resp.get("rows", []):
+def balance_from_rows(rows, symbol):
+    for row in rows:
         amount, row_symbol = parse_asset(row["balance"])
         if row_symbol == symbol:
             return amount
     return Decimal("0")
 
-def get_single_table_row(code, scope, table, lower_bound):
-    resp = chainapi.get_table_rows(True, code, scope, table, lower_bound, lower_bound, 1)
+def get_currency_balance(contract, account, symbol):
+    if not CHAIN_FOLLOWER.enabled:
+        resp = NODE_POOL.get_table_rows(contract, account, "accounts", symbol, symbol, 1)
+        return balance_from_rows(resp.get("rows", []), symbol)
+    hit, amount = CHAIN_FOLLOWER.balance(contract, account, symbol)
+    if hit:
+        return amount
+    read_started = time.monotonic()
+    resp = NODE_POOL.get_table_rows(contract, account, "accounts", symbol, symbol, 1)
+    amount = balance_from_rows(resp.get("rows", []), symbol)
+    CHAIN_FOLLOWER.record_balance(contract, account, symbol, amount, read_started)
+    return amount
+
+
+def read_single_table_row(code, scope, table, lower_bound):
+    resp = NODE_POOL.get_table_rows(code, scope, table, lower_bound, lower_bound, 1)
     if resp and resp.get("rows"):
         return resp["rows"][0]
     return None
 
-def get_swap_market(trade_pair):
-    row = get_single_table_row(DEX_CONTRACT, DEX_CONTRACT, "markets", trade_pair)
+def get_single_table_row(code, scope, table, lower_bound, snapshot=None):
+    hit, row = CHAIN_FOLLOWER.row(code, scope, table, lower_bound)
+    if hit:
+        return row
+    hit, row = MARKET_SNAPSHOTS.row(code, scope, table, lower_bound, snapshot)
+    if hit:
+        return row
+    return TABLE_CACHE.get(code, scope, table, lower_bound,
+                           lambda: read_single_table_row(code, scope, table, lower_bound))
+
+def invalidate_trade_rows(trade_pair, selected_bot=None, block_num=None):
+    """
+    Drop cached rows that our own trade on trade_pair has just changed.
+    The chain follower serves them again once it has applied block_num.
+    """
+    TABLE_CACHE.invalidate(DEX_CONTRACT, DEX_CONTRACT, "markets", trade_pair)
+    TABLE_CACHE.invalidate(TOKENX_MM_CONTRACT, TOKENX_MM_CONTRACT, "botmarkets", trade_pair)
+    TABLE_CACHE.invalidate(TOKENX_MM_CONTRACT, TOKENX_MM_CONTRACT, "schedules", trade_pair)
+    MARKET_SNAPSHOTS.mark_dirty(trade_pair)
+    forget_trade_ready_at(trade_pair)
+    if selected_bot:
+        BALANCE_FETCHER.invalidate_account(selected_bot)
+    if CHAIN_FOLLOWER.enabled:
+        CHAIN_FOLLOWER.mark_dirty(trade_pair, block_num)
+        if selected_bot:
+            CHAIN_FOLLOWER.mark_dirty(selected_bot, block_num)
+
+def update_inventory(selected_bot, result=None):
+    """
+    Move ledger balances by the transfers of our accepted trade, or re-read the
+    bot's balances before its next pick when the push failed or its outcome is unknown.
+    """
+    if not INVENTORY_LEDGER_ENABLED or not selected_bot:
+        return
+    if result is None:
+        INVENTORY_LEDGER.invalidate(selected_bot)
+        BALANCE_FETCHER.invalidate_account(selected_bot)
+        return
+    INVENTORY_LEDGER.apply_transfers(parse_transfers_from_result(result))
+
+def result_block_num(trx):
+    processed = trx.get("processed") if isinstance(trx, dict) else None
+    if isinstance(processed, dict):
+        return processed.get("block_num")
+    return None
+
+def get_swap_market(trade_pair, snapshot=None):
+    row = get_single_table_row(DEX_CONTRACT, DEX_CONTRACT, "markets", trade_pair, snapshot)
     if row and row.get("tpcode") == trade_pair:
         return row
     return None
 
-def get_bot_market(trade_pair):
-    row = get_single_table_row(TOKENX_MM_CONTRACT, TOKENX_MM_CONTRACT, "botmarkets", trade_pair)
+def get_bot_market(trade_pair, snapshot=None):
+    row = get_single_table_row(TOKENX_MM_CONTRACT, TOKENX_MM_CONTRACT, "botmarkets", trade_pair, snapshot)
     if row and row.get("trade_pair_name") == trade_pair:
         return row
     return None
 
-def mix32(value):
-    value &= 0xffffffff
-    value ^= value >> 16
-    value = (value * 0x7feb352d) & 0xffffffff
-    value ^= value >> 15
-    value = (value * 0x846ca68b) & 0xffffffff
-    value ^= value >> 16
-    return value & 0xffffffff
-
 def calc_left_inventory_bps(bot_market, left_price):
-    left_amount, _ = parse_asset(bot_market["left_pool"]["total_quantity"])
-    right_amount, _ = parse_asset(bot_market["right_pool"]["total_quantity"])
-    left_value = left_amount * left_price
-    total_value = left_value + right_amount
+    left_value = cached_asset(bot_market["left_pool"]["total_quantity"]).decimal * left_price
+    total_value = left_value + cached_asset(bot_market["right_pool"]["total_quantity"]).decimal
     if total_value <= 0:
         return 5000
     return int(max(Decimal("0"), min(Decimal("10000"), left_value * Decimal("10000") / total_value)))
@@ -225,24 +649,7 @@ def planned_candle_state(trade_pair, now_seconds=None):
         return None, None
     if now_seconds is None:
         now_seconds = int(time.time())
-
-    candle_index = now_seconds // CANDLE_SECONDS
-    candle_elapsed = now_seconds % CANDLE_SECONDS
-    seed = utils.name_to_number(trade_pair) & 0xffffffff
-    candle_rand = mix32(seed ^ ((candle_index * 2246822519) & 0xffffffff))
-    body_side = "left" if (candle_rand & 1) == 0 else "right"
-    counter_side = opposite_side(body_side)
-
-    open_wick_until = CANDLE_SECONDS * 20 // 100
-    body_until = CANDLE_SECONDS * 70 // 100
-    close_wick_until = CANDLE_SECONDS * 87 // 100
-    if candle_elapsed < open_wick_until:
-        return counter_side, "open_wick"
-    if candle_elapsed < body_until:
-        return body_side, "body"
-    if candle_elapsed < close_wick_until:
-        return counter_side, "close_wick"
-    return body_side, "close"
+    return candle_state(trade_pair, now_seconds, CANDLE_SECONDS)
 
 def planned_candle_side(trade_pair, now_seconds=None):
     side, _ = planned_candle_state(trade_pair, now_seconds)
@@ -252,75 +659,57 @@ def planned_candle_phase(trade_pair, now_seconds=None):
     _, phase = planned_candle_state(trade_pair, now_seconds)
     return phase
 
+def band_forced_side(trade_pair, market_config, left, right):
+    """
+    The side the target deadband or correction band forces, or None inside them.
+    """
+    bands = price_bands(
+        market_config.get("target_price") or "0",
+        market_config.get("fluctuation_ratio") or "0",
+        get_target_side_deadband_ratio(trade_pair),
+    )
+    return forced_side(left, right, bands)
+
 def predict_trade_side(trade_pair, market_config, swap_market, bot_market):
-    target_price = Decimal(str(market_config.get("target_price") or "0"))
-    fluctuation_ratio = Decimal(str(market_config.get("fluctuation_ratio") or "0"))
-    left_amount, _ = parse_asset(swap_market["left_pool_quant"]["quantity"])
-    right_amount, _ = parse_asset(swap_market["right_pool_quant"]["quantity"])
-    if left_amount <= 0 or right_amount <= 0:
+    left = cached_asset(swap_market["left_pool_quant"]["quantity"])
+    right = cached_asset(swap_market["right_pool_quant"]["quantity"])
+    if left.amount <= 0 or right.amount <= 0:
         return None
 
-    left_price = right_amount / left_amount
-    if target_price > 0:
-        target_gap_ratio = abs(left_price - target_price) / target_price
-        target_deadband_ratio = get_target_side_deadband_ratio(trade_pair)
-        if target_gap_ratio > target_deadband_ratio and left_price < target_price:
-            return "right"
-        if target_gap_ratio > target_deadband_ratio and left_price > target_price:
-            return "left"
-
-    correction_ratio = min(fluctuation_ratio * CORRECTION_BAND_MULTIPLIER, Decimal("1"))
-    min_price = target_price * (Decimal("1") - correction_ratio)
-    max_price = target_price * (Decimal("1") + correction_ratio)
-    if left_price < min_price:
-        side = "right"
-    elif left_price > max_price:
-        side = "left"
-    else:
+    side = band_forced_side(trade_pair, market_config, left, right)
+    if side is None:
         side = planned_candle_side(trade_pair)
         if side not in ("left", "right"):
-            segment = int(time.time()) // SIDE_SEGMENT_SECONDS
-            seed = utils.name_to_number(trade_pair) & 0xffffffff
-            segment_rand = mix32(seed ^ ((segment * 2246822519) & 0xffffffff))
-            side = "left" if (segment_rand & 1) == 0 else "right"
+            side = segment_side(trade_pair, int(time.time()), SIDE_SEGMENT_SECONDS)
 
     return side
 
 def side_required_balance(side, market_config, swap_market, bot_market):
-    min_left_amount, _ = parse_asset(market_config["min_trade_amount"])
-    left_amount, _ = parse_asset(swap_market["left_pool_quant"]["quantity"])
-    right_amount, _ = parse_asset(swap_market["right_pool_quant"]["quantity"])
-    left_price = right_amount / left_amount
-
+    min_left = cached_asset(market_config["min_trade_amount"])
     if side == "left":
         pool = bot_market["left_pool"]
-        required_amount = min_left_amount
+        balance = cached_asset(pool["balance"]["quantity"])
+        required_amount = min_left.decimal
     else:
         pool = bot_market["right_pool"]
-        required_amount = min_left_amount * left_price
-
-    _, symbol = parse_asset(pool["balance"]["quantity"])
-    pool_balance, _ = parse_asset(pool["balance"]["quantity"])
-    return pool["balance"]["contract"], symbol, pool_balance, required_amount
+        balance = cached_asset(pool["balance"]["quantity"])
+        required_amount = quote_required_amount(
+            min_left,
+            cached_asset(swap_market["left_pool_quant"]["quantity"]),
+            cached_asset(swap_market["right_pool_quant"]["quantity"]),
+            balance.precision,
+        )
+    return pool["balance"]["contract"], balance.symbol, balance.decimal, required_amount
 
 def possible_trade_sides(market_config, swap_market):
-    target_price = Decimal(str(market_config.get("target_price") or "0"))
-    fluctuation_ratio = Decimal(str(market_config.get("fluctuation_ratio") or "0"))
-    left_amount, _ = parse_asset(swap_market["left_pool_quant"]["quantity"])
-    right_amount, _ = parse_asset(swap_market["right_pool_quant"]["quantity"])
-    if left_amount <= 0 or right_amount <= 0:
+    left = cached_asset(swap_market["left_pool_quant"]["quantity"])
+    right = cached_asset(swap_market["right_pool_quant"]["quantity"])
+    if left.amount <= 0 or right.amount <= 0:
         return ("left", "right")
 
-    left_price = right_amount / left_amount
-    correction_ratio = min(fluctuation_ratio * CORRECTION_BAND_MULTIPLIER, Decimal("1"))
-    min_price = target_price * (Decimal("1") - correction_ratio)
-    max_price = target_price * (Decimal("1") + correction_ratio)
-
-    if left_price < min_price:
-        return ("right",)
-    if left_price > max_price:
-        return ("left",)
-    return ("left", "right")
+    bands = price_bands(market_config.get("target_price") or "0", market_config.get("fluctuation_ratio") or "0")
+    side = forced_side(left, right, bands)
+    return (side,) if side else ("left", "right")
 
 def action_name_for_side(side):
     if side == "right":
@@ -337,50 +726,112 @@ def build_trade_authorizations(selected_bot, trade_action):
         selected_bot: TRADE_PERMISSION
     }
 
+def funded_bots(trade_pair, contract, symbol, bots, need, balances):
+    """
+    Bots whose wallet holds at least need of the token; their balances are added to balances.
+    """
+    balance_key = f"{contract}:{symbol}"
+    if INVENTORY_LEDGER_ENABLED:
+        selected = INVENTORY_LEDGER.pick(trade_pair, contract, symbol, bots, need)
+        if not selected:
+            return []
+        balances[selected] = {balance_key: str(INVENTORY_LEDGER.balance(trade_pair, contract, symbol, selected))}
+        return [selected]
+    eligible, side_balances = BALANCE_FETCHER.find_funded(
+        contract,
+        symbol,
+        bots,
+        lambda amount: amount >= need,
+        BALANCE_PREFILTER_TARGET,
+    )
+    for bot, amount in side_balances.items():
+        balances.setdefault(bot, {})[balance_key] = str(amount)
+    return eligible
+
+def swap_preflight(side, market_config, swap_market):
+    return SwapPreflight(side, market_config, swap_market, PREFLIGHT_SWAP_FEE_RATIO,
+                         PREFLIGHT_INPUT_SCALE_MAX, PREFLIGHT_MAX_SLIPPAGE_RATIO)
+
+def repick_side(trade_pair, market_config, swap_market, side, check, log_file=None):
+    """
+    (side, check) to trade when the planned side is predicted not to fill: the other
+    side when no band forces the planned one and the other side may fill.
+    """
+    left = cached_asset(swap_market["left_pool_quant"]["quantity"])
+    right = cached_asset(swap_market["right_pool_quant"]["quantity"])
+    if band_forced_side(trade_pair, market_config, left, right) is not None:
+        return side, check
+    other_side = "right" if side == "left" else "left"
+    other_check = swap_preflight(other_side, market_config, swap_market)
+    if other_check.pool_verdict == NO_FILL:
+        return side, check
+    info(f"preflight predicts {action_name_for_side(side)} would not fill ({check.reason}); "
+         f"trying {action_name_for_side(other_side)} instead", log_file)
+    METRICS.inc("preflight_repicked", pair=trade_pair, reason=check.reason)
+    return other_side, other_check
+
 def choose_funded_bot(trade_pair, bots, market_config, log_file=None):
-    swap_market = get_swap_market(trade_pair)
-    bot_market = get_bot_market(trade_pair)
+    """
+    Returns (bot or None, action, predicted side, preflight), where preflight is
+    (SwapPreflight, verdict, reason) when preflight_mode is on and the side is known.
+    """
+    # Both rows come from the same market snapshot when one covers the pair
+    snapshot = MARKET_SNAPSHOTS.current()
+    swap_market = get_swap_market(trade_pair, snapshot)
+    bot_market = get_bot_market(trade_pair, snapshot)
     if not market_config or not swap_market or not bot_market:
         selected = random.choice(bots)
-        debug(f"Selected bot without market prefilter: {selected}", log_file)
-        return selected, "trade", None
+        debug("Selected bot without market prefilter: %s", log_file, selected)
+        return selected, "trade", None, None
 
     side = predict_trade_side(trade_pair, market_config, swap_market, bot_market)
     if side not in ("left", "right"):
         selected = random.choice(bots)
-        debug(f"Selected bot without side prediction: {selected}", log_file)
-        return selected, "trade", None
+        debug("Selected bot without side prediction: %s", log_file, selected)
+        return selected, "trade", None, None
+
+    check = None
+    if PREFLIGHT_MODE in ("shadow", "enforce"):
+        check = swap_preflight(side, market_config, swap_market)
+        if PREFLIGHT_MODE == "enforce" and check.pool_verdict == NO_FILL:
+            side, check = repick_side(trade_pair, market_config, swap_market, side, check, log_file)
+        if PREFLIGHT_MODE == "enforce" and check.pool_verdict == NO_FILL:
+            info(f"no_fill: preflight predicts {'sell' if side == 'left' else 'buy'} would not fill "
+                 f"({check.reason}); push skipped", log_file)
+            return None, action_name_for_side(side), side, (check, NO_FILL, check.reason)
 
     candidate_sides = (side,)
     requirements = {
         candidate_side: side_required_balance(candidate_side, market_config, swap_market, bot_market)
         for candidate_side in candidate_sides
     }
-    eligible = []
+    eligible = list(bots)
     balances = {}
-    for bot in bots:
-        bot_balances = {}
-        is_eligible = True
-        for candidate_side, (contract, symbol, pool_balance, required_amount) in requirements.items():
-            balance_key = f"{contract}:{symbol}"
-            if balance_key not in bot_balances:
-                bot_balances[balance_key] = get_currency_balance(contract, bot, symbol)
-            available_amount = bot_balances[balance_key] + pool_balance
-            if available_amount < required_amount:
-                is_eligible = False
-        balances[bot] = {key: str(value) for key, value in bot_balances.items()}
-        if is_eligible:
-            eligible.append(bot)
+    for candidate_side, (contract, symbol, pool_balance, required_amount) in requirements.items():
+        if pool_balance >= required_amount and (PREFLIGHT_MODE != "enforce" or pool_balance >= check.max_input):
+            continue
+        if PREFLIGHT_MODE == "enforce" and check.max_input > required_amount:
+            # Prefer bots that also cover the largest input the contract may pick
+            covered = funded_bots(trade_pair, contract, symbol, eligible, check.max_input - pool_balance, balances)
+            if covered or pool_balance >= required_amount:
+                eligible = covered or eligible
+                continue
+        eligible = funded_bots(trade_pair, contract, symbol, eligible, required_amount - pool_balance, balances)
 
     if eligible:
         selected = random.choice(eligible)
         action_name = action_name_for_side(side)
         debug(
-            f"Selected funded bot: {selected}, predicted_side={side}, "
-            f"action={action_name}, balances={balances}",
-            log_file,
+            "Selected funded bot: %s, predicted_side=%s, action=%s, balances=%s",
+            log_file, selected, side, action_name, balances,
         )
-        return selected, action_name, side
+        preflight = None
+        if check is not None:
+            contract, symbol, pool_balance, _ = requirements[side]
+            wallet_balance = balances.get(selected, {}).get(f"{contract}:{symbol}")
+            funds = pool_balance + Decimal(wallet_balance) if wallet_balance is not None else pool_balance
+            preflight = (check, *check.verdict(funds))
+        return selected, action_name, side, preflight
 
     readable_sides = ",".join("sell" if candidate_side == "left" else "buy" for candidate_side in candidate_sides)
     required_text = ", ".join(
@@ -392,66 +843,57 @@ def choose_funded_bot(trade_pair, bots, market_config, log_file=None):
         f"required={required_text}, balances={balances}",
         log_file,
     )
-    return None, action_name_for_side(side), side
+    return None, action_name_for_side(side), side, None
 
 def get_market_config(trade_pair):
     """
     Query market config from trademarkets table of buylowsellhi contract.
     Returns dict of market row if found, else None.
     """
-    resp = chainapi.get_table_rows(
-        True,
-        BUYLOWSELLHI_CONTRACT,
-        BUYLOWSELLHI_CONTRACT,
-        "trademarkets",
-        trade_pair,
-        trade_pair,
-        1
-    )
-    if resp and resp.get("rows"):
-        return resp["rows"][0]
-    return None
+    return get_single_table_row(BUYLOWSELLHI_CONTRACT, BUYLOWSELLHI_CONTRACT, "trademarkets", trade_pair)
 
 def get_trade_schedule(trade_pair):
     """
     Query per-pair trade schedule from tokenx.mm schedules table.
     Returns dict of schedule row if found, else None.
     """
-    resp = chainapi.get_table_rows(
-        True,
-        TOKENX_MM_CONTRACT,
-        TOKENX_MM_CONTRACT,
-        "schedules",
-        trade_pair,
-        trade_pair,
-        1
-    )
-    if resp and resp.get("rows"):
-        row = resp["rows"][0]
-        if row.get("trade_pair_name") == trade_pair:
-            return row
+    row = get_single_table_row(TOKENX_MM_CONTRACT, TOKENX_MM_CONTRACT, "schedules", trade_pair)
+    if row and row.get("trade_pair_name") == trade_pair:
+        return row
     return None
 
-def seconds_until_trade_ready(trade_pair):
-    schedule = get_trade_schedule(trade_pair)
+def schedule_ready_at(schedule):
+    """
+    Unix time at which the schedules row allows the next trade, 0 if it does not restrict trading.
+    """
     if not schedule:
         return 0
     last_traded_at = parse_chain_time_seconds(schedule.get("last_traded_at"))
     random_interval_seconds = int(schedule.get("random_interval_seconds") or 0)
     if last_traded_at <= 0 or random_interval_seconds <= 0:
         return 0
-    next_trade_at = last_traded_at + random_interval_seconds
-    return max(0, next_trade_at - int(time.time()))
-
-def wait_for_contract_schedule(trade_pair, stop_event, log_file=None):
-    wait_seconds = seconds_until_trade_ready(trade_pair)
+    return last_traded_at + random_interval_seconds
+
+# Known next-ready deadline per pair. The schedules row only changes when the pair
+# trades, so it is read once after each of our trades (or failures) and not again
+# while the deadline is known.
+TRADE_READY_AT = {}
+
+def forget_trade_ready_at(trade_pair):
+    TRADE_READY_AT.pop(trade_pair, None)
+
+def contract_schedule_wait_seconds(trade_pair, log_file=None):
+    ready_at = TRADE_READY_AT.get(trade_pair)
+    if ready_at is None:
+        ready_at = schedule_ready_at(get_trade_schedule(trade_pair))
+        TRADE_READY_AT[trade_pair] = ready_at
+    wait_seconds = max(0, ready_at - int(time.time()))
     if wait_seconds <= 0:
-        return False
+        return 0
     ready_jitter = max(float(READY_JITTER_SECONDS or 0), 0)
     sleep_time = wait_seconds + random.uniform(0, ready_jitter)
     info(f"wait for contract schedule: {sleep_time:.1f}s", log_file)
-    sleep_until(stop_event, sleep_time)
-    return True
+    return sleep_time
 
 
 def get_bots_from_group(group_name):
@@ -459,162 +901,461 @@ def get_bots_from_group(group_name):
     Read bots from botgroups table in bot.mm contract for the given group_name.
     Returns a list of bot names.
     """
-    resp = chainapi.get_table_rows(
-        True,
-        BOT_MM_CONTRACT,
-        BOT_MM_CONTRACT,
-        "botgroups",
-        group_name,
-        group_name,
-        1
-    )
-    if resp and resp.get("rows"):
-        return resp["rows"][0].get("bots", [])
+    row = get_single_table_row(BOT_MM_CONTRACT, BOT_MM_CONTRACT, "botgroups", group_name)
+    if row:
+        return row.get("bots", [])
     return []
 
-def parse_price_from_result(trx):
-    result = {}
-    if "processed" not in trx:
-        return result
-    if "action_traces" not in trx["processed"]:
-        return result
-    traces = trx["processed"]["action_traces"]
-    for trace in traces:
-        if "act" in trace and "name" in trace["act"] and trace["act"]["name"] in ("trade", "buy", "sell"):
-            if "inline_traces" not in trace or not trace["inline_traces"]:
-                continue
-            if len(trace["inline_traces"]) < 2:
-                continue
+def pack_trade_action(trade_action, action_data):
+    started = time.perf_counter()
+    if ACTION_TEMPLATES_ENABLED:
+        packed_args = ACTION_PACKER.pack(TOKENX_MM_CONTRACT, trade_action, action_data)
+    else:
+        packed_args = utils.pack_args(TOKENX_MM_CONTRACT, trade_action, action_data)
+    METRICS.lap("round_stage_seconds", started, pair=action_data["trade_pair_name"], stage="pack")
+    return packed_args
+
+def submit_trade_action(trade_action, action_data, authorizations):
+    if not (LOCAL_SIGNING_ENABLED or ACTION_TEMPLATES_ENABLED):
+        return utils.push_action(TOKENX_MM_CONTRACT, trade_action, action_data, authorizations)
+    packed_args = pack_trade_action(trade_action, action_data)
+    if LOCAL_SIGNING_ENABLED:
+        return TX_BUILDER.push_action(TOKENX_MM_CONTRACT, trade_action, packed_args, authorizations)
+    return utils.push_packed_action(TOKENX_MM_CONTRACT, trade_action, packed_args, authorizations)
+
+def warm_action_templates(log_file=None):
+    """
+    Load the tokenx.mm ABI (from abi_cache_dir when the code hash still matches)
+    and compile the trade actions before the first round.
+    """
+    if not ACTION_TEMPLATES_ENABLED:
+        return
+    try:
+        ACTION_PACKER.warm(TOKENX_MM_CONTRACT, TRADE_ACTIONS)
+    except Exception as e:
+        error(f"failed to warm action templates, packing per trade instead: {e}", log_file)
 
-            after_swap = trace["inline_traces"][1]
-            if "act" not in after_swap or "data" not in after_swap["act"]:
-                continue
-            after_swap_act = after_swap["act"]
-            after_swap_data = after_swap_act["data"]
-            bot_user = after_swap_data.get("bot", "")
-            side = after_swap_data.get("side", "")
-
-            swap_inlines = trace["inline_traces"][0].get("inline_traces", [])
-            for inline in swap_inlines:
-                if "act" not in inline or "data" not in inline["act"]:
-                    continue
-                act = inline["act"]
-                act_data = act["data"]
-                if act["name"] == "transfer" and act["name"] == "transfer" and act_data["from"] == "flon.swap" and act_data["memo"].startswith("flon swap by"):
-                    # result["input_contract"] = act["account"]
-                    input_quantity = act_data["quantity"]  # "0.514535 USDT"
-                    memo = act_data["memo"]  # "swap:9.53418172 FLON:flon.usdt"
-
-                    in_amount = float(input_quantity.split()[0])
-                    in_symbol = input_quantity.split()[1]
-                    # parse memo: "flon swap by 0.514535 USDT:18446744073709551615"
-                    output_quantity = memo.split("by")[1].strip()  # "0.514535 USDT:18446744073709551615"
-                    output_quantity = output_quantity.split(":")[0].strip()  # "0.514535 USDT"
-                    out_amount = float(output_quantity.split()[0])
-                    out_symbol = output_quantity.split()[1]
-                    price = out_amount / in_amount if in_amount > 0 else 0
-                    price_reverted = in_amount / out_amount if out_amount > 0 else 0
-                    if side == "left":
-                        result["trade_side"] = "sell"
-                        result["execution_price"] = f"{price_reverted:.8f} {in_symbol}/{out_symbol}"
-                        result["inverse_price"] = f"{price:.8f} {out_symbol}/{in_symbol}"
-                        result["base_quantity"] = output_quantity
-                        result["quote_quantity"] = input_quantity
-                    else:
-                        result["trade_side"] = "buy"
-                        result["execution_price"] = f"{price:.8f} {out_symbol}/{in_symbol}"
-                        result["inverse_price"] = f"{price_reverted:.8f} {in_symbol}/{out_symbol}"
-                        result["base_quantity"] = input_quantity
-                        result["quote_quantity"] = output_quantity
-                    result["maker_account"] = bot_user
-                    return result
-    return result
-
-def run_pair_worker(trade_pair, stop_event):
-    log_file = os.path.join(LOG_DIR, f"trade_{trade_pair.replace('.', '_')}.log")
-    info(f"trade bot started for {trade_pair}")
-    while not stop_event.is_set():
-        try:
-            timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
-            memo = str(random.randint(0, 2**32 - 1))
-            candle_phase = planned_candle_phase(trade_pair)
-            if candle_phase:
-                memo = f"{memo}:candle_phase={candle_phase}"
-            debug(f"[{timestamp}] trade: pair={trade_pair} memo={memo}")
-
-            market_config = get_market_config(trade_pair)
-            if market_config:
-                paused = market_config.get("paused", 0)
-                if paused:
-                    info(f"Market {trade_pair} is paused, skipping this round.", log_file)
-                    sleep_with_jitter(stop_event, RETRY_MIN_INTERVAL_SECONDS, RETRY_MAX_INTERVAL_SECONDS, log_file, "retry after paused market")
-                    continue
-
-            if wait_for_contract_schedule(trade_pair, stop_event, log_file):
-                continue
+def collect_warm_start():
+    return TABLE_CACHE.export(WARM_START_TABLES), BALANCE_FETCHER.export()
 
-            bots = get_bots_from_group(trade_pair)
-            if not bots:
-                error(f"No bots found in group {trade_pair}", log_file)
-                sleep_with_jitter(stop_event, RETRY_MIN_INTERVAL_SECONDS, RETRY_MAX_INTERVAL_SECONDS, log_file, "retry after missing bots")
-                continue
-            selected_bot, trade_action, predicted_side = choose_funded_bot(trade_pair, bots, market_config, log_file)
-            if not selected_bot:
-                sleep_with_jitter(stop_event, RETRY_MIN_INTERVAL_SECONDS, RETRY_MAX_INTERVAL_SECONDS, log_file, "retry after no funded bot")
-                continue
-            debug(f"Selected bot: {selected_bot}, action={trade_action}, predicted_side={predicted_side}", log_file)
-
-            action_data = {"bot": selected_bot, "trade_pair_name": trade_pair, "memo": memo}
-            authorizations = build_trade_authorizations(selected_bot, trade_action)
-            result = utils.push_action(TOKENX_MM_CONTRACT, trade_action, action_data, authorizations)
-            submitted_at = current_log_time()
-            debug(f"{trade_action} result: {result}", log_file)
-            trade_info = parse_price_from_result(result)
-            transaction_link = format_transaction_link(result, submitted_at)
-            info(f"\n========== Trade Result ({trade_pair}) ==========" , log_file)
-            if transaction_link:
-                info(f"submitted_at    : {transaction_link}", log_file)
-            if trade_info:
-                max_key_len = max(len(str(k)) for k in trade_info.keys())
-                for k, v in trade_info.items():
-                    info(f"{k:<{max_key_len}} : {v}", log_file)
-            else:
-                info("no_fill: transaction accepted but no swap fill was emitted.", log_file)
-            info("========== End Trade ==========" , log_file)
-            sleep_with_jitter(stop_event, MIN_INTERVAL_SECONDS, MAX_INTERVAL_SECONDS, log_file, "next trade")
-        except Exception as e:
-            no_fill_message = format_no_fill_message(e)
-            if no_fill_message:
-                info(no_fill_message, log_file)
-            else:
-                error(f"trade failed for {trade_pair}: {e}", log_file)
-            sleep_with_jitter(stop_event, RETRY_MIN_INTERVAL_SECONDS, RETRY_MAX_INTERVAL_SECONDS, log_file, "retry after failure")
+def save_warm_start():
+    WARM_START.stop()
+    try:
+        rows, balances = WARM_START.save(*collect_warm_start())
+        info(f"warm start: saved {rows} rows and {balances} balances to {WARM_START_PATH}")
+    except Exception as e:
+        error(f"warm start save failed: {e}")
+
+def restore_warm_start():
+    """
+    Put the rows and bot balances of the warm-start snapshot back in the caches and
+    use the persisted tokenx.mm ABI as is. Seeded entries keep their read time, so
+    they expire on their table's (or the balance) cache TTL as if this process had
+    read them, and nothing is served staler than a running worker would serve it.
+    The ABI's code-hash check runs in the background. The snapshot is saved again
+    periodically and at exit.
+    """
+    if LOCAL_SIGNING_ENABLED:
+        WARM_START.identity["chain_id"] = TX_BUILDER.tapos()[0].hex()
+    rows, balances, saved_at = WARM_START.load()
+    now = time.monotonic()
+    seeded_rows = [row for row in rows if row[5] < TABLE_CACHE.ttl_for(row[2])]
+    for code, scope, table, key, value, age in seeded_rows:
+        TABLE_CACHE.put(code, scope, table, key, value, now - age)
+    seeded_balances = [balance for balance in balances if balance[4] < BALANCE_CACHE_SECONDS]
+    for contract, symbol, account, amount, age in seeded_balances:
+        BALANCE_FETCHER.put(contract, account, symbol, amount, now - age)
+    abi_loaded = ACTION_TEMPLATES_ENABLED and ABI_CACHE.load_persisted(TOKENX_MM_CONTRACT)
+    METRICS.inc("warm_start_seeded", len(seeded_rows), kind="rows")
+    METRICS.inc("warm_start_seeded", len(seeded_balances), kind="balances")
+    if saved_at is not None:
+        info(f"warm start: seeded {len(seeded_rows)} of {len(rows)} rows and {len(seeded_balances)} of "
+             f"{len(balances)} balances from {WARM_START_PATH}, saved {time.time() - saved_at:.0f}s ago")
+    if abi_loaded:
+        threading.Thread(target=verify_warm_start_abi, name="warm-start-abi", daemon=True).start()
+    WARM_START.start(WARM_START_SAVE_SECONDS, collect_warm_start, lambda e: error(f"warm start save failed: {e}"))
+    atexit.register(save_warm_start)
+
+def verify_warm_start_abi():
+    """
+    Check the persisted tokenx.mm ABI against the chain and rebuild the action templates if it changed.
+    """
+    try:
+        if ABI_CACHE.verify(TOKENX_MM_CONTRACT):
+            info(f"warm start: {TOKENX_MM_CONTRACT} ABI changed, rebuilding action templates")
+            ACTION_PACKER.reset()
+            warm_action_templates()
+    except Exception as e:
+        error(f"warm start ABI check failed: {e}")
+
+def push_packed_actions(actions):
+    if LOCAL_SIGNING_ENABLED:
+        return TX_BUILDER.push_actions(actions)
+    return NODE_POOL.push(lambda: utils.push_packed_actions(actions), utils.set_node)
+
+def chain_rejected(exc):
+    """
+    True when the chain refused a transaction (nothing was applied), as opposed to a
+    node that could not be reached or was overloaded.
+    """
+    if isinstance(exc, RpcError):
+        return exc.status != 429 and exc.status <= 500
+    return not is_transport_error(exc)
+
+
+def push_trade_action(trade_action, action_data, authorizations):
+    if ACTION_BATCHER is not None:
+        packed_args = pack_trade_action(trade_action, action_data)
+        return ACTION_BATCHER.push([TOKENX_MM_CONTRACT, trade_action, packed_args, authorizations])
+    if LOCAL_SIGNING_ENABLED:
+        # TX_BUILDER fails over between nodes itself
+        return submit_trade_action(trade_action, action_data, authorizations)
+    return NODE_POOL.push(
+        lambda: submit_trade_action(trade_action, action_data, authorizations),
+        utils.set_node,
+    )
+
+def journal_attempt(trade_pair, selected_bot, side, outcome, latency_seconds=0.0, result=None, fills=()):
+    """
+    Append one attempt to the trade journal; fills are summed into its quantities.
+    """
+    if JOURNAL is None:
+        return
+    JOURNAL.record(
+        trade_pair,
+        selected_bot,
+        fills[0]["side"] if fills else side,
+        outcome,
+        sum(fill["base_amount"] for fill in fills),
+        sum(fill["quote_amount"] for fill in fills),
+        latency_seconds,
+        extract_transaction_id(result),
+    )
+
+def record_preflight(trade_pair, preflight, outcome, fills=()):
+    """
+    Count the pre-flight verdict against the outcome on chain, and whether the
+    simulated output of the executed input matched the filled output exactly.
+    """
+    if preflight is None:
+        return
+    check, verdict, _ = preflight
+    METRICS.inc("preflight_verdicts", pair=trade_pair, verdict=verdict, outcome=outcome)
+    for fill in fills[:1]:
+        if fill["side"] == "left":
+            amount_in, amount_out = fill["base_amount"], fill["quote_amount"]
+        else:
+            amount_in, amount_out = fill["quote_amount"], fill["base_amount"]
+        predicted, _ = check.output(amount_in)
+        METRICS.inc("preflight_outputs", pair=trade_pair, result="exact" if predicted == amount_out else "differs")
+
+def log_trade_result(trade_pair, result, submitted_at, log_file=None, selected_bot=None, predicted_side=None,
+                     latency_seconds=0.0, preflight=None):
+    fills = parse_fills_from_result(result, DEX_CONTRACT)
+    trade_info = format_fill(fills[0]) if fills else {}
+    METRICS.inc("rounds", pair=trade_pair, result="trade" if trade_info else "no_fill")
+    record_preflight(trade_pair, preflight, "trade" if fills else "no_fill", fills)
+    journal_attempt(trade_pair, selected_bot, predicted_side, "trade" if fills else "no_fill", latency_seconds, result, fills)
+    transaction_link = format_transaction_link(result, submitted_at)
+    info(f"\n========== Trade Result ({trade_pair}) ==========" , log_file)
+    if transaction_link:
+        info(f"submitted_at    : {transaction_link}", log_file)
+    if trade_info:
+        max_key_len = max(len(str(k)) for k in trade_info.keys())
+        for k, v in trade_info.items():
+            info(f"{k:<{max_key_len}} : {v}", log_file)
+    else:
+        info("no_fill: transaction accepted but no swap fill was emitted.", log_file)
+    info("========== End Trade ==========" , log_file)
+
+def log_trade_failure(trade_pair, exc, log_file=None, selected_bot=None, predicted_side=None, latency_seconds=0.0,
+                      preflight=None):
+    forget_trade_ready_at(trade_pair)
+    if isinstance(exc, BatchResultError):
+        # Executed on chain, but the fills in the batch's traces cannot be told apart
+        outcome = "executed_unattributed"
+        no_fill_message = None
+    else:
+        no_fill_message = format_no_fill_message(exc)
+        outcome = "no_fill" if no_fill_message else "failed"
+    METRICS.inc("rounds", pair=trade_pair, result=outcome)
+    record_preflight(trade_pair, preflight, outcome)
+    journal_attempt(trade_pair, selected_bot, predicted_side, outcome, latency_seconds,
+                    exc.result if outcome == "executed_unattributed" else None)
+    if outcome == "executed_unattributed":
+        info(f"trade executed for {trade_pair}, fills unknown: {exc}", log_file)
+    elif no_fill_message:
+        info(no_fill_message, log_file)
+    else:
+        error(f"trade failed for {trade_pair}: {exc}", log_file)
+
+def invalidate_executed_rows(trade_pair, selected_bot, exc):
+    """
+    A batch whose traces could not be split still executed our trade: drop the rows it changed.
+    """
+    if isinstance(exc, BatchResultError):
+        invalidate_trade_rows(trade_pair, selected_bot, result_block_num(exc.result))
+
+def reconcile_trade(record, result, exc):
+    """
+    Handle a push submitted in reconcile mode once the node has answered.
+    """
+    trade_pair, trade_action, selected_bot, predicted_side, preflight, submitted_at, pushed_at, log_file = record
+    latency_seconds = time.perf_counter() - pushed_at
+    if exc is not None:
+        invalidate_executed_rows(trade_pair, selected_bot, exc)
+        update_inventory(selected_bot)
+        log_trade_failure(trade_pair, exc, log_file, selected_bot, predicted_side, latency_seconds, preflight)
+        return
+    invalidate_trade_rows(trade_pair, selected_bot, result_block_num(result))
+    update_inventory(selected_bot, result)
+    debug("%s result: %s", log_file, trade_action, result)
+    log_trade_result(trade_pair, result, submitted_at, log_file, selected_bot, predicted_side, latency_seconds, preflight)
+
+def owns_pair(trade_pair):
+    """
+    False while a shard worker does not hold trade_pair's lease; always True when not sharded.
+    """
+    return SHARD_LEASES is None or SHARD_LEASES.owns(trade_pair)
+
+def log_shard_change(taken, released):
+    info(f"shard {SHARD_MEMBER}: took {','.join(taken) or '-'}; released {','.join(released) or '-'}; "
+         f"holds {len(SHARD_LEASES.owned())} of {len(TRADE_PAIRS)} pairs")
+
+def start_shard_leases():
+    """
+    Take this worker's first leases before any round runs, then renew them every shard_renew_seconds.
+    """
+    try:
+        log_shard_change(*SHARD_LEASES.sync())
+    except Exception as e:
+        error(f"shard lease sync failed: {e}")
+    SHARD_LEASES.start(SHARD_RENEW_SECONDS, log_shard_change, lambda e: error(f"shard lease sync failed: {e}"))
+
+def stop_shard_leases():
+    SHARD_LEASES.stop()
+    try:
+        SHARD_LEASES.leave()
+    except Exception as e:
+        error(f"shard lease release failed: {e}")
+
+def pair_log_file(trade_pair):
+    return os.path.join(LOG_DIR, f"trade_{trade_pair.replace('.', '_')}.log")
+
+def run_trade_round(trade_pair, log_file=None):
+    """
+    Run one trading round for trade_pair.
+    Returns the number of seconds to wait before the next round.
+    Each stage's duration is recorded in round_stage_seconds; push includes pack and sign.
+    """
+    if not owns_pair(trade_pair):
+        return SHARD_RENEW_SECONDS
+    if SUBMIT_MODE == "reconcile" and RECONCILER.in_flight(trade_pair):
+        # The pair's last push has not been reconciled; its rows may still change
+        METRICS.inc("rounds", pair=trade_pair, result="in_flight")
+        return jitter_wait_seconds(RETRY_MIN_INTERVAL_SECONDS, RETRY_MAX_INTERVAL_SECONDS, log_file, "retry after push in flight")
+    round_started = stage_at = time.perf_counter()
+    selected_bot = predicted_side = preflight = pushed_at = None
+    tag_thread(trade_pair)
+    if RPC_GOVERNOR is not None:
+        RPC_GOVERNOR.begin_round()
+    try:
+        memo = str(random.randint(0, 2**32 - 1))
+        candle_phase = planned_candle_phase(trade_pair)
+        if candle_phase:
+            memo = f"{memo}:candle_phase={candle_phase}"
+        if VERBOSE:
+            debug("[%s] trade: pair=%s memo=%s", None, time.strftime('%Y-%m-%d %H:%M:%S'), trade_pair, memo)
+
+        market_config = get_market_config(trade_pair)
+        stage_at = METRICS.lap("round_stage_seconds", stage_at, pair=trade_pair, stage="market_config")
+        if market_config:
+            paused = market_config.get("paused", 0)
+            if paused:
+                METRICS.inc("rounds", pair=trade_pair, result="paused")
+                info(f"Market {trade_pair} is paused, skipping this round.", log_file)
+                return jitter_wait_seconds(RETRY_MIN_INTERVAL_SECONDS, RETRY_MAX_INTERVAL_SECONDS, log_file, "retry after paused market")
+
+        schedule_wait = contract_schedule_wait_seconds(trade_pair, log_file)
+        stage_at = METRICS.lap("round_stage_seconds", stage_at, pair=trade_pair, stage="schedule")
+        if schedule_wait > 0:
+            METRICS.inc("rounds", pair=trade_pair, result="not_ready")
+            return schedule_wait
+
+        bots = get_bots_from_group(trade_pair)
+        stage_at = METRICS.lap("round_stage_seconds", stage_at, pair=trade_pair, stage="bots")
+        if not bots:
+            METRICS.inc("rounds", pair=trade_pair, result="no_bots")
+            error(f"No bots found in group {trade_pair}", log_file)
+            return jitter_wait_seconds(RETRY_MIN_INTERVAL_SECONDS, RETRY_MAX_INTERVAL_SECONDS, log_file, "retry after missing bots")
+        selected_bot, trade_action, predicted_side, preflight = choose_funded_bot(trade_pair, bots, market_config, log_file)
+        stage_at = METRICS.lap("round_stage_seconds", stage_at, pair=trade_pair, stage="choose_bot")
+        if not selected_bot and preflight is not None:
+            METRICS.inc("rounds", pair=trade_pair, result="preflight_skip")
+            METRICS.inc("preflight_skipped", pair=trade_pair, reason=preflight[2])
+            journal_attempt(trade_pair, None, predicted_side, "preflight_skip")
+            return jitter_wait_seconds(RETRY_MIN_INTERVAL_SECONDS, RETRY_MAX_INTERVAL_SECONDS, log_file, "retry after preflight skip")
+        if not selected_bot:
+            METRICS.inc("rounds", pair=trade_pair, result="no_funded_bot")
+            journal_attempt(trade_pair, None, predicted_side, "no_funded_bot")
+            return jitter_wait_seconds(RETRY_MIN_INTERVAL_SECONDS, RETRY_MAX_INTERVAL_SECONDS, log_file, "retry after no funded bot")
+        debug("Selected bot: %s, action=%s, predicted_side=%s", log_file, selected_bot, trade_action, predicted_side)
+
+        action_data = {"bot": selected_bot, "trade_pair_name": trade_pair, "memo": memo}
+        authorizations = build_trade_authorizations(selected_bot, trade_action)
+        push = lambda: push_trade_action(trade_action, action_data, authorizations)
+        if SUBMIT_MODE == "reconcile":
+            record = (trade_pair, trade_action, selected_bot, predicted_side, preflight, current_log_time(),
+                      time.perf_counter(), log_file)
+            if not RECONCILER.submit(record, push, trade_pair):
+                METRICS.inc("rounds", pair=trade_pair, result="in_flight")
+                return jitter_wait_seconds(RETRY_MIN_INTERVAL_SECONDS, RETRY_MAX_INTERVAL_SECONDS, log_file,
+                                           "retry after push in flight")
+            # Rows read from now on may predate the trade: read them again once it lands
+            invalidate_trade_rows(trade_pair, selected_bot)
+            debug("%s submitted for %s, result will be reconciled", log_file, trade_action, trade_pair)
+            return jitter_wait_seconds(MIN_INTERVAL_SECONDS, MAX_INTERVAL_SECONDS, log_file, "next trade")
+        pushed_at = time.perf_counter()
+        result = push()
+        stage_at = METRICS.lap("round_stage_seconds", stage_at, pair=trade_pair, stage="push")
+        submitted_at = current_log_time()
+        invalidate_trade_rows(trade_pair, selected_bot, result_block_num(result))
+        update_inventory(selected_bot, result)
+        debug("%s result: %s", log_file, trade_action, result)
+        log_trade_result(trade_pair, result, submitted_at, log_file, selected_bot, predicted_side, stage_at - pushed_at,
+                         preflight)
+        METRICS.lap("round_stage_seconds", stage_at, pair=trade_pair, stage="log_result")
+        return jitter_wait_seconds(MIN_INTERVAL_SECONDS, MAX_INTERVAL_SECONDS, log_file, "next trade")
+    except RpcShed as e:
+        # The round's first read was shed, so nothing was spent on it
+        METRICS.inc("rounds", pair=trade_pair, result="shed")
+        debug("round shed: %s", log_file, e)
+        return jitter_wait_seconds(RETRY_MIN_INTERVAL_SECONDS, RETRY_MAX_INTERVAL_SECONDS, log_file, "retry after shed read")
+    except Exception as e:
+        invalidate_executed_rows(trade_pair, selected_bot, e)
+        update_inventory(selected_bot)
+        latency_seconds = time.perf_counter() - pushed_at if pushed_at is not None else 0.0
+        log_trade_failure(trade_pair, e, log_file, selected_bot, predicted_side, latency_seconds, preflight)
+        return jitter_wait_seconds(RETRY_MIN_INTERVAL_SECONDS, RETRY_MAX_INTERVAL_SECONDS, log_file, "retry after failure")
+    finally:
+        if RPC_GOVERNOR is not None:
+            RPC_GOVERNOR.end_round()
+        untag_thread()
+        METRICS.observe("round_seconds", time.perf_counter() - round_started, pair=trade_pair)
+
+METRICS_STOP = threading.Event()
+
+def start_metrics():
+    """
+    Serve Prometheus metrics on metrics_port (0 disables) and log a summary
+    line every metrics_summary_seconds (0 disables).
+    """
+    if METRICS_PORT:
+        try:
+            serve_metrics(METRICS, METRICS_PORT, METRICS_HOST)
+            info(f"metrics served on http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+        except OSError as e:
+            error(f"failed to serve metrics on {METRICS_HOST}:{METRICS_PORT}: {e}")
+    start_summary(METRICS, METRICS_SUMMARY_SECONDS, info, METRICS_STOP)
+
+def log_stacks():
+    info("stack dump of all threads:\n" + dump_stacks())
+
+def log_profile(path, stats):
+    info(f"profile written to {path}: {stats['samples']} samples over {stats['seconds']:.1f}s, "
+         f"{stats['stacks']} distinct stacks, sampler overhead {stats['overhead_ratio']:.1%}")
+
+def toggle_profile():
+    if PROFILER.running():
+        info("stopping the running profile early")
+        PROFILER.stop()
+    elif PROFILER.start(PROFILE_SECONDS, log_profile, lambda e: error(f"profile failed: {e}")):
+        info(f"profiling all threads for {PROFILE_SECONDS:.0f}s every {PROFILE_INTERVAL_MS:g}ms")
+
+def install_profiling_signals():
+    """
+    SIGUSR1 logs the stack of every thread; SIGUSR2 starts a profile_seconds
+    sampling profile, or ends a running one early. Both run on a new thread so
+    the handler never waits on a lock the interrupted main thread holds.
+    """
+    for name, action in (("SIGUSR1", log_stacks), ("SIGUSR2", toggle_profile)):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name),
+                          lambda signum, frame, action=action: threading.Thread(target=action, daemon=True).start())
 
 def run_bot_service():
     """
     Entry point for multi-pair trading bot service. Uses trade_pairs from config.example.yaml or .config.yaml.
-    Each trading pair runs in a separate thread with its own log file.
+    Pair rounds are dispatched by a deadline scheduler onto a shared worker pool.
+    Each trading pair has its own log file.
+    With shard_workers set, this process only runs the shard coordinator.
     """
+    configure()
+    if SHARD_WORKERS > 0 and SHARD_MEMBER is None:
+        info(f"shard coordinator started: {SHARD_WORKERS} workers as {SHARD_NAME}.0-{SHARD_WORKERS - 1}, "
+             f"leases in {SHARD_LEASE_FILE}")
+        ShardCoordinator(SHARD_WORKERS, sys.argv[1:], info).run()
+        return
     info("trade bot service started.")
-    utils.setup_flon_network([NODE_URL])
+    utils.setup_flon_network(NODE_URLS)
+    NODE_POOL.start_health_checks()
     if not TRADE_PRIVKEY:
         error("trade_privkey not configured, please set trade_privkey in config.example.yaml or config/.config.yaml")
         return
     wallet.import_key('tradewallet', TRADE_PRIVKEY)
+    if LOCAL_SIGNING_ENABLED:
+        try:
+            TX_BUILDER.start(TRADE_PRIVKEY)
+        except Exception as e:
+            error(f"failed to start local transaction builder: {e}")
+            return
+        atexit.register(TX_BUILDER.stop)
     if not TRADE_PAIRS:
         error("trade_pairs not configured in config.example.yaml or config/.config.yaml")
         return
+    if WARM_START is not None:
+        restore_warm_start()
+    warm_action_templates()
+    start_metrics()
+    install_profiling_signals()
+    if MARKET_SNAPSHOTS.enabled:
+        MARKET_SNAPSHOTS.start(lambda e: error(f"market snapshot refresh failed: {e}"))
+        atexit.register(MARKET_SNAPSHOTS.stop)
+    if CHAIN_FOLLOWER.enabled:
+        CHAIN_FOLLOWER.start(lambda e: error(f"chain follower poll failed: {e}"))
+        atexit.register(CHAIN_FOLLOWER.stop)
+    if SHARD_LEASES is not None:
+        start_shard_leases()
+        # Runs after the reconciler has settled the pushes still in flight
+        atexit.register(stop_shard_leases)
+    if ACTION_BATCHER is not None:
+        atexit.register(ACTION_BATCHER.close)
+    if SUBMIT_MODE == "reconcile":
+        # Registered last so pending results are logged before the log writer closes
+        atexit.register(RECONCILER.close)
     stop_event = threading.Event()
-    threads = []
+    # A round blocks its thread for the whole push, so fewer threads than pairs delays due rounds
+    scheduler_workers = SCHEDULER_WORKERS if SCHEDULER_WORKERS > 0 else len(TRADE_PAIRS)
+    if scheduler_workers < len(TRADE_PAIRS):
+        info(f"scheduler_workers caps concurrent rounds at {scheduler_workers} for {len(TRADE_PAIRS)} pairs; "
+             f"watch scheduler_lag_seconds")
+    scheduler = DeadlineScheduler(
+        lambda trade_pair: run_trade_round(trade_pair, pair_log_file(trade_pair)),
+        scheduler_workers,
+        RETRY_MAX_INTERVAL_SECONDS,
+        lambda trade_pair, e: error(f"round of {trade_pair} raised, retrying: {e!r}", pair_log_file(trade_pair)),
+    )
     for trade_pair in TRADE_PAIRS:
-        t = threading.Thread(target=run_pair_worker, args=(trade_pair, stop_event))
-        t.start()
-        threads.append(t)
-    def handle_sigint(signum, frame):
-        info("Received Ctrl-C, stopping all bots...")
+        info(f"trade bot started for {trade_pair}")
+        scheduler.schedule(trade_pair)
+    def handle_stop(signum, frame):
+        info("Received stop signal, stopping all bots...")
         stop_event.set()
-    signal.signal(signal.SIGINT, handle_sigint)
-    for t in threads:
-        t.join()
+    signal.signal(signal.SIGINT, handle_stop)
+    signal.signal(signal.SIGTERM, handle_stop)
+    scheduler.start()
+    stop_event.wait()
+    scheduler.stop()
+    scheduler.join()
 
 # ...existing code...
@@ -0,0 +1,148 @@
+"""
+Deterministic candle plan: the side and phase each pair trades on at a given time
+"""
+from pydexbot.optional import load_numpy
+from pydexbot.packing import encode_name
+
+SIDES = ("left", "right")
+CANDLE_PHASES = ("open_wick", "body", "close_wick", "close")
+SEED_MULTIPLIER = 2246822519
+# Phase starts as percent of the candle; open_wick and close_wick trade against the body
+PHASE_PERCENTS = (0, 20, 70, 87)
+
+
+def mix32(value):
+    value &= 0xffffffff
+    value ^= value >> 16
+    value = (value * 0x7feb352d) & 0xffffffff
+    value ^= value >> 15
+    value = (value * 0x846ca68b) & 0xffffffff
+    value ^= value >> 16
+    return value & 0xffffffff
+
+
+def pair_seed(trade_pair):
+    return encode_name(trade_pair) & 0xffffffff
+
+
+def plan_side(seed, index):
+    """
+    Side for candle or segment `index`: "left" when the mixed bit is 0.
+    """
+    return SIDES[mix32(seed ^ ((index * SEED_MULTIPLIER) & 0xffffffff)) & 1]
+
+
+def phase_starts(candle_seconds):
+    return tuple(candle_seconds * percent // 100 for percent in PHASE_PERCENTS)
+
+
+def candle_state(trade_pair, now_seconds, candle_seconds):
+    """
+    (side, phase) of trade_pair at now_seconds, or (None, None) when candle_seconds <= 0.
+    """
+    if candle_seconds <= 0:
+        return None, None
+    body_side = plan_side(pair_seed(trade_pair), now_seconds // candle_seconds)
+    counter_side = SIDES[1 - SIDES.index(body_side)]
+    _, body_from, close_wick_from, close_from = phase_starts(candle_seconds)
+    elapsed = now_seconds % candle_seconds
+    if elapsed < body_from:
+        return counter_side, "open_wick"
+    if elapsed < close_wick_from:
+        return body_side, "body"
+    if elapsed < close_from:
+        return counter_side, "close_wick"
+    return body_side, "close"
+
+
+def segment_side(trade_pair, now_seconds, side_segment_seconds):
+    """
+    Side used inside the correction band when there is no candle plan.
+    """
+    return plan_side(pair_seed(trade_pair), now_seconds // side_segment_seconds)
+
+
+def mix32_array(values):
+    np = load_numpy()
+    values = values.astype(np.uint32)
+    values ^= values >> np.uint32(16)
+    values *= np.uint32(0x7feb352d)
+    values ^= values >> np.uint32(15)
+    values *= np.uint32(0x846ca68b)
+    values ^= values >> np.uint32(16)
+    return values
+
+
+def plan_side_array(seeds, indexes):
+    """
+    Vectorized plan_side: 1 (right) or 0 (left) for broadcastable seeds and indexes.
+    """
+    np = load_numpy()
+    mixed = (np.asarray(indexes).astype(np.uint64) * np.uint64(SEED_MULTIPLIER)) & np.uint64(0xffffffff)
+    return (mix32_array(np.asarray(seeds, dtype=np.uint64) ^ mixed) & np.uint32(1)).astype(np.uint8)
+
+
+def plan_arrays(seeds, times, candle_seconds, side_segment_seconds):
+    """
+    Side and phase codes for every (pair, time): seeds has shape (P,), times has
+    shape (T,) or (P, T). Sides are 0 (left) or 1 (right); phases index
+    CANDLE_PHASES, or are -1 where the segment side applies (candle_seconds <= 0).
+    """
+    np = load_numpy()
+    seeds = np.asarray(seeds, dtype=np.uint64).reshape(-1, 1)
+    times = np.asarray(times, dtype=np.int64)
+    if times.ndim == 1:
+        times = times.reshape(1, -1)
+    if candle_seconds <= 0:
+        sides = plan_side_array(seeds, times // side_segment_seconds)
+        return sides, np.full(sides.shape, -1, dtype=np.int8)
+    body = plan_side_array(seeds, times // candle_seconds)
+    phases = (np.searchsorted(np.array(phase_starts(candle_seconds)), times % candle_seconds, side="right") - 1).astype(np.int8)
+    # Wick phases (0 and 2) trade against the body
+    sides = body ^ (1 - (phases & 1)).astype(np.uint8)
+    return sides, np.broadcast_to(phases, sides.shape).copy()
+
+
+def _plan_lists(trade_pairs, times, candle_seconds, side_segment_seconds):
+    sides, phases = [], []
+    for i, trade_pair in enumerate(trade_pairs):
+        row_times = times[i] if times and isinstance(times[0], (list, tuple)) else times
+        if candle_seconds <= 0:
+            sides.append([SIDES.index(segment_side(trade_pair, t, side_segment_seconds)) for t in row_times])
+            phases.append([-1] * len(row_times))
+            continue
+        states = [candle_state(trade_pair, t, candle_seconds) for t in row_times]
+        sides.append([SIDES.index(side) for side, _ in states])
+        phases.append([CANDLE_PHASES.index(phase) for _, phase in states])
+    return sides, phases
+
+
+def plan_schedule(trade_pairs, times, candle_seconds, side_segment_seconds=900):
+    """
+    Planned side and phase codes of every pair at every time in one pass.
+    Uses NumPy arrays when available and nested lists otherwise.
+    """
+    if load_numpy() is None:
+        return _plan_lists(list(trade_pairs), [list(row) if isinstance(row, (list, tuple)) else row for row in times],
+                           candle_seconds, side_segment_seconds)
+    seeds = [pair_seed(trade_pair) for trade_pair in trade_pairs]
+    return plan_arrays(seeds, times, candle_seconds, side_segment_seconds)
+
+
+def schedule_boundaries(start, end, candle_seconds, side_segment_seconds=900):
+    """
+    Sorted times in [start, end) where a planned side or phase may change, starting
+    with start itself. Sides are constant between consecutive boundaries, so
+    plan_schedule over these times describes the whole range.
+    """
+    if candle_seconds <= 0:
+        steps, period = (0,), side_segment_seconds
+    else:
+        steps, period = phase_starts(candle_seconds), candle_seconds
+    boundaries = {start}
+    for index in range(start // period, (end - 1) // period + 1):
+        for step in steps:
+            at = index * period + step
+            if start <= at < end:
+                boundaries.add(at)
+    return sorted(boundaries)
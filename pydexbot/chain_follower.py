@@ -0,0 +1,382 @@
+"""
+In-memory mirror of pair table rows and bot balances, kept current by following blocks
+"""
+import re
+import threading
+import time
+
+from pydexbot.assets import cached_asset
+from pydexbot.market_snapshot import MarketSnapshotService
+from pydexbot.metrics import METRICS
+
+# Action data fields that may name the trade pair an action is about
+PAIR_FIELDS = ("trade_pair_name", "tpcode", "trade_pair", "name")
+# Action data fields that name an account whose token balances the action may change
+ACCOUNT_FIELDS = ("bot", "from", "to")
+MAX_BLOCKS_PER_POLL = 100
+# Further behind than this, reconcile and jump to the head instead of replaying blocks
+MAX_CATCH_UP_BLOCKS = 1200
+# Balance reads older than this are no longer tracked against drops
+BALANCE_READ_GRACE_SECONDS = 60.0
+
+
+def block_actions(block):
+    """
+    Top-level actions of the executed transactions in a get_block result.
+    """
+    for receipt in block.get("transactions") or []:
+        if receipt.get("status", "executed") != "executed":
+            continue
+        trx = receipt.get("trx")
+        if not isinstance(trx, dict):
+            # Deferred transactions are listed by id only
+            continue
+        for action in (trx.get("transaction") or {}).get("actions") or []:
+            yield action
+
+
+class ChainFollower:
+    """
+    Follow the chain block by block and mirror the per-pair rows of `tables` and
+    the token balances of bots in memory.
+
+    tables maps (code, scope, table) to the row field holding the pair name, or a
+    tuple of fields, as in MarketSnapshotService, which does the full reads: at
+    start and every reconcile_seconds all tables are read as paged key ranges and
+    replace the mirror, and rows that differ are counted as follower_drift_rows.
+
+    Each new block is applied in order. A block with table_deltas (row values as a
+    state-history bridge or the mock node serves them) is applied as is. Otherwise
+    the actions are scanned. get_block lists only the top-level actions, not the
+    inline ones they cause, so an action naming a followed pair (on any contract)
+    marks that pair's rows in every table stale, to be read again after the block.
+    For actions naming no pair, watch maps an account to the tables that actions on
+    it, or transfers to or from it, may change, and all rows of those tables are
+    marked stale. Actions naming an
+    account (bot, from, to) drop its mirrored balances. Balances are added by
+    record_balance after a point read.
+
+    Readers get rows and balances only while the follower is live: polled recently
+    and at most max_lag_blocks behind the head. Stale rows, pairs and accounts
+    marked dirty by our own trades, and anything not mirrored fall back to reads.
+    """
+
+    def __init__(self, get_info, get_block, get_table_rows, trade_pairs, tables, watch, poll_seconds=0.5,
+                 reconcile_seconds=60, max_lag_blocks=10, page_limit=200, max_pages=10,
+                 on_row_change=None, on_account_change=None):
+        self._get_info = get_info
+        self._get_block = get_block
+        self._get_table_rows = get_table_rows
+        self._tables = {key: (fields,) if isinstance(fields, str) else tuple(fields) for key, fields in tables.items()}
+        self._watch = {account: tuple(keys) for account, keys in watch.items()}
+        self._pairs = {str(trade_pair) for trade_pair in trade_pairs}
+        self._poll_seconds = float(poll_seconds or 0)
+        self._reconcile_seconds = max(float(reconcile_seconds or 0), 0)
+        self._max_lag_blocks = max(0, int(max_lag_blocks or 0))
+        self._max_poll_age = max(3 * self._poll_seconds, 2.0)
+        self._page_limit = max(1, int(page_limit or 1))
+        self._reader = MarketSnapshotService(get_table_rows, trade_pairs, self._tables, 0, page_limit, max_pages)
+        self._on_row_change = on_row_change
+        self._on_account_change = on_account_change
+        self._rows = {}
+        self._rows_as_of = None
+        self._stale = set()
+        self._stale_tables = set()
+        self._balances = {}
+        self._balance_dropped = {}
+        self._balances_cleared_at = 0.0
+        self._dirty = {}
+        self._head_block_num = 0
+        self._next_block = None
+        self._last_block_id = None
+        self._polled_at = None
+        self._reconciled_at = None
+        self._reconcile_requested = True
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def enabled(self):
+        return self._poll_seconds > 0 and bool(self._pairs)
+
+    def live(self):
+        polled_at = self._polled_at
+        if polled_at is None or self._rows_as_of is None or time.monotonic() - polled_at > self._max_poll_age:
+            return False
+        return self._head_block_num - (self._next_block - 1) <= self._max_lag_blocks
+
+    def stats(self):
+        return {
+            "live": self.live(),
+            "head_block_num": self._head_block_num,
+            "processed_block_num": (self._next_block or 1) - 1,
+            "stale_rows": len(self._stale) + len(self._stale_tables),
+            "dirty": len(self._dirty),
+            "balances": sum(len(balances) for balances in list(self._balances.values())),
+        }
+
+    def row(self, code, scope, table, key):
+        """
+        Return (True, row) when the mirror holds a current row for key, else (False, None).
+        """
+        rows = self._rows.get((code, scope, table))
+        if rows is None or key not in rows or key in self._dirty or not self.live():
+            return False, None
+        if (code, scope, table) in self._stale_tables or (code, scope, table, key) in self._stale:
+            return False, None
+        return True, rows[key]
+
+    def balance(self, contract, account, symbol):
+        """
+        Return (True, amount) when the mirror holds a current balance, else (False, None).
+        """
+        amount = self._balances.get(account, {}).get((contract, symbol))
+        if amount is None or account in self._dirty or not self.live():
+            return False, None
+        return True, amount
+
+    def record_balance(self, contract, account, symbol, amount, read_started):
+        """
+        Mirror a balance read at monotonic time read_started, unless the follower has
+        dropped the account's balances since the read started.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if account in self._dirty or read_started <= self._balances_cleared_at:
+                return
+            if self._balance_dropped.get(account, 0.0) >= read_started:
+                return
+            self._balances.setdefault(account, {})[(contract, symbol)] = amount
+
+    def mark_dirty(self, key, block_num=None):
+        """
+        Stop serving key (a trade pair or an account) until the follower has applied
+        block_num, the block of our own trade, or until the next reconciliation.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._dirty[key] = (int(block_num) if block_num else None, time.monotonic())
+
+    def _drop_balances(self, account):
+        with self._lock:
+            self._balance_dropped[account] = time.monotonic()
+            self._balances.pop(account, None)
+        if self._on_account_change is not None:
+            self._on_account_change(account)
+
+    def _set_row(self, table_key, pair, row):
+        rows = self._rows.get(table_key)
+        if rows is None:
+            return
+        changed = pair not in rows or rows[pair] != row
+        rows[pair] = row
+        self._stale.discard((*table_key, pair))
+        if changed and self._on_row_change is not None:
+            self._on_row_change(*table_key, pair)
+
+    def _row_pair(self, table_key, row):
+        for field in self._tables[table_key]:
+            value = (row or {}).get(field)
+            if value is not None:
+                return str(value)
+        return None
+
+    def _action_pairs(self, data):
+        pairs = {str(data[field]) for field in PAIR_FIELDS if isinstance(data.get(field), str)} & self._pairs
+        memo = data.get("memo")
+        if not pairs and isinstance(memo, str):
+            # Swap transfers name the pair in the memo, e.g. "swap:1.000000 USDT:flon.usdt"
+            pairs = set(re.split(r"[:\s]+", memo)) & self._pairs
+        return pairs
+
+    def _apply_action(self, action, rows_current):
+        data = action.get("data")
+        if not isinstance(data, dict):
+            # Undecoded (hex) data: only the contract is known
+            data = {}
+        for field in ACCOUNT_FIELDS:
+            account = data.get(field)
+            if isinstance(account, str) and account:
+                self._drop_balances(account)
+        if not rows_current:
+            return
+        pairs = self._action_pairs(data)
+        if pairs:
+            # Its inline actions are not in the block and may reach any table of the pair
+            for table_key in self._rows:
+                for pair in pairs:
+                    self._stale.add((*table_key, pair))
+            return
+        table_keys = set(self._watch.get(action.get("account"), ()))
+        if action.get("name") == "transfer":
+            for field in ("from", "to"):
+                table_keys.update(self._watch.get(data.get(field), ()))
+        self._stale_tables.update(table_key for table_key in table_keys if table_key in self._rows)
+
+    def _apply_delta(self, delta, rows_current):
+        code, scope, table = delta.get("code"), delta.get("scope"), delta.get("table")
+        row = delta.get("value") if delta.get("present", True) else None
+        if table == "accounts":
+            symbol = cached_asset(row["balance"]).symbol if row is not None else str(delta.get("primary_key") or "")
+            with self._lock:
+                self._balance_dropped[scope] = time.monotonic()
+                balances = self._balances.get(scope)
+                # Only balances that are mirrored already; others are read on demand
+                if balances is not None and (code, symbol) in balances:
+                    if row is None:
+                        del balances[(code, symbol)]
+                    else:
+                        balances[(code, symbol)] = cached_asset(row["balance"]).decimal
+            if self._on_account_change is not None:
+                self._on_account_change(scope)
+            return
+        table_key = (code, scope, table)
+        if not rows_current or table_key not in self._tables:
+            return
+        pair = self._row_pair(table_key, row) or str(delta.get("primary_key") or "")
+        if pair in self._pairs:
+            self._set_row(table_key, pair, row)
+
+    def apply_block(self, block):
+        """
+        Apply one get_block result; blocks must be applied in order.
+        """
+        block_num = int(block["block_num"])
+        previous = block.get("previous")
+        if self._last_block_id and previous and previous != self._last_block_id:
+            # The block we applied last is no longer on the chain
+            METRICS.inc("follower_forks")
+            with self._lock:
+                self._balances.clear()
+                self._balances_cleared_at = time.monotonic()
+            self._reconcile_requested = True
+        rows_current = self._rows_as_of is not None and block_num > self._rows_as_of
+        deltas = block.get("table_deltas")
+        if deltas is not None:
+            for delta in deltas:
+                self._apply_delta(delta, rows_current)
+        else:
+            for action in block_actions(block):
+                self._apply_action(action, rows_current)
+        self._last_block_id = block.get("id")
+        self._next_block = block_num + 1
+        with self._lock:
+            self._dirty = {
+                key: (through, marked_at) for key, (through, marked_at) in self._dirty.items()
+                if through is None or through > block_num
+            }
+        METRICS.inc("follower_blocks")
+
+    def refresh_stale(self):
+        """
+        Read rows marked stale by actions again; failures stay stale for the next poll.
+        A table with more stale rows than the pages of a full read is read in full.
+        """
+        stale_by_table = {}
+        for code, scope, table, _ in self._stale:
+            stale_by_table[(code, scope, table)] = stale_by_table.get((code, scope, table), 0) + 1
+        full_read_pages = -(-len(self._pairs) // self._page_limit)
+        self._stale_tables.update(table_key for table_key, count in stale_by_table.items() if count > full_read_pages)
+        for table_key in list(self._stale_tables):
+            rows = self._reader.read_table(*table_key)
+            self._stale_tables.discard(table_key)
+            for pair, row in rows.items():
+                self._set_row(table_key, pair, row)
+            METRICS.inc("follower_reads", table=table_key[2])
+        for code, scope, table, pair in list(self._stale):
+            if (code, scope, table) in self._stale_tables:
+                continue
+            resp = self._get_table_rows(code, scope, table, pair, pair, 1) or {}
+            rows = [row for row in resp.get("rows") or [] if self._row_pair((code, scope, table), row) == pair]
+            self._set_row((code, scope, table), pair, rows[0] if rows else None)
+            METRICS.inc("follower_reads", table=table)
+
+    def reconcile(self):
+        """
+        Read all tables in full and replace the mirror rows.
+        """
+        started_at = time.monotonic()
+        head = int((self._get_info() or {}).get("head_block_num") or 0)
+        snapshot = self._reader.refresh()
+        for table_key in self._tables:
+            fresh = dict((snapshot.rows(*table_key) if snapshot else None) or {})
+            old = self._rows.get(table_key)
+            self._rows[table_key] = fresh
+            if old is None:
+                continue
+            changed = [pair for pair in set(fresh) | set(old) if fresh.get(pair) != old.get(pair)]
+            if changed:
+                METRICS.inc("follower_drift_rows", len(changed), table=table_key[2])
+            if self._on_row_change is not None:
+                for pair in changed:
+                    self._on_row_change(*table_key, pair)
+        self._stale.clear()
+        self._stale_tables.clear()
+        with self._lock:
+            self._dirty = {
+                key: (through, marked_at) for key, (through, marked_at) in self._dirty.items()
+                if marked_at >= started_at or (through is not None and through > head)
+            }
+        self._rows_as_of = head
+        if self._next_block is None or head - self._next_block > MAX_CATCH_UP_BLOCKS:
+            if self._next_block is not None:
+                # Blocks are skipped, so balance changes in them are unknown
+                with self._lock:
+                    self._balances.clear()
+                    self._balances_cleared_at = time.monotonic()
+            self._next_block = head + 1
+            self._last_block_id = None
+        self._head_block_num = max(self._head_block_num, head)
+        self._reconciled_at = time.monotonic()
+        self._reconcile_requested = False
+        METRICS.observe("follower_reconcile_seconds", time.monotonic() - started_at)
+
+    def poll(self):
+        """
+        Apply the blocks up to the node's head, at most MAX_BLOCKS_PER_POLL of them.
+        Returns True when the follower has caught up with the head.
+        """
+        if self._reconcile_requested or (
+            self._reconcile_seconds and time.monotonic() - self._reconciled_at >= self._reconcile_seconds
+        ):
+            self.reconcile()
+        head = int((self._get_info() or {}).get("head_block_num") or 0)
+        self._head_block_num = head
+        if head - self._next_block > MAX_CATCH_UP_BLOCKS:
+            self.reconcile()
+        last = min(head, self._next_block + MAX_BLOCKS_PER_POLL - 1)
+        while self._next_block <= last:
+            self.apply_block(self._get_block(self._next_block))
+        self.refresh_stale()
+        self._polled_at = time.monotonic()
+        now = time.monotonic()
+        with self._lock:
+            self._balance_dropped = {
+                account: at for account, at in self._balance_dropped.items() if now - at < BALANCE_READ_GRACE_SECONDS
+            }
+        return self._next_block > head
+
+    def start(self, on_error=None):
+        if not self.enabled:
+            return
+        def run():
+            while not self._stop_event.is_set():
+                caught_up = False
+                try:
+                    caught_up = self.poll()
+                except Exception as e:
+                    # Readers fall back to point reads once the follower is no longer live
+                    if on_error is not None:
+                        on_error(e)
+                if caught_up and self._stop_event.wait(self._poll_seconds):
+                    return
+                if not caught_up and self._stop_event.wait(0.05):
+                    return
+        self._thread = threading.Thread(target=run, name="chain-follower", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
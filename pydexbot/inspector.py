@@ -0,0 +1,167 @@
+"""
+Market and bot inspection CLI: prices, inventory and funded bots of every pair in one pass
+
+For each trade pair it reads the market config, the swap pool, the bot market,
+the bot group and the wallet balances of the group's bots through the same
+helpers and pooled node connections as the service, all pairs and bots at
+once, and prints one row per pair: the pool price and its deviation from
+target_price, the side the price bands force, the left inventory in basis
+points, and how many bots could fund a sell (left) or a buy (right) now.
+
+Usage:
+  python -m pydexbot.main inspect
+  python -m pydexbot.main inspect --pair flon.usdt,sing.usdt --format json
+  python -m pydexbot.main inspect --config-dir ./config --format csv > pairs.csv
+"""
+import argparse
+import csv
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from pydexbot.assets import cached_asset, forced_side, price_bands
+from pydexbot.balances import BalanceFetcher
+from pydexbot.runtime import get_runtime
+
+FIELDS = ("pair", "paused", "price", "target_price", "deviation", "forced_side", "inventory_bps", "bots",
+          "funded_sell", "funded_buy", "pool_left", "pool_right", "wallets_left", "wallets_right", "error")
+FORMATS = ("table", "json", "csv")
+
+
+def funded_count(balances, bots, contract, symbol, pool_balance, required_amount):
+    """
+    (bots able to fund the side, sum of their wallets) as choose_funded_bot sees it:
+    every bot when the pool balance already covers the trade.
+    """
+    wallets = balances.get_many(contract, symbol, bots) if bots else {}
+    total = sum(wallets.values(), Decimal("0"))
+    if pool_balance >= required_amount:
+        return len(bots), total
+    need = required_amount - pool_balance
+    return sum(1 for amount in wallets.values() if amount >= need), total
+
+
+def inspect_pair(service, balances, trade_pair):
+    row = dict.fromkeys(FIELDS)
+    row["pair"] = trade_pair
+    market_config = service.get_market_config(trade_pair)
+    swap_market = service.get_swap_market(trade_pair)
+    bot_market = service.get_bot_market(trade_pair)
+    bots = service.get_bots_from_group(trade_pair)
+    row["bots"] = len(bots)
+    missing = [name for name, value in (("trademarkets", market_config), ("markets", swap_market),
+                                        ("botmarkets", bot_market)) if not value]
+    if missing:
+        row["error"] = "no " + ", ".join(missing) + " row"
+        return row
+
+    row["paused"] = bool(market_config.get("paused", 0))
+    left = cached_asset(swap_market["left_pool_quant"]["quantity"])
+    right = cached_asset(swap_market["right_pool_quant"]["quantity"])
+    target = Decimal(str(market_config.get("target_price") or "0"))
+    row["target_price"] = float(target)
+    if left.amount > 0 and right.amount > 0:
+        price = right.decimal / left.decimal
+        row["price"] = float(price)
+        if target > 0:
+            row["deviation"] = float(price / target - 1)
+        side = forced_side(left, right, price_bands(
+            market_config.get("target_price") or "0",
+            market_config.get("fluctuation_ratio") or "0",
+            service.get_target_side_deadband_ratio(trade_pair),
+        ))
+        row["forced_side"] = {"left": "sell", "right": "buy"}.get(side)
+        row["inventory_bps"] = service.calc_left_inventory_bps(bot_market, price)
+
+    row["pool_left"] = bot_market["left_pool"]["balance"]["quantity"]
+    row["pool_right"] = bot_market["right_pool"]["balance"]["quantity"]
+    for side, funded_key, wallets_key in (("left", "funded_sell", "wallets_left"),
+                                          ("right", "funded_buy", "wallets_right")):
+        if side == "right" and (left.amount <= 0 or right.amount <= 0):
+            # The quote needed for a buy follows from the pool price
+            continue
+        contract, symbol, pool_balance, required_amount = service.side_required_balance(
+            side, market_config, swap_market, bot_market)
+        funded, total = funded_count(balances, bots, contract, symbol, pool_balance, required_amount)
+        row[funded_key] = funded
+        row[wallets_key] = f"{total} {symbol}"
+    return row
+
+
+def inspect_pairs(service, trade_pairs, workers=32):
+    """
+    One row per pair in trade_pairs order; a pair that fails to read gets its error instead.
+    Wallets are read on a separate pool of `workers` threads, each with its keep-alive connection.
+    """
+    balances = BalanceFetcher(service.get_currency_balance, workers, service.BALANCE_CACHE_SECONDS)
+
+    def run(trade_pair):
+        try:
+            return inspect_pair(service, balances, trade_pair)
+        except Exception as e:
+            row = dict.fromkeys(FIELDS)
+            row.update(pair=trade_pair, error=str(e) or type(e).__name__)
+            return row
+    with ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="inspect") as pool:
+        return list(pool.map(run, trade_pairs))
+
+
+def format_cell(field, value):
+    if value is None:
+        return "-"
+    if field == "deviation":
+        return f"{value:+.2%}"
+    if field in ("price", "target_price"):
+        return f"{value:.8f}"
+    if field == "paused":
+        return "yes" if value else "no"
+    return str(value)
+
+
+def format_table(rows):
+    fields = [field for field in FIELDS if field != "error" or any(row["error"] for row in rows)]
+    cells = [list(fields)] + [[format_cell(field, row[field]) for field in fields] for row in rows]
+    widths = [max(len(line[i]) for line in cells) for i in range(len(fields))]
+    return "\n".join(
+        "  ".join(cell.ljust(width) if fields[i] in ("pair", "forced_side", "error") else cell.rjust(width)
+                  for i, (cell, width) in enumerate(zip(line, widths)))
+        for line in cells
+    )
+
+
+def split_list(value):
+    return [item.strip() for item in str(value).split(",") if item.strip()] if value else []
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="pydexbot inspect", description=__doc__.splitlines()[1],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     epilog="\n".join(__doc__.splitlines()[10:]))
+    parser.add_argument("--config-dir", help="config directory of the bot (default ./config)")
+    parser.add_argument("--log-dir", help="log directory of the bot (default ./logs)")
+    parser.add_argument("--pair", help="comma-separated trade pairs (default trade_pairs of the config)")
+    parser.add_argument("--format", choices=FORMATS, default="table")
+    parser.add_argument("--workers", type=int, default=32, help="pairs, and separately wallets, read at the same time")
+    options = parser.parse_args(argv)
+
+    from pydexbot import bot_service as service
+    service.configure(get_runtime(argv))
+    trade_pairs = split_list(options.pair) or list(service.TRADE_PAIRS)
+    if not trade_pairs:
+        sys.exit("no trade pairs: pass --pair or set trade_pairs in the config")
+    rows = inspect_pairs(service, trade_pairs, options.workers)
+    if options.format == "json":
+        print(json.dumps(rows, indent=2))
+    elif options.format == "csv":
+        writer = csv.DictWriter(sys.stdout, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    else:
+        print(format_table(rows))
+    if any(row["error"] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
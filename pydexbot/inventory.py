@@ -0,0 +1,222 @@
+"""
+Ledger of bot wallet balances and inventory-weighted bot selection
+"""
+import math
+import random
+import threading
+import time
+
+from pydexbot.assets import cached_asset
+
+# Random draws inside a bucket before the threshold bucket is searched directly
+MAX_BUCKET_DRAWS = 64
+
+
+def balance_bucket(amount):
+    """
+    Power-of-two bucket of a positive amount: amounts in [2**(b-1), 2**b) share bucket b.
+    None for zero and negative amounts.
+    """
+    if amount <= 0:
+        return None
+    return math.frexp(float(amount))[1]
+
+
+class InventoryIndex:
+    """
+    Bots of one pair holding one token, bucketed by balance.
+
+    pick(need) returns a bot holding at least need, chosen with probability
+    proportional to its balance: a bucket above need's bucket is drawn by its total
+    weight, then a bot in it by rejection (every bot in bucket b holds at least half
+    of 2**b, so a draw is accepted with probability 1/2 or more). Bots in need's own
+    bucket are only searched when no higher bucket holds any balance, so picks cost
+    O(number of buckets) and not O(bots).
+    """
+
+    def __init__(self, rng=None):
+        self._random = rng or random
+        self._balances = {}
+        self._buckets = {}
+        self._weights = {}
+        self._positions = {}
+
+    def __len__(self):
+        return len(self._balances)
+
+    def balance(self, bot):
+        return self._balances.get(bot)
+
+    def bots(self):
+        return list(self._balances)
+
+    def set(self, bot, amount):
+        self.remove(bot)
+        self._balances[bot] = amount
+        bucket = balance_bucket(amount)
+        if bucket is None:
+            return
+        members = self._buckets.setdefault(bucket, [])
+        self._positions[bot] = (bucket, len(members))
+        members.append(bot)
+        self._weights[bucket] = self._weights.get(bucket, 0.0) + float(amount)
+
+    def remove(self, bot):
+        amount = self._balances.pop(bot, None)
+        slot = self._positions.pop(bot, None)
+        if slot is None:
+            return
+        bucket, position = slot
+        members = self._buckets[bucket]
+        last = members.pop()
+        if last != bot:
+            # Move the last bot into the freed slot
+            members[position] = last
+            self._positions[last] = (bucket, position)
+        if members:
+            self._weights[bucket] -= float(amount)
+        else:
+            del self._buckets[bucket]
+            del self._weights[bucket]
+
+    def pick(self, need):
+        """
+        A bot with a balance of at least need, weighted by balance; None when no bot has enough.
+        """
+        floor = balance_bucket(need)
+        candidates = [
+            (bucket, weight) for bucket, weight in self._weights.items()
+            if (floor is None or bucket > floor) and weight > 0
+        ]
+        if candidates:
+            target = self._random.random() * sum(weight for _, weight in candidates)
+            for bucket, weight in candidates:
+                target -= weight
+                if target < 0:
+                    break
+            members = self._buckets[bucket]
+            limit = 2.0 ** bucket
+            for _ in range(MAX_BUCKET_DRAWS):
+                bot = members[self._random.randrange(len(members))]
+                if self._random.random() * limit < float(self._balances[bot]):
+                    return bot
+            return members[self._random.randrange(len(members))]
+        if floor is None:
+            # Nothing to weight by; every bot holds at least need
+            return self._random.choice(list(self._balances)) if self._balances else None
+        eligible = [bot for bot in self._buckets.get(floor, ()) if self._balances[bot] >= need]
+        if not eligible:
+            return None
+        return self._random.choices(eligible, weights=[float(self._balances[bot]) for bot in eligible])[0]
+
+
+class InventoryLedger:
+    """
+    Wallet balances of each pair's bots per token, kept between rounds.
+
+    The first pick for a (pair, token) reads every bot's balance once through
+    fetch_balances(contract, symbol, bots) -> {bot: amount}; later picks use the
+    ledger. Transfers in our own trade traces move balances (apply_transfers), bots
+    whose balance is in doubt are re-read before the next pick (invalidate), and
+    each index is read in full again every reconcile_seconds or when its bot group
+    changes.
+    """
+
+    def __init__(self, fetch_balances, reconcile_seconds=300, rng=None):
+        self._fetch_balances = fetch_balances
+        self._reconcile_seconds = max(float(reconcile_seconds or 0), 0)
+        self._random = rng or random
+        self._lock = threading.Lock()
+        self._indexes = {}
+        self._seeded_at = {}
+        self._groups = {}
+        self._members = {}
+        self._stale = set()
+
+    def _seed(self, key, bots):
+        trade_pair, contract, symbol = key
+        balances = self._fetch_balances(contract, symbol, bots)
+        index = InventoryIndex(self._random)
+        for bot in bots:
+            index.set(bot, balances[bot])
+        with self._lock:
+            old = self._indexes.get(key)
+            for bot in old.bots() if old is not None else ():
+                self._members.get((contract, symbol, bot), set()).discard(key)
+            for bot in bots:
+                self._members.setdefault((contract, symbol, bot), set()).add(key)
+                self._stale.discard((contract, symbol, bot))
+            self._indexes[key] = index
+            self._groups[key] = bots
+            self._seeded_at[key] = time.monotonic()
+        return index
+
+    def _refresh_stale(self, key, index):
+        _, contract, symbol = key
+        with self._lock:
+            stale = [bot for bot in index.bots() if (contract, symbol, bot) in self._stale]
+        if not stale:
+            return
+        balances = self._fetch_balances(contract, symbol, stale)
+        with self._lock:
+            for bot in stale:
+                self._stale.discard((contract, symbol, bot))
+                for member_key in self._members.get((contract, symbol, bot), ()):
+                    self._indexes[member_key].set(bot, balances[bot])
+
+    def seeded(self, trade_pair, contract, symbol):
+        """
+        True when picks for trade_pair and the token are served without a full read.
+        """
+        key = (trade_pair, contract, symbol)
+        if key not in self._indexes:
+            return False
+        return not self._reconcile_seconds or time.monotonic() - self._seeded_at[key] < self._reconcile_seconds
+
+    def index(self, trade_pair, contract, symbol, bots):
+        """
+        The current InventoryIndex of trade_pair's bots for one token, seeded or
+        refreshed first when needed.
+        """
+        key = (trade_pair, contract, symbol)
+        index = self._indexes.get(key)
+        group = self._groups.get(key)
+        due = self._reconcile_seconds and time.monotonic() - self._seeded_at.get(key, 0.0) >= self._reconcile_seconds
+        if index is None or due or not (group is bots or group == bots):
+            return self._seed(key, bots)
+        self._refresh_stale(key, index)
+        return index
+
+    def pick(self, trade_pair, contract, symbol, bots, need):
+        """
+        A bot of trade_pair whose wallet holds at least need of the token, weighted by
+        its balance, or None.
+        """
+        index = self.index(trade_pair, contract, symbol, bots)
+        with self._lock:
+            return index.pick(need)
+
+    def balance(self, trade_pair, contract, symbol, bot):
+        index = self._indexes.get((trade_pair, contract, symbol))
+        return index.balance(bot) if index is not None else None
+
+    def apply_transfers(self, transfers):
+        """
+        Move ledger balances by (contract, from, to, quantity) transfers of our own trades.
+        """
+        with self._lock:
+            for contract, sender, receiver, quantity in transfers:
+                asset = cached_asset(quantity)
+                for account, sign in ((sender, -1), (receiver, 1)):
+                    for key in self._members.get((contract, asset.symbol, account), ()):
+                        index = self._indexes[key]
+                        index.set(account, index.balance(account) + sign * asset.decimal)
+
+    def invalidate(self, account):
+        """
+        Re-read every ledger balance of account before it is picked again.
+        """
+        with self._lock:
+            for contract, symbol, bot in self._members:
+                if bot == account:
+                    self._stale.add((contract, symbol, bot))
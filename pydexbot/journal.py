@@ -0,0 +1,550 @@
+"""
+Append-only columnar trade journal and its query CLI
+
+Every trade attempt is one record: time, pair, bot, side, outcome, filled base and
+quote amounts, push latency and transaction id. Records are kept in one directory
+per UTC day with one file per column (fixed-width little-endian values), so a
+query maps only the columns it needs and skips days outside its time range. Pair
+and bot names are stored as codes into the day's names.txt.
+
+Usage:
+  python -m pydexbot.main journal --since 2026-10-01 --group-by pair
+  python -m pydexbot.main journal --pair flon.usdt --group-by bot,side --outcome trade,no_fill
+  python -m pydexbot.main journal --group-by hour --json
+  python -m pydexbot.main journal --config-dir ./config --since 2026-10-01
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from array import array
+from datetime import datetime, timedelta, timezone
+
+from pydexbot.optional import load_numpy
+from pydexbot.runtime import get_runtime
+
+# (file name, array typecode, numpy dtype)
+COLUMNS = (
+    ("time", "q", "<i8"),       # unix microseconds
+    ("pair", "I", "<u4"),       # code into names.txt
+    ("bot", "I", "<u4"),        # code into names.txt; 0 is no bot
+    ("side", "B", "u1"),        # index into SIDES
+    ("outcome", "B", "u1"),     # index into OUTCOMES
+    ("base", "d", "<f8"),       # filled base amount
+    ("quote", "d", "<f8"),      # filled quote amount
+    ("latency", "f", "<f4"),    # push latency in milliseconds
+    ("trx", None, "S32"),       # transaction id bytes, zeros when none
+)
+DTYPES = {name: dtype for name, _, dtype in COLUMNS}
+SIDES = ("", "sell", "buy")
+OUTCOMES = ("trade", "no_fill", "failed", "no_funded_bot", "preflight_skip", "executed_unattributed")
+NAMES_FILE = "names.txt"
+GROUP_KEYS = ("pair", "bot", "side", "outcome", "hour", "day")
+MICROS_PER_HOUR = 3600 * 10 ** 6
+MICROS_PER_DAY = 24 * MICROS_PER_HOUR
+
+def day_name(micros):
+    return datetime.fromtimestamp(micros / 1e6, timezone.utc).strftime("%Y-%m-%d")
+
+
+def _itemsize(typecode, dtype):
+    return array(typecode).itemsize if typecode else int(dtype[1:])
+
+
+def _trx_bytes(trx_id):
+    if not trx_id:
+        return bytes(32)
+    try:
+        return bytes.fromhex(str(trx_id))[:32].ljust(32, b"\0")
+    except ValueError:
+        return bytes(32)
+
+
+class _Day:
+    """
+    Open day segment on the writer side: name codes and the record count on disk.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.names = [""]
+        names_path = os.path.join(path, NAMES_FILE)
+        if os.path.exists(names_path):
+            with open(names_path) as f:
+                self.names = [""] + [line.rstrip("\n") for line in f][1:]
+        else:
+            with open(names_path, "w") as f:
+                f.write("\n")
+        self.codes = {name: code for code, name in enumerate(self.names)}
+        self.new_names = []
+        self._repair()
+
+    def _repair(self):
+        # A flush cut short leaves some columns longer; drop the partial records
+        sizes = {}
+        for name, typecode, dtype in COLUMNS:
+            column_path = os.path.join(self.path, name)
+            size = os.path.getsize(column_path) if os.path.exists(column_path) else 0
+            sizes[name] = (column_path, size, _itemsize(typecode, dtype))
+        count = min(size // itemsize for _, size, itemsize in sizes.values())
+        for column_path, size, itemsize in sizes.values():
+            if size != count * itemsize:
+                with open(column_path, "ab") as f:
+                    f.truncate(count * itemsize)
+
+    def code(self, name):
+        name = name or ""
+        code = self.codes.get(name)
+        if code is None:
+            code = self.codes[name] = len(self.names)
+            self.names.append(name)
+            self.new_names.append(name)
+        return code
+
+
+class TradeJournal:
+    """
+    Buffer trade attempt records and append them to the day's column files.
+
+    record() only appends a tuple under a lock; a writer thread flushes the buffer
+    every flush_interval_seconds (and close() flushes the rest), writing new names
+    first and then each column in one write, so a reader never meets a code that
+    is not in names.txt. A crash loses at most the unflushed records.
+    """
+
+    def __init__(self, directory, flush_interval_seconds=1.0):
+        self._directory = directory
+        self._flush_interval_seconds = max(0.01, float(flush_interval_seconds or 1.0))
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._days = {}
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._error_reported = False
+
+    def record(self, trade_pair, bot, side, outcome, base_amount=0, quote_amount=0, latency_seconds=0.0,
+               trx_id=None, at=None):
+        """
+        Add one attempt. side is "sell"/"buy" or "left"/"right"; outcome one of OUTCOMES.
+        """
+        side = {"left": "sell", "right": "buy"}.get(side, side)
+        micros = int((time.time() if at is None else at) * 1e6)
+        entry = (micros, str(trade_pair), bot or "", SIDES.index(side) if side in SIDES else 0,
+                 OUTCOMES.index(outcome), float(base_amount or 0), float(quote_amount or 0),
+                 float(latency_seconds or 0) * 1000.0, _trx_bytes(trx_id))
+        with self._lock:
+            self._pending.append(entry)
+        if self._thread is None:
+            self.start()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="trade-journal", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop_event.wait(self._flush_interval_seconds):
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        with self._flush_lock:
+            by_day = {}
+            for entry in pending:
+                by_day.setdefault(day_name(entry[0]), []).append(entry)
+            for day, entries in sorted(by_day.items()):
+                try:
+                    self._write_day(day, entries)
+                except OSError as e:
+                    if not self._error_reported:
+                        self._error_reported = True
+                        sys.stderr.write(f"trade journal write failed: {e}\n")
+
+    def _write_day(self, day, entries):
+        segment = self._days.get(day)
+        if segment is None:
+            # Keep only the newest open day and the one before, for records around midnight
+            for old in sorted(self._days)[:-1]:
+                del self._days[old]
+            segment = self._days[day] = _Day(os.path.join(self._directory, day))
+        rows = [
+            (micros, segment.code(pair), segment.code(bot), side, outcome, base, quote, latency, trx)
+            for micros, pair, bot, side, outcome, base, quote, latency, trx in entries
+        ]
+        if segment.new_names:
+            with open(os.path.join(segment.path, NAMES_FILE), "a") as f:
+                f.write("".join(f"{name}\n" for name in segment.new_names))
+            segment.new_names = []
+        values = list(zip(*rows))
+        for (name, typecode, _), column in zip(COLUMNS, values):
+            data = array(typecode, column).tobytes() if typecode else b"".join(column)
+            with open(os.path.join(segment.path, name), "ab") as f:
+                f.write(data)
+
+    def close(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(5.0)
+        self.flush()
+
+
+def parse_time(text, end=False):
+    """
+    "2026-10-01" or "2026-10-01T12:00" (UTC) -> unix microseconds; a bare date as
+    --until covers the whole day.
+    """
+    value = datetime.fromisoformat(text)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    if end and len(text) == 10:
+        value += timedelta(days=1)
+    return int(value.timestamp() * 1e6)
+
+
+def day_dirs(directory, since=None, until=None, nested=True):
+    """
+    Day segment directories overlapping [since, until), oldest first. With nested,
+    the days of each subdirectory (one journal per shard worker) are included too.
+    """
+    if not os.path.isdir(directory):
+        return []
+    first = day_name(since) if since is not None else None
+    last = day_name(until - 1) if until is not None else None
+    days = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if os.path.exists(os.path.join(path, NAMES_FILE)):
+            if len(name) == 10 and not (first and name < first) and not (last and name > last):
+                days.append(path)
+        elif nested and os.path.isdir(path):
+            days.extend(day_dirs(path, since, until, nested=False))
+    return sorted(days, key=os.path.basename)
+
+
+def load_day(path, fields):
+    """
+    Memory-map the given columns of one day segment; returns (names, {field: array}).
+    """
+    np = load_numpy()
+    with open(os.path.join(path, NAMES_FILE)) as f:
+        names = [""] + [line.rstrip("\n") for line in f][1:]
+    count = None
+    for name, typecode, dtype in COLUMNS:
+        column_path = os.path.join(path, name)
+        size = os.path.getsize(column_path) if os.path.exists(column_path) else 0
+        rows = size // _itemsize(typecode, dtype)
+        count = rows if count is None else min(count, rows)
+    columns = {}
+    for field in fields:
+        if count:
+            columns[field] = np.memmap(os.path.join(path, field), dtype=DTYPES[field], mode="r", shape=(count,))
+        else:
+            columns[field] = np.zeros(0, dtype=DTYPES[field])
+    return names, columns
+
+
+def _key(values):
+    """
+    (offsets, low, span) of an integer key array, for _group_index.
+    """
+    low = int(values.min())
+    return values - low, low, int(values.max()) - low + 1
+
+
+def _group_index(keys, count):
+    """
+    Group rows by small integer keys given as (offsets, low, span): the key value is
+    low + offset and offsets are below span (a scalar offset applies to every row).
+    Returns (index, size, decode): index maps each row to a slot below size and
+    decode(slots) returns the key values of slots.
+    """
+    np = load_numpy()
+    index = np.zeros(count, dtype=np.int64)
+    size = 1
+    for offsets, _, span in keys:
+        index = index * span + offsets
+        size *= span
+    groups = None
+    if size > 4 * count + 1024:
+        groups, index = np.unique(index, return_inverse=True)
+        size = len(groups)
+
+    def decode(slots):
+        combined = groups[slots] if groups is not None else slots.astype(np.int64)
+        values = []
+        for _, low, span in reversed(keys):
+            combined, offset = np.divmod(combined, span)
+            values.append(offset + low)
+        return values[::-1]
+
+    return index, size, decode
+
+
+def _matches(values, codes):
+    """
+    values in codes; comparisons are much faster than np.isin for a few codes.
+    """
+    np = load_numpy()
+    codes = list(codes)
+    if len(codes) > 8:
+        return np.isin(values, codes)
+    mask = np.zeros(len(values), dtype=bool)
+    for code in codes:
+        mask |= values == code
+    return mask
+
+
+def _aggregate(index, size, outcome, base, quote, latency):
+    """
+    Per slot: attempts by outcome (size x len(OUTCOMES)), base and quote volume,
+    latency sum and max. outcome holds outcome codes, or per-row count vectors.
+    """
+    np = load_numpy()
+    if outcome.ndim == 1:
+        counts = np.bincount(index * len(OUTCOMES) + outcome, minlength=size * len(OUTCOMES))
+        counts = counts.reshape(size, len(OUTCOMES))
+    else:
+        counts = np.stack([np.bincount(index, outcome[:, code], size) for code in range(len(OUTCOMES))], axis=1)
+    latency_max = np.zeros(size, dtype=latency.dtype)
+    np.maximum.at(latency_max, index, latency)
+    return (
+        counts.astype(np.int64),
+        np.bincount(index, base, size),
+        np.bincount(index, quote, size),
+        np.bincount(index, latency, size),
+        latency_max,
+    )
+
+
+def query(directory, since=None, until=None, pairs=None, bots=None, sides=None, outcomes=None, group_by=("pair",)):
+    """
+    Aggregate matching attempts per group; returns a list of row dicts sorted by key.
+
+    Each row has the group key fields plus attempts, one count per outcome,
+    fill_rate (trades / attempts), base and quote volume of the trades, their
+    volume-weighted price (quote / base) and the average and max push latency.
+    Every day segment is aggregated on its own and the small per-day tables are
+    merged, so memory stays at one day's columns.
+    """
+    np = load_numpy()
+    if np is None:
+        raise RuntimeError("journal queries need numpy: poetry install --extras numpy")
+    group_by = tuple(group_by or ())
+    for key in group_by:
+        if key not in GROUP_KEYS:
+            raise ValueError(f"unknown group key {key!r}; choose from {', '.join(GROUP_KEYS)}")
+    for side in sides or ():
+        if side not in SIDES[1:]:
+            raise ValueError(f"unknown side {side!r}; choose from {', '.join(SIDES[1:])}")
+    for outcome in outcomes or ():
+        if outcome not in OUTCOMES:
+            raise ValueError(f"unknown outcome {outcome!r}; choose from {', '.join(OUTCOMES)}")
+    fields = {"outcome", "base", "quote", "latency"}
+    fields.update(key for key in group_by if key in ("pair", "bot", "side"))
+    if pairs:
+        fields.add("pair")
+    if bots:
+        fields.add("bot")
+    if sides:
+        fields.add("side")
+    if since is not None or until is not None or "hour" in group_by or "day" in group_by:
+        fields.add("time")
+    side_codes = [SIDES.index(side) for side in sides or ()]
+    outcome_codes = [OUTCOMES.index(outcome) for outcome in outcomes or ()]
+
+    names = []
+    name_codes = {}
+    parts = []
+    for path in day_dirs(directory, since, until):
+        day_names, columns = load_day(path, fields)
+        if not len(columns["outcome"]):
+            continue
+        mask = None
+
+        def narrow(condition):
+            nonlocal mask
+            mask = condition if mask is None else mask & condition
+
+        if since is not None and columns["time"][0] < since:
+            narrow(columns["time"] >= since)
+        if until is not None and columns["time"][-1] >= until:
+            narrow(columns["time"] < until)
+        if pairs:
+            narrow(_matches(columns["pair"], (code for code, name in enumerate(day_names) if name in pairs)))
+        if bots:
+            narrow(_matches(columns["bot"], (code for code, name in enumerate(day_names) if name in bots)))
+        if side_codes:
+            narrow(_matches(columns["side"], side_codes))
+        if outcome_codes:
+            narrow(_matches(columns["outcome"], outcome_codes))
+        if mask is not None:
+            # Gathering the matching rows is much cheaper than boolean indexing
+            rows = np.flatnonzero(mask)
+            if not len(rows):
+                continue
+            columns = {field: values[rows] for field, values in columns.items()}
+        count = len(columns["outcome"])
+
+        day_start = parse_time(os.path.basename(path))
+        keys = []
+        for key in group_by:
+            if key == "day":
+                keys.append((0, day_start // MICROS_PER_DAY, 1))
+            elif key == "hour":
+                keys.append(((columns["time"] - day_start) // MICROS_PER_HOUR, day_start // MICROS_PER_HOUR, 24))
+            elif key in ("pair", "bot"):
+                keys.append((columns[key], 0, len(day_names)))
+            else:
+                keys.append((columns[key], 0, len(SIDES) if key == "side" else len(OUTCOMES)))
+        index, size, decode = _group_index(keys, count)
+        aggregates = _aggregate(index, size, columns["outcome"], columns["base"], columns["quote"], columns["latency"])
+        present = np.nonzero(aggregates[0].sum(axis=1))[0]
+        # Day name codes -> codes shared by all days
+        remap = np.empty(len(day_names), dtype=np.int64)
+        for code, name in enumerate(day_names):
+            shared = name_codes.get(name)
+            if shared is None:
+                shared = name_codes[name] = len(names)
+                names.append(name)
+            remap[code] = shared
+        group_keys = [remap[values] if key in ("pair", "bot") else values
+                      for key, values in zip(group_by, decode(present))]
+        parts.append((group_keys, [values[present] for values in aggregates]))
+    if not parts:
+        return []
+
+    key_arrays = [np.concatenate([part[0][i] for part in parts]) for i in range(len(group_by))]
+    counts, base, quote, latency_sum, latency_max = (
+        np.concatenate([part[1][i] for part in parts]) for i in range(5)
+    )
+    index, size, decode = _group_index([_key(values) for values in key_arrays], len(counts))
+    counts, base_volume, quote_volume, latency_sum, _ = _aggregate(index, size, counts, base, quote, latency_sum)
+    merged_max = np.zeros(size, dtype=latency_max.dtype)
+    np.maximum.at(merged_max, index, latency_max)
+    attempts = counts.sum(axis=1)
+    slots = np.nonzero(attempts)[0]
+    group_values = decode(slots)
+
+    rows = []
+    for position, slot in enumerate(slots):
+        row = {}
+        for key, values in zip(group_by, group_values):
+            value = int(values[position])
+            if key in ("pair", "bot"):
+                row[key] = names[value]
+            elif key == "side":
+                row[key] = SIDES[value]
+            elif key == "outcome":
+                row[key] = OUTCOMES[value]
+            else:
+                unit = MICROS_PER_HOUR if key == "hour" else MICROS_PER_DAY
+                row[key] = datetime.fromtimestamp(value * unit / 1e6, timezone.utc).strftime(
+                    "%Y-%m-%dT%H:00" if key == "hour" else "%Y-%m-%d")
+        attempt_count = int(attempts[slot])
+        row["attempts"] = attempt_count
+        for code, outcome in enumerate(OUTCOMES):
+            row[outcome] = int(counts[slot, code])
+        row["fill_rate"] = row["trade"] / attempt_count
+        row["base_volume"] = float(base_volume[slot])
+        row["quote_volume"] = float(quote_volume[slot])
+        row["avg_price"] = float(quote_volume[slot] / base_volume[slot]) if base_volume[slot] > 0 else None
+        row["latency_ms_avg"] = float(latency_sum[slot] / attempt_count)
+        row["latency_ms_max"] = float(merged_max[slot])
+        rows.append(row)
+    rows.sort(key=lambda row: tuple(str(row[key]) for key in group_by))
+    return rows
+
+
+def format_table(rows, group_by):
+    headers = list(group_by) + ["attempts", *OUTCOMES, "fill_rate", "base_volume", "quote_volume", "avg_price",
+                                "latency_ms_avg", "latency_ms_max"]
+    cells = [headers]
+    for row in rows:
+        line = []
+        for header in headers:
+            value = row.get(header)
+            if value is None:
+                line.append("-")
+            elif header == "fill_rate":
+                line.append(f"{value:.1%}")
+            elif header == "avg_price":
+                line.append(f"{value:.8f}")
+            elif isinstance(value, float):
+                line.append(f"{value:.2f}" if header.startswith("latency") else f"{value:.4f}")
+            else:
+                line.append(str(value))
+        cells.append(line)
+    widths = [max(len(line[i]) for line in cells) for i in range(len(headers))]
+    return "\n".join(
+        "  ".join(cell.ljust(width) if i < len(group_by) else cell.rjust(width) for i, (cell, width) in enumerate(zip(line, widths)))
+        for line in cells
+    )
+
+
+def split_list(value):
+    return [item.strip() for item in str(value).split(",") if item.strip()] if value else []
+
+
+def configured_journal_dir(argv=None):
+    """
+    journal_dir of the bot's config (--config-dir in argv), else the service's default.
+    """
+    default = os.path.join(os.getcwd(), "data", "journal")
+    try:
+        config = get_runtime(argv).config
+    except OSError:
+        return default
+    return config.get("journal_dir") or default
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="pydexbot journal", description=__doc__.splitlines()[1],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     epilog="\n".join(__doc__.splitlines()[9:]))
+    parser.add_argument("--config-dir", help="config directory of the bot, whose journal_dir is read (default ./config)")
+    parser.add_argument("--dir", help="journal directory (default journal_dir of the config)")
+    parser.add_argument("--since", help="UTC date or time, e.g. 2026-10-01 or 2026-10-01T12:00")
+    parser.add_argument("--until", help="UTC date (inclusive) or time (exclusive)")
+    parser.add_argument("--pair", help="comma-separated trade pairs")
+    parser.add_argument("--bot", help="comma-separated bots")
+    parser.add_argument("--side", help="sell, buy or both comma-separated")
+    parser.add_argument("--outcome", help=f"comma-separated: {', '.join(OUTCOMES)}")
+    parser.add_argument("--group-by", default="pair", help=f"comma-separated: {', '.join(GROUP_KEYS)}; empty for one total")
+    parser.add_argument("--json", action="store_true", help="print JSON rows instead of a table")
+    options = parser.parse_args(argv)
+
+    if load_numpy() is None:
+        sys.exit("journal queries need numpy: poetry install --extras numpy")
+    group_by = split_list(options.group_by)
+    try:
+        rows = query(
+            options.dir or configured_journal_dir(argv),
+            since=parse_time(options.since) if options.since else None,
+            until=parse_time(options.until, end=True) if options.until else None,
+            pairs=set(split_list(options.pair)),
+            bots=set(split_list(options.bot)),
+            sides=split_list(options.side),
+            outcomes=split_list(options.outcome),
+            group_by=group_by,
+        )
+    except ValueError as e:
+        sys.exit(str(e))
+    if options.json:
+        print(json.dumps(rows, indent=2))
+    elif rows:
+        print(format_table(rows, group_by))
+    else:
+        print("no matching attempts")
+
+
+if __name__ == "__main__":
+    main()
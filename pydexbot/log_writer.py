@@ -0,0 +1,201 @@
+"""
+Queue-backed log writer: one thread owns all log files, batches writes and rotates them
+"""
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+
+from pydexbot.metrics import METRICS
+
+_STOP = object()
+_FLUSH = object()
+
+
+class _LogFile:
+    def __init__(self, path):
+        self.path = path
+        self.handle = None
+        self.size = 0
+        self.day = None
+        self.lines = []
+
+
+class LogWriter:
+    """
+    Write log lines from any thread without touching the file system on the caller.
+
+    Callers enqueue (level, msg, args, log_file); the message is only formatted
+    (msg % args) on the writer thread. Files stay open, and buffered lines are written
+    once flush_bytes are pending or flush_interval_seconds have passed. Files are
+    rotated when they exceed max_bytes (0 disables) or, with rotate_daily, when the
+    day changes. Lines without log_file go to stdout.
+    """
+
+    def __init__(self, flush_bytes=64 * 1024, flush_interval_seconds=1.0, max_bytes=0,
+                 rotate_daily=False, json_lines=False, tz=None):
+        self._flush_bytes = max(0, int(flush_bytes or 0))
+        self._flush_interval_seconds = max(0.01, float(flush_interval_seconds or 1.0))
+        self._max_bytes = max(0, int(max_bytes or 0))
+        self._rotate_daily = bool(rotate_daily)
+        self._json_lines = bool(json_lines)
+        self._tz = tz
+        self._queue = queue.SimpleQueue()
+        self._files = {}
+        self._pending_bytes = 0
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._error_reported = False
+
+    def write(self, level, msg, args=(), log_file=None):
+        if self._thread is None:
+            self.start()
+        self._queue.put((time.time(), level, msg, args, log_file))
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self._thread.start()
+
+    def flush(self, timeout=5.0):
+        """
+        Block until everything enqueued so far has been written.
+        """
+        if self._thread is None:
+            return
+        done = threading.Event()
+        self._queue.put((_FLUSH, done))
+        done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _run(self):
+        next_flush = time.monotonic() + self._flush_interval_seconds
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, next_flush - time.monotonic()))
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                self._flush_all()
+                self._close_all()
+                return
+            if isinstance(item, tuple) and item[0] is _FLUSH:
+                self._flush_all()
+                item[1].set()
+                next_flush = time.monotonic() + self._flush_interval_seconds
+                continue
+            if item is not None:
+                self._append(*item)
+            if self._pending_bytes >= self._flush_bytes or time.monotonic() >= next_flush:
+                self._flush_all()
+                next_flush = time.monotonic() + self._flush_interval_seconds
+
+    def _format(self, created, level, msg, args, log_file):
+        if args:
+            try:
+                msg = msg % args
+            except Exception:
+                msg = f"{msg} {args!r}"
+        if self._json_lines:
+            record = {
+                "ts": datetime.fromtimestamp(created, self._tz).isoformat(timespec="milliseconds"),
+                "level": level,
+                "msg": str(msg),
+            }
+            return json.dumps(record, ensure_ascii=False) + "\n"
+        return f"[{level}] {msg}\n"
+
+    def _append(self, created, level, msg, args, log_file):
+        line = self._format(created, level, msg, args, log_file)
+        key = log_file or ""
+        log = self._files.get(key)
+        if log is None:
+            log = self._files[key] = _LogFile(log_file)
+        log.lines.append(line)
+        self._pending_bytes += len(line)
+
+    def _flush_all(self):
+        started = time.perf_counter()
+        for log in self._files.values():
+            if not log.lines:
+                continue
+            data = "".join(log.lines)
+            log.lines.clear()
+            try:
+                if log.path is None:
+                    sys.stdout.write(data)
+                    sys.stdout.flush()
+                    continue
+                # Open first: the size (and day) of a file left by an earlier run is only known once it is open
+                if log.handle is None:
+                    self._open(log)
+                if self._maybe_rotate(log, len(data)):
+                    self._open(log)
+                log.handle.write(data)
+                log.handle.flush()
+                log.size += len(data)
+            except Exception as e:
+                if not self._error_reported:
+                    self._error_reported = True
+                    sys.stderr.write(f"log writer failed for {log.path}: {e}\n")
+        if self._pending_bytes:
+            METRICS.observe("log_flush_seconds", time.perf_counter() - started)
+        self._pending_bytes = 0
+
+    def _today(self):
+        return datetime.now(self._tz).strftime("%Y-%m-%d")
+
+    def _day_of(self, timestamp):
+        return datetime.fromtimestamp(timestamp, self._tz).strftime("%Y-%m-%d")
+
+    def _open(self, log):
+        log_dir = os.path.dirname(log.path)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+        log.handle = open(log.path, "a")
+        log.size = log.handle.tell()
+        if log.day is None:
+            # A file written on an earlier day rotates on its first flush
+            log.day = self._day_of(os.path.getmtime(log.path)) if log.size else self._today()
+
+    def _maybe_rotate(self, log, incoming_bytes):
+        """
+        Move the open file aside when it is from an earlier day or incoming_bytes would
+        take it past max_bytes; True when it was, and the caller opens a new one.
+        A batch larger than max_bytes still goes to an empty file whole.
+        """
+        suffix = None
+        today = self._today() if self._rotate_daily else None
+        if self._rotate_daily and log.day is not None and today != log.day:
+            suffix = log.day
+        elif self._max_bytes and log.size and log.size + incoming_bytes > self._max_bytes:
+            suffix = datetime.now(self._tz).strftime("%Y-%m-%d-%H%M%S")
+        if suffix is None:
+            return False
+        if log.handle is not None:
+            log.handle.close()
+            log.handle = None
+        target = f"{log.path}.{suffix}"
+        index = 1
+        while os.path.exists(target):
+            target = f"{log.path}.{suffix}.{index}"
+            index += 1
+        if os.path.exists(log.path):
+            os.replace(log.path, target)
+        log.day = today
+        return True
+
+    def _close_all(self):
+        for log in self._files.values():
+            if log.handle is not None:
+                log.handle.close()
+                log.handle = None
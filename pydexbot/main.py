@@ -2,10 +2,17 @@
 """
 Entry point for pydexbot service
 """
-from pydexbot.bot_service import run_bot_service
+import sys
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "journal":
+        from pydexbot.journal import main as journal_main
+        return journal_main(sys.argv[2:])
+    if len(sys.argv) > 1 and sys.argv[1] == "inspect":
+        from pydexbot.inspector import main as inspect_main
+        return inspect_main(sys.argv[2:])
+    from pydexbot.bot_service import run_bot_service
     run_bot_service()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,176 @@
+"""
+Shared snapshot of market table rows for all configured pairs, refreshed with paged range reads
+"""
+import threading
+import time
+from types import MappingProxyType
+
+from pydexbot.metrics import METRICS
+from pydexbot.packing import encode_name
+
+
+class MarketSnapshot:
+    """
+    Rows of one refresh, read-only: (code, scope, table) -> {trade_pair: row or None}.
+
+    A pair present with None was inside the range read and has no row; pairs that
+    are absent were not covered (see MarketSnapshotService.row).
+    """
+
+    __slots__ = ("_tables", "_started_at")
+
+    def __init__(self, tables, started_at):
+        self._tables = MappingProxyType({key: MappingProxyType(rows) for key, rows in tables.items()})
+        self._started_at = started_at
+
+    @property
+    def started_at(self):
+        return self._started_at
+
+    def age(self):
+        return time.monotonic() - self._started_at
+
+    def lookup(self, code, scope, table, trade_pair):
+        """
+        Return (True, row) when the snapshot covers trade_pair, else (False, None).
+        """
+        rows = self._tables.get((code, scope, table))
+        if rows is None or trade_pair not in rows:
+            return False, None
+        return True, rows[trade_pair]
+
+    def rows(self, code, scope, table):
+        """
+        Read-only {trade_pair: row or None} of one table, or None when it was not read.
+        """
+        return self._tables.get((code, scope, table))
+
+
+class MarketSnapshotService:
+    """
+    Keep one MarketSnapshot of per-pair tables for all configured trade pairs.
+
+    tables maps (code, scope, table) to the row field holding the pair name, or a
+    tuple of fields tried in order. Each refresh reads every table as one key range
+    from the lowest to the highest pair in pages of page_limit rows, following
+    next_key, so RPCs grow with pages rather than pairs. At most max_pages pages are read per table; pairs beyond them are
+    left to point reads. The new snapshot replaces the old one in a single
+    assignment, so readers never see a half-built snapshot.
+
+    After our own trade a pair is marked dirty: snapshots started before the mark
+    do not serve it, and callers fall back to a point read until the next refresh.
+    """
+
+    def __init__(self, get_table_rows, trade_pairs, tables, refresh_seconds=1.0, page_limit=200, max_pages=10):
+        self._get_table_rows = get_table_rows
+        self._tables = dict(tables)
+        self._refresh_seconds = float(refresh_seconds or 0)
+        self._page_limit = max(1, int(page_limit or 1))
+        self._max_pages = max(1, int(max_pages or 1))
+        self._max_age = max(3 * self._refresh_seconds, 1.0)
+        self._keys = {}
+        for trade_pair in trade_pairs:
+            try:
+                self._keys[str(trade_pair)] = encode_name(str(trade_pair))
+            except ValueError:
+                # Not a valid name; point reads only
+                continue
+        self._snapshot = None
+        self._dirty = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def enabled(self):
+        return self._refresh_seconds > 0 and bool(self._keys)
+
+    def current(self):
+        return self._snapshot
+
+    def mark_dirty(self, trade_pair):
+        with self._lock:
+            self._dirty[trade_pair] = time.monotonic()
+
+    def row(self, code, scope, table, trade_pair, snapshot=None):
+        """
+        Return (True, row) from the given or current snapshot when it is fresh, covers
+        trade_pair and was started after the pair's last dirty mark; else (False, None).
+        """
+        snapshot = snapshot or self._snapshot
+        if snapshot is None or snapshot.age() > self._max_age:
+            return False, None
+        dirty_at = self._dirty.get(trade_pair)
+        if dirty_at is not None and dirty_at >= snapshot.started_at:
+            return False, None
+        return snapshot.lookup(code, scope, table, trade_pair)
+
+    def _read_table(self, code, scope, table, key_fields):
+        if isinstance(key_fields, str):
+            key_fields = (key_fields,)
+        ordered = sorted(self._keys.items(), key=lambda item: item[1])
+        lower, upper = ordered[0][0], ordered[-1][0]
+        rows = {}
+        covered_until = None
+        for _ in range(self._max_pages):
+            resp = self._get_table_rows(code, scope, table, lower, upper, self._page_limit) or {}
+            METRICS.inc("snapshot_pages", table=table)
+            page = resp.get("rows") or []
+            names = [next((row[field] for field in key_fields if field in row), None) for row in page]
+            for name, row in zip(names, page):
+                if name in self._keys:
+                    rows[name] = row
+            if not resp.get("more") or not resp.get("next_key"):
+                covered_until = self._keys[upper]
+                break
+            if names and names[-1]:
+                covered_until = encode_name(str(names[-1]))
+            lower = resp["next_key"]
+        if covered_until is None:
+            return rows
+        for trade_pair, key in self._keys.items():
+            if key <= covered_until:
+                rows.setdefault(trade_pair, None)
+        return rows
+
+    def read_table(self, code, scope, table):
+        """
+        {trade_pair: row or None} of one configured table, read as in a refresh.
+        """
+        if not self._keys:
+            return {}
+        return self._read_table(code, scope, table, self._tables[(code, scope, table)])
+
+    def refresh(self):
+        if not self._keys:
+            return None
+        started_at = time.monotonic()
+        tables = {
+            (code, scope, table): self._read_table(code, scope, table, key_fields)
+            for (code, scope, table), key_fields in self._tables.items()
+        }
+        snapshot = MarketSnapshot(tables, started_at)
+        self._snapshot = snapshot
+        with self._lock:
+            self._dirty = {pair: at for pair, at in self._dirty.items() if at >= started_at}
+        METRICS.observe("snapshot_refresh_seconds", time.monotonic() - started_at)
+        return snapshot
+
+    def start(self, on_error=None):
+        if not self.enabled:
+            return
+        def run():
+            while True:
+                try:
+                    self.refresh()
+                except Exception as e:
+                    # Readers fall back to point reads once the last snapshot is too old
+                    if on_error is not None:
+                        on_error(e)
+                if self._stop_event.wait(self._refresh_seconds):
+                    return
+        self._thread = threading.Thread(target=run, name="market-snapshot", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
@@ -0,0 +1,197 @@
+"""
+Always-on counters and latency histograms, exposed as Prometheus text and a periodic summary line
+"""
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PREFIX = "pydexbot_"
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self, size):
+        self.counts = [0] * (size + 1)
+        self.total = 0.0
+        self.count = 0
+
+
+def _label_key(labels):
+    # Values are kept as text, so keys of one metric always sort (status=503 next to status="transport")
+    return tuple(sorted((name, str(value)) for name, value in labels.items())) if labels else ()
+
+
+def _format_labels(key, extra=None):
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    text = ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in items
+    )
+    return "{" + text + "}"
+
+
+class Metrics:
+    """
+    Thread-safe registry of counters and fixed-bucket histograms keyed by name and labels.
+
+    Recording is a dict update under one lock (about a microsecond), so it stays on
+    in production. lap() times consecutive stages: it records the time since
+    `started` and returns the new start.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self._buckets = tuple(buckets)
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _label_key(labels))
+        index = bisect.bisect_left(self._buckets, seconds)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(len(self._buckets))
+            histogram.counts[index] += 1
+            histogram.total += seconds
+            histogram.count += 1
+
+    def lap(self, name, started, **labels):
+        now = time.perf_counter()
+        self.observe(name, now - started, **labels)
+        return now
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {
+                key: (list(histogram.counts), histogram.total, histogram.count)
+                for key, histogram in self._histograms.items()
+            }
+        return counters, histograms
+
+    def render(self):
+        """
+        Prometheus text exposition format.
+        """
+        counters, histograms = self.snapshot()
+        lines = []
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f"# TYPE {PREFIX}{name}_total counter")
+            for (metric, key), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{PREFIX}{name}_total{_format_labels(key)} {value}")
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f"# TYPE {PREFIX}{name} histogram")
+            for (metric, key), (counts, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(self._buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{PREFIX}{name}_bucket{_format_labels(key, ('le', le))} {cumulative}")
+                lines.append(f"{PREFIX}{name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{PREFIX}{name}_count{_format_labels(key)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def quantile(self, counts, count, ratio):
+        """
+        Upper bucket bound containing the ratio-quantile (inf if beyond the last bucket).
+        """
+        target = count * ratio
+        cumulative = 0
+        for bound, bucket_count in zip(self._buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return bound
+        return float("inf")
+
+    def summary(self, counter="rounds", histogram="round_stage_seconds", group_by="stage", previous=None):
+        """
+        One line with counter totals by their first label value other than pair, and
+        per-group mean and p95 bound of a histogram, merged across the other labels.
+        Returns (line, snapshot); pass the snapshot back as previous to summarize
+        only what happened since.
+        """
+        counters, histograms = self.snapshot()
+        old_counters, old_histograms = previous or ({}, {})
+        totals = {}
+        for (name, key), value in counters.items():
+            if name != counter:
+                continue
+            label = next((str(v) for k, v in key if k != "pair"), name)
+            totals[label] = totals.get(label, 0) + value - old_counters.get((name, key), 0)
+        groups = {}
+        for (name, key), (counts, total, count) in histograms.items():
+            if name != histogram:
+                continue
+            old_counts, old_total, old_count = old_histograms.get((name, key), ([0] * len(counts), 0.0, 0))
+            group = dict(key).get(group_by, name)
+            merged = groups.setdefault(group, [[0] * len(counts), 0.0, 0])
+            merged[0] = [a + b - c for a, b, c in zip(merged[0], counts, old_counts)]
+            merged[1] += total - old_total
+            merged[2] += count - old_count
+        parts = [" ".join(f"{label}={value}" for label, value in sorted(totals.items()) if value)]
+        for group, (counts, total, count) in sorted(groups.items()):
+            if count:
+                p95 = self.quantile(counts, count, 0.95)
+                p95_text = f"{p95 * 1000:g}ms" if p95 != float("inf") else f">{self._buckets[-1]:g}s"
+                parts.append(f"{group} avg={total / count * 1000:.1f}ms p95<={p95_text}")
+        return "metrics: " + " | ".join(part for part in parts if part), (counters, histograms)
+
+
+METRICS = Metrics()
+
+
+def serve_metrics(metrics, port, host="127.0.0.1"):
+    """
+    Serve metrics.render() on http://host:port/metrics from a daemon thread.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            data = metrics.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, int(port)), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def start_summary(metrics, interval_seconds, emit, stop_event):
+    """
+    Call emit(line) every interval_seconds with the activity since the last line.
+    """
+    if interval_seconds <= 0:
+        return None
+
+    def run():
+        previous = metrics.snapshot()
+        while not stop_event.wait(interval_seconds):
+            line, previous = metrics.summary(previous=previous)
+            emit(line)
+    thread = threading.Thread(target=run, name="metrics-summary", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,448 @@
+"""
+Pool of chain API nodes with health checks and latency-aware routing
+"""
+import errno
+import http.client
+import json
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlsplit
+
+from pydexbot.metrics import METRICS
+from pydexbot.rpc_governor import BACKGROUND, MARKET, PUSH, RpcShed, table_priority
+
+try:
+    # Optional: several times faster on large transaction traces
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+
+class RpcError(Exception):
+    """
+    The node answered, but with an HTTP error status.
+    """
+
+    def __init__(self, url, status, body):
+        super().__init__(f"{url} HTTP {status}: {body[:512]}")
+        self.url = url
+        self.status = status
+        self.body = body
+
+
+def is_transport_error(exc):
+    """
+    True when exc means the node could not be reached or did not answer in time,
+    as opposed to the chain rejecting the request.
+    """
+    if isinstance(exc, (OSError, http.client.HTTPException)):
+        return True
+    name = type(exc).__name__
+    return "Timeout" in name or "Connect" in name
+
+
+CONNECT_ERRNOS = {errno.ECONNREFUSED, errno.EHOSTUNREACH, errno.ENETUNREACH}
+CONNECT_ERROR_NAMES = {"ConnectTimeout", "ConnectTimeoutError", "NewConnectionError", "NameResolutionError"}
+
+
+def is_connect_error(exc):
+    """
+    True when exc shows the request never reached the node: the connection was
+    refused, the address did not resolve or route, or connecting timed out. Sending
+    it to another node then cannot apply it twice. A read timeout or a reset is not
+    one of these: the node may already have the transaction.
+    """
+    seen = set()
+    # HTTP clients wrap the socket error (requests -> urllib3 -> OSError, urllib -> URLError.reason)
+    while isinstance(exc, BaseException) and id(exc) not in seen:
+        seen.add(id(exc))
+        if isinstance(exc, (ConnectionRefusedError, socket.gaierror)):
+            return True
+        if isinstance(exc, OSError) and exc.errno in CONNECT_ERRNOS:
+            return True
+        if type(exc).__name__ in CONNECT_ERROR_NAMES:
+            return True
+        reason = getattr(exc, "reason", None)
+        exc = reason if isinstance(reason, BaseException) else exc.__cause__ or exc.__context__
+    return False
+
+
+def raise_last_error(last_error, path):
+    """
+    Raise the error of the last node tried; when no node was tried at all (every
+    one shed, or none left), a ConnectionError saying so.
+    """
+    if last_error is None:
+        raise ConnectionError(f"{path}: no node left to send the request to")
+    raise last_error
+
+
+class NodeState:
+    def __init__(self, url, ewma_alpha):
+        self.url = url
+        self.healthy = True
+        self.ewma_ms = None
+        self.head_block_num = 0
+        self.consecutive_failures = 0
+        self._alpha = ewma_alpha
+        self._samples = deque(maxlen=256)
+        self._p95_ms = None
+        self._samples_since_p95 = 0
+
+    def record(self, latency_ms):
+        if self.ewma_ms is None:
+            self.ewma_ms = latency_ms
+        else:
+            # Clip single outliers so one slow answer does not demote an otherwise fast node;
+            # sustained slowness still raises the score quickly.
+            clipped = min(latency_ms, self.ewma_ms * 4)
+            self.ewma_ms = self._alpha * clipped + (1 - self._alpha) * self.ewma_ms
+        self._samples.append(latency_ms)
+        self._samples_since_p95 += 1
+        self.consecutive_failures = 0
+
+    def p95_ms(self):
+        if len(self._samples) < 20:
+            return None
+        if self._p95_ms is None or self._samples_since_p95 >= 16:
+            ordered = sorted(self._samples)
+            self._p95_ms = ordered[int(len(ordered) * 0.95) - 1]
+            self._samples_since_p95 = 0
+        return self._p95_ms
+
+    def score(self):
+        return float("inf") if self.ewma_ms is None else self.ewma_ms
+
+
+class NodePool:
+    """
+    Route reads to the fastest healthy node and fail over between nodes.
+
+    Latency is tracked per node as an exponential moving average of every request.
+    Reads that run longer than the primary node's p95 latency get a hedged copy
+    sent to the next best node; the first successful answer wins. With a governor
+    (RpcGovernor), every request first takes a token of its node's budget at its
+    priority; hedged copies only go out when a token is free at once.
+    """
+
+    def __init__(self, urls, timeout_seconds=10.0, hedge_enabled=True, hedge_min_delay_ms=50,
+                 health_interval_seconds=10.0, max_head_lag_blocks=10, ewma_alpha=0.2, max_workers=16,
+                 governor=None):
+        if isinstance(urls, str):
+            urls = [urls]
+        urls = [str(url).rstrip("/") for url in urls if url]
+        if not urls:
+            raise ValueError("at least one node url is required")
+        self.urls = urls
+        self._nodes = {url: NodeState(url, ewma_alpha) for url in urls}
+        self._timeout_seconds = float(timeout_seconds or 10.0)
+        self._hedge_enabled = bool(hedge_enabled) and len(urls) > 1
+        self._hedge_min_delay = max(float(hedge_min_delay_ms or 0), 0) / 1000.0
+        self._health_interval_seconds = float(health_interval_seconds or 0)
+        self._max_head_lag_blocks = int(max_head_lag_blocks or 0)
+        self._executor = ThreadPoolExecutor(max_workers=max(2, int(max_workers or 2)), thread_name_prefix="rpc")
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._push_changed = threading.Condition()
+        self._push_url = None
+        self._push_active = 0
+        self._push_moves = 0
+        self._stop_event = threading.Event()
+        self._health_thread = None
+        self.governor = governor
+
+    def ranked(self):
+        """
+        Node urls ordered by preference: healthy nodes by latency score, then unhealthy ones.
+        """
+        nodes = sorted(self._nodes.values(), key=lambda node: (not node.healthy, node.score()))
+        return [node.url for node in nodes]
+
+    def best(self):
+        return self.ranked()[0]
+
+    def stats(self):
+        with self._lock:
+            return {
+                node.url: {"healthy": node.healthy, "ewma_ms": node.ewma_ms, "p95_ms": node.p95_ms(), "head_block_num": node.head_block_num}
+                for node in self._nodes.values()
+            }
+
+    def record_success(self, url, latency_ms):
+        node = self._nodes.get(url)
+        if node is not None:
+            with self._lock:
+                node.record(latency_ms)
+                node.healthy = True
+
+    def record_failure(self, url):
+        node = self._nodes.get(url)
+        if node is not None:
+            with self._lock:
+                node.consecutive_failures += 1
+                node.healthy = False
+
+    def _connection(self, url):
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = {}
+        conn = connections.get(url)
+        if conn is None:
+            parts = urlsplit(url)
+            conn_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+            conn = conn_class(parts.netloc, timeout=self._timeout_seconds)
+            connections[url] = conn
+        return conn
+
+    def _drop_connection(self, url):
+        connections = getattr(self._local, "connections", {})
+        conn = connections.pop(url, None)
+        if conn is not None:
+            conn.close()
+
+    def admit(self, url, priority=MARKET, wait=True):
+        """
+        Take a token of url's budget: wait for it at priority, or with wait False
+        be shed unless one is free. Without a governor every request is admitted.
+        """
+        if self.governor is not None:
+            if wait:
+                self.governor.acquire(url, priority)
+            else:
+                self.governor.try_acquire(url, priority)
+
+    def request(self, url, path, payload, priority=MARKET, wait=True):
+        """
+        POST payload as JSON to one node over a per-thread keep-alive connection,
+        once admitted by the governor.
+        """
+        self.admit(url, priority, wait)
+        return self._send(url, path, payload)
+
+    def _send(self, url, path, payload):
+        body = json.dumps(payload, separators=(",", ":")).encode()
+        base_path = urlsplit(url).path
+        started = time.monotonic()
+        try:
+            conn = self._connection(url)
+            try:
+                conn.request("POST", base_path + path, body, {"Content-Type": "application/json"})
+                resp = conn.getresponse()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                # Stale keep-alive connection; reconnect once
+                self._drop_connection(url)
+                conn = self._connection(url)
+                conn.request("POST", base_path + path, body, {"Content-Type": "application/json"})
+                resp = conn.getresponse()
+            data = resp.read()
+        except Exception:
+            self._drop_connection(url)
+            self.record_failure(url)
+            if self.governor is not None:
+                self.governor.backoff(url)
+            METRICS.inc("rpc_errors", node=url, endpoint=path.rsplit("/", 1)[-1], status="transport")
+            raise
+        elapsed = time.monotonic() - started
+        METRICS.observe("rpc_seconds", elapsed, node=url, endpoint=path.rsplit("/", 1)[-1], table=payload.get("table", ""))
+        if resp.status >= 400:
+            METRICS.inc("rpc_errors", node=url, endpoint=path.rsplit("/", 1)[-1], status=str(resp.status))
+            # nodeos reports chain errors as 500; rate limits and gateway errors are node trouble
+            if resp.status == 429 or resp.status > 500:
+                self.record_failure(url)
+                if self.governor is not None:
+                    self.governor.backoff(url, throttled=resp.status == 429)
+            else:
+                self.record_success(url, elapsed * 1000.0)
+            raise RpcError(url, resp.status, data.decode(errors="replace"))
+        self.record_success(url, elapsed * 1000.0)
+        return json_loads(data) if data else None
+
+    def hedge_delay(self, url):
+        node = self._nodes[url]
+        with self._lock:
+            p95 = node.p95_ms()
+        if p95 is None:
+            p95 = (node.ewma_ms or 0) * 2
+        return max(self._hedge_min_delay, p95 / 1000.0)
+
+    def read(self, path, payload, hedge=True, priority=MARKET):
+        """
+        Read from the best node. Slow reads are hedged to the next node, and
+        failed reads move on to the remaining nodes in ranked order.
+        """
+        candidates = self.ranked()
+        if not (hedge and self._hedge_enabled):
+            return self._read_in_order(candidates, path, payload, priority)
+
+        # Admitted on the calling thread, where the governor knows the round
+        try:
+            self.admit(candidates[0], priority)
+        except RpcShed:
+            if len(candidates) == 1:
+                raise
+            return self._read_in_order(candidates[1:], path, payload, priority)
+        primary = self._executor.submit(self._send, candidates[0], path, payload)
+        done, _ = wait([primary], timeout=self.hedge_delay(candidates[0]))
+        if done and primary.exception() is None:
+            return primary.result()
+        in_flight = {primary: candidates[0]} if not done else {}
+        remaining = candidates[1:]
+        last_error = primary.exception() if done else None
+        while in_flight or remaining:
+            if remaining and len(in_flight) < 2:
+                url = remaining.pop(0)
+                # A hedge next to a running request only goes out if its node has a token to spare
+                try:
+                    self.admit(url, priority, not in_flight)
+                except RpcShed as e:
+                    last_error = e
+                    continue
+                in_flight[self._executor.submit(self._send, url, path, payload)] = url
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                in_flight.pop(future)
+                if future.exception() is None:
+                    return future.result()
+                last_error = future.exception()
+        raise_last_error(last_error, path)
+
+    def _read_in_order(self, candidates, path, payload, priority=MARKET):
+        last_error = None
+        for url in candidates:
+            try:
+                return self.request(url, path, payload, priority)
+            except Exception as e:
+                last_error = e
+        raise_last_error(last_error, path)
+
+    def get_table_rows(self, code, scope, table, lower_bound, upper_bound, limit, priority=None):
+        payload = {
+            "json": True,
+            "code": code,
+            "scope": scope,
+            "table": table,
+            "lower_bound": lower_bound,
+            "upper_bound": upper_bound,
+            "limit": limit,
+        }
+        return self.read("/v1/chain/get_table_rows", payload, priority=table_priority(table) if priority is None else priority)
+
+    def push(self, submit, set_node):
+        """
+        Run submit() against the best node. set_node(url) points the signing client
+        at a node before submitting. submit() signs a new transaction on every call,
+        so it only moves on to the next node when the connection was never made
+        (is_connect_error); any other error, a read timeout included, is raised
+        without retrying, as the first transaction may still execute.
+        """
+        last_error = None
+        for url in self.ranked():
+            if self.governor is not None:
+                self.governor.acquire(url, PUSH)
+            self._begin_push(url, set_node)
+            started = time.monotonic()
+            try:
+                result = submit()
+            except Exception as e:
+                if is_transport_error(e):
+                    self.record_failure(url)
+                    if self.governor is not None:
+                        self.governor.backoff(url)
+                    METRICS.inc("rpc_errors", node=url, endpoint="push_action", status="transport")
+                if not is_connect_error(e):
+                    raise
+                last_error = e
+                continue
+            finally:
+                self._end_push()
+            elapsed = time.monotonic() - started
+            METRICS.observe("rpc_seconds", elapsed, node=url, endpoint="push_action", table="")
+            self.record_success(url, elapsed * 1000.0)
+            return result
+        raise_last_error(last_error, "push_action")
+
+    def _begin_push(self, url, set_node):
+        """
+        Point the signing client at url for one push. Its node is process-wide, so it
+        only moves once the pushes running against the old node are done, and pushes
+        to the current node wait while a move is pending so the move is not starved.
+        """
+        moving = False
+        with self._push_changed:
+            try:
+                while True:
+                    if self._push_url == url and (moving or not self._push_moves):
+                        break
+                    if self._push_url != url and not self._push_active:
+                        set_node(url)
+                        self._push_url = url
+                        break
+                    if self._push_url != url and not moving:
+                        moving = True
+                        self._push_moves += 1
+                    self._push_changed.wait()
+            finally:
+                if moving:
+                    self._push_moves -= 1
+                    self._push_changed.notify_all()
+            self._push_active += 1
+
+    def _end_push(self):
+        with self._push_changed:
+            self._push_active -= 1
+            if not self._push_active:
+                self._push_changed.notify_all()
+
+    def write(self, path, payload):
+        """
+        POST a write (e.g. a signed transaction) to the best node without hedging,
+        failing over only when the node could not be reached or was overloaded.
+        Every node gets the same signed transaction, which the chain applies once.
+        """
+        last_error = None
+        for url in self.ranked():
+            try:
+                return self.request(url, path, payload, PUSH)
+            except RpcError as e:
+                if e.status != 429 and e.status <= 500:
+                    raise
+                last_error = e
+            except Exception as e:
+                if not is_transport_error(e):
+                    raise
+                last_error = e
+        raise_last_error(last_error, path)
+
+    def check_health(self):
+        heads = {}
+        for url in self.urls:
+            try:
+                chain_info = self.request(url, "/v1/chain/get_info", {}, BACKGROUND, wait=False)
+                heads[url] = int((chain_info or {}).get("head_block_num") or 0)
+            except Exception:
+                continue
+        if not heads:
+            return
+        best_head = max(heads.values())
+        with self._lock:
+            for url, head in heads.items():
+                node = self._nodes[url]
+                node.head_block_num = head
+                if self._max_head_lag_blocks > 0 and best_head - head > self._max_head_lag_blocks:
+                    node.healthy = False
+
+    def start_health_checks(self):
+        if self._health_interval_seconds <= 0 or self._health_thread is not None:
+            return
+        def run():
+            while not self._stop_event.is_set():
+                self.check_health()
+                self._stop_event.wait(self._health_interval_seconds)
+        self._health_thread = threading.Thread(target=run, name="node-health", daemon=True)
+        self._health_thread.start()
+
+    def stop(self):
+        self._stop_event.set()
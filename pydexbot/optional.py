@@ -0,0 +1,21 @@
+"""
+Optional dependencies, imported on first use
+"""
+np = None
+_numpy_checked = False
+
+
+def load_numpy():
+    """
+    NumPy, imported on first use (the service only needs it for journal queries and
+    the backtest); None when it is not installed.
+    """
+    global np, _numpy_checked
+    if not _numpy_checked:
+        _numpy_checked = True
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        np = numpy
+    return np
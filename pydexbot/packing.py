@@ -0,0 +1,320 @@
+"""
+ABI cache, compiled action serializers and pre-packed action templates
+"""
+import json
+import os
+import struct
+import threading
+from functools import lru_cache
+
+NAME_CHARS = ".12345abcdefghijklmnopqrstuvwxyz"
+
+
+@lru_cache(maxsize=65536)
+def encode_name(name):
+    """
+    Convert an account/action name to its uint64 value.
+    """
+    if len(name) > 13:
+        raise ValueError(f"invalid name: {name!r}")
+    value = 0
+    for i in range(13):
+        c = 0
+        if i < len(name):
+            c = NAME_CHARS.find(name[i])
+            if c < 0:
+                raise ValueError(f"invalid name: {name!r}")
+        if i < 12:
+            value |= (c & 0x1f) << (64 - 5 * (i + 1))
+        else:
+            if c > 0x0f:
+                raise ValueError(f"invalid name: {name!r}")
+            value |= c
+    return value
+
+
+def decode_name(value):
+    chars = []
+    tmp = value
+    for i in range(13):
+        c = NAME_CHARS[tmp & (0x0f if i == 0 else 0x1f)]
+        chars.append(c)
+        tmp >>= 4 if i == 0 else 5
+    return "".join(reversed(chars)).rstrip(".")
+
+
+def pack_varuint32(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+@lru_cache(maxsize=65536)
+def pack_name(value):
+    return encode_name(value).to_bytes(8, "little")
+
+
+def pack_string(value):
+    data = str(value).encode()
+    return pack_varuint32(len(data)) + data
+
+
+def _pack_int(fmt):
+    packer = struct.Struct(fmt).pack
+    return lambda value: packer(int(value))
+
+
+ENCODERS = {
+    "name": pack_name,
+    "string": pack_string,
+    "bool": lambda value: b"\x01" if value else b"\x00",
+    "uint8": _pack_int("<B"),
+    "int8": _pack_int("<b"),
+    "uint16": _pack_int("<H"),
+    "int16": _pack_int("<h"),
+    "uint32": _pack_int("<I"),
+    "int32": _pack_int("<i"),
+    "uint64": _pack_int("<Q"),
+    "int64": _pack_int("<q"),
+    "varuint32": lambda value: pack_varuint32(int(value)),
+}
+
+
+def resolve_type(abi, type_name):
+    aliases = {item["new_type_name"]: item["type"] for item in abi.get("types", [])}
+    seen = set()
+    while type_name in aliases and type_name not in seen:
+        seen.add(type_name)
+        type_name = aliases[type_name]
+    return type_name
+
+
+def struct_fields(abi, struct_name):
+    """
+    Return [(field_name, type_name)] of a struct including its base structs.
+    """
+    structs = {item["name"]: item for item in abi.get("structs", [])}
+    struct_name = resolve_type(abi, struct_name)
+    if struct_name not in structs:
+        raise ValueError(f"struct {struct_name} not found in abi")
+    item = structs[struct_name]
+    fields = struct_fields(abi, item["base"]) if item.get("base") else []
+    return fields + [(field["name"], resolve_type(abi, field["type"])) for field in item.get("fields", [])]
+
+
+def action_type(abi, action_name):
+    for item in abi.get("actions", []):
+        if item["name"] == action_name:
+            return item["type"]
+    raise ValueError(f"action {action_name} not found in abi")
+
+
+def compile_action(abi, action_name):
+    """
+    Compile an action's data struct into [(field_name, encoder)].
+    Raises ValueError for field types without a native encoder.
+    """
+    compiled = []
+    for field_name, type_name in struct_fields(abi, action_type(abi, action_name)):
+        encoder = ENCODERS.get(type_name)
+        if encoder is None:
+            raise ValueError(f"unsupported field type {type_name} in {action_name}.{field_name}")
+        compiled.append((field_name, encoder))
+    return compiled
+
+
+class ActionTemplate:
+    """
+    Action data with the fixed fields packed once. pack() only encodes the
+    remaining fields (e.g. bot and memo) and joins the pre-packed segments.
+    """
+
+    def __init__(self, compiled, fixed_args):
+        segments = []
+        for field_name, encoder in compiled:
+            if field_name in fixed_args:
+                packed = encoder(fixed_args[field_name])
+                if segments and isinstance(segments[-1], bytes):
+                    segments[-1] += packed
+                else:
+                    segments.append(packed)
+            else:
+                segments.append((field_name, encoder))
+        self._segments = segments
+
+    def pack(self, args):
+        return b"".join(
+            segment if isinstance(segment, bytes) else segment[1](args[segment[0]])
+            for segment in self._segments
+        )
+
+
+class AbiCache:
+    """
+    Keep contract ABIs in memory and on disk for warm restarts.
+
+    A persisted ABI is reused as long as the contract's code hash still matches;
+    if the hash cannot be checked the persisted copy is trusted. Loaded ABIs are
+    also registered with the chain client through set_abi when given.
+    load_persisted() takes the persisted copy without the code hash round trip, for
+    a warm start, and verify() checks it later.
+    """
+
+    def __init__(self, cache_dir, get_abi, get_code_hash=None, set_abi=None):
+        self._cache_dir = cache_dir
+        self._get_abi = get_abi
+        self._get_code_hash = get_code_hash
+        self._set_abi = set_abi
+        self._abis = {}
+        self._lock = threading.Lock()
+
+    def _path(self, account):
+        return os.path.join(self._cache_dir, f"{account}.abi.json")
+
+    def _code_hash(self, account):
+        if self._get_code_hash is None:
+            return None
+        try:
+            return self._get_code_hash(account)
+        except Exception:
+            return None
+
+    def _load_disk(self, account):
+        try:
+            with open(self._path(account)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_disk(self, account, code_hash, abi):
+        if not self._cache_dir:
+            return
+        os.makedirs(self._cache_dir, exist_ok=True)
+        tmp_path = self._path(account) + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"account": account, "code_hash": code_hash, "abi": abi}, f)
+        os.replace(tmp_path, self._path(account))
+
+    def _use(self, account, abi):
+        if self._set_abi is not None:
+            self._set_abi(account, json.dumps(abi))
+        self._abis[account] = abi
+
+    def load_persisted(self, account):
+        """
+        Use the persisted ABI of account without checking its code hash; False if there is none.
+        """
+        entry = self._load_disk(account) if self._cache_dir else None
+        if not entry:
+            return False
+        with self._lock:
+            if account not in self._abis:
+                self._use(account, entry["abi"])
+        return True
+
+    def verify(self, account):
+        """
+        Check the ABI in use against the contract's code hash and reload it if the
+        contract changed; returns True when it was reloaded.
+        """
+        code_hash = self._code_hash(account)
+        entry = self._load_disk(account) if self._cache_dir else None
+        if code_hash is None or (entry and entry.get("code_hash") == code_hash):
+            return False
+        resp = self._get_abi(account)
+        abi = resp.get("abi", resp) if isinstance(resp, dict) else json.loads(resp)
+        self._save_disk(account, code_hash, abi)
+        with self._lock:
+            changed = self._abis.get(account) != abi
+            self._use(account, abi)
+        return changed
+
+    def get(self, account):
+        with self._lock:
+            abi = self._abis.get(account)
+            if abi is not None:
+                return abi
+            code_hash = self._code_hash(account)
+            entry = self._load_disk(account) if self._cache_dir else None
+            if entry and (code_hash is None or entry.get("code_hash") == code_hash):
+                abi = entry["abi"]
+            else:
+                resp = self._get_abi(account)
+                abi = resp.get("abi", resp) if isinstance(resp, dict) else json.loads(resp)
+                self._save_disk(account, code_hash, abi)
+            self._use(account, abi)
+            return abi
+
+
+class ActionPacker:
+    """
+    Pack action data through per (contract, action, fixed fields) templates.
+
+    Each template is checked once against the chain client's pack_args; if the
+    bytes differ, or the ABI has types without a native encoder, that action
+    falls back to pack_args for every call.
+    """
+
+    def __init__(self, abi_cache, pack_args, fixed_fields=("trade_pair_name",)):
+        self._abi_cache = abi_cache
+        self._pack_args = pack_args
+        self._fixed_fields = tuple(fixed_fields)
+        self._compiled_actions = {}
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """
+        Forget compiled actions and templates, after an ABI was reloaded.
+        """
+        with self._lock:
+            self._compiled_actions = {}
+            self._templates = {}
+
+    def warm(self, contract, action_names):
+        for action_name in action_names:
+            self._compiled(contract, action_name)
+
+    def _compiled(self, contract, action_name):
+        key = (contract, action_name)
+        compiled = self._compiled_actions.get(key)
+        if compiled is None:
+            try:
+                compiled = compile_action(self._abi_cache.get(contract), action_name)
+            except ValueError:
+                compiled = False
+            self._compiled_actions[key] = compiled
+        return compiled
+
+    def template(self, contract, action_name, args):
+        fixed_args = {field: args[field] for field in self._fixed_fields if field in args}
+        key = (contract, action_name, tuple(sorted(fixed_args.items())))
+        template = self._templates.get(key)
+        if template is not None:
+            return template
+        with self._lock:
+            template = self._templates.get(key)
+            if template is not None:
+                return template
+            compiled = self._compiled(contract, action_name)
+            template = ActionTemplate(compiled, fixed_args) if compiled else False
+            if template and template.pack(args) != bytes(self._pack_args(contract, action_name, args)):
+                template = False
+            self._templates[key] = template
+            return template
+
+    def pack(self, contract, action_name, args):
+        try:
+            template = self.template(contract, action_name, args)
+        except Exception:
+            # ABI not reachable right now; pack_args reports real errors, the template is retried next call
+            template = None
+        if template:
+            return template.pack(args)
+        return self._pack_args(contract, action_name, args)
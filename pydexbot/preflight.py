@@ -0,0 +1,114 @@
+"""
+Local pre-flight simulation of a trade's swap, before it is signed and pushed
+"""
+from decimal import Decimal, ROUND_DOWN
+
+from pydexbot.assets import cached_asset
+
+FILL = "fill"
+UNCERTAIN = "uncertain"
+NO_FILL = "no_fill"
+VERDICTS = (FILL, UNCERTAIN, NO_FILL)
+
+
+def quantize_down(amount, precision):
+    return amount.quantize(Decimal(1).scaleb(-precision), rounding=ROUND_DOWN)
+
+
+def swap_output(amount_in, reserve_in, reserve_out, fee_ratio, in_precision, out_precision):
+    """
+    Constant-product output of a swap as the DEX computes it: the fee is taken from
+    the input, and fee and output are rounded down to whole units. Returns (output, fee).
+    """
+    fee = quantize_down(amount_in * fee_ratio, in_precision)
+    net_in = amount_in - fee
+    if net_in <= 0:
+        return Decimal(0), fee
+    return quantize_down(net_in * reserve_out / (reserve_in + net_in), out_precision), fee
+
+
+def slippage_ratio(amount_in, fee, amount_out, reserve_in, reserve_out):
+    """
+    How far amount_out falls short of the input after fee at the pool price before the swap.
+    """
+    expected = (amount_in - fee) * reserve_out / reserve_in
+    return 1 - amount_out / expected if expected > 0 else Decimal(1)
+
+
+def worst(*verdicts):
+    return max(verdicts, key=VERDICTS.index)
+
+
+class SwapPreflight:
+    """
+    The swaps one trade can make and whether they fill.
+
+    The contract picks the input between min_input (min_trade_amount, converted at
+    the pool price for buys) and max_input = min_input * input_scale_max, so every
+    check is decided at both ends: a check that passes at its worst end always
+    passes (FILL), one that fails at its best end always fails (NO_FILL), anything
+    else is UNCERTAIN. The output must be above zero (worst at the smallest input)
+    and its slippage within max_slippage_ratio (worst at the largest); 0 disables
+    the slippage check. verdict(funds) adds the bot's funds, which must cover the
+    input.
+
+    fee_ratio and input_scale_max are the configured defaults: a markets row with
+    fee_ratio and a trademarkets row with max_trade_amount take precedence.
+    """
+
+    __slots__ = ("side", "reserves", "precisions", "fee_ratio", "min_input", "max_input",
+                 "pool_verdict", "reason", "expected_output")
+
+    def __init__(self, side, market_config, swap_market, fee_ratio, input_scale_max, max_slippage_ratio):
+        left = cached_asset(swap_market["left_pool_quant"]["quantity"])
+        right = cached_asset(swap_market["right_pool_quant"]["quantity"])
+        min_left = cached_asset(market_config["min_trade_amount"])
+        if swap_market.get("fee_ratio") is not None:
+            fee_ratio = Decimal(str(swap_market["fee_ratio"]))
+        if market_config.get("max_trade_amount") and min_left.amount > 0:
+            input_scale_max = cached_asset(market_config["max_trade_amount"]).decimal / min_left.decimal
+        self.side = side
+        self.fee_ratio = fee_ratio
+        if side == "left":
+            self.reserves = (left.decimal, right.decimal)
+            self.precisions = (left.precision, right.precision)
+            base_input = min_left.decimal
+        else:
+            self.reserves = (right.decimal, left.decimal)
+            self.precisions = (right.precision, left.precision)
+            base_input = min_left.decimal * (right.decimal / left.decimal)
+        self.min_input = quantize_down(base_input, self.precisions[0])
+        self.max_input = quantize_down(base_input * input_scale_max, self.precisions[0])
+
+        smallest, _ = self.output(self.min_input)
+        largest, largest_fee = self.output(self.max_input)
+        checks = [(FILL if smallest > 0 else NO_FILL if largest <= 0 else UNCERTAIN, "output is zero")]
+        if max_slippage_ratio > 0 and largest > 0:
+            smallest_fee = quantize_down(self.min_input * fee_ratio, self.precisions[0])
+            best = slippage_ratio(self.min_input, smallest_fee, smallest, *self.reserves) if smallest > 0 else Decimal(1)
+            most = slippage_ratio(self.max_input, largest_fee, largest, *self.reserves)
+            checks.append((FILL if most <= max_slippage_ratio else NO_FILL if best > max_slippage_ratio else UNCERTAIN,
+                           "slippage above limit"))
+        self.pool_verdict = worst(*(verdict for verdict, _ in checks))
+        self.reason = next((reason for verdict, reason in checks if verdict == self.pool_verdict), None)
+        self.expected_output = smallest
+
+    def output(self, amount_in):
+        """
+        (output, fee) of a swap of amount_in against the reserves seen before the trade.
+        """
+        reserve_in, reserve_out = self.reserves
+        in_precision, out_precision = self.precisions
+        return swap_output(amount_in, reserve_in, reserve_out, self.fee_ratio, in_precision, out_precision)
+
+    def verdict(self, funds=None):
+        """
+        (verdict, reason) for a bot with funds (wallet plus pool balance) of the input token.
+        """
+        if funds is None or funds >= self.max_input:
+            return self.pool_verdict, self.reason if self.pool_verdict != FILL else None
+        if funds < self.min_input:
+            return NO_FILL, "balance too low"
+        if self.pool_verdict == FILL:
+            return UNCERTAIN, "balance may be too low"
+        return self.pool_verdict, self.reason
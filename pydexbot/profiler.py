@@ -0,0 +1,192 @@
+"""
+In-process stack dumps and a sampling profiler that writes collapsed stacks tagged by trade pair
+"""
+import os
+import re
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+
+# Thread ident -> trade pair of the round that thread is running
+THREAD_PAIRS = {}
+# Innermost frames (function, file) of a thread parked until it has work
+IDLE_FRAMES = {
+    ("wait", "threading.py"),
+    ("_worker", "thread.py"),
+    ("get", "queue.py"),
+    ("select", "selectors.py"),
+    # Blocks in a C-level queue get; its writes show up as deeper frames
+    ("_run", "log_writer.py"),
+}
+
+
+def tag_thread(trade_pair):
+    """
+    Mark the current thread as running a round of trade_pair, until untag_thread().
+    """
+    THREAD_PAIRS[threading.get_ident()] = trade_pair
+
+
+def untag_thread():
+    THREAD_PAIRS.pop(threading.get_ident(), None)
+
+
+def _thread_names():
+    return {thread.ident: thread.name for thread in threading.enumerate()}
+
+
+def thread_tag(ident, names):
+    """
+    The trade pair a thread is working on, else its name without the pool index.
+    """
+    trade_pair = THREAD_PAIRS.get(ident)
+    if trade_pair is not None:
+        return trade_pair
+    return re.sub(r"[_-]?\d+(_\d+)?$", "", names.get(ident, "thread")) or "thread"
+
+
+def dump_stacks():
+    """
+    Text with the current stack of every thread, headed by its name and trade pair.
+    """
+    names = _thread_names()
+    current = threading.get_ident()
+    parts = []
+    for ident, frame in sorted(sys._current_frames().items(), key=lambda item: names.get(item[0], "")):
+        if ident == current:
+            continue
+        trade_pair = THREAD_PAIRS.get(ident)
+        header = f"thread {names.get(ident, ident)}" + (f" pair={trade_pair}" if trade_pair else "")
+        parts.append(header + "\n" + "".join(traceback.format_stack(frame)).rstrip())
+    return "\n".join(parts)
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Sample the stacks of all threads every interval_seconds for a fixed duration
+    and write them as collapsed stacks (one "tag;outer;...;inner count" line per
+    distinct stack, the input of flamegraph.pl and speedscope). The tag is the
+    trade pair a thread's round is running for, else the thread's name, so one
+    pair's rounds fold into one tower. Samples are wall-clock: a round waiting on
+    a lock or the network counts as well as one running. Threads outside a round
+    that are parked waiting for work (IDLE_FRAMES) are left out unless include_idle.
+    """
+
+    def __init__(self, output_dir, interval_seconds=0.01, include_idle=False):
+        self.output_dir = output_dir
+        self.interval_seconds = max(0.001, float(interval_seconds))
+        self.include_idle = bool(include_idle)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def running(self):
+        with self._lock:
+            return self._thread is not None
+
+    def start(self, duration_seconds, on_done=None, on_error=None):
+        """
+        Profile for duration_seconds in a background thread, then call
+        on_done(path, stats). Returns False if a profile is already running.
+        """
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(float(duration_seconds), on_done, on_error),
+                                            name="profiler", daemon=True)
+            self._thread.start()
+        return True
+
+    def stop(self):
+        """
+        End a running profile early; its samples are still written.
+        """
+        self._stop.set()
+        with self._lock:
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def sample(self, duration_seconds, stop_event=None):
+        """
+        Collect samples for duration_seconds on the calling thread: (Counter of stack -> samples, stats).
+        """
+        own = threading.get_ident()
+        stacks = Counter()
+        names = _thread_names()
+        samples = idle = 0
+        sampling_seconds = 0.0
+        started = time.monotonic()
+        deadline = started + duration_seconds
+        next_at = started
+        while True:
+            now = time.monotonic()
+            if now >= deadline or (stop_event is not None and stop_event.is_set()):
+                break
+            if now < next_at:
+                if stop_event is not None:
+                    stop_event.wait(next_at - now)
+                else:
+                    time.sleep(next_at - now)
+                continue
+            next_at += self.interval_seconds
+            if next_at < now:
+                # Fell behind (a long GIL hold): skip missed ticks instead of bursting
+                next_at = now + self.interval_seconds
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if ident not in names:
+                    names = _thread_names()
+                code = frame.f_code
+                if (not self.include_idle and ident not in THREAD_PAIRS
+                        and (code.co_name, os.path.basename(code.co_filename)) in IDLE_FRAMES):
+                    idle += 1
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                labels.append(thread_tag(ident, names))
+                stacks[";".join(reversed(labels))] += 1
+            samples += 1
+            sampling_seconds += time.monotonic() - now
+        elapsed = time.monotonic() - started
+        return stacks, {
+            "samples": samples,
+            "stacks": len(stacks),
+            "idle": idle,
+            "seconds": elapsed,
+            "overhead_ratio": sampling_seconds / elapsed if elapsed > 0 else 0.0,
+        }
+
+    def write(self, stacks, path):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as f:
+            for stack, count in sorted(stacks.items()):
+                f.write(f"{stack} {count}\n")
+        os.replace(temp_path, path)
+
+    def _run(self, duration_seconds, on_done, on_error):
+        try:
+            stacks, stats = self.sample(duration_seconds, self._stop)
+            path = os.path.join(self.output_dir, time.strftime("profile-%Y%m%d-%H%M%S.folded"))
+            self.write(stacks, path)
+            if on_done is not None:
+                on_done(path, stats)
+        except Exception as e:
+            if on_error is None:
+                raise
+            on_error(e)
+        finally:
+            with self._lock:
+                self._thread = None
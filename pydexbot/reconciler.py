@@ -0,0 +1,96 @@
+"""
+Fire-and-reconcile submission: pushes run off the trade workers and their results are handled in batches
+"""
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_STOP = object()
+
+
+class Reconciler:
+    """
+    Run pushes on a bounded pool so a trade round returns right after handing its
+    transaction over. Finished pushes are queued, and one reconciler thread drains
+    them in batches of up to batch_size, calling handle_result(record, result, exc)
+    for each; the trace is dropped as soon as it has been handled.
+
+    A push submitted with a key (the trade pair) holds it until its result has been
+    handled: another push for the same key is refused meanwhile, so a pair never
+    trades again on rows its previous trade may still change.
+    """
+
+    def __init__(self, handle_result, max_inflight=16, batch_size=64):
+        self._handle_result = handle_result
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(max_inflight or 1)), thread_name_prefix="submit")
+        self._batch_size = max(1, int(batch_size or 1))
+        self._done = queue.SimpleQueue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._keys_lock = threading.Lock()
+        self._inflight_keys = set()
+
+    def in_flight(self, key):
+        with self._keys_lock:
+            return key in self._inflight_keys
+
+    def submit(self, record, push, key=None):
+        """
+        Hand push to the pool; False (and nothing submitted) while key has a push in flight.
+        """
+        if key is not None:
+            with self._keys_lock:
+                if key in self._inflight_keys:
+                    return False
+                self._inflight_keys.add(key)
+        if self._thread is None:
+            self.start()
+        try:
+            future = self._executor.submit(push)
+        except Exception:
+            self._release(key)
+            raise
+        future.add_done_callback(lambda f: self._done.put((record, f, key)))
+        return True
+
+    def _release(self, key):
+        if key is not None:
+            with self._keys_lock:
+                self._inflight_keys.discard(key)
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="reconciler", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._done.get()]
+            while len(batch) < self._batch_size:
+                try:
+                    batch.append(self._done.get_nowait())
+                except queue.Empty:
+                    break
+            for item in batch:
+                if item is _STOP:
+                    return
+                record, future, key = item
+                exc = future.exception()
+                try:
+                    self._handle_result(record, None if exc else future.result(), exc)
+                except Exception as e:
+                    sys.stderr.write(f"reconciler failed to handle {record!r}: {e}\n")
+                finally:
+                    self._release(key)
+
+    def close(self, timeout=30.0):
+        """
+        Wait for pushes in flight and handle their results before returning.
+        """
+        self._executor.shutdown(wait=True)
+        if self._thread is None:
+            return
+        self._done.put(_STOP)
+        self._thread.join(timeout)
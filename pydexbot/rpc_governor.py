@@ -0,0 +1,191 @@
+"""
+Process-wide RPC budget: a token bucket per node, served in priority order, that backs off when nodes push back
+"""
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+
+from pydexbot.metrics import METRICS
+
+# Lower value is served first
+PUSH, SCHEDULE, MARKET, BALANCE, BACKGROUND = range(5)
+PRIORITY_NAMES = ("push", "schedule", "market", "balance", "background")
+# None outside a trade round, False until the round's first request got a token, then True
+ROUND_ADMITTED = contextvars.ContextVar("rpc_round_admitted", default=None)
+ERROR_ALPHA = 0.05
+# Share of failing requests at which 5xx answers and timeouts count as the node pushing back
+BACKOFF_ERROR_RATIO = 0.2
+
+
+def table_priority(table):
+    if table == "schedules":
+        return SCHEDULE
+    if table == "accounts":
+        return BALANCE
+    return MARKET
+
+
+class RpcShed(Exception):
+    """
+    A request was dropped before it was sent because its node's budget is used up.
+    """
+
+    def __init__(self, url, priority):
+        super().__init__(f"{PRIORITY_NAMES[priority]} request to {url} shed: rpc budget exhausted")
+        self.url = url
+        self.priority = priority
+
+
+class _Bucket:
+    def __init__(self, rate, burst):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+        self.backed_off_at = 0.0
+        self.error_ratio = 0.0
+        self.waiters = []
+
+    def take(self):
+        self.tokens -= 1
+        self.error_ratio -= ERROR_ALPHA * self.error_ratio
+
+    def refill(self, now, recover_seconds):
+        elapsed = now - self.updated_at
+        self.updated_at = now
+        if self.rate < self.max_rate and recover_seconds > 0:
+            # Additive recovery: from zero back to the full rate in recover_seconds
+            self.rate = min(self.max_rate, self.rate + self.max_rate * elapsed / recover_seconds)
+        self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+
+
+class RpcGovernor:
+    """
+    Meter every request to a node through that node's token bucket.
+
+    Each node may take rate_per_second requests per second with bursts of up to
+    burst. acquire(url, priority) blocks until a token is free and no request
+    ranked at or above it is queued: pushes first, then the requests of trade
+    rounds that already hold a token, then those of rounds still starting, each
+    by priority (schedule, market, balance, background reads). A request whose
+    expected wait is above queue_seconds for its priority is shed with RpcShed
+    instead of queueing. Pushes are never shed, and between begin_round() and
+    end_round() only the round's first request can be, so budget is not wasted
+    on rounds dropped half way. When a node answers with 429, or with 5xx and
+    timeouts on more than BACKOFF_ERROR_RATIO of its recent requests, backoff()
+    halves its rate (at most once per second, down to min_rate_ratio of the full
+    rate); the rate then climbs back linearly over recover_seconds.
+    """
+
+    def __init__(self, rate_per_second, burst=None, queue_seconds=None, min_rate_ratio=0.1, recover_seconds=30):
+        self.rate_per_second = float(rate_per_second)
+        self.burst = max(1.0, float(burst or self.rate_per_second))
+        self.queue_seconds = dict(queue_seconds or {})
+        self.min_rate_ratio = min(1.0, max(0.01, float(min_rate_ratio)))
+        self.recover_seconds = float(recover_seconds)
+        self._cond = threading.Condition()
+        self._buckets = {}
+        self._counter = itertools.count()
+
+    def begin_round(self):
+        """
+        A trade round starts in this context: its first request may be shed, the rest wait.
+        """
+        ROUND_ADMITTED.set(False)
+
+    def end_round(self):
+        ROUND_ADMITTED.set(None)
+
+    def _bucket(self, url):
+        bucket = self._buckets.get(url)
+        if bucket is None:
+            bucket = self._buckets[url] = _Bucket(self.rate_per_second, self.burst)
+        return bucket
+
+    def _rank(self, priority):
+        starting = priority != PUSH and ROUND_ADMITTED.get() is not True
+        return int(starting), priority
+
+    def _expected_wait(self, bucket, rank):
+        ahead = sum(1 for waiter in bucket.waiters if waiter[:2] <= rank)
+        return max(0.0, (ahead + 1 - bucket.tokens) / bucket.rate)
+
+    def try_acquire(self, url, priority):
+        """
+        Take a token only if one is free right now; raises RpcShed otherwise.
+        """
+        with self._cond:
+            bucket = self._bucket(url)
+            bucket.refill(time.monotonic(), self.recover_seconds)
+            rank = self._rank(priority)
+            if bucket.tokens >= 1 and not any(waiter[:2] <= rank for waiter in bucket.waiters):
+                bucket.take()
+                return
+        METRICS.inc("rpc_shed", node=url, priority=PRIORITY_NAMES[priority])
+        raise RpcShed(url, priority)
+
+    def acquire(self, url, priority):
+        """
+        Wait for a token of url's bucket in priority order; raises RpcShed when the
+        wait would be longer than queue_seconds for the priority.
+        """
+        admitted = ROUND_ADMITTED.get()
+        limit = None if priority == PUSH or admitted else self.queue_seconds.get(PRIORITY_NAMES[priority])
+        started = time.monotonic()
+        shed = False
+        with self._cond:
+            bucket = self._bucket(url)
+            bucket.refill(started, self.recover_seconds)
+            if not bucket.waiters and bucket.tokens >= 1:
+                bucket.take()
+            elif limit is not None and self._expected_wait(bucket, self._rank(priority)) > limit:
+                shed = True
+            else:
+                entry = (*self._rank(priority), next(self._counter))
+                heapq.heappush(bucket.waiters, entry)
+                while True:
+                    now = time.monotonic()
+                    bucket.refill(now, self.recover_seconds)
+                    if bucket.waiters[0] == entry and bucket.tokens >= 1:
+                        heapq.heappop(bucket.waiters)
+                        bucket.take()
+                        self._cond.notify_all()
+                        break
+                    if limit is not None and now - started > limit:
+                        bucket.waiters.remove(entry)
+                        heapq.heapify(bucket.waiters)
+                        self._cond.notify_all()
+                        shed = True
+                        break
+                    self._cond.wait(max(0.001, (1 - bucket.tokens) / bucket.rate))
+        if shed:
+            METRICS.inc("rpc_shed", node=url, priority=PRIORITY_NAMES[priority])
+            raise RpcShed(url, priority)
+        if admitted is False:
+            ROUND_ADMITTED.set(True)
+        METRICS.observe("rpc_queue_seconds", time.monotonic() - started, priority=PRIORITY_NAMES[priority])
+
+    def backoff(self, url, throttled=False):
+        """
+        The node failed a request: a 429 (throttled), a 5xx or a timeout. Halve its
+        rate if it throttled us or enough of its requests fail.
+        """
+        now = time.monotonic()
+        with self._cond:
+            bucket = self._bucket(url)
+            bucket.refill(now, self.recover_seconds)
+            bucket.error_ratio += ERROR_ALPHA * (1.0 - bucket.error_ratio)
+            if not throttled and bucket.error_ratio < BACKOFF_ERROR_RATIO:
+                return
+            if now - bucket.backed_off_at < 1.0:
+                return
+            bucket.backed_off_at = now
+            bucket.rate = max(bucket.max_rate * self.min_rate_ratio, bucket.rate / 2)
+        METRICS.inc("rpc_backoffs", node=url)
+
+    def rates(self):
+        with self._cond:
+            return {url: bucket.rate for url, bucket in self._buckets.items()}
@@ -0,0 +1,55 @@
+"""
+Command line and YAML config of the service, read once on first use
+"""
+import argparse
+import os
+import threading
+
+
+def get_config_path(config_dir):
+    # Prefer .config.yaml if exists
+    config_path = os.path.join(config_dir, ".config.yaml")
+    if os.path.exists(config_path):
+        return config_path
+    return os.path.join(config_dir, "config.example.yaml")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--config-dir', default=os.path.join(os.getcwd(), 'config'), help='Config directory path')
+    parser.add_argument('--log-dir', default=os.path.join(os.getcwd(), 'logs'), help='Log directory path')
+    parser.add_argument('--shard-index', type=int, default=None, help='Run as shard worker N (set by the shard coordinator)')
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+
+class Runtime:
+    """
+    Where the service reads its config and writes its logs, and the loaded config
+    (.config.yaml in config_dir, else config.example.yaml).
+    """
+
+    def __init__(self, config_dir, log_dir, shard_index=None):
+        self.config_dir = config_dir
+        self.log_dir = log_dir
+        self.shard_index = shard_index
+        self.config_path = get_config_path(config_dir)
+        import yaml
+        with open(self.config_path, "r") as f:
+            self.config = yaml.safe_load(f) or {}
+
+
+_RUNTIME = None
+_RUNTIME_LOCK = threading.Lock()
+
+
+def get_runtime(argv=None):
+    """
+    The process's Runtime, built from argv (default sys.argv) on the first call.
+    """
+    global _RUNTIME
+    with _RUNTIME_LOCK:
+        if _RUNTIME is None:
+            args = parse_args(argv)
+            _RUNTIME = Runtime(args.config_dir, args.log_dir, args.shard_index)
+        return _RUNTIME
@@ -0,0 +1,87 @@
+"""
+Central deadline scheduler that runs each trade pair's round when it is due
+"""
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pydexbot.metrics import METRICS
+
+
+class DeadlineScheduler:
+    """
+    Keep one min-heap of next-round deadlines for all pairs.
+
+    A single dispatcher thread sleeps until the earliest deadline (or until a new,
+    earlier one is scheduled, or until stop) and hands exactly the due pair to a
+    bounded worker pool. run_round(pair) returns the seconds to wait before that
+    pair's next round, which puts the pair back on the heap. A round that raises
+    is passed to on_error(pair, exc) and the pair runs again after retry_seconds.
+    How late each round starts after its deadline is observed as scheduler_lag_seconds;
+    it grows once all max_workers threads are busy with rounds of other pairs.
+    """
+
+    def __init__(self, run_round, max_workers=16, retry_seconds=5.0, on_error=None):
+        self._run_round = run_round
+        self._retry_seconds = max(0.0, float(retry_seconds))
+        self._on_error = on_error
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(max_workers or 1)), thread_name_prefix="pair")
+        self._cond = threading.Condition()
+        self._heap = []
+        self._counter = itertools.count()
+        self._stopped = False
+        self._thread = None
+
+    def schedule(self, pair, delay_seconds=0):
+        deadline = time.monotonic() + max(0.0, float(delay_seconds or 0))
+        with self._cond:
+            if self._stopped:
+                return
+            heapq.heappush(self._heap, (deadline, next(self._counter), pair))
+            if self._heap[0][2] == pair:
+                self._cond.notify()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._dispatch, name="scheduler", daemon=True)
+        self._thread.start()
+
+    def _dispatch(self):
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    remaining = self._heap[0][0] - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._stopped:
+                    return
+                deadline, _, pair = heapq.heappop(self._heap)
+            self._executor.submit(self._run, pair, deadline)
+
+    def _run(self, pair, deadline):
+        METRICS.observe("scheduler_lag_seconds", max(0.0, time.monotonic() - deadline))
+        wait_seconds = self._retry_seconds
+        try:
+            wait_seconds = self._run_round(pair)
+        except Exception as e:
+            if self._on_error is not None:
+                self._on_error(pair, e)
+        finally:
+            # A pair that is not put back on the heap never trades again
+            self.schedule(pair, wait_seconds)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._heap.clear()
+            self._cond.notify_all()
+
+    def join(self):
+        if self._thread is not None:
+            self._thread.join()
+        self._executor.shutdown(wait=True)
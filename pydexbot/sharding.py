@@ -0,0 +1,243 @@
+"""
+Split trade pairs across worker processes and hosts: a consistent hash ring over
+live members and pair leases kept in a shared file
+"""
+import bisect
+import fcntl
+import hashlib
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+def ring_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Consistent hash of keys onto members. Each member has `replicas` points on the
+    ring and a key belongs to the first point at or after its hash, so adding or
+    removing a member only moves the keys between it and its neighbours.
+    """
+
+    def __init__(self, members=(), replicas=160):
+        points = sorted((ring_hash(f"{member}#{replica}"), member) for member in set(members) for replica in range(replicas))
+        self._hashes = [point for point, _ in points]
+        self._members = [member for _, member in points]
+
+    def owner(self, key):
+        if not self._hashes:
+            return None
+        position = bisect.bisect_left(self._hashes, ring_hash(key))
+        return self._members[position % len(self._members)]
+
+    def assign(self, keys):
+        owners = {}
+        for key in keys:
+            owners.setdefault(self.owner(key), []).append(key)
+        return owners
+
+
+class LeaseFile:
+    """
+    A JSON document of members and pair leases in one file. update(change) takes an
+    exclusive flock on path + ".lock", reads the document, lets change(state) modify
+    it in place and writes it back with an atomic rename.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def update(self, change):
+        with open(self.path + ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                state = self.read()
+                result = change(state)
+                directory = os.path.dirname(os.path.abspath(self.path))
+                fd, temp_path = tempfile.mkstemp(prefix=".leases-", dir=directory)
+                with os.fdopen(fd, "w") as f:
+                    json.dump(state, f, sort_keys=True)
+                os.replace(temp_path, self.path)
+                return result
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class ShardMember:
+    """
+    One member's view of which trade pairs it may trade.
+
+    Every sync() heartbeats the member in the lease file, builds a hash ring over
+    the members whose heartbeat has not expired, and then holds exactly the pairs
+    the ring gives it: free or expired leases of its pairs are taken, held ones are
+    renewed for lease_seconds, and held pairs the ring now gives to another member
+    are released. A released lease is left to run for grace_seconds, so a round
+    already in flight finishes before the new owner can take the pair. A member
+    that stops syncing drops off the ring once its heartbeat expires, and its pairs
+    move to the others when their leases run out.
+
+    owns(pair) is checked before every round. It only holds until lease_seconds -
+    grace_seconds after the sync that last renewed the lease, counted on this
+    process's monotonic clock from before the lease file was read, so a member whose
+    syncs fail stops trading before its leases can be taken over.
+    """
+
+    def __init__(self, store, member, pairs, lease_seconds=15, grace_seconds=5, replicas=160,
+                 clock=time.time, monotonic=time.monotonic):
+        self.store = store
+        self.member = member
+        self.pairs = list(pairs)
+        self.lease_seconds = float(lease_seconds)
+        self.grace_seconds = min(float(grace_seconds), self.lease_seconds / 2)
+        self.replicas = replicas
+        self._clock = clock
+        self._monotonic = monotonic
+        self._lock = threading.Lock()
+        self._owned = set()
+        self._valid_until = 0.0
+        self._thread = None
+        self._stop = threading.Event()
+
+    def owns(self, trade_pair):
+        with self._lock:
+            return trade_pair in self._owned and self._monotonic() < self._valid_until
+
+    def owned(self):
+        with self._lock:
+            return sorted(self._owned) if self._monotonic() < self._valid_until else []
+
+    def _claim(self, state):
+        now = self._clock()
+        members = {member: expires for member, expires in state.get("members", {}).items() if expires > now}
+        members[self.member] = now + self.lease_seconds
+        state["members"] = members
+        ring = HashRing(members, self.replicas)
+        leases = state.setdefault("leases", {})
+        owned = set()
+        for pair in self.pairs:
+            lease = leases.get(pair)
+            holder = lease["owner"] if lease and lease["expires"] > now else None
+            if ring.owner(pair) == self.member:
+                if holder in (None, self.member):
+                    leases[pair] = {"owner": self.member, "expires": now + self.lease_seconds}
+                    owned.add(pair)
+            elif holder == self.member and not lease.get("released"):
+                leases[pair] = {"owner": self.member, "expires": now + self.grace_seconds, "released": True}
+        return owned
+
+    def sync(self):
+        """
+        Heartbeat and rebalance once; returns (taken, released) pairs.
+        """
+        started = self._monotonic()
+        owned = self.store.update(self._claim)
+        with self._lock:
+            previous = self._owned if started < self._valid_until else set()
+            self._owned = owned
+            self._valid_until = started + self.lease_seconds - self.grace_seconds
+        return sorted(owned - previous), sorted(previous - owned)
+
+    def leave(self):
+        """
+        Drop the heartbeat and release every lease of this member, so others take its
+        pairs after grace_seconds instead of after lease_seconds.
+        """
+        def release(state):
+            now = self._clock()
+            state.get("members", {}).pop(self.member, None)
+            for pair, lease in state.get("leases", {}).items():
+                if lease["owner"] == self.member and lease["expires"] > now + self.grace_seconds:
+                    lease.update(expires=now + self.grace_seconds, released=True)
+        with self._lock:
+            self._owned = set()
+        self.store.update(release)
+
+    def start(self, interval_seconds, on_change=None, on_error=None):
+        def run():
+            while not self._stop.is_set():
+                try:
+                    taken, released = self.sync()
+                    if on_change and (taken or released):
+                        on_change(taken, released)
+                except Exception as e:
+                    if on_error:
+                        on_error(e)
+                self._stop.wait(interval_seconds)
+        self._thread = threading.Thread(target=run, name="shard-leases", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+class ShardCoordinator:
+    """
+    Run `workers` copies of the service, each as `sys.executable -m pydexbot.main`
+    with the coordinator's own arguments plus --shard-index i. A worker that exits
+    is started again after restart_seconds; SIGINT and SIGTERM are passed on to the
+    workers, which are waited for before run() returns. SIGUSR1 and SIGUSR2 (stack
+    dump, profile) are passed on to every running worker.
+    """
+
+    def __init__(self, workers, argv, log=print, restart_seconds=2):
+        self.workers = int(workers)
+        self.argv = list(argv)
+        self.log = log
+        self.restart_seconds = float(restart_seconds)
+        self._stop = threading.Event()
+        self._processes = {}
+
+    def _spawn(self, index):
+        command = [sys.executable, "-m", "pydexbot.main", *self.argv, "--shard-index", str(index)]
+        self._processes[index] = subprocess.Popen(command)
+        self.log(f"shard worker {index} started (pid {self._processes[index].pid})")
+
+    def run(self):
+        def handle_stop(signum, frame):
+            self.log("Received stop signal, stopping shard workers...")
+            self._stop.set()
+        def forward(signum, frame):
+            for process in list(self._processes.values()):
+                if process.poll() is None:
+                    process.send_signal(signum)
+        signal.signal(signal.SIGINT, handle_stop)
+        signal.signal(signal.SIGTERM, handle_stop)
+        for name in ("SIGUSR1", "SIGUSR2"):
+            if hasattr(signal, name):
+                signal.signal(getattr(signal, name), forward)
+        for index in range(self.workers):
+            self._spawn(index)
+        exited_at = {}
+        while not self._stop.wait(0.5):
+            for index, process in self._processes.items():
+                if process.poll() is None:
+                    continue
+                if index not in exited_at:
+                    self.log(f"shard worker {index} exited with {process.returncode}")
+                    exited_at[index] = time.monotonic()
+                elif time.monotonic() - exited_at[index] >= self.restart_seconds:
+                    del exited_at[index]
+                    self._spawn(index)
+        for process in self._processes.values():
+            if process.poll() is None:
+                process.send_signal(signal.SIGTERM)
+        for process in self._processes.values():
+            process.wait()
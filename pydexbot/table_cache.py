@@ -0,0 +1,129 @@
+"""
+Process-wide TTL cache for on-chain table rows shared by all pair workers
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Flight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+        self.stale = False
+
+
+class TableCache:
+    """
+    Cache table reads keyed by (code, scope, table, key).
+
+    Each table has its own TTL in seconds; tables without a TTL (or with 0) are not
+    cached. Least recently used entries are evicted once max_entries is reached, and
+    concurrent misses on the same key wait for a single loader call.
+    Missing rows (None) are cached like any other value. Entries remember when
+    they were read, so export() can hand them to a warm-start snapshot and put()
+    can take them back: an entry read earlier expires that much earlier.
+    """
+
+    def __init__(self, ttl_seconds=None, max_entries=4096):
+        self._ttl_seconds = {str(table): float(value or 0) for table, value in (ttl_seconds or {}).items()}
+        self._max_entries = max(1, int(max_entries or 1))
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._flights = {}
+
+    def ttl_for(self, table):
+        return self._ttl_seconds.get(table, 0)
+
+    def lookup(self, code, scope, table, key):
+        """
+        Return (True, value) for a fresh cached entry, else (False, None).
+        """
+        cache_key = (code, scope, table, key)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None or entry[0] < time.monotonic():
+                return False, None
+            return True, entry[1]
+
+    def get(self, code, scope, table, key, loader):
+        ttl = self.ttl_for(table)
+        if ttl <= 0:
+            return loader()
+        cache_key = (code, scope, table, key)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                expires_at, value, _ = entry
+                if expires_at >= time.monotonic():
+                    self._entries.move_to_end(cache_key)
+                    return value
+                del self._entries[cache_key]
+            flight = self._flights.get(cache_key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[cache_key] = flight
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                # A fresh instance per waiter: raising the leader's would splice every traceback onto it
+                raise copy.copy(flight.error) from flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+        except Exception as e:
+            flight.error = e
+            raise
+        else:
+            if not flight.stale:
+                self.put(code, scope, table, key, flight.value)
+            return flight.value
+        finally:
+            with self._lock:
+                if self._flights.get(cache_key) is flight:
+                    del self._flights[cache_key]
+            flight.event.set()
+
+    def put(self, code, scope, table, key, value, read_at=None):
+        """
+        Cache value for the table's TTL from read_at, its monotonic read time (default now).
+        """
+        ttl = self.ttl_for(table)
+        if ttl <= 0:
+            return
+        if read_at is None:
+            read_at = time.monotonic()
+        cache_key = (code, scope, table, key)
+        with self._lock:
+            self._entries[cache_key] = (read_at + ttl, value, read_at)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, code, scope, table, key):
+        cache_key = (code, scope, table, key)
+        with self._lock:
+            self._entries.pop(cache_key, None)
+            flight = self._flights.pop(cache_key, None)
+            if flight is not None:
+                # A read started before the invalidation must neither repopulate the entry
+                # nor be joined by later gets, which start a read of their own
+                flight.stale = True
+
+    def export(self, tables):
+        """
+        [(code, scope, table, key, value, age_seconds)] of every entry of tables still held, expired or not.
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [(*cache_key, value, now - read_at) for cache_key, (_, value, read_at) in self._entries.items()
+                    if cache_key[2] in tables]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,240 @@
+"""
+Exact fill extraction from push_transaction traces
+"""
+from decimal import Decimal
+
+TRADE_ACTION_NAMES = frozenset(("trade", "buy", "sell"))
+SWAP_OUT_MEMO_PREFIX = "flon swap by "
+SWAP_IN_MEMO_PREFIX = "swap:"
+ZERO = Decimal("0")
+
+
+def parse_quantity(value):
+    """
+    "13.68536925 FLON" -> (Decimal("13.68536925"), "FLON")
+    """
+    amount, _, symbol = value.partition(" ")
+    if not symbol or " " in symbol:
+        amount, symbol = value.split()
+    return Decimal(amount), symbol
+
+
+def _swap_pair(data, dex_contract):
+    memo = data.get("memo", "")
+    if data.get("to") == dex_contract and memo.startswith(SWAP_IN_MEMO_PREFIX):
+        return memo.rpartition(":")[2] or None
+    return None
+
+
+def _scan_actions(actions, dex_contract):
+    """
+    Find (output transfer, afterswap data, trade pair) among the actions executed
+    under a trade/buy/sell action. Notification copies are skipped.
+    """
+    output = None
+    after_swap = None
+    trade_pair = None
+    for trace in actions:
+        act = trace["act"]
+        name = act["name"]
+        if name == "transfer":
+            if trace.get("receiver", act["account"]) != act["account"]:
+                continue
+            data = act["data"]
+            if output is None and data.get("from") == dex_contract and data.get("memo", "").startswith(SWAP_OUT_MEMO_PREFIX):
+                output = data
+            elif trade_pair is None:
+                trade_pair = _swap_pair(data, dex_contract)
+        elif name == "afterswap" and after_swap is None:
+            after_swap = act["data"]
+        else:
+            continue
+        if output is not None and after_swap is not None and trade_pair is not None:
+            # The rest are the notification copies of these and the later bookkeeping
+            break
+    return output, after_swap, trade_pair
+
+
+def _scan_nested(trace, dex_contract):
+    """
+    Jump straight to the known layout: the trade action's inline transfer to the
+    dex, whose own inlines hold the output transfer, next to the afterswap action.
+    Falls back to walking every descendant when the layout differs.
+    """
+    output = None
+    after_swap = None
+    trade_pair = None
+    for child in trace.get("inline_traces") or ():
+        act = child["act"]
+        name = act["name"]
+        if name == "afterswap":
+            after_swap = act["data"]
+        elif name == "transfer" and output is None:
+            if trade_pair is None:
+                trade_pair = _swap_pair(act["data"], dex_contract)
+            for inline in child.get("inline_traces") or ():
+                inline_act = inline["act"]
+                if inline_act["name"] != "transfer":
+                    continue
+                data = inline_act["data"]
+                if (data.get("from") == dex_contract and data.get("memo", "").startswith(SWAP_OUT_MEMO_PREFIX)
+                        and inline.get("receiver", inline_act["account"]) == inline_act["account"]):
+                    output = data
+                    break
+    if output is None or after_swap is None:
+        return _scan_actions(_nested_descendants(trace), dex_contract)
+    return output, after_swap, trade_pair
+
+
+def _make_fill(trade_trace, output, after_swap, trade_pair):
+    # The output transfer carries what the bot received; its memo what the bot paid
+    received = output["quantity"]
+    paid = output["memo"][len(SWAP_OUT_MEMO_PREFIX):].partition(":")[0]
+    after_swap = after_swap or {}
+    side = after_swap.get("side", "")
+    if side == "left":
+        base_quantity, quote_quantity = paid, received
+    else:
+        base_quantity, quote_quantity = received, paid
+    base_amount, base_symbol = parse_quantity(base_quantity)
+    quote_amount, quote_symbol = parse_quantity(quote_quantity)
+    return {
+        "action": trade_trace["act"]["name"],
+        "trade_pair": trade_pair,
+        "maker_account": after_swap.get("bot", ""),
+        "side": side,
+        "trade_side": "sell" if side == "left" else "buy",
+        "base_amount": base_amount,
+        "base_symbol": base_symbol,
+        "base_quantity": base_quantity,
+        "quote_amount": quote_amount,
+        "quote_symbol": quote_symbol,
+        "quote_quantity": quote_quantity,
+        "price": quote_amount / base_amount if base_amount > 0 else ZERO,
+    }
+
+
+def _nested_descendants(trace):
+    stack = list(reversed(trace.get("inline_traces") or ()))
+    while stack:
+        child = stack.pop()
+        yield child
+        inline_traces = child.get("inline_traces")
+        if inline_traces:
+            stack.extend(reversed(inline_traces))
+
+
+def parse_fills_from_result(trx, dex_contract="flon.swap"):
+    """
+    Return one fill per trade/buy/sell action in the transaction, in action order.
+
+    Quantities and prices are exact Decimals. Both nested traces (inline_traces)
+    and nodeos' flat action_traces (creator_action_ordinal) are supported.
+    """
+    if not isinstance(trx, dict):
+        return []
+    processed = trx.get("processed")
+    if not isinstance(processed, dict):
+        return []
+    traces = processed.get("action_traces") or []
+    fills = []
+    if traces and "inline_traces" in traces[0]:
+        for trace in traces:
+            if trace["act"]["name"] in TRADE_ACTION_NAMES:
+                output, after_swap, trade_pair = _scan_nested(trace, dex_contract)
+                if output is not None:
+                    fills.append(_make_fill(trace, output, after_swap, trade_pair))
+        return fills
+
+    # Only the subtrees of trade actions are collected; creators come before the actions they create
+    trades = []
+    children = {}
+    roots = {}
+    for trace in traces:
+        creator = trace.get("creator_action_ordinal", 0)
+        if creator:
+            root = roots.get(creator)
+            if root is not None:
+                roots[trace.get("action_ordinal")] = root
+                children[root].append(trace)
+        elif trace["act"]["name"] in TRADE_ACTION_NAMES:
+            ordinal = trace.get("action_ordinal")
+            roots[ordinal] = ordinal
+            children[ordinal] = []
+            trades.append(trace)
+    for trace in trades:
+        output, after_swap, trade_pair = _scan_actions(children[trace.get("action_ordinal")], dex_contract)
+        if output is not None:
+            fills.append(_make_fill(trace, output, after_swap, trade_pair))
+    return fills
+
+
+def parse_transfers_from_result(trx):
+    """
+    Return (contract, from, to, quantity) for every token transfer executed in the
+    transaction, in execution order. Notification copies are skipped.
+    """
+    if not isinstance(trx, dict) or not isinstance(trx.get("processed"), dict):
+        return []
+    traces = trx["processed"].get("action_traces") or []
+    if any("inline_traces" in trace for trace in traces):
+        flat = []
+        for trace in traces:
+            flat.append(trace)
+            flat.extend(_nested_descendants(trace))
+        traces = flat
+    transfers = []
+    for trace in traces:
+        act = trace["act"]
+        if act["name"] != "transfer" or trace.get("receiver", act["account"]) != act["account"]:
+            continue
+        data = act["data"]
+        if isinstance(data, dict) and "quantity" in data:
+            transfers.append((act["account"], data.get("from"), data.get("to"), data["quantity"]))
+    return transfers
+
+
+def split_result_by_action(trx):
+    """
+    Split a multi-action push result into one result per top-level action, in action
+    order. Each keeps the transaction's fields but only the traces its action
+    produced, so fills and transfers are attributed to the action that made them.
+    """
+    if not isinstance(trx, dict) or not isinstance(trx.get("processed"), dict):
+        return []
+    traces = trx["processed"].get("action_traces") or []
+    if any("inline_traces" in trace for trace in traces):
+        groups = [[trace] for trace in traces]
+    else:
+        roots = {}
+        groups = []
+        by_root = {}
+        for trace in traces:
+            ordinal = trace.get("action_ordinal")
+            creator = trace.get("creator_action_ordinal", 0)
+            root = roots.get(creator, ordinal) if creator else ordinal
+            roots[ordinal] = root
+            if root == ordinal:
+                by_root[root] = [trace]
+                groups.append(by_root[root])
+            else:
+                by_root[root].append(trace)
+    return [{**trx, "processed": {**trx["processed"], "action_traces": group}} for group in groups]
+
+
+def format_fill(fill):
+    """
+    Render a fill as the trade result fields written to the pair logs.
+    """
+    base_amount, quote_amount = fill["base_amount"], fill["quote_amount"]
+    base_symbol, quote_symbol = fill["base_symbol"], fill["quote_symbol"]
+    inverse_price = base_amount / quote_amount if quote_amount > 0 else ZERO
+    return {
+        "trade_side": fill["trade_side"],
+        "execution_price": f"{fill['price']:.8f} {quote_symbol}/{base_symbol}",
+        "inverse_price": f"{inverse_price:.8f} {base_symbol}/{quote_symbol}",
+        # The quantities as the chain wrote them
+        "base_quantity": fill["base_quantity"],
+        "quote_quantity": fill["quote_quantity"],
+        "maker_account": fill["maker_account"],
+    }
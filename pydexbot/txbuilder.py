@@ -0,0 +1,182 @@
+"""
+Local transaction building: cached TAPOS, native serialization and process-pool signing
+"""
+import hashlib
+import struct
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import base58
+from Crypto.Hash import RIPEMD160
+
+from pydexbot.metrics import METRICS
+from pydexbot.packing import pack_name, pack_varuint32
+
+MAX_SIGN_ATTEMPTS = 64
+
+_SIGNER = None
+
+
+def ripemd160(data):
+    return RIPEMD160.new(data).digest()
+
+
+def decode_private_key(key):
+    """
+    Decode a WIF (5...) or PVT_K1_ private key into its 32 raw bytes.
+    """
+    if key.startswith("PVT_K1_"):
+        raw = base58.b58decode(key[len("PVT_K1_"):])
+        secret, checksum = raw[:-4], raw[-4:]
+        if ripemd160(secret + b"K1")[:4] != checksum:
+            raise ValueError("invalid private key checksum")
+        return secret
+    raw = base58.b58decode(key)
+    payload, checksum = raw[:-4], raw[-4:]
+    if hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4] != checksum or payload[0] != 0x80:
+        raise ValueError("invalid private key checksum")
+    return payload[1:33]
+
+
+def encode_signature(compact):
+    return "SIG_K1_" + base58.b58encode(compact + ripemd160(compact + b"K1")[:4]).decode()
+
+
+def is_canonical(compact):
+    return (
+        not (compact[1] & 0x80)
+        and not (compact[1] == 0 and not (compact[2] & 0x80))
+        and not (compact[33] & 0x80)
+        and not (compact[33] == 0 and not (compact[34] & 0x80))
+    )
+
+
+def pack_header(expiration, ref_block_num, ref_block_prefix):
+    # max_net_usage_words, max_cpu_usage_ms and delay_sec are all 0
+    return struct.pack("<IHI", expiration, ref_block_num, ref_block_prefix) + b"\x00\x00\x00"
+
+
+def pack_actions(actions):
+    """
+    Serialize [contract, action_name, packed_args, {actor: permission}] entries
+    into the transaction body that follows the header.
+    """
+    parts = [pack_varuint32(0), pack_varuint32(len(actions))]
+    for contract, action_name, packed_args, permissions in actions:
+        parts.append(pack_name(contract) + pack_name(action_name))
+        parts.append(pack_varuint32(len(permissions)))
+        for actor, permission in permissions.items():
+            parts.append(pack_name(actor) + pack_name(permission))
+        packed_args = bytes(packed_args)
+        parts.append(pack_varuint32(len(packed_args)) + packed_args)
+    parts.append(pack_varuint32(0))
+    return b"".join(parts)
+
+
+def _init_signer(private_key):
+    global _SIGNER
+    import coincurve
+    _SIGNER = coincurve.PrivateKey(decode_private_key(private_key))
+
+
+def sign_transaction(chain_id, expiration, ref_block_num, ref_block_prefix, body):
+    """
+    Runs in a signing process. Returns (packed_trx, signature); the expiration is
+    bumped by a second until libsecp256k1 yields a canonical signature.
+    """
+    for _ in range(MAX_SIGN_ATTEMPTS):
+        packed_trx = pack_header(expiration, ref_block_num, ref_block_prefix) + body
+        digest = hashlib.sha256(chain_id + packed_trx + bytes(32)).digest()
+        signature = _SIGNER.sign_recoverable(digest, hasher=None)
+        compact = bytes([signature[64] + 31]) + signature[:64]
+        if is_canonical(compact):
+            return packed_trx, encode_signature(compact)
+        expiration += 1
+    raise RuntimeError("no canonical signature found")
+
+
+def parse_block_time(value):
+    return datetime.fromisoformat(str(value).split(".")[0]).replace(tzinfo=timezone.utc).timestamp()
+
+
+class TransactionBuilder:
+    """
+    Build, sign and push transactions without a per-trade get_info.
+
+    The chain id and reference block (last irreversible block) are refreshed on a
+    background timer and shared by all pairs; expirations are derived from the
+    chain time of the last refresh. Signing runs in a process pool so many pairs
+    can sign in parallel outside the GIL.
+    """
+
+    def __init__(self, node_pool, signing_workers=2, refresh_seconds=10.0, expiration_seconds=60):
+        self._node_pool = node_pool
+        self._signing_workers = max(1, int(signing_workers or 1))
+        self._refresh_seconds = max(1.0, float(refresh_seconds or 10.0))
+        self._expiration_seconds = max(1, int(expiration_seconds or 60))
+        self._tapos = None
+        self._lock = threading.Lock()
+        self._executor = None
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def start(self, private_key):
+        decode_private_key(private_key)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self._signing_workers, initializer=_init_signer, initargs=(private_key,)
+        )
+        self.refresh()
+        def run():
+            while not self._stop_event.wait(self._refresh_seconds):
+                try:
+                    self.refresh()
+                except Exception:
+                    # Keep the last reference block; it stays valid for hours
+                    continue
+        self._thread = threading.Thread(target=run, name="tapos-refresh", daemon=True)
+        self._thread.start()
+
+    def refresh(self):
+        chain_info = self._node_pool.read("/v1/chain/get_info", {})
+        block_id = bytes.fromhex(chain_info["last_irreversible_block_id"])
+        tapos = (
+            bytes.fromhex(chain_info["chain_id"]),
+            int(chain_info["last_irreversible_block_num"]) & 0xffff,
+            int.from_bytes(block_id[8:12], "little"),
+            parse_block_time(chain_info["head_block_time"]),
+            time.monotonic(),
+        )
+        with self._lock:
+            self._tapos = tapos
+        return tapos
+
+    def tapos(self):
+        with self._lock:
+            tapos = self._tapos
+        return tapos if tapos is not None else self.refresh()
+
+    def push_action(self, contract, action_name, packed_args, permissions):
+        return self.push_actions([[contract, action_name, packed_args, permissions]])
+
+    def push_actions(self, actions):
+        chain_id, ref_block_num, ref_block_prefix, chain_time, refreshed_at = self.tapos()
+        expiration = int(chain_time + time.monotonic() - refreshed_at) + self._expiration_seconds
+        started = time.perf_counter()
+        packed_trx, signature = self._executor.submit(
+            sign_transaction, chain_id, expiration, ref_block_num, ref_block_prefix, pack_actions(actions)
+        ).result()
+        METRICS.observe("sign_seconds", time.perf_counter() - started)
+        payload = {
+            "signatures": [signature],
+            "compression": "none",
+            "packed_context_free_data": "",
+            "packed_trx": packed_trx.hex(),
+        }
+        return self._node_pool.write("/v1/chain/push_transaction", payload)
+
+    def stop(self):
+        self._stop_event.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
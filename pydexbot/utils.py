@@ -4,17 +4,24 @@ import json
 import base58
 from pyflonkit import eosapi as chainapi, config as chain_config
 from pyflonkit.eosBase import Transaction
-from Crypto.Cipher import PKCS1_OAEP
 
 SYSTEM_CONTRACT="flon"
 MAIN_TOKEN_CONTRACT="flon.token"
 MAIN_TOKEN="FLON"
 
 def setup_flon_network(node_urls):
-    for url in node_urls:
-        chainapi.set_node(url)
+    """
+    Point the chain client at the first node; callers that use several nodes
+    route between them with pydexbot.node_pool.NodePool.
+    """
+    if isinstance(node_urls, str):
+        node_urls = [node_urls]
+    chainapi.set_node(node_urls[0])
     chain_config.config_network(SYSTEM_CONTRACT, MAIN_TOKEN_CONTRACT, MAIN_TOKEN)
 
+def set_node(url):
+    chainapi.set_node(url)
+
 def create_account(account_name, owner_key, transfer_amount, creator=SYSTEM_CONTRACT, token_contract=MAIN_TOKEN_CONTRACT, active_key=None):
     """
     Create a new EOS account and transfer initial token in one transaction.
@@ -76,10 +83,38 @@ def push_action(contract, action_name, args, permissions=None):
     args = chainapi.pack_args(contract, action_name, args)
     return chainapi.push_action(contract, action_name, args, permissions)
 
+def push_packed_action(contract, action_name, packed_args, permissions=None):
+    """
+    Push an action whose arguments are already serialized.
+    """
+    return chainapi.push_action(contract, action_name, packed_args, permissions)
+
+def push_packed_actions(actions):
+    """
+    Push [contract, action_name, packed_args, permissions] entries as one transaction.
+    """
+    return chainapi.push_actions(actions)
+
+def pack_args(contract, action_name, args):
+    return chainapi.pack_args(contract, action_name, args)
+
+def get_abi(contract):
+    return chainapi.get_abi(contract)
+
+def set_abi(contract, abi_json):
+    """
+    Register an ABI with the chain client so pack_args does not fetch it again.
+    Silently skipped when the client has no local ABI registry.
+    """
+    register = getattr(chainapi, "set_abi", None)
+    if register is not None:
+        register(contract, abi_json)
+
 def encrypt_with_public_key(data, rsa_pubkey):
     """
     Encrypt data using RSA public key (PKCS1_OAEP). Returns ciphertext raw bytes.
     """
+    from Crypto.Cipher import PKCS1_OAEP
     cipher_rsa = PKCS1_OAEP.new(rsa_pubkey)
     if isinstance(data, str):
         data_bytes = data.encode()
@@ -0,0 +1,104 @@
+"""
+Warm-start snapshot: cached table rows and bot balances kept on disk, so a restarted worker trades before its reads come back
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from decimal import Decimal
+
+SNAPSHOT_VERSION = 1
+
+
+class WarmStartSnapshot:
+    """
+    Save and load table rows and bot balances as one JSON file.
+
+    save(rows, balances) writes them with the wall-clock time each was read, via
+    an atomic rename. load() ignores the file when its format version differs or
+    its identity (contracts, chain id) does not match this process's, and drops
+    every row or balance older than its kind's bound in max_age_seconds: kinds are
+    table names and "balances", and kinds without a bound are not saved at all.
+    Rows come back as (code, scope, table, key, value, age_seconds), balances as
+    (contract, symbol, account, amount, age_seconds).
+    """
+
+    def __init__(self, path, identity, max_age_seconds):
+        self.path = path
+        self.identity = dict(identity)
+        self.max_age_seconds = {str(kind): float(value) for kind, value in (max_age_seconds or {}).items()}
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _fresh(self, kind, age):
+        bound = self.max_age_seconds.get(kind, 0)
+        return bound > 0 and age <= bound
+
+    def _matches(self, identity):
+        # A field only one side knows (chain id without local signing) does not count
+        return all(identity.get(field) == value for field, value in self.identity.items()
+                   if value is not None and identity.get(field) is not None)
+
+    def save(self, rows, balances):
+        now = time.time()
+        document = {
+            "version": SNAPSHOT_VERSION,
+            "identity": self.identity,
+            "saved_at": now,
+            "rows": [[code, scope, table, key, value, now - age]
+                     for code, scope, table, key, value, age in rows if self._fresh(table, age)],
+            "balances": [[contract, symbol, account, str(amount), now - age]
+                         for contract, symbol, account, amount, age in balances if self._fresh("balances", age)],
+        }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix=".warm-start-", dir=directory)
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(document, f, separators=(",", ":"))
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        return len(document["rows"]), len(document["balances"])
+
+    def load(self):
+        """
+        (rows, balances, saved_at) still within their bounds; empty when there is no usable snapshot.
+        """
+        try:
+            with open(self.path) as f:
+                document = json.load(f)
+        except (OSError, ValueError):
+            return [], [], None
+        if document.get("version") != SNAPSHOT_VERSION or not self._matches(document.get("identity") or {}):
+            return [], [], None
+        now = time.time()
+        rows = [(code, scope, table, key, value, now - read_at)
+                for code, scope, table, key, value, read_at in document.get("rows", ())
+                if self._fresh(table, now - read_at)]
+        balances = [(contract, symbol, account, Decimal(amount), now - read_at)
+                    for contract, symbol, account, amount, read_at in document.get("balances", ())
+                    if self._fresh("balances", now - read_at)]
+        return rows, balances, document.get("saved_at")
+
+    def start(self, interval_seconds, collect, on_error=None):
+        """
+        Save collect() -> (rows, balances) every interval_seconds until stop().
+        """
+        def run():
+            while not self._stop.wait(interval_seconds):
+                try:
+                    self.save(*collect())
+                except Exception as e:
+                    if on_error:
+                        on_error(e)
+        self._thread = threading.Thread(target=run, name="warm-start", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,93 @@
+import random
+from decimal import Decimal
+
+import pytest
+
+from pydexbot.assets import Asset, _forced_side_decimal, cached_asset, forced_side, price_bands, quote_required_amount
+
+
+@pytest.mark.parametrize("text, amount, precision, symbol", [
+    ("13.68536925 FLON", 1368536925, 8, "FLON"),
+    ("0.494418 USDT", 494418, 6, "USDT"),
+    ("-1.50 EUR", -150, 2, "EUR"),
+    ("42 NFT", 42, 0, "NFT"),
+    ("0E-8 FLON", 0, 8, "FLON"),
+])
+def test_parse_and_format(text, amount, precision, symbol):
+    asset = Asset.parse(text)
+
+    assert (asset.amount, asset.precision, asset.symbol) == (amount, precision, symbol)
+    assert asset.decimal == Decimal(text.split()[0])
+    if "E" not in text:
+        assert str(asset) == text
+
+
+def test_amount_must_fit_int64():
+    with pytest.raises(ValueError):
+        Asset(2 ** 63, 4, "FLON")
+
+
+def test_cached_asset_is_shared():
+    assert cached_asset("1.0000 FLON") is cached_asset("1.0000 FLON")
+    assert cached_asset("1.0000 FLON") == Asset(10000, 4, "FLON")
+
+
+def pool(price, left_precision=8, right_precision=6):
+    left = Asset(1000 * 10 ** left_precision, left_precision, "FLON")
+    right = Asset(int(Decimal(price) * 1000 * 10 ** right_precision), right_precision, "USDT")
+    return left, right
+
+
+@pytest.mark.parametrize("price, side", [
+    ("0.0496", "right"),
+    ("0.04985", None),
+    ("0.05", None),
+    ("0.05015", None),
+    ("0.0504", "left"),
+])
+def test_deadband_forces_the_price_back_to_the_target(price, side):
+    bands = price_bands("0.05", "0.1", "0.006")
+
+    assert forced_side(*pool(price), bands) == side
+
+
+def test_correction_band_without_a_deadband():
+    bands = price_bands("0.05", "0.1")
+
+    assert forced_side(*pool("0.039"), bands) == "right"
+    assert forced_side(*pool("0.045"), bands) is None
+    assert forced_side(*pool("0.061"), bands) == "left"
+
+
+def test_prices_exactly_on_a_threshold_match_the_decimal_formulas():
+    bands = price_bands("0.05", "0.1", "0.006")
+    # 0.05 * (1 - 0.006) and 0.05 * (1 + 0.006): not outside the deadband
+    for price in ("0.0497", "0.0503"):
+        left, right = pool(price)
+        assert forced_side(left, right, bands) is None
+        assert forced_side(left, right, bands) == _forced_side_decimal(left, right, bands)
+
+
+def test_exact_decisions_agree_with_decimal_on_random_pools():
+    rng = random.Random(7)
+    for _ in range(2000):
+        target = Decimal(rng.randint(1, 10 ** 5)).scaleb(-rng.randint(2, 8))
+        fluctuation = Decimal(rng.randint(0, 600)).scaleb(-3)
+        deadband = rng.choice([None, Decimal(rng.randint(0, 50)).scaleb(-3)])
+        bands = price_bands(str(target), str(fluctuation), None if deadband is None else str(deadband))
+        left_precision, right_precision = rng.randint(0, 8), rng.randint(0, 8)
+        left = Asset(rng.randint(1, 10 ** (6 + left_precision)), left_precision, "FLON")
+        price = target * Decimal(rng.uniform(0.5, 1.5))
+        right_amount = int(left.decimal * price * 10 ** right_precision) or 1
+        right = Asset(right_amount, right_precision, "USDT")
+
+        assert forced_side(left, right, bands) == _forced_side_decimal(left, right, bands)
+
+
+def test_quote_required_amount_rounds_up_to_whole_units():
+    left, right = pool("0.05")
+
+    # 1.23456789 FLON at 0.05 USDT = 0.0617283945 USDT
+    assert quote_required_amount(Asset(123456789, 8, "FLON"), left, right, 6) == Decimal("0.061729")
+    # Exact amounts stay exact
+    assert quote_required_amount(Asset(100000000, 8, "FLON"), left, right, 6) == Decimal("0.05")
@@ -0,0 +1,102 @@
+import threading
+import time
+from decimal import Decimal
+
+from pydexbot.balances import BalanceFetcher
+
+
+class SlowBalances:
+    """
+    fetch_balance stand-in that returns the current chain amount and can hold a read in flight.
+    """
+
+    def __init__(self, amounts):
+        self.amounts = dict(amounts)
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+        self.started = threading.Event()
+
+    def __call__(self, contract, account, symbol):
+        amount = self.amounts[account]
+        self.calls.append(account)
+        self.started.set()
+        self.release.wait(2)
+        return amount
+
+
+def test_concurrent_misses_share_one_read():
+    fetch = SlowBalances({"bot1": Decimal("5")})
+    fetch.release.clear()
+    fetcher = BalanceFetcher(fetch, max_workers=4, ttl_seconds=10)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(fetcher.get("flon.token", "bot1", "FLON")))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    assert fetch.started.wait(2)
+    time.sleep(0.05)
+    fetch.release.set()
+    for thread in threads:
+        thread.join()
+    assert results == [Decimal("5")] * 4
+    assert fetch.calls == ["bot1"]
+
+
+def test_invalidate_discards_a_read_in_flight():
+    fetch = SlowBalances({"bot1": Decimal("100")})
+    fetch.release.clear()
+    fetcher = BalanceFetcher(fetch, ttl_seconds=10)
+    future = fetcher._submit("flon.token", "bot1", "FLON")
+    assert fetch.started.wait(2)
+    # Our trade spends the balance while the old read is still on the wire
+    fetch.amounts["bot1"] = Decimal("40")
+    fetcher.invalidate("flon.token", "bot1", "FLON")
+    fetch.release.set()
+    assert future.result() == Decimal("100")
+
+    assert fetcher.cached("flon.token", "bot1", "FLON") is None
+    assert fetcher.get("flon.token", "bot1", "FLON") == Decimal("40")
+    assert fetch.calls == ["bot1", "bot1"]
+
+
+def test_invalidate_account_discards_reads_in_flight():
+    fetch = SlowBalances({"bot1": Decimal("100")})
+    fetch.release.clear()
+    fetcher = BalanceFetcher(fetch, ttl_seconds=10)
+    future = fetcher._submit("flon.token", "bot1", "FLON")
+    assert fetch.started.wait(2)
+    fetcher.invalidate_account("bot1")
+    fetch.release.set()
+    future.result()
+    assert fetcher.cached("flon.token", "bot1", "FLON") is None
+
+
+def test_balances_expire_after_ttl():
+    fetch = SlowBalances({"bot1": Decimal("1")})
+    fetcher = BalanceFetcher(fetch, ttl_seconds=0.05)
+    fetcher.get("flon.token", "bot1", "FLON")
+    assert fetcher.cached("flon.token", "bot1", "FLON") == Decimal("1")
+    time.sleep(0.06)
+    assert fetcher.cached("flon.token", "bot1", "FLON") is None
+
+
+def test_least_recently_used_balance_is_evicted():
+    fetch = SlowBalances({f"bot{index}": Decimal(index) for index in range(3)})
+    fetcher = BalanceFetcher(fetch, ttl_seconds=10, max_entries=2)
+    fetcher.get("flon.token", "bot0", "FLON")
+    fetcher.get("flon.token", "bot1", "FLON")
+    fetcher.cached("flon.token", "bot0", "FLON")
+    fetcher.get("flon.token", "bot2", "FLON")
+    assert fetcher.cached("flon.token", "bot0", "FLON") == Decimal(0)
+    assert fetcher.cached("flon.token", "bot1", "FLON") is None
+    assert fetcher.cached("flon.token", "bot2", "FLON") == Decimal(2)
+
+
+def test_find_funded_stops_once_enough_bots_pass():
+    amounts = {f"bot{index}": Decimal(10 if index % 2 else 0) for index in range(10)}
+    fetcher = BalanceFetcher(SlowBalances(amounts), max_workers=1, ttl_seconds=10)
+    eligible, balances = fetcher.find_funded("flon.token", "FLON", list(amounts), lambda amount: amount >= 5, want=2)
+    assert len(eligible) == 2
+    assert all(amounts[bot] == 10 for bot in eligible)
+    assert all(balances[bot] == amounts[bot] for bot in balances)
@@ -0,0 +1,140 @@
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+from pydexbot.batcher import ActionBatcher, BatchResultError
+from pydexbot.trace_parser import split_result_by_action
+
+
+class Rejected(Exception):
+    pass
+
+
+class Chain:
+    """
+    Applies a batch of actions atomically: any action named "bad" rejects all of them.
+    """
+
+    def __init__(self):
+        self.pushes = []
+        self.applied = []
+        self.lock = threading.Lock()
+
+    def push_actions(self, actions):
+        with self.lock:
+            self.pushes.append(list(actions))
+        if "bad" in actions:
+            raise Rejected("assertion failure: bot cannot pay")
+        with self.lock:
+            self.applied.extend(actions)
+        traces = [{"action_ordinal": ordinal, "creator_action_ordinal": 0, "act": {"name": action}}
+                  for ordinal, action in enumerate(actions, 1)]
+        return {"transaction_id": "ab", "processed": {"action_traces": traces}}
+
+
+def own_action(result):
+    return [trace["act"]["name"] for trace in result["processed"]["action_traces"]]
+
+
+def run(batcher, actions):
+    futures = [batcher.submit(action) for action in actions]
+    batcher.close()
+    outcomes = []
+    for future in futures:
+        try:
+            outcomes.append(own_action(future.result()))
+        except Exception as e:
+            outcomes.append(e)
+    return outcomes
+
+
+def test_each_action_gets_only_its_own_traces():
+    chain = Chain()
+    batcher = ActionBatcher(chain.push_actions, split_result_by_action, window_seconds=0.05, max_actions=8)
+
+    assert run(batcher, ["a", "b", "c"]) == [["a"], ["b"], ["c"]]
+    assert chain.pushes == [["a", "b", "c"]]
+
+
+def test_rejected_batch_is_bisected_down_to_the_failing_action():
+    chain = Chain()
+    batcher = ActionBatcher(chain.push_actions, split_result_by_action, window_seconds=0.05, max_actions=8,
+                            max_inflight=1, is_retryable=lambda exc: isinstance(exc, Rejected))
+
+    outcomes = run(batcher, ["a", "b", "c", "bad", "e", "f", "g", "h"])
+
+    assert isinstance(outcomes[3], Rejected)
+    assert [outcome for index, outcome in enumerate(outcomes) if index != 3] == [[name] for name in "abcefgh"]
+    assert sorted(chain.applied) == list("abcefgh")
+    # Whole batch, then halves, then quarters, then the pair holding the failure split once more
+    assert chain.pushes[1:3] == [["a", "b", "c", "bad"], ["a", "b"]]
+    assert ["bad"] in chain.pushes
+
+
+def test_many_failures_push_a_rejected_batch_one_action_at_a_time():
+    chain = Chain()
+    batcher = ActionBatcher(chain.push_actions, split_result_by_action, is_retryable=lambda exc: isinstance(exc, Rejected))
+    # Failures rose while this batch was waiting to go out
+    batch = [(action, Future()) for action in ("a", "bad", "c")]
+    batcher._failure_ratio = 0.4
+
+    batcher._push_batch(batch)
+
+    assert own_action(batch[0][1].result()) == ["a"] and own_action(batch[2][1].result()) == ["c"]
+    assert isinstance(batch[1][1].exception(), Rejected)
+    assert chain.pushes == [["a", "bad", "c"], ["a"], ["bad"], ["c"]]
+    batcher.close()
+
+
+def test_batches_shrink_while_actions_fail():
+    batcher = ActionBatcher(lambda actions: None, split_result_by_action, max_actions=16)
+    assert batcher.batch_limit() == 16
+    batcher._failure_ratio = 0.1
+    assert batcher.batch_limit() == 5
+    batcher._failure_ratio = 0.9
+    assert batcher.batch_limit() == 1
+
+
+def test_transport_error_fails_the_batch_without_pushing_it_again():
+    pushes = []
+
+    def push_actions(actions):
+        pushes.append(list(actions))
+        raise TimeoutError("read timed out")
+
+    batcher = ActionBatcher(push_actions, split_result_by_action, window_seconds=0.05,
+                            is_retryable=lambda exc: not isinstance(exc, TimeoutError))
+
+    outcomes = run(batcher, ["a", "b"])
+
+    assert all(isinstance(outcome, TimeoutError) for outcome in outcomes)
+    assert pushes == [["a", "b"]]
+
+
+def test_result_that_does_not_split_per_action_fails_every_action():
+    chain = Chain()
+    batcher = ActionBatcher(chain.push_actions, lambda result: [result], window_seconds=0.05)
+
+    outcomes = run(batcher, ["a", "b"])
+
+    assert all(isinstance(outcome, BatchResultError) for outcome in outcomes)
+    assert own_action(outcomes[0].result) == ["a", "b"]
+    # The batch executed, so it is not pushed again
+    assert chain.pushes == [["a", "b"]]
+
+
+def test_close_pushes_what_is_still_queued():
+    chain = Chain()
+    batcher = ActionBatcher(chain.push_actions, split_result_by_action, window_seconds=60)
+    future = batcher.submit("a")
+    batcher.close()
+    assert own_action(future.result(timeout=5)) == ["a"]
+
+
+def test_single_action_result_is_passed_through_unsplit():
+    result = {"transaction_id": "ab", "processed": {"action_traces": []}}
+    batcher = ActionBatcher(lambda actions: result, lambda result: pytest.fail("split a single action"),
+                            window_seconds=0)
+    assert batcher.push("a") is result
+    batcher.close()
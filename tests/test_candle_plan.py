@@ -0,0 +1,64 @@
+import pytest
+
+from pydexbot import backtest
+from pydexbot.candle_plan import (
+    CANDLE_PHASES, SIDES, _plan_lists, candle_state, plan_schedule, schedule_boundaries, segment_side,
+)
+
+np = pytest.importorskip("numpy")
+
+PAIRS = ["flon.usdt", "sing.usdt", "zzzzzzzzzzzzj", "a"]
+START = 1_792_000_000
+
+
+@pytest.mark.parametrize("candle_seconds", [300, 7, 1])
+def test_vectorized_plan_equals_the_scalar_plan(candle_seconds):
+    times = list(range(START - 5, START + 3 * candle_seconds + 5))
+
+    sides, phases = plan_schedule(PAIRS, times, candle_seconds)
+
+    assert (sides.tolist(), phases.tolist()) == _plan_lists(PAIRS, times, candle_seconds, 900)
+    for i, trade_pair in enumerate(PAIRS):
+        for j, t in enumerate(times):
+            assert (SIDES[sides[i, j]], CANDLE_PHASES[phases[i, j]]) == candle_state(trade_pair, t, candle_seconds)
+
+
+def test_vectorized_segment_sides_equal_the_scalar_ones():
+    times = list(range(START, START + 4 * 900, 97))
+
+    sides, phases = plan_schedule(PAIRS, times, 0, side_segment_seconds=900)
+
+    assert (phases == -1).all()
+    assert sides.tolist() == [[SIDES.index(segment_side(pair, t, 900)) for t in times] for pair in PAIRS]
+
+
+def test_each_pair_may_have_its_own_times():
+    times = [[START + i * 11 + j * 37 for j in range(50)] for i in range(len(PAIRS))]
+
+    sides, phases = plan_schedule(PAIRS, times, 300)
+
+    assert (sides.tolist(), phases.tolist()) == _plan_lists(PAIRS, times, 300, 900)
+
+
+@pytest.mark.parametrize("candle_seconds", [300, 0])
+def test_plans_change_only_at_boundaries(candle_seconds):
+    start, end = START + 13, START + 3000
+    times = list(range(start, end))
+    sides, phases = plan_schedule(PAIRS, times, candle_seconds)
+    boundaries = set(schedule_boundaries(start, end, candle_seconds))
+
+    changes = {times[j] for j in range(1, len(times))
+               if (sides[:, j] != sides[:, j - 1]).any() or (phases[:, j] != phases[:, j - 1]).any()}
+
+    assert start in boundaries and changes <= boundaries
+
+
+def test_backtest_follows_the_plan_inside_the_band():
+    # A correction band down to zero and up to twice the target, and no deadband in reach
+    markets = backtest.synthetic_markets(backtest.synthetic_pair_names(20), fluctuation_ratio=1, seed=3)
+    result = backtest.run_backtest(markets, START, START + 3600, interval_seconds=8, deadband_ratio=100, seed=3)
+
+    assert result["ticks"] == 450 and (result["trades"] == 450).all()
+    assert result["reasons"][0].sum() == 20 * 450
+    again = backtest.run_backtest(markets, START, START + 3600, interval_seconds=8, deadband_ratio=100, seed=3)
+    assert np.array_equal(result["final_price"], again["final_price"])
@@ -0,0 +1,170 @@
+import time
+
+from pydexbot.chain_follower import ChainFollower
+from pydexbot.packing import encode_name
+
+MARKETS = ("flon.swap", "flon.swap", "markets")
+SCHEDULES = ("tokenx.mm", "tokenx.mm", "schedules")
+TABLES = {MARKETS: "tpcode", SCHEDULES: "trade_pair_name"}
+WATCH = {"flon.swap": (MARKETS,), "tokenx.mm": (SCHEDULES,)}
+PAIRS = ["flon.usdt", "sing.usdt"]
+
+
+class Chain:
+    def __init__(self):
+        self.head = 100
+        self.blocks = {}
+        self.tables = {
+            MARKETS: {pair: {"tpcode": pair, "price": "1"} for pair in PAIRS},
+            SCHEDULES: {pair: {"trade_pair_name": pair, "next": 0} for pair in PAIRS},
+        }
+        self.reads = []
+
+    def get_info(self):
+        return {"head_block_num": self.head}
+
+    def get_block(self, block_num):
+        return {"block_num": block_num, "id": f"id{block_num}", "previous": f"id{block_num - 1}",
+                **self.blocks.get(block_num, {"transactions": []})}
+
+    def get_table_rows(self, code, scope, table, lower, upper, limit):
+        self.reads.append((table, lower, upper))
+        rows = self.tables.get((code, scope, table), {})
+        keys = [pair for pair in sorted(rows, key=encode_name)
+                if encode_name(str(lower)) <= encode_name(pair) <= encode_name(str(upper))]
+        return {"rows": [rows[pair] for pair in keys[:limit]], "more": False, "next_key": ""}
+
+    def add_block(self, actions=(), table_deltas=None):
+        self.head += 1
+        block = {"transactions": [{"status": "executed", "trx": {"transaction": {"actions": list(actions)}}}]}
+        if table_deltas is not None:
+            block["table_deltas"] = table_deltas
+        self.blocks[self.head] = block
+
+
+def follower(chain, poll_seconds=0.5):
+    return ChainFollower(chain.get_info, chain.get_block, chain.get_table_rows, PAIRS, TABLES, WATCH,
+                         poll_seconds=poll_seconds, reconcile_seconds=0)
+
+
+def test_reconcile_mirrors_the_rows():
+    chain = Chain()
+    mirror = follower(chain)
+
+    assert mirror.poll()
+
+    assert mirror.row(*MARKETS, "flon.usdt") == (True, {"tpcode": "flon.usdt", "price": "1"})
+    assert mirror.row(*SCHEDULES, "sing.usdt")[0]
+    assert mirror.row(*MARKETS, "other.usdt") == (False, None)
+
+
+def test_an_action_naming_a_pair_rereads_the_pair_in_every_table():
+    chain = Chain()
+    mirror = follower(chain)
+    mirror.poll()
+    # An unwatched contract whose inline actions change both tables
+    chain.tables[MARKETS]["flon.usdt"]["price"] = "2"
+    chain.tables[SCHEDULES]["flon.usdt"]["next"] = 5
+    chain.add_block([{"account": "router.mm", "name": "route", "data": {"trade_pair": "flon.usdt"}}])
+    chain.reads.clear()
+
+    mirror.poll()
+
+    assert sorted(chain.reads) == [("markets", "flon.usdt", "flon.usdt"), ("schedules", "flon.usdt", "flon.usdt")]
+    assert mirror.row(*MARKETS, "flon.usdt")[1]["price"] == "2"
+    assert mirror.row(*SCHEDULES, "flon.usdt")[1]["next"] == 5
+
+
+def test_a_table_with_more_stale_rows_than_pages_is_read_in_full():
+    chain = Chain()
+    mirror = follower(chain)
+    mirror.poll()
+    chain.add_block([{"account": "router.mm", "name": "route", "data": {"trade_pair": pair}} for pair in PAIRS])
+    chain.reads.clear()
+
+    mirror.poll()
+
+    assert sorted(chain.reads) == [("markets", "flon.usdt", "sing.usdt"), ("schedules", "flon.usdt", "sing.usdt")]
+    assert mirror.stats()["stale_rows"] == 0
+
+
+def test_a_swap_memo_names_the_pair():
+    chain = Chain()
+    mirror = follower(chain)
+    mirror.poll()
+    chain.add_block([{"account": "usdt.token", "name": "transfer",
+                      "data": {"from": "trader", "to": "flon.swap", "memo": "swap:1.000000 USDT:sing.usdt"}}])
+    chain.reads.clear()
+
+    mirror.poll()
+
+    assert {lower for _, lower, _ in chain.reads} == {"sing.usdt"}
+
+
+def test_a_watched_action_naming_no_pair_rereads_its_tables():
+    chain = Chain()
+    mirror = follower(chain)
+    mirror.poll()
+    chain.tables[MARKETS]["sing.usdt"]["price"] = "3"
+    chain.add_block([{"account": "flon.swap", "name": "setfee", "data": {"fee_ratio": "0.002"}}])
+    chain.reads.clear()
+
+    mirror.poll()
+
+    # One range read of the whole table
+    assert chain.reads == [("markets", "flon.usdt", "sing.usdt")]
+    assert mirror.row(*MARKETS, "sing.usdt")[1]["price"] == "3"
+
+
+def test_table_deltas_are_applied_without_reads():
+    chain = Chain()
+    mirror = follower(chain)
+    mirror.poll()
+    row = {"tpcode": "flon.usdt", "price": "4"}
+    chain.add_block(table_deltas=[{"code": "flon.swap", "scope": "flon.swap", "table": "markets", "value": row}])
+    chain.reads.clear()
+
+    mirror.poll()
+
+    assert chain.reads == []
+    assert mirror.row(*MARKETS, "flon.usdt") == (True, row)
+
+
+def test_a_dirty_pair_is_read_until_its_block_is_applied():
+    chain = Chain()
+    mirror = follower(chain)
+    mirror.poll()
+
+    mirror.mark_dirty("flon.usdt", chain.head + 1)
+    assert not mirror.row(*MARKETS, "flon.usdt")[0]
+    assert mirror.row(*MARKETS, "sing.usdt")[0]
+    chain.add_block()
+    mirror.poll()
+
+    assert mirror.row(*MARKETS, "flon.usdt")[0]
+
+
+def test_a_balance_read_started_before_a_drop_is_not_mirrored():
+    chain = Chain()
+    mirror = follower(chain)
+    mirror.poll()
+    mirror.record_balance("flon.token", "bot1", "FLON", 10, time.monotonic())
+    assert mirror.balance("flon.token", "bot1", "FLON") == (True, 10)
+
+    read_started = time.monotonic()
+    chain.add_block([{"account": "tokenx.mm", "name": "sell", "data": {"bot": "bot1", "trade_pair_name": "flon.usdt"}}])
+    mirror.poll()
+    assert mirror.balance("flon.token", "bot1", "FLON") == (False, None)
+    mirror.record_balance("flon.token", "bot1", "FLON", 9, read_started)
+
+    assert mirror.balance("flon.token", "bot1", "FLON") == (False, None)
+
+
+def test_a_disabled_follower_keeps_nothing():
+    mirror = follower(Chain(), poll_seconds=0)
+
+    assert not mirror.enabled
+    mirror.mark_dirty("flon.usdt", 101)
+    mirror.record_balance("flon.token", "bot1", "FLON", 10, time.monotonic())
+
+    assert mirror.stats()["dirty"] == 0 and mirror.stats()["balances"] == 0
@@ -0,0 +1,104 @@
+import json
+from decimal import Decimal
+
+import pytest
+
+from pydexbot.assets import cached_asset
+from pydexbot.inspector import FIELDS, format_table, inspect_pairs
+
+WALLETS = {
+    ("flon.token", "FLON"): {"bot1": "6.00000000", "bot2": "4.00000000"},
+    ("usdt.token", "USDT"): {"bot1": "0.100000", "bot2": "2.000000"},
+}
+
+
+def pool(contract, quantity, total):
+    return {"balance": {"contract": contract, "quantity": quantity}, "total_quantity": total}
+
+
+class Service:
+    """
+    The bot_service functions the inspector reads through, over fixed rows.
+    """
+
+    BALANCE_CACHE_SECONDS = 0
+
+    def __init__(self, target_price="0.05", left_pool="5.00000000 FLON", paused=0):
+        self.market_config = {"min_trade_amount": "10.00000000 FLON", "target_price": target_price,
+                              "fluctuation_ratio": "0.1", "paused": paused}
+        self.swap_market = {"left_pool_quant": {"quantity": "200000.00000000 FLON"},
+                            "right_pool_quant": {"quantity": "10000.000000 USDT"}}
+        self.bot_market = {"left_pool": pool("flon.token", left_pool, "1000.00000000 FLON"),
+                           "right_pool": pool("usdt.token", "0.000000 USDT", "50.000000 USDT")}
+        self.bots = ["bot1", "bot2"]
+
+    def get_market_config(self, trade_pair):
+        return self.market_config
+
+    def get_swap_market(self, trade_pair):
+        return self.swap_market
+
+    def get_bot_market(self, trade_pair):
+        return self.bot_market
+
+    def get_bots_from_group(self, trade_pair):
+        return self.bots
+
+    def get_target_side_deadband_ratio(self, trade_pair):
+        return "0.5"
+
+    def calc_left_inventory_bps(self, bot_market, price):
+        left_value = cached_asset(bot_market["left_pool"]["total_quantity"]).decimal * price
+        return int(left_value * 10000 / (left_value + cached_asset(bot_market["right_pool"]["total_quantity"]).decimal))
+
+    def side_required_balance(self, side, market_config, swap_market, bot_market):
+        balance = cached_asset(bot_market[f"{side}_pool"]["balance"]["quantity"])
+        required = Decimal("10") if side == "left" else Decimal("0.5")
+        return bot_market[f"{side}_pool"]["balance"]["contract"], balance.symbol, balance.decimal, required
+
+    def get_currency_balance(self, contract, account, symbol):
+        return Decimal(WALLETS[(contract, symbol)][account])
+
+
+def test_a_row_per_pair_with_price_inventory_and_funded_bots():
+    [row] = inspect_pairs(Service(), ["flon.usdt"], workers=2)
+
+    assert list(row) == list(FIELDS)
+    assert row == {
+        "pair": "flon.usdt", "paused": False, "price": 0.05, "target_price": 0.05, "deviation": 0.0,
+        "forced_side": None, "inventory_bps": 5000, "bots": 2,
+        # The pool holds 5 of the 10 FLON a sell needs, so wallets must cover 5
+        "funded_sell": 1, "funded_buy": 1,
+        "pool_left": "5.00000000 FLON", "pool_right": "0.000000 USDT",
+        "wallets_left": "10.00000000 FLON", "wallets_right": "2.100000 USDT", "error": None,
+    }
+    assert json.loads(json.dumps(row)) == row
+
+
+def test_the_band_side_and_a_pool_that_covers_the_trade():
+    service = Service(target_price="0.04", left_pool="20.00000000 FLON", paused=1)
+
+    [row] = inspect_pairs(service, ["flon.usdt"])
+
+    assert row["paused"] is True
+    assert row["deviation"] == pytest.approx(0.25)
+    assert row["forced_side"] == "sell"
+    # Every bot can sell when the pool covers the trade
+    assert row["funded_sell"] == 2
+
+
+def test_missing_rows_and_read_errors_become_the_row_error():
+    service = Service()
+    service.bot_market = None
+    [missing] = inspect_pairs(service, ["flon.usdt"])
+
+    class Failing(Service):
+        def get_swap_market(self, trade_pair):
+            raise ConnectionError("node down")
+
+    rows = inspect_pairs(Failing(), ["flon.usdt", "sing.usdt"])
+
+    assert missing["error"] == "no botmarkets row" and missing["bots"] == 2
+    assert [row["error"] for row in rows] == ["node down", "node down"]
+    assert [row["pair"] for row in rows] == ["flon.usdt", "sing.usdt"]
+    assert "error" in format_table(rows).splitlines()[0]
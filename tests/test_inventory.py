@@ -0,0 +1,97 @@
+import random
+from collections import Counter
+from decimal import Decimal
+
+from pydexbot.inventory import InventoryIndex, InventoryLedger, balance_bucket
+
+
+def index_of(balances, seed=1):
+    index = InventoryIndex(random.Random(seed))
+    for bot, amount in balances.items():
+        index.set(bot, Decimal(amount))
+    return index
+
+
+def test_balance_buckets_are_powers_of_two():
+    assert [balance_bucket(Decimal(amount)) for amount in ("0.5", "1", "1.99", "2", "3", "4")] == [0, 1, 1, 2, 2, 3]
+    assert balance_bucket(Decimal(0)) is None and balance_bucket(Decimal(-1)) is None
+
+
+def test_higher_buckets_are_picked_before_the_bucket_of_need():
+    # need 5 is in bucket 3 with bot5 and bot7; bot9 is in bucket 4
+    index = index_of({"bot1": "1", "bot5": "5", "bot7": "7", "bot9": "9"})
+
+    assert {index.pick(Decimal(5)) for _ in range(200)} == {"bot9"}
+    index.remove("bot9")
+    # Only now is the bucket of need searched, for bots holding at least need
+    assert {index.pick(Decimal(6)) for _ in range(200)} == {"bot7"}
+    assert {index.pick(Decimal(5)) for _ in range(200)} == {"bot5", "bot7"}
+    assert index.pick(Decimal(8)) is None
+
+
+def test_picks_are_weighted_by_balance():
+    index = index_of({"small": "1", "large": "3", "empty": "0"})
+
+    counts = Counter(index.pick(Decimal("0.1")) for _ in range(20000))
+
+    assert set(counts) == {"small", "large"}
+    assert 0.72 < counts["large"] / 20000 < 0.78
+
+
+def test_zero_need_and_empty_index():
+    assert InventoryIndex().pick(Decimal(1)) is None
+    index = index_of({"bot1": "0", "bot2": "0"})
+    assert index.pick(Decimal(0)) in {"bot1", "bot2"}
+    assert index.pick(Decimal("0.1")) is None
+
+
+def test_set_and_remove_keep_the_buckets_consistent():
+    index = index_of({f"bot{i}": str(i + 1) for i in range(8)})
+
+    index.set("bot0", Decimal(100))
+    index.remove("bot3")
+    index.set("bot7", Decimal(0))
+
+    assert len(index) == 7 and index.balance("bot3") is None
+    assert {index.pick(Decimal(70)) for _ in range(50)} == {"bot0"}
+    assert "bot7" not in {index.pick(Decimal("0.5")) for _ in range(500)}
+
+
+class Balances:
+    def __init__(self, balances):
+        self.balances = balances
+        self.reads = []
+
+    def __call__(self, contract, symbol, bots):
+        self.reads.append(list(bots))
+        return {bot: Decimal(self.balances[bot]) for bot in bots}
+
+
+def test_ledger_reads_once_then_moves_balances_by_transfers():
+    fetch = Balances({"bot1": "10", "bot2": "0"})
+    ledger = InventoryLedger(fetch, rng=random.Random(1))
+    bots = ["bot1", "bot2"]
+
+    assert ledger.pick("flon.usdt", "flon.token", "FLON", bots, Decimal(5)) == "bot1"
+    ledger.apply_transfers([("flon.token", "bot1", "bot2", "8.00000000 FLON")])
+
+    assert ledger.pick("flon.usdt", "flon.token", "FLON", bots, Decimal(5)) == "bot2"
+    assert ledger.balance("flon.usdt", "flon.token", "FLON", "bot1") == Decimal(2)
+    assert fetch.reads == [bots]
+
+
+def test_invalidated_bots_are_read_again_before_the_next_pick():
+    fetch = Balances({"bot1": "10", "bot2": "1"})
+    ledger = InventoryLedger(fetch, rng=random.Random(1))
+    bots = ["bot1", "bot2"]
+    ledger.pick("flon.usdt", "flon.token", "FLON", bots, Decimal(5))
+
+    fetch.balances["bot1"] = "0"
+    ledger.invalidate("bot1")
+
+    assert ledger.pick("flon.usdt", "flon.token", "FLON", bots, Decimal(5)) is None
+    assert fetch.reads == [bots, ["bot1"]]
+    # A changed bot group is read in full
+    fetch.balances["bot3"] = "6"
+    assert ledger.pick("flon.usdt", "flon.token", "FLON", bots + ["bot3"], Decimal(5)) == "bot3"
+    assert fetch.reads[-1] == ["bot1", "bot2", "bot3"]
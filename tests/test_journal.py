@@ -0,0 +1,91 @@
+import json
+import os
+
+import pytest
+
+from pydexbot import journal, runtime
+from pydexbot.journal import COLUMNS, TradeJournal, day_name, query
+
+np = pytest.importorskip("numpy")
+
+AT = 1760000000.0
+
+
+def write_attempts(directory):
+    trade_journal = TradeJournal(directory)
+    trade_journal.record("flon.usdt", "bot1", "sell", "trade", 10, 0.5, 0.02, "ab" * 32, at=AT)
+    trade_journal.record("flon.usdt", "bot2", "buy", "no_fill", latency_seconds=0.01, at=AT + 1)
+    trade_journal.record("sing.usdt", None, "", "no_funded_bot", at=AT + 86400)
+    trade_journal.close()
+
+
+def test_records_round_trip(tmp_path):
+    write_attempts(str(tmp_path))
+
+    rows = {row["pair"]: row for row in query(str(tmp_path))}
+
+    assert rows["flon.usdt"]["attempts"] == 2
+    assert (rows["flon.usdt"]["trade"], rows["flon.usdt"]["no_fill"]) == (1, 1)
+    assert rows["flon.usdt"]["base_volume"] == 10.0 and rows["flon.usdt"]["quote_volume"] == 0.5
+    assert rows["flon.usdt"]["avg_price"] == pytest.approx(0.05)
+    assert rows["flon.usdt"]["latency_ms_max"] == pytest.approx(20.0)
+    assert rows["sing.usdt"]["no_funded_bot"] == 1
+    bots = {row["bot"]: row["outcome"] for row in query(str(tmp_path), pairs={"flon.usdt"}, group_by=("bot", "outcome"))}
+    assert bots == {"bot1": "trade", "bot2": "no_fill"}
+
+
+def test_unattributed_batch_trades_are_counted_apart_from_failures(tmp_path):
+    trade_journal = TradeJournal(str(tmp_path))
+    trade_journal.record("flon.usdt", "bot1", "sell", "executed_unattributed", trx_id="cd" * 32, at=AT)
+    trade_journal.record("flon.usdt", "bot2", "sell", "failed", at=AT + 1)
+    trade_journal.close()
+
+    row = query(str(tmp_path), group_by=())[0]
+
+    assert (row["executed_unattributed"], row["failed"], row["trade"]) == (1, 1, 0)
+
+
+def test_time_range_skips_other_days(tmp_path):
+    write_attempts(str(tmp_path))
+
+    rows = query(str(tmp_path), since=int(AT * 1e6), until=int((AT + 3600) * 1e6), group_by=())
+
+    assert rows[0]["attempts"] == 2
+
+
+def test_partial_record_is_dropped_when_the_day_is_reopened(tmp_path):
+    write_attempts(str(tmp_path))
+    day = os.path.join(str(tmp_path), day_name(int(AT * 1e6)))
+    with open(os.path.join(day, "time"), "ab") as f:
+        f.write(b"\x01" * 8)
+
+    trade_journal = TradeJournal(str(tmp_path))
+    trade_journal.record("flon.usdt", "bot1", "sell", "failed", at=AT + 2)
+    trade_journal.close()
+
+    records = {os.path.getsize(os.path.join(day, name)) // np.dtype(dtype).itemsize for name, _, dtype in COLUMNS}
+    assert records == {3}
+    assert query(str(tmp_path), pairs={"flon.usdt"}, group_by=())[0]["attempts"] == 3
+
+
+def test_cli_reads_journal_dir_from_the_config(tmp_path, monkeypatch, capsys):
+    journal_dir = tmp_path / "journal"
+    write_attempts(str(journal_dir))
+    config_dir = tmp_path / "config"
+    config_dir.mkdir()
+    (config_dir / ".config.yaml").write_text(f"journal_dir: {journal_dir}\n")
+    monkeypatch.setattr(runtime, "_RUNTIME", None)
+
+    journal.main(["--config-dir", str(config_dir), "--json", "--group-by", ""])
+
+    assert json.loads(capsys.readouterr().out)[0]["attempts"] == 3
+
+
+def test_cli_dir_overrides_the_config(tmp_path, monkeypatch, capsys):
+    write_attempts(str(tmp_path / "other"))
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(runtime, "_RUNTIME", None)
+
+    journal.main(["--dir", str(tmp_path / "other"), "--json", "--group-by", ""])
+
+    assert json.loads(capsys.readouterr().out)[0]["attempts"] == 3
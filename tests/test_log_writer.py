@@ -0,0 +1,127 @@
+import json
+import os
+import time
+
+from pydexbot.log_writer import LogWriter
+
+
+def rotated(path):
+    directory, name = os.path.split(path)
+    return sorted(entry for entry in os.listdir(directory) if entry.startswith(name + "."))
+
+
+def test_lines_are_batched_until_a_flush(tmp_path):
+    path = str(tmp_path / "logs" / "trade.log")
+    writer = LogWriter(flush_bytes=1 << 20, flush_interval_seconds=60)
+
+    writer.write("INFO", "round %d of %s", (1, "flon.usdt"), path)
+    writer.write("ERROR", "push failed", (), path)
+    time.sleep(0.05)
+    assert not os.path.exists(path)
+
+    writer.flush()
+    with open(path) as f:
+        assert f.read() == "[INFO] round 1 of flon.usdt\n[ERROR] push failed\n"
+    writer.close()
+
+
+def test_flush_bytes_triggers_a_write(tmp_path):
+    path = str(tmp_path / "trade.log")
+    writer = LogWriter(flush_bytes=64, flush_interval_seconds=60)
+
+    for index in range(10):
+        writer.write("INFO", f"line {index:02d} of the batch", (), path)
+    deadline = time.monotonic() + 2
+    while not os.path.exists(path) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert os.path.getsize(path) >= 64
+    writer.close()
+    assert os.path.getsize(path) == 10 * len("[INFO] line 00 of the batch\n")
+
+
+def test_bad_format_arguments_keep_the_line():
+    writer = LogWriter()
+
+    assert writer._format(0, "INFO", "%d pairs", ("many",), None) == "[INFO] %d pairs ('many',)\n"
+
+
+def test_json_lines(tmp_path):
+    path = str(tmp_path / "trade.log")
+    writer = LogWriter(json_lines=True)
+
+    writer.write("INFO", "traded %s", ("flon.usdt",), path)
+    writer.close()
+
+    with open(path) as f:
+        record = json.loads(f.read())
+    assert (record["level"], record["msg"]) == ("INFO", "traded flon.usdt")
+
+
+def test_first_flush_rotates_a_file_left_by_an_earlier_run(tmp_path):
+    path = str(tmp_path / "trade.log")
+    with open(path, "w") as f:
+        f.write("x" * 90 + "\n")
+    writer = LogWriter(max_bytes=100)
+
+    writer.write("INFO", "after restart", (), path)
+    writer.close()
+
+    with open(path) as f:
+        assert f.read() == "[INFO] after restart\n"
+    [old] = rotated(path)
+    assert os.path.getsize(tmp_path / old) == 91
+
+
+def test_size_rotation_across_flushes(tmp_path):
+    path = str(tmp_path / "trade.log")
+    writer = LogWriter(max_bytes=50)
+    line = "[INFO] twenty bytes.\n"
+
+    for _ in range(5):
+        writer.write("INFO", "twenty bytes.", (), path)
+        writer.flush()
+    writer.close()
+
+    files = [path] + [str(tmp_path / name) for name in rotated(path)]
+    sizes = sorted(os.path.getsize(name) for name in files)
+    assert sum(sizes) == 5 * len(line)
+    assert all(size <= 50 for size in sizes)
+
+
+def test_a_batch_larger_than_max_bytes_is_not_split(tmp_path):
+    path = str(tmp_path / "trade.log")
+    writer = LogWriter(max_bytes=10)
+
+    writer.write("INFO", "longer than ten bytes", (), path)
+    writer.close()
+
+    assert rotated(path) == []
+    assert os.path.getsize(path) == len("[INFO] longer than ten bytes\n")
+
+
+def test_daily_rotation(tmp_path):
+    path = str(tmp_path / "trade.log")
+    writer = LogWriter(rotate_daily=True)
+    days = iter(["2026-10-17", "2026-10-17", "2026-10-18"])
+    writer._today = lambda: next(days)
+
+    writer.write("INFO", "before midnight", (), path)
+    writer.flush()
+    writer.write("INFO", "after midnight", (), path)
+    writer.close()
+
+    assert rotated(path) == ["trade.log.2026-10-17"]
+    with open(tmp_path / "trade.log.2026-10-17") as f:
+        assert f.read() == "[INFO] before midnight\n"
+    with open(path) as f:
+        assert f.read() == "[INFO] after midnight\n"
+
+
+def test_lines_without_a_file_go_to_stdout(capsys):
+    writer = LogWriter()
+
+    writer.write("INFO", "service started")
+    writer.close()
+
+    assert capsys.readouterr().out == "[INFO] service started\n"
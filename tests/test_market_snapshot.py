@@ -0,0 +1,110 @@
+from pydexbot.market_snapshot import MarketSnapshotService
+from pydexbot.packing import encode_name
+
+MARKETS = ("flon.swap", "flon.swap", "markets")
+TRADEMARKETS = ("buylowsellhi", "buylowsellhi", "trademarkets")
+PAIRS = ["aaa.usdt", "bbb.usdt", "ccc.usdt", "ddd.usdt", "eee.usdt"]
+
+
+class Node:
+    """
+    Range reads over name-keyed tables, with more and next_key as nodeos pages them.
+    """
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.reads = []
+
+    def get_table_rows(self, code, scope, table, lower, upper, limit):
+        self.reads.append((table, lower, upper))
+        rows = self.tables[(code, scope, table)]
+        names = [name for name in sorted(rows, key=encode_name) if encode_name(lower) <= encode_name(name) <= encode_name(upper)]
+        page = names[:limit]
+        more = len(names) > limit
+        return {"rows": [rows[name] for name in page], "more": more, "next_key": names[limit] if more else ""}
+
+
+def market_rows(pairs):
+    return {pair: {"tpcode": pair, "price": pair[0]} for pair in pairs}
+
+
+def service(node, tables, **options):
+    return MarketSnapshotService(node.get_table_rows, PAIRS, tables, refresh_seconds=1, **options)
+
+
+def test_refresh_follows_next_key_across_pages():
+    # ccc.usdt has no row; zzz.usdt is outside the configured pairs
+    node = Node({MARKETS: market_rows(["aaa.usdt", "bbb.usdt", "ddd.usdt", "eee.usdt", "zzz.usdt"])})
+    snapshots = service(node, {MARKETS: "tpcode"}, page_limit=2)
+
+    snapshot = snapshots.refresh()
+
+    assert node.reads == [("markets", "aaa.usdt", "eee.usdt"), ("markets", "ddd.usdt", "eee.usdt")]
+    assert snapshots.row(*MARKETS, "eee.usdt") == (True, {"tpcode": "eee.usdt", "price": "e"})
+    # Inside the range read without a row
+    assert snapshots.row(*MARKETS, "ccc.usdt") == (True, None)
+    assert snapshots.row(*MARKETS, "zzz.usdt") == (False, None)
+    assert snapshot.rows(*MARKETS).keys() == set(PAIRS)
+
+
+def test_pairs_beyond_max_pages_are_left_to_point_reads():
+    node = Node({MARKETS: market_rows(["aaa.usdt", "bbb.usdt", "ddd.usdt", "eee.usdt"])})
+    snapshots = service(node, {MARKETS: "tpcode"}, page_limit=2, max_pages=1)
+
+    snapshots.refresh()
+
+    assert len(node.reads) == 1
+    assert snapshots.row(*MARKETS, "bbb.usdt")[0]
+    assert snapshots.row(*MARKETS, "ccc.usdt") == (False, None)
+    assert snapshots.row(*MARKETS, "eee.usdt") == (False, None)
+
+
+def test_key_fields_are_tried_in_order():
+    rows = {"aaa.usdt": {"name": "aaa.usdt"}, "bbb.usdt": {"trade_pair_name": "bbb.usdt"}}
+    node = Node({TRADEMARKETS: rows})
+    snapshots = service(node, {TRADEMARKETS: ("name", "trade_pair_name")})
+
+    snapshots.refresh()
+
+    assert snapshots.row(*TRADEMARKETS, "aaa.usdt") == (True, rows["aaa.usdt"])
+    assert snapshots.row(*TRADEMARKETS, "bbb.usdt") == (True, rows["bbb.usdt"])
+
+
+def test_a_dirty_pair_is_served_again_by_a_refresh_started_after_the_mark():
+    node = Node({MARKETS: market_rows(PAIRS)})
+    snapshots = service(node, {MARKETS: "tpcode"})
+    snapshots.refresh()
+
+    snapshots.mark_dirty("bbb.usdt")
+
+    assert snapshots.row(*MARKETS, "bbb.usdt") == (False, None)
+    assert snapshots.row(*MARKETS, "aaa.usdt")[0]
+    snapshots.refresh()
+    assert snapshots.row(*MARKETS, "bbb.usdt")[0]
+
+
+def test_a_mark_during_a_refresh_holds_until_the_next_one():
+    node = Node({MARKETS: market_rows(PAIRS)})
+    trades = ["ccc.usdt"]
+
+    def read_then_trade(*args):
+        resp = node.get_table_rows(*args)
+        # Our trade lands after the page was read
+        while trades:
+            snapshots.mark_dirty(trades.pop())
+        return resp
+
+    snapshots = MarketSnapshotService(read_then_trade, PAIRS, {MARKETS: "tpcode"}, refresh_seconds=1)
+    snapshots.refresh()
+
+    assert snapshots.row(*MARKETS, "ccc.usdt") == (False, None)
+    snapshots.refresh()
+    assert snapshots.row(*MARKETS, "ccc.usdt")[0]
+
+
+def test_invalid_pair_names_are_not_read():
+    node = Node({MARKETS: market_rows(PAIRS)})
+    snapshots = MarketSnapshotService(node.get_table_rows, ["Not-A-Name"], {MARKETS: "tpcode"}, refresh_seconds=1)
+
+    assert not snapshots.enabled
+    assert snapshots.refresh() is None and node.reads == []
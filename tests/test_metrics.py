@@ -0,0 +1,36 @@
+from pydexbot.metrics import Metrics
+
+
+def test_render_mixes_int_and_str_label_values():
+    metrics = Metrics()
+    metrics.inc("rpc_errors", node="http://a", endpoint="get_table_rows", status=503)
+    metrics.inc("rpc_errors", node="http://a", endpoint="get_table_rows", status="transport")
+    metrics.observe("rpc_seconds", 0.02, node="http://a", status=200)
+    metrics.observe("rpc_seconds", 0.03, node="http://a", status="transport")
+
+    text = metrics.render()
+
+    assert 'pydexbot_rpc_errors_total{endpoint="get_table_rows",node="http://a",status="503"} 1' in text
+    assert 'pydexbot_rpc_errors_total{endpoint="get_table_rows",node="http://a",status="transport"} 1' in text
+    assert 'pydexbot_rpc_seconds_count{node="http://a",status="200"} 1' in text
+
+
+def test_int_and_str_label_values_share_a_series():
+    metrics = Metrics()
+    metrics.inc("rpc_errors", status=503)
+    metrics.inc("rpc_errors", status="503")
+
+    assert 'pydexbot_rpc_errors_total{status="503"} 2' in metrics.render()
+
+
+def test_histogram_buckets_are_cumulative():
+    metrics = Metrics(buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.5, 5.0):
+        metrics.observe("round_seconds", seconds, pair="flon.usdt")
+
+    text = metrics.render()
+
+    assert 'pydexbot_round_seconds_bucket{pair="flon.usdt",le="0.1"} 1' in text
+    assert 'pydexbot_round_seconds_bucket{pair="flon.usdt",le="1.0"} 2' in text
+    assert 'pydexbot_round_seconds_bucket{pair="flon.usdt",le="+Inf"} 3' in text
+    assert 'pydexbot_round_seconds_count{pair="flon.usdt"} 3' in text
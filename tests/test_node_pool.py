@@ -0,0 +1,157 @@
+import json
+import socket
+import threading
+import time
+import urllib.error
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from pydexbot.node_pool import NodePool, RpcError, is_connect_error
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.server.paths.append(self.path)
+        body = json.dumps(self.server.answer).encode()
+        self.send_response(self.server.status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def node():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.paths = []
+    server.answer = {"rows": [{"id": 1}]}
+    server.status = 200
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def closed_url():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+def test_read_fails_over_to_the_next_node(node):
+    down = closed_url()
+    pool = NodePool([down, node.url], hedge_enabled=False, health_interval_seconds=0)
+
+    assert pool.read("/v1/chain/get_table_rows", {"table": "markets"}) == {"rows": [{"id": 1}]}
+    assert node.paths == ["/v1/chain/get_table_rows"]
+    assert pool.ranked() == [node.url, down]
+
+
+def test_write_fails_over_on_overload_but_not_on_a_chain_error(node):
+    node.status = 503
+    pool = NodePool([node.url], hedge_enabled=False, health_interval_seconds=0)
+    with pytest.raises(RpcError) as raised:
+        pool.write("/v1/chain/push_transaction", {})
+    assert raised.value.status == 503
+
+    node.status = 500
+    with pytest.raises(RpcError) as raised:
+        pool.write("/v1/chain/push_transaction", {})
+    assert raised.value.status == 500
+    assert len(node.paths) == 2
+
+
+def test_push_fails_over_when_the_node_refused_the_connection():
+    pool = NodePool(["http://a", "http://b"], health_interval_seconds=0)
+    nodes = []
+    current = []
+
+    def submit():
+        if current[-1] == "http://a":
+            raise urllib.error.URLError(ConnectionRefusedError(111, "Connection refused"))
+        return {"transaction_id": "ab"}
+
+    assert pool.push(submit, lambda url: (nodes.append(url), current.append(url))) == {"transaction_id": "ab"}
+    assert nodes == ["http://a", "http://b"]
+    assert pool.ranked() == ["http://b", "http://a"]
+
+
+@pytest.mark.parametrize("error", [TimeoutError("timed out"), ConnectionResetError(104, "reset by peer")])
+def test_push_does_not_resign_after_the_node_may_have_the_transaction(error):
+    pool = NodePool(["http://a", "http://b"], health_interval_seconds=0)
+    calls = []
+
+    def submit():
+        calls.append(1)
+        raise error
+
+    with pytest.raises(type(error)):
+        pool.push(submit, lambda url: None)
+    assert len(calls) == 1
+
+
+def test_push_raises_chain_errors_without_retrying():
+    pool = NodePool(["http://a", "http://b"], health_interval_seconds=0)
+    calls = []
+
+    def submit():
+        calls.append(1)
+        raise RuntimeError("assertion failure: no fill")
+
+    with pytest.raises(RuntimeError):
+        pool.push(submit, lambda url: None)
+    assert len(calls) == 1
+    assert pool.ranked() == ["http://a", "http://b"]
+
+
+def test_push_does_not_move_the_node_under_a_running_push():
+    pool = NodePool(["http://a", "http://b"], health_interval_seconds=0)
+    current = ["http://a"]
+    seen = []
+    started = threading.Event()
+
+    def slow_submit():
+        node = current[0]
+        started.set()
+        time.sleep(0.2)
+        seen.append((node, current[0]))
+
+    def set_node(url):
+        current[0] = url
+
+    first = threading.Thread(target=pool.push, args=(slow_submit, set_node))
+    first.start()
+    started.wait()
+    # The ranking now prefers b; the move waits for the push running against a
+    pool.record_failure("http://a")
+    pool.push(lambda: seen.append((current[0], current[0])), set_node)
+    first.join()
+
+    assert seen == [("http://a", "http://a"), ("http://b", "http://b")]
+
+
+def test_no_candidate_raises_a_connection_error():
+    pool = NodePool(["http://a"], health_interval_seconds=0)
+    with pytest.raises(ConnectionError):
+        pool._read_in_order([], "/v1/chain/get_info", {})
+
+
+def test_connect_errors_are_told_from_errors_after_sending():
+    assert is_connect_error(ConnectionRefusedError(111, "refused"))
+    assert is_connect_error(urllib.error.URLError(socket.gaierror(-2, "Name or service not known")))
+    try:
+        try:
+            raise ConnectionRefusedError(111, "refused")
+        except OSError as e:
+            raise RuntimeError("wrapped") from e
+    except RuntimeError as wrapped:
+        assert is_connect_error(wrapped)
+    assert not is_connect_error(TimeoutError("read timed out"))
+    assert not is_connect_error(ConnectionResetError(104, "reset"))
+    assert not is_connect_error(RpcError("http://a", 500, "no fill"))
@@ -0,0 +1,121 @@
+import struct
+
+import pytest
+
+from pydexbot.packing import AbiCache, ActionPacker, ActionTemplate, compile_action, decode_name, encode_name
+
+ACTIONS = ("trade", "buy", "sell")
+
+
+def trade_abi(memo_type="string"):
+    return {
+        "version": "eosio::abi/1.2",
+        "types": [{"new_type_name": "memo_t", "type": memo_type}],
+        "structs": [
+            {"name": "trade_base", "base": "", "fields": [{"name": "bot", "type": "name"}]},
+        ] + [
+            {"name": action, "base": "trade_base", "fields": [
+                {"name": "trade_pair_name", "type": "name"},
+                {"name": "memo", "type": "memo_t"},
+            ]}
+            for action in ACTIONS
+        ],
+        "actions": [{"name": action, "type": action, "ricardian_contract": ""} for action in ACTIONS],
+        "tables": [],
+    }
+
+
+def pack_args(contract, action_name, args):
+    # Field by field, as the chain serializes trade_base + {trade_pair_name, memo}
+    memo = args["memo"].encode()
+    assert len(memo) < 0x80
+    return (struct.pack("<Q", encode_name(args["bot"])) + struct.pack("<Q", encode_name(args["trade_pair_name"]))
+            + bytes([len(memo)]) + memo)
+
+
+class CountingPackArgs:
+    def __init__(self, pack=pack_args):
+        self.pack = pack
+        self.calls = 0
+
+    def __call__(self, contract, action_name, args):
+        self.calls += 1
+        return self.pack(contract, action_name, args)
+
+
+class Abis:
+    def __init__(self, abi):
+        self.abi = abi
+
+    def get(self, account):
+        return self.abi
+
+
+SAMPLES = [
+    {"bot": "botuser1aaaa", "trade_pair_name": "flon.usdt", "memo": ""},
+    {"bot": "botuser1abcd", "trade_pair_name": "flon.usdt", "memo": "4294967295:candle_phase=body"},
+    {"bot": "a", "trade_pair_name": "flon.usdt", "memo": "x" * 100},
+]
+
+
+def test_names_round_trip_and_reject_invalid_characters():
+    for name in ("flon.usdt", "botuser1abcd", "a", "zzzzzzzzzzzzj"):
+        assert decode_name(encode_name(name)) == name
+    for name in ("Flon", "bot0", "zzzzzzzzzzzzzz", "zzzzzzzzzzzzz"):
+        with pytest.raises(ValueError):
+            encode_name(name)
+
+
+@pytest.mark.parametrize("args", SAMPLES)
+def test_template_packing_equals_pack_args(args):
+    template = ActionTemplate(compile_action(trade_abi(), "sell"), {"trade_pair_name": "flon.usdt"})
+
+    assert template.pack(args) == pack_args("tokenx.mm", "sell", args)
+
+
+def test_packer_checks_each_template_once():
+    checked = CountingPackArgs()
+    packer = ActionPacker(Abis(trade_abi()), checked)
+
+    for args in SAMPLES * 3:
+        assert packer.pack("tokenx.mm", "sell", args) == pack_args("tokenx.mm", "sell", args)
+
+    assert checked.calls == 1
+    # Another fixed pair gets its own template
+    packer.pack("tokenx.mm", "sell", dict(SAMPLES[0], trade_pair_name="sing.usdt"))
+    assert checked.calls == 2
+
+
+def test_packer_falls_back_to_pack_args_when_the_template_differs():
+    differs = CountingPackArgs(lambda contract, action_name, args: b"\x00" + pack_args(contract, action_name, args))
+    packer = ActionPacker(Abis(trade_abi()), differs)
+
+    for args in SAMPLES:
+        assert packer.pack("tokenx.mm", "sell", args)[:1] == b"\x00"
+
+    assert differs.calls == len(SAMPLES) + 1
+
+
+def test_unsupported_field_types_fall_back_to_pack_args():
+    checked = CountingPackArgs(lambda contract, action_name, args: b"asset")
+    packer = ActionPacker(Abis(trade_abi(memo_type="asset")), checked)
+
+    assert packer.pack("tokenx.mm", "sell", SAMPLES[0]) == b"asset"
+    assert packer.template("tokenx.mm", "sell", SAMPLES[0]) is False
+
+
+def test_abi_cache_reuses_the_persisted_abi_while_the_code_hash_matches(tmp_path):
+    fetches = []
+    code_hash = ["aa"]
+
+    def get_abi(account):
+        fetches.append(account)
+        return {"abi": trade_abi()}
+
+    assert AbiCache(str(tmp_path), get_abi, lambda account: code_hash[0]).get("tokenx.mm") == trade_abi()
+    AbiCache(str(tmp_path), get_abi, lambda account: code_hash[0]).get("tokenx.mm")
+    assert fetches == ["tokenx.mm"]
+
+    code_hash[0] = "bb"
+    AbiCache(str(tmp_path), get_abi, lambda account: code_hash[0]).get("tokenx.mm")
+    assert fetches == ["tokenx.mm", "tokenx.mm"]
@@ -0,0 +1,85 @@
+from decimal import Decimal
+
+import pytest
+
+from pydexbot.preflight import FILL, NO_FILL, UNCERTAIN, SwapPreflight, swap_output, worst
+
+FEE_RATIO = Decimal("0.003")
+SCALE_MAX = Decimal("1.5")
+
+
+def rows(left="200000.00000000 FLON", right="10000.000000 USDT", min_trade="10.00000000 FLON", **extra):
+    market_config = {"min_trade_amount": min_trade}
+    swap_market = {"left_pool_quant": {"quantity": left}, "right_pool_quant": {"quantity": right}}
+    for key, value in extra.items():
+        (market_config if key == "max_trade_amount" else swap_market)[key] = value
+    return market_config, swap_market
+
+
+def preflight(side, market_config, swap_market, max_slippage_ratio=Decimal(0)):
+    return SwapPreflight(side, market_config, swap_market, FEE_RATIO, SCALE_MAX, max_slippage_ratio)
+
+
+def test_swap_output_rounds_fee_and_output_down():
+    # fee 0.03 FLON; 9.97 * 10000 / 200009.97 = 0.49847514... USDT
+    assert swap_output(Decimal("10"), Decimal("200000"), Decimal("10000"), FEE_RATIO, 8, 6) == (
+        Decimal("0.498475"), Decimal("0.03000000"),
+    )
+    assert swap_output(Decimal("0.00000001"), Decimal("1"), Decimal("1"), Decimal("1"), 8, 6) == (0, Decimal("1E-8"))
+
+
+def test_worst_verdict():
+    assert worst(FILL, UNCERTAIN) == UNCERTAIN
+    assert worst(FILL, NO_FILL, UNCERTAIN) == NO_FILL
+
+
+def test_inputs_span_min_trade_amount_to_the_scale_max():
+    sell = preflight("left", *rows())
+    buy = preflight("right", *rows())
+
+    assert (sell.min_input, sell.max_input) == (Decimal("10.00000000"), Decimal("15.00000000"))
+    # A buy pays min_trade_amount of FLON at the pool price in USDT
+    assert (buy.min_input, buy.max_input) == (Decimal("0.500000"), Decimal("0.750000"))
+    assert sell.verdict() == (FILL, None)
+    assert sell.expected_output == sell.output(sell.min_input)[0] > 0
+
+
+@pytest.mark.parametrize("right, verdict", [
+    ("10000.000000 USDT", FILL),
+    # Output rounds to zero at the smallest input only
+    ("0.016000 USDT", UNCERTAIN),
+    ("0.010000 USDT", NO_FILL),
+])
+def test_zero_output_is_decided_at_both_ends_of_the_input(right, verdict):
+    check = preflight("left", *rows(right=right))
+
+    assert check.pool_verdict == verdict
+    if verdict != FILL:
+        assert check.reason == "output is zero"
+
+
+def test_funds_must_cover_the_input():
+    check = preflight("left", *rows())
+
+    assert check.verdict(Decimal("9.99")) == (NO_FILL, "balance too low")
+    assert check.verdict(Decimal("12")) == (UNCERTAIN, "balance may be too low")
+    assert check.verdict(Decimal("15")) == (FILL, None)
+
+
+def test_slippage_limit():
+    # 15 FLON into a 2000 FLON pool moves the price by about 1%
+    market_config, swap_market = rows(left="2000.00000000 FLON", right="100.000000 USDT")
+
+    assert preflight("left", market_config, swap_market, Decimal("0.02")).pool_verdict == FILL
+    assert preflight("left", market_config, swap_market, Decimal("0.006")).pool_verdict == UNCERTAIN
+    check = preflight("left", market_config, swap_market, Decimal("0.001"))
+    assert (check.pool_verdict, check.reason) == (NO_FILL, "slippage above limit")
+
+
+def test_market_rows_override_the_configured_fee_and_input_scale():
+    check = preflight("left", *rows(max_trade_amount="20.00000000 FLON", fee_ratio="0.01"))
+
+    assert check.fee_ratio == Decimal("0.01")
+    assert check.max_input == Decimal("20.00000000")
+    assert check.output(Decimal("10")) == swap_output(Decimal("10"), Decimal("200000"), Decimal("10000"),
+                                                      Decimal("0.01"), 8, 6)
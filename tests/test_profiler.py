@@ -0,0 +1,107 @@
+import os
+import re
+import threading
+
+from pydexbot.profiler import SamplingProfiler, dump_stacks, tag_thread, thread_tag, untag_thread
+
+FOLDED_LINE = re.compile(r"^(\S[^;]*)(;[^;]+ \([^:;]+:\d+\))+ (\d+)$")
+
+
+def spin_round(trade_pair, started, stop):
+    tag_thread(trade_pair)
+    try:
+        started.set()
+        while not stop.is_set():
+            sum(range(100))
+    finally:
+        untag_thread()
+
+
+def park(started, stop):
+    started.set()
+    stop.wait()
+
+
+def run_threads(*targets):
+    stop = threading.Event()
+    threads = []
+    for name, target, args in targets:
+        started = threading.Event()
+        thread = threading.Thread(target=target, args=args + (started, stop), name=name, daemon=True)
+        thread.start()
+        started.wait(2)
+        threads.append(thread)
+    return stop, threads
+
+
+def test_thread_tag_is_the_pair_else_the_name_without_its_pool_index():
+    names = {1: "round_3", 2: "ThreadPoolExecutor-0_12", 3: "profiler", 4: "7"}
+    tag_thread("flon.usdt")
+    try:
+        assert thread_tag(threading.get_ident(), {}) == "flon.usdt"
+    finally:
+        untag_thread()
+
+    assert [thread_tag(ident, names) for ident in (1, 2, 3, 4, 5)] == [
+        "round", "ThreadPoolExecutor", "profiler", "thread", "thread",
+    ]
+
+
+def test_samples_are_written_as_collapsed_stacks_per_pair(tmp_path):
+    stop, threads = run_threads(("round_1", spin_round, ("flon.usdt",)), ("parked_1", park, ()))
+    profiler = SamplingProfiler(str(tmp_path), interval_seconds=0.005)
+    try:
+        stacks, stats = profiler.sample(0.3)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    path = str(tmp_path / "out" / "profile.folded")
+    profiler.write(stacks, path)
+
+    with open(path) as f:
+        lines = f.read().splitlines()
+    assert lines == sorted(lines) and not os.path.exists(path + ".tmp")
+    assert all(FOLDED_LINE.match(line) for line in lines), lines
+    pair_lines = [line for line in lines if line.startswith("flon.usdt;")]
+    assert pair_lines and all("spin_round (test_profiler.py:" in line for line in pair_lines)
+    # The parked thread waits in threading.py and is left out
+    assert not any(line.startswith("parked;") for line in lines)
+    assert stats["idle"] > 0
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == sum(stacks.values())
+    assert stats["samples"] > 10 and stats["stacks"] == len(lines)
+
+
+def test_include_idle_keeps_parked_threads(tmp_path):
+    stop, threads = run_threads(("parked_1", park, ()),)
+    try:
+        stacks, _ = SamplingProfiler(str(tmp_path), 0.005, include_idle=True).sample(0.05)
+    finally:
+        stop.set()
+        threads[0].join()
+
+    assert any(stack.startswith("parked;") and "park (test_profiler.py:" in stack for stack in stacks)
+
+
+def test_one_profile_at_a_time_and_stop_still_writes_it(tmp_path):
+    done = []
+    profiler = SamplingProfiler(str(tmp_path), 0.005)
+
+    assert profiler.start(30, lambda path, stats: done.append(path))
+    assert not profiler.start(30)
+    profiler.stop()
+
+    assert not profiler.running()
+    [path] = done
+    assert os.path.dirname(path) == str(tmp_path) and path.endswith(".folded") and os.path.exists(path)
+
+
+def test_dump_stacks_heads_each_thread_with_its_pair():
+    stop, threads = run_threads(("round_1", spin_round, ("sing.usdt",)),)
+    try:
+        text = dump_stacks()
+    finally:
+        stop.set()
+        threads[0].join()
+
+    assert "thread round_1 pair=sing.usdt" in text
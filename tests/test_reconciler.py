@@ -0,0 +1,87 @@
+import threading
+import time
+
+from pydexbot.reconciler import Reconciler
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_results_and_errors_reach_the_handler():
+    handled = []
+    reconciler = Reconciler(lambda record, result, exc: handled.append((record, result, exc)))
+
+    def fail():
+        raise ConnectionError("node down")
+
+    reconciler.submit("a", lambda: {"transaction_id": "ab"})
+    reconciler.submit("b", fail)
+    reconciler.close()
+
+    results = {record: (result, exc) for record, result, exc in handled}
+    assert results["a"] == ({"transaction_id": "ab"}, None)
+    assert results["b"][0] is None and isinstance(results["b"][1], ConnectionError)
+
+
+def test_a_pair_has_one_push_in_flight_until_its_result_is_handled():
+    release = threading.Event()
+    handled = threading.Event()
+    reconciler = Reconciler(lambda record, result, exc: handled.set())
+
+    assert reconciler.submit("first", lambda: release.wait(5), "flon.usdt")
+    assert reconciler.in_flight("flon.usdt")
+    assert not reconciler.submit("second", lambda: None, "flon.usdt")
+    # Other pairs are not held up
+    assert reconciler.submit("other", lambda: None, "sing.usdt")
+
+    release.set()
+    assert handled.wait(2)
+    wait_for(lambda: not reconciler.in_flight("flon.usdt"))
+    assert reconciler.submit("third", lambda: None, "flon.usdt")
+    reconciler.close()
+
+
+def test_the_pair_is_held_until_the_handler_has_run():
+    in_handler = threading.Event()
+    release_handler = threading.Event()
+
+    def handle(record, result, exc):
+        in_handler.set()
+        release_handler.wait(5)
+
+    reconciler = Reconciler(handle)
+    reconciler.submit("first", lambda: "done", "flon.usdt")
+
+    assert in_handler.wait(2)
+    # The push has returned, but its result has not been handled yet
+    assert reconciler.in_flight("flon.usdt")
+    release_handler.set()
+    wait_for(lambda: not reconciler.in_flight("flon.usdt"))
+    reconciler.close()
+
+
+def test_a_failing_handler_releases_the_pair(capsys):
+    def handle(record, result, exc):
+        raise ValueError("log writer gone")
+
+    reconciler = Reconciler(handle)
+    reconciler.submit("first", lambda: "done", "flon.usdt")
+
+    wait_for(lambda: not reconciler.in_flight("flon.usdt"))
+    reconciler.close()
+    assert "log writer gone" in capsys.readouterr().err
+
+
+def test_close_waits_for_pushes_in_flight():
+    handled = []
+    reconciler = Reconciler(lambda record, result, exc: handled.append(result), max_inflight=2)
+
+    for index in range(4):
+        reconciler.submit(index, lambda index=index: time.sleep(0.02) or index, f"pair{index}")
+    reconciler.close()
+
+    assert sorted(handled) == [0, 1, 2, 3]
@@ -0,0 +1,128 @@
+import contextvars
+import threading
+import time
+
+import pytest
+
+from pydexbot.rpc_governor import (
+    BACKGROUND, BALANCE, MARKET, PUSH, SCHEDULE, RpcGovernor, RpcShed, table_priority,
+)
+
+URL = "http://a"
+
+
+def drain(governor, url=URL):
+    while True:
+        try:
+            governor.try_acquire(url, PUSH)
+        except RpcShed:
+            return
+
+
+def test_table_priorities():
+    assert table_priority("schedules") == SCHEDULE
+    assert table_priority("accounts") == BALANCE
+    assert table_priority("markets") == MARKET
+
+
+def test_burst_then_shed_without_waiting():
+    governor = RpcGovernor(1, burst=3)
+    for _ in range(3):
+        governor.try_acquire(URL, MARKET)
+
+    with pytest.raises(RpcShed) as shed:
+        governor.try_acquire(URL, MARKET)
+    assert shed.value.priority == MARKET
+    # Other nodes have their own bucket
+    governor.try_acquire("http://b", MARKET)
+
+
+def test_request_is_shed_when_its_wait_would_exceed_its_queue_bound():
+    governor = RpcGovernor(2, burst=1, queue_seconds={"background": 0.2, "schedule": 2})
+    drain(governor)
+
+    started = time.monotonic()
+    with pytest.raises(RpcShed):
+        governor.acquire(URL, BACKGROUND)
+    assert time.monotonic() - started < 0.1
+    # The next token is half a second away, within the schedule bound
+    governor.acquire(URL, SCHEDULE)
+
+
+def test_pushes_are_never_shed():
+    governor = RpcGovernor(20, burst=1, queue_seconds={"push": 0})
+    drain(governor)
+
+    governor.acquire(URL, PUSH)
+
+
+def test_waiters_are_served_in_priority_order():
+    governor = RpcGovernor(20, burst=1)
+    drain(governor)
+    served = []
+    lock = threading.Lock()
+
+    def request(priority):
+        governor.acquire(URL, priority)
+        with lock:
+            served.append(priority)
+
+    threads = []
+    for priority in (BACKGROUND, BALANCE, MARKET, SCHEDULE, PUSH):
+        thread = threading.Thread(target=request, args=(priority,))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.005)
+    for thread in threads:
+        thread.join()
+
+    assert served == [PUSH, SCHEDULE, MARKET, BALANCE, BACKGROUND]
+
+
+def test_only_the_first_request_of_a_round_can_be_shed():
+    governor = RpcGovernor(10, burst=1, queue_seconds={"market": 0.01})
+
+    def round_requests():
+        governor.begin_round()
+        governor.acquire(URL, MARKET)
+        # Admitted: the round's next request waits for its token instead of being shed
+        governor.acquire(URL, MARKET)
+        governor.end_round()
+
+    contextvars.copy_context().run(round_requests)
+
+    with pytest.raises(RpcShed):
+        contextvars.copy_context().run(lambda: (governor.begin_round(), governor.acquire(URL, MARKET)))
+
+
+def test_backoff_halves_the_rate_once_a_second_and_never_below_the_floor():
+    governor = RpcGovernor(100, min_rate_ratio=0.3)
+
+    governor.backoff(URL, throttled=True)
+    assert governor.rates()[URL] == pytest.approx(50, rel=0.01)
+    governor.backoff(URL, throttled=True)
+    assert governor.rates()[URL] == pytest.approx(50, rel=0.01)
+
+    governor._buckets[URL].backed_off_at -= 1
+    governor.backoff(URL, throttled=True)
+    assert governor.rates()[URL] == pytest.approx(30, rel=0.01)
+
+
+def test_isolated_errors_do_not_back_off():
+    governor = RpcGovernor(100)
+    governor.backoff(URL)
+    governor.backoff(URL)
+
+    assert governor.rates()[URL] == 100
+
+
+def test_rate_recovers_over_recover_seconds(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    governor = RpcGovernor(100, recover_seconds=10)
+    governor.backoff(URL, throttled=True)
+
+    now[0] += 2.5
+    governor.try_acquire(URL, PUSH)
+
+    assert governor.rates()[URL] == pytest.approx(75)
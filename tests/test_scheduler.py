@@ -0,0 +1,137 @@
+import threading
+import time
+
+from pydexbot.metrics import METRICS
+from pydexbot.scheduler import DeadlineScheduler
+
+
+def lag_observations():
+    _, histograms = METRICS.snapshot()
+    counts, total, count = histograms.get(("scheduler_lag_seconds", ()), ([], 0.0, 0))
+    return total, count
+
+
+def test_pairs_run_in_deadline_order():
+    order = []
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def run_round(pair):
+        with lock:
+            order.append(pair)
+            if len(order) == 3:
+                done.set()
+        return 60
+
+    scheduler = DeadlineScheduler(run_round, max_workers=1)
+    scheduler.schedule("c.usdt", 0.06)
+    scheduler.schedule("a.usdt", 0.0)
+    scheduler.schedule("b.usdt", 0.03)
+    scheduler.start()
+    assert done.wait(2)
+    scheduler.stop()
+    scheduler.join()
+    assert order == ["a.usdt", "b.usdt", "c.usdt"]
+
+
+def test_returned_wait_reschedules_the_pair():
+    runs = []
+    done = threading.Event()
+
+    def run_round(pair):
+        runs.append(time.monotonic())
+        if len(runs) == 3:
+            done.set()
+        return 0.05
+
+    scheduler = DeadlineScheduler(run_round)
+    scheduler.schedule("flon.usdt")
+    scheduler.start()
+    assert done.wait(2)
+    scheduler.stop()
+    scheduler.join()
+    assert all(later - earlier >= 0.04 for earlier, later in zip(runs, runs[1:]))
+
+
+def test_round_that_raises_runs_again_after_retry_seconds():
+    calls = []
+    errors = []
+    done = threading.Event()
+
+    def run_round(pair):
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        done.set()
+        return 60
+
+    scheduler = DeadlineScheduler(run_round, retry_seconds=0.05, on_error=lambda pair, e: errors.append((pair, e)))
+    scheduler.schedule("flon.usdt")
+    scheduler.start()
+    assert done.wait(2)
+    scheduler.stop()
+    scheduler.join()
+    assert len(calls) == 2
+    assert calls[1] - calls[0] >= 0.04
+    assert [(pair, str(e)) for pair, e in errors] == [("flon.usdt", "boom")]
+
+
+def test_round_reschedules_even_when_on_error_raises():
+    calls = []
+    done = threading.Event()
+
+    def run_round(pair):
+        calls.append(pair)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        done.set()
+        return 60
+
+    def on_error(pair, e):
+        raise ValueError("logging failed")
+
+    scheduler = DeadlineScheduler(run_round, retry_seconds=0.01, on_error=on_error)
+    scheduler.schedule("flon.usdt")
+    scheduler.start()
+    assert done.wait(2)
+    scheduler.stop()
+    scheduler.join()
+    assert calls == ["flon.usdt", "flon.usdt"]
+
+
+def test_stop_drops_pending_pairs():
+    calls = []
+    scheduler = DeadlineScheduler(lambda pair: calls.append(pair) or 60)
+    scheduler.schedule("flon.usdt", 0.2)
+    scheduler.start()
+    scheduler.stop()
+    scheduler.join()
+    scheduler.schedule("sing.usdt")
+    time.sleep(0.3)
+    assert calls == []
+
+
+def test_rounds_waiting_for_a_busy_pool_are_observed_as_lag():
+    done = threading.Event()
+    runs = []
+
+    def run_round(pair):
+        runs.append(pair)
+        if len(runs) == 2:
+            done.set()
+        time.sleep(0.1)
+        return 60
+
+    total_before, count_before = lag_observations()
+    scheduler = DeadlineScheduler(run_round, max_workers=1)
+    scheduler.schedule("a.usdt")
+    scheduler.schedule("b.usdt")
+    scheduler.start()
+    assert done.wait(2)
+    scheduler.stop()
+    scheduler.join()
+
+    total, count = lag_observations()
+    assert count - count_before == 2
+    # The second pair waited for the first round to free the only thread
+    assert total - total_before >= 0.09
@@ -0,0 +1,106 @@
+import pytest
+
+from pydexbot.sharding import HashRing, LeaseFile, ShardMember
+
+PAIRS = [f"p{index:03d}.usdt" for index in range(200)]
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_ring_spreads_keys_and_moves_few_when_a_member_joins():
+    before = HashRing(["a", "b", "c"])
+    after = HashRing(["a", "b", "c", "d"])
+
+    counts = {member: len(keys) for member, keys in before.assign(PAIRS).items()}
+    assert set(counts) == {"a", "b", "c"} and min(counts.values()) > 40
+    moved = [pair for pair in PAIRS if before.owner(pair) != after.owner(pair)]
+    # Only keys taken over by the new member move
+    assert all(after.owner(pair) == "d" for pair in moved)
+    assert len(moved) < len(PAIRS) / 2
+    assert HashRing().owner("p000.usdt") is None
+
+
+def members(tmp_path, names, clock, **options):
+    store = LeaseFile(str(tmp_path / "leases.json"))
+    return [ShardMember(store, name, PAIRS, clock=clock, monotonic=clock, **options) for name in names]
+
+
+def test_members_split_the_pairs_without_overlap(tmp_path):
+    clock = Clock()
+    a, b = members(tmp_path, ["a", "b"], clock)
+
+    a.sync()
+    b.sync()
+    a.sync()
+    clock.now += 5.1
+    b.sync()
+    a.sync()
+
+    assert set(a.owned()).isdisjoint(b.owned())
+    assert set(a.owned()) | set(b.owned()) == set(PAIRS)
+    assert all(a.owns(pair) for pair in a.owned())
+
+
+def test_a_pair_moves_only_after_the_grace_of_its_released_lease(tmp_path):
+    clock = Clock()
+    a, b = members(tmp_path, ["a", "b"], clock, lease_seconds=15, grace_seconds=5)
+    a.sync()
+    assert len(a.owned()) == len(PAIRS)
+
+    b.sync()
+    # a still holds every lease; b waits for them
+    assert b.owned() == []
+    taken, released = a.sync()
+    assert taken == [] and released
+    b.sync()
+    assert b.owned() == []
+
+    clock.now += 5.1
+    b.sync()
+    assert set(b.owned()) == set(released)
+
+
+def test_a_member_that_stops_syncing_stops_owning_before_its_lease_expires(tmp_path):
+    clock = Clock()
+    a, b = members(tmp_path, ["a", "b"], clock, lease_seconds=15, grace_seconds=5)
+    a.sync()
+
+    clock.now += 9.9
+    assert a.owns(PAIRS[0])
+    clock.now += 0.2
+    assert not a.owns(PAIRS[0]) and a.owned() == []
+
+    # Its heartbeat and leases expire, and the pairs go to the member still syncing
+    clock.now += 5
+    b.sync()
+    assert set(b.owned()) == set(PAIRS)
+
+
+def test_leave_hands_the_pairs_over_after_the_grace(tmp_path):
+    clock = Clock()
+    a, b = members(tmp_path, ["a", "b"], clock, lease_seconds=15, grace_seconds=5)
+    a.sync()
+    b.sync()
+    a.leave()
+    assert a.owned() == []
+
+    clock.now += 5.1
+    b.sync()
+
+    assert set(b.owned()) == set(PAIRS)
+
+
+@pytest.mark.parametrize("content", ["", "{not json"])
+def test_unreadable_lease_file_starts_empty(tmp_path, content):
+    (tmp_path / "leases.json").write_text(content)
+    store = LeaseFile(str(tmp_path / "leases.json"))
+
+    assert store.read() == {}
+    assert store.update(lambda state: state.setdefault("members", {"a": 1})) == {"a": 1}
+    assert store.read() == {"members": {"a": 1}}
@@ -0,0 +1,166 @@
+import threading
+import time
+
+import pytest
+
+from pydexbot.table_cache import TableCache
+
+KEY = ("tokenx.mm", "tokenx.mm", "schedules", "flon.usdt")
+
+
+def counting_loader(value="row"):
+    calls = []
+
+    def load():
+        calls.append(1)
+        return value
+    return load, calls
+
+
+def test_entries_are_served_until_their_table_ttl_runs_out(monkeypatch):
+    cache = TableCache({"schedules": 5})
+    load, calls = counting_loader()
+    now = [100.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+
+    assert cache.get(*KEY, load) == "row"
+    now[0] += 4.9
+    assert cache.get(*KEY, load) == "row"
+    assert len(calls) == 1
+    now[0] += 0.2
+    assert cache.get(*KEY, load) == "row"
+    assert len(calls) == 2
+
+
+def test_tables_without_a_ttl_are_not_cached():
+    cache = TableCache({"schedules": 5, "markets": 0})
+    load, calls = counting_loader()
+
+    cache.get("flon.swap", "flon.swap", "markets", "flon.usdt", load)
+    cache.get("flon.swap", "flon.swap", "markets", "flon.usdt", load)
+    cache.get("bot.mm", "bot.mm", "botgroups", "flon.usdt", load)
+
+    assert len(calls) == 3
+    assert cache.lookup("flon.swap", "flon.swap", "markets", "flon.usdt") == (False, None)
+
+
+def test_missing_rows_are_cached():
+    cache = TableCache({"schedules": 5})
+    load, calls = counting_loader(None)
+
+    assert cache.get(*KEY, load) is None
+    assert cache.get(*KEY, load) is None
+    assert len(calls) == 1
+
+
+def test_concurrent_misses_share_one_read():
+    cache = TableCache({"schedules": 5})
+    release = threading.Event()
+    calls = []
+
+    def slow_load():
+        calls.append(1)
+        release.wait(5)
+        return "row"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get(*KEY, slow_load))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["row"] * 8
+    assert len(calls) == 1
+
+
+def test_a_failed_read_reaches_every_waiter_and_is_not_cached():
+    cache = TableCache({"schedules": 5})
+    release = threading.Event()
+
+    def failing_load():
+        release.wait(5)
+        raise ConnectionError("node down")
+
+    errors = []
+
+    def get():
+        try:
+            cache.get(*KEY, failing_load)
+        except ConnectionError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=get) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(errors) == 4
+    assert len({id(error) for error in errors}) == 4
+    assert sum(error.__cause__ is None for error in errors) == 1
+    assert cache.lookup(*KEY) == (False, None)
+
+
+def test_invalidation_during_a_read_keeps_its_result_out_of_the_cache():
+    cache = TableCache({"schedules": 5})
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_load():
+        started.set()
+        release.wait(5)
+        return "before our trade"
+
+    reader = threading.Thread(target=cache.get, args=(*KEY, slow_load))
+    reader.start()
+    started.wait(5)
+    cache.invalidate(*KEY)
+    release.set()
+    reader.join()
+
+    assert cache.lookup(*KEY) == (False, None)
+    assert cache.get(*KEY, lambda: "after our trade") == "after our trade"
+
+
+def test_a_get_after_invalidation_does_not_join_the_stale_read():
+    cache = TableCache({"schedules": 5})
+    started = threading.Event()
+    release = threading.Event()
+    results = []
+
+    def slow_load():
+        started.set()
+        release.wait(5)
+        return "before our trade"
+
+    reader = threading.Thread(target=lambda: results.append(cache.get(*KEY, slow_load)))
+    reader.start()
+    started.wait(5)
+    cache.invalidate(*KEY)
+    load, calls = counting_loader("after our trade")
+
+    assert cache.get(*KEY, load) == "after our trade"
+    assert len(calls) == 1
+    release.set()
+    reader.join()
+    assert results == ["before our trade"]
+    # The stale read finishing last neither drops nor overwrites the new entry
+    assert cache.lookup(*KEY) == (True, "after our trade")
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = TableCache({"schedules": 5}, max_entries=2)
+    for pair in ("a", "b"):
+        cache.put("tokenx.mm", "tokenx.mm", "schedules", pair, pair)
+    cache.get("tokenx.mm", "tokenx.mm", "schedules", "a", pytest.fail)
+
+    cache.put("tokenx.mm", "tokenx.mm", "schedules", "c", "c")
+
+    assert cache.lookup("tokenx.mm", "tokenx.mm", "schedules", "a") == (True, "a")
+    assert cache.lookup("tokenx.mm", "tokenx.mm", "schedules", "b") == (False, None)
+    assert cache.lookup("tokenx.mm", "tokenx.mm", "schedules", "c") == (True, "c")
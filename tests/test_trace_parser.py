@@ -0,0 +1,156 @@
+import copy
+import json
+import os
+from decimal import Decimal
+
+import pytest
+
+from pydexbot.trace_parser import (
+    format_fill, parse_fills_from_result, parse_quantity, parse_transfers_from_result, split_result_by_action,
+)
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "data", "exectrade.result.json")
+GOLDEN = {
+    "trade_side": "sell",
+    "execution_price": "0.03612749 USDT/FLON",
+    "inverse_price": "27.67975529 FLON/USDT",
+    "base_quantity": "13.68536925 FLON",
+    "quote_quantity": "0.494418 USDT",
+    "maker_account": "botuser11111",
+}
+
+
+@pytest.fixture
+def golden():
+    with open(GOLDEN_PATH) as f:
+        return json.load(f)
+
+
+def flatten(trx):
+    """
+    The same transaction in nodeos' flat action_traces layout: every action with its
+    action_ordinal and creator_action_ordinal, top-level actions first.
+    """
+    flat = []
+    queue = [(trace, 0) for trace in trx["processed"]["action_traces"]]
+    while queue:
+        trace, creator = queue.pop(0)
+        item = {key: value for key, value in trace.items() if key != "inline_traces"}
+        item["action_ordinal"] = len(flat) + 1
+        item["creator_action_ordinal"] = creator
+        flat.append(item)
+        queue.extend((child, item["action_ordinal"]) for child in trace.get("inline_traces") or ())
+    return {**trx, "processed": {**trx["processed"], "action_traces": flat}}
+
+
+def multi_action(golden, count):
+    """
+    One transaction holding `count` copies of the golden trade, each selling a different quantity.
+    """
+    trx = copy.deepcopy(golden)
+    template = golden["processed"]["action_traces"][0]
+    traces = []
+    for index in range(count):
+        trace = copy.deepcopy(template)
+        quantity = f"{Decimal('13.68536925') + Decimal(index) / 1000:.8f} FLON"
+        for inline in trace["inline_traces"][0]["inline_traces"]:
+            data = inline["act"]["data"]
+            if data["memo"].startswith("flon swap by"):
+                data["memo"] = f"flon swap by {quantity}:18446744073709551615"
+                for copy_trace in inline.get("inline_traces") or ():
+                    copy_trace["act"]["data"]["memo"] = data["memo"]
+        traces.append(trace)
+    trx["processed"]["action_traces"] = traces
+    return trx
+
+
+def test_parse_quantity():
+    assert parse_quantity("13.68536925 FLON") == (Decimal("13.68536925"), "FLON")
+    assert parse_quantity("0.494418  USDT") == (Decimal("0.494418"), "USDT")
+
+
+def test_golden_trade_fill(golden):
+    fills = parse_fills_from_result(golden)
+
+    assert len(fills) == 1
+    fill = fills[0]
+    assert format_fill(fill) == GOLDEN
+    assert fill["trade_pair"] == "flon.usdt"
+    assert fill["action"] == "trade"
+    assert (fill["base_amount"], fill["base_symbol"]) == (Decimal("13.68536925"), "FLON")
+    assert (fill["quote_amount"], fill["quote_symbol"]) == (Decimal("0.494418"), "USDT")
+    # Exact, not a float rounded on the way
+    assert fill["price"] == Decimal("0.494418") / Decimal("13.68536925")
+
+
+def test_flat_traces_give_the_same_fill(golden):
+    assert parse_fills_from_result(flatten(golden)) == parse_fills_from_result(golden)
+
+
+def test_buy_side_swaps_base_and_quote(golden):
+    golden["processed"]["action_traces"][0]["inline_traces"][1]["act"]["data"]["side"] = "right"
+
+    fill = parse_fills_from_result(golden)[0]
+
+    assert fill["trade_side"] == "buy"
+    assert (fill["base_amount"], fill["base_symbol"]) == (Decimal("0.494418"), "USDT")
+    assert (fill["quote_amount"], fill["quote_symbol"]) == (Decimal("13.68536925"), "FLON")
+
+
+def test_multi_action_fills_keep_action_order(golden):
+    trx = multi_action(golden, 5)
+
+    fills = parse_fills_from_result(trx)
+
+    assert [fill["base_amount"] for fill in fills] == [Decimal("13.68536925") + Decimal(i) / 1000 for i in range(5)]
+    assert parse_fills_from_result(flatten(trx)) == fills
+
+
+def test_notification_copies_are_skipped(golden):
+    flat = flatten(golden)
+    traces = flat["processed"]["action_traces"]
+    position, output = next((i, trace) for i, trace in enumerate(traces)
+                            if trace["act"]["data"].get("memo", "").startswith("flon swap by"))
+    # A copy delivered to the bot ahead of the transfer itself must not be taken for it
+    notified = copy.deepcopy(output)
+    notified["receiver"] = "botuser11111"
+    notified["act"]["data"]["quantity"] = "999.000000 USDT"
+    traces.insert(position, notified)
+
+    assert parse_fills_from_result(flat)[0]["quote_amount"] == Decimal("0.494418")
+    assert parse_transfers_from_result(golden) == [
+        ("flon.token", "botuser11111", "flon.swap", "13.68536925 FLON"),
+        ("flon.token", "flon.swap", "swap.admin", "0.04105610 FLON"),
+        ("flon.mtoken", "flon.swap", "botuser11111", "0.494418 USDT"),
+    ]
+    assert parse_transfers_from_result(flatten(golden)) == parse_transfers_from_result(golden)
+
+
+def test_unexpected_layout_falls_back_to_walking_every_action(golden):
+    trade = golden["processed"]["action_traces"][0]
+    # afterswap one level deeper than usual
+    after_swap = trade["inline_traces"].pop(1)
+    trade["inline_traces"][0]["inline_traces"].append(after_swap)
+
+    assert format_fill(parse_fills_from_result(golden)[0]) == GOLDEN
+
+
+def test_results_without_traces_have_no_fills():
+    assert parse_fills_from_result({"transaction_id": "00"}) == []
+    assert parse_fills_from_result(None) == []
+    assert parse_fills_from_result({"processed": {"action_traces": []}}) == []
+
+
+@pytest.mark.parametrize("layout", [lambda trx: trx, flatten], ids=["nested", "flat"])
+def test_split_result_by_action(golden, layout):
+    trx = layout(multi_action(golden, 3))
+
+    parts = split_result_by_action(trx)
+
+    assert len(parts) == 3
+    for index, part in enumerate(parts):
+        assert part["transaction_id"] == trx["transaction_id"]
+        fills = parse_fills_from_result(part)
+        assert [fill["base_amount"] for fill in fills] == [Decimal("13.68536925") + Decimal(index) / 1000]
+        assert len(parse_transfers_from_result(part)) == 3
+    assert split_result_by_action({"transaction_id": "00"}) == []
@@ -0,0 +1,111 @@
+import hashlib
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("base58")
+pytest.importorskip("Crypto")
+coincurve = pytest.importorskip("coincurve")
+
+import base58  # noqa: E402
+
+from pydexbot import txbuilder  # noqa: E402
+from pydexbot.txbuilder import (  # noqa: E402
+    TransactionBuilder, decode_private_key, is_canonical, pack_actions, pack_header, parse_block_time, ripemd160,
+)
+
+# The well-known development key of nodeos
+DEV_KEY = "5KQwrPbwdL6PhXujxW37FSSQZ1JiwsST4cqQzDeyXtP79zkvFD3"
+DEV_SECRET = bytes.fromhex("d2653ff7cbb2d8ff129ac27ef5781ce68b2558c41a74af1f2ddca635cbeef07d")
+CHAIN_ID = "1c6ae7719a2a3b4ecb19584a30ff510ba1b6ded86e1fd8b8fc22f1179c622a32"
+LIB_ID = "0000c35049b6a62f8ad15ff2b1f7b5bc4d1c5c0ebd01d7c81ee22d3c4f1a6f3a"
+INFO = {
+    "chain_id": CHAIN_ID,
+    "last_irreversible_block_num": 50000,
+    "last_irreversible_block_id": LIB_ID,
+    "head_block_time": "2026-10-18T12:00:00.500",
+}
+
+
+class Pool:
+    def __init__(self):
+        self.reads = 0
+        self.writes = []
+
+    def read(self, path, payload):
+        assert path == "/v1/chain/get_info"
+        self.reads += 1
+        return INFO
+
+    def write(self, path, payload):
+        self.writes.append((path, payload))
+        return {"transaction_id": "ab"}
+
+
+def test_decode_private_key_formats():
+    assert decode_private_key(DEV_KEY) == DEV_SECRET
+    pvt = "PVT_K1_" + base58.b58encode(DEV_SECRET + ripemd160(DEV_SECRET + b"K1")[:4]).decode()
+    assert decode_private_key(pvt) == DEV_SECRET
+    with pytest.raises(ValueError):
+        decode_private_key(DEV_KEY[:-1] + ("2" if DEV_KEY[-1] != "2" else "3"))
+
+
+def test_pack_header_and_actions():
+    assert pack_header(0x01020304, 0xc350, 0x2fa6b649) == bytes.fromhex("04030201" "50c3" "49b6a62f" "000000")
+
+    body = pack_actions([["eosio.token", "transfer", b"\x01\x02", {"alice": "active"}]])
+
+    assert body == bytes.fromhex(
+        "00"                   # context free actions
+        "01"                   # actions
+        "00a6823403ea3055"     # eosio.token
+        "000000572d3ccdcd"     # transfer
+        "01"                   # authorizations
+        "0000000000855c34"     # alice
+        "00000000a8ed3232"     # active
+        "020102"               # data
+        "00"                   # transaction extensions
+    )
+
+
+def test_refresh_reads_tapos_from_the_last_irreversible_block():
+    pool = Pool()
+    builder = TransactionBuilder(pool)
+
+    chain_id, ref_block_num, ref_block_prefix, chain_time, _ = builder.tapos()
+    builder.tapos()
+
+    assert pool.reads == 1
+    assert chain_id.hex() == CHAIN_ID
+    assert ref_block_num == 50000 & 0xffff
+    assert ref_block_prefix == int.from_bytes(bytes.fromhex(LIB_ID)[8:12], "little")
+    assert chain_time == parse_block_time("2026-10-18T12:00:00")
+
+
+def test_push_signs_a_canonical_transaction_for_the_chain():
+    pool = Pool()
+    builder = TransactionBuilder(pool, expiration_seconds=60)
+    # Sign in this process instead of a process pool
+    txbuilder._init_signer(DEV_KEY)
+    builder._executor = ThreadPoolExecutor(max_workers=1)
+    actions = [["tokenx.mm", "trade", b"\x00" * 8, {"tradewallet": "trade"}]]
+
+    builder.push_actions(actions)
+
+    path, payload = pool.writes[0]
+    assert path == "/v1/chain/push_transaction"
+    packed_trx = bytes.fromhex(payload["packed_trx"])
+    expiration, ref_block_num, ref_block_prefix = struct.unpack("<IHI", packed_trx[:10])
+    assert 0 <= expiration - (parse_block_time(INFO["head_block_time"]) + 60) < 64
+    assert (ref_block_num, ref_block_prefix) == builder.tapos()[1:3]
+    assert packed_trx[13:] == pack_actions(actions)
+
+    raw = base58.b58decode(payload["signatures"][0][len("SIG_K1_"):])
+    compact, checksum = raw[:65], raw[65:]
+    assert checksum == ripemd160(compact + b"K1")[:4]
+    assert is_canonical(compact)
+    digest = hashlib.sha256(bytes.fromhex(CHAIN_ID) + packed_trx + bytes(32)).digest()
+    signer = coincurve.PublicKey.from_signature_and_message(compact[1:] + bytes([compact[0] - 31]), digest, hasher=None)
+    assert signer.format() == coincurve.PrivateKey(DEV_SECRET).public_key.format()
+    builder._executor.shutdown()
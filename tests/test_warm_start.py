@@ -0,0 +1,55 @@
+import time
+from decimal import Decimal
+
+from pydexbot.balances import BalanceFetcher
+from pydexbot.table_cache import TableCache
+from pydexbot.warm_start import WarmStartSnapshot
+
+IDENTITY = {"contracts": ["tokenx.mm", "flon.swap"], "chain_id": None}
+
+
+def test_snapshot_round_trip_drops_entries_past_their_bound(tmp_path):
+    path = str(tmp_path / "warm_start.json")
+    snapshot = WarmStartSnapshot(path, IDENTITY, {"trademarkets": 10, "balances": 2})
+    rows = [
+        ("tokenx.mm", "tokenx.mm", "trademarkets", "flon.usdt", {"paused": 0}, 1.0),
+        ("tokenx.mm", "tokenx.mm", "trademarkets", "sing.usdt", {"paused": 1}, 30.0),
+        ("tokenx.mm", "tokenx.mm", "botgroups", "flon.usdt", {"bots": []}, 1.0),
+    ]
+    balances = [("flon.token", "FLON", "bot1", Decimal("1.5"), 0.5), ("flon.token", "FLON", "bot2", Decimal("9"), 5.0)]
+
+    assert snapshot.save(rows, balances) == (1, 1)
+    loaded_rows, loaded_balances, saved_at = WarmStartSnapshot(path, IDENTITY, {"trademarkets": 10, "balances": 2}).load()
+
+    assert [row[:5] for row in loaded_rows] == [rows[0][:5]]
+    assert [balance[:4] for balance in loaded_balances] == [("flon.token", "FLON", "bot1", Decimal("1.5"))]
+    assert saved_at is not None
+
+
+def test_snapshot_of_other_contracts_is_ignored(tmp_path):
+    path = str(tmp_path / "warm_start.json")
+    WarmStartSnapshot(path, IDENTITY, {"trademarkets": 10}).save(
+        [("tokenx.mm", "tokenx.mm", "trademarkets", "flon.usdt", {}, 0.0)], [])
+
+    other = WarmStartSnapshot(path, {"contracts": ["other.mm", "flon.swap"], "chain_id": None}, {"trademarkets": 10})
+
+    assert other.load() == ([], [], None)
+
+
+def test_seeded_entries_expire_on_their_ttl_from_the_read_time():
+    cache = TableCache({"trademarkets": 10})
+    now = time.monotonic()
+    cache.put("tokenx.mm", "tokenx.mm", "trademarkets", "flon.usdt", {"paused": 0}, now - 9.5)
+    cache.put("tokenx.mm", "tokenx.mm", "trademarkets", "sing.usdt", {"paused": 0}, now - 10.5)
+
+    assert cache.lookup("tokenx.mm", "tokenx.mm", "trademarkets", "flon.usdt") == (True, {"paused": 0})
+    assert cache.lookup("tokenx.mm", "tokenx.mm", "trademarkets", "sing.usdt") == (False, None)
+    reads = []
+    assert cache.get("tokenx.mm", "tokenx.mm", "trademarkets", "sing.usdt", lambda: reads.append(1) or {"paused": 1}) \
+        == {"paused": 1}
+    assert reads == [1]
+
+    fetcher = BalanceFetcher(lambda contract, account, symbol: Decimal("2"), ttl_seconds=2)
+    fetcher.put("flon.token", "bot1", "FLON", Decimal("1"), now - 2.5)
+    assert fetcher.cached("flon.token", "bot1", "FLON") is None
+    assert fetcher.get("flon.token", "bot1", "FLON") == Decimal("2")
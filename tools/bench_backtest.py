@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Golden check and benchmark for the vectorized candle plan and the backtest engine.
+
+Checks that plan_schedule matches candle_state/segment_side call by call (NumPy
+and list paths), that schedule_boundaries captures every side change, then times
+schedule generation and a backtest run.
+
+Usage: python tools/bench_backtest.py [--pairs 2000] [--days 3]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pydexbot import candle_plan  # noqa: E402
+from pydexbot.backtest import run_backtest, summarize, synthetic_markets  # noqa: E402
+from pydexbot.candle_plan import (  # noqa: E402
+    CANDLE_PHASES, SIDES, candle_state, plan_schedule, schedule_boundaries, segment_side,
+)
+from pydexbot.optional import load_numpy  # noqa: E402
+from mock_node import pair_names  # noqa: E402
+
+np = load_numpy()
+
+
+def check_plan(trade_pairs, times, candle_seconds, side_segment_seconds):
+    sides, phases = plan_schedule(trade_pairs, times, candle_seconds, side_segment_seconds)
+    # The pure-Python path plan_schedule takes without NumPy
+    list_sides, list_phases = candle_plan._plan_lists(trade_pairs, times, candle_seconds, side_segment_seconds)
+    assert np.array_equal(sides, np.array(list_sides)) and np.array_equal(phases, np.array(list_phases))
+    for i, trade_pair in enumerate(trade_pairs):
+        for j, t in enumerate(times):
+            if candle_seconds > 0:
+                assert (SIDES[sides[i, j]], CANDLE_PHASES[phases[i, j]]) == candle_state(trade_pair, t, candle_seconds)
+            else:
+                assert SIDES[sides[i, j]] == segment_side(trade_pair, t, side_segment_seconds)
+
+
+def check_boundaries(trade_pairs, start, end, candle_seconds, side_segment_seconds):
+    boundaries = schedule_boundaries(start, end, candle_seconds, side_segment_seconds)
+    sides, phases = plan_schedule(trade_pairs, list(range(start, end)), candle_seconds, side_segment_seconds)
+    changes = {start} | {start + j for j in range(1, end - start)
+                         if (sides[:, j] != sides[:, j - 1]).any() or (phases[:, j] != phases[:, j - 1]).any()}
+    assert changes <= set(boundaries), sorted(changes - set(boundaries))[:5]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pairs", type=int, default=2000)
+    parser.add_argument("--days", type=float, default=3.0)
+    parser.add_argument("--interval", type=float, default=8.0)
+    options = parser.parse_args()
+    if np is None:
+        sys.exit("numpy is required")
+
+    rng = random.Random(7)
+    trade_pairs = pair_names(40)
+    times = [rng.randrange(1_600_000_000, 1_900_000_000) for _ in range(200)]
+    for candle_seconds in (300, 60, 7, 1, 0):
+        check_plan(trade_pairs, times, candle_seconds, 900)
+        check_boundaries(trade_pairs[:8], 1_700_000_013, 1_700_002_000, candle_seconds, 900)
+    print("golden checks passed")
+
+    end = 1_700_000_000
+    start = end - int(options.days * 86400)
+    trade_pairs = pair_names(options.pairs)
+    started = time.perf_counter()
+    grid = np.arange(start, end, 1)
+    for offset in range(0, len(grid), 3600):
+        plan_schedule(trade_pairs, grid[offset:offset + 3600], 300, 900)
+    elapsed = time.perf_counter() - started
+    print(f"{'per-second schedule':<28} {options.pairs * len(grid) / elapsed / 1e6:10.1f} M pair-seconds/s")
+
+    started = time.perf_counter()
+    for t in times[:50]:
+        for trade_pair in trade_pairs[:100]:
+            candle_state(trade_pair, t, 300)
+    elapsed = time.perf_counter() - started
+    print(f"{'scalar candle_state':<28} {5000 / elapsed / 1e6:10.2f} M pair-seconds/s")
+
+    markets = synthetic_markets(trade_pairs)
+    started = time.perf_counter()
+    summary = summarize(run_backtest(markets, start, end, options.interval, external_flow_ratio=1.0))
+    elapsed = time.perf_counter() - started
+    print(f"{'backtest':<28} {elapsed:10.2f} s for {options.pairs} pairs x {options.days:g} days ({summary['trades']} trades)")
+    print(summary)
+
+
+if __name__ == "__main__":
+    main()
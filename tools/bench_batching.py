@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Golden check and benchmark for batched multi-action trade transactions.
+
+Submits trades of many pairs at once through ActionBatcher onto an in-memory mock
+chain, where a share of the bots cannot pay and their actions fail. A rejected
+transaction rolls back as a whole, so the batcher has to bisect: every funded
+trade must fill exactly once, every unfunded one must fail with its own no-fill
+error, and each result must carry only its own action's fill. Results in the
+flat trace layout are split the same way. Reports transactions per trade for
+several failure shares against one transaction per trade without batching.
+
+Usage: python tools/bench_batching.py [--pairs 200] [--rounds 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pydexbot.batcher import ActionBatcher  # noqa: E402
+from mock_node import ChainError, MockChain, pair_names  # noqa: E402
+from pydexbot.trace_parser import parse_fills_from_result, parse_transfers_from_result, split_result_by_action  # noqa: E402
+
+BOTGROUPS = ("bot.mm", "bot.mm", "botgroups")
+
+
+def flatten(trx):
+    """
+    The same transaction in nodeos' flat action_traces layout.
+    """
+    flat = []
+
+    def walk(trace, creator):
+        copy = {key: value for key, value in trace.items() if key != "inline_traces"}
+        copy["creator_action_ordinal"] = creator
+        flat.append(copy)
+        for child in trace.get("inline_traces") or ():
+            walk(child, trace["action_ordinal"])
+    for trace in trx["processed"]["action_traces"]:
+        walk(trace, 0)
+    return {**trx, "processed": {**trx["processed"], "action_traces": flat}}
+
+
+def run_rounds(options, fail_ratio, window_seconds):
+    rng = random.Random(21)
+    pairs = pair_names(options.pairs)
+    chain = MockChain(pairs, 2, funded_ratio=0.5, block_deltas=False, seed=21)
+    pushes = []
+
+    def push_actions(actions):
+        pushes.append(len(actions))
+        return chain.execute(actions)
+
+    def split(result):
+        parts = split_result_by_action(result)
+        flat_parts = split_result_by_action(flatten(result))
+        assert [parse_fills_from_result(part) for part in parts] == [parse_fills_from_result(part) for part in flat_parts]
+        return parts
+
+    batcher = ActionBatcher(push_actions, split, window_seconds, options.max_actions, 4,
+                            is_retryable=lambda exc: isinstance(exc, ChainError))
+    filled = failed = 0
+    with ThreadPoolExecutor(max_workers=len(pairs)) as rounds:
+        for _ in range(options.rounds):
+            expected = {}
+            futures = {}
+            for pair in pairs:
+                funded, unfunded = chain.tables[BOTGROUPS][pair]["bots"]
+                bot = unfunded if rng.random() < fail_ratio else funded
+                expected[pair] = bot == funded
+                action = {"account": "tokenx.mm", "name": rng.choice(("buy", "sell")), "authorization": [],
+                          "data": {"bot": bot, "trade_pair_name": pair, "memo": ""}}
+                futures[pair] = (bot, rounds.submit(batcher.push, action))
+            for pair, (bot, future) in futures.items():
+                try:
+                    result = future.result()
+                except ChainError as exc:
+                    assert not expected[pair] and "balance" in str(exc) and bot in str(exc), (pair, exc)
+                    failed += 1
+                    continue
+                assert expected[pair], pair
+                fills = parse_fills_from_result(result)
+                assert len(fills) == 1 and fills[0]["trade_pair"] == pair and fills[0]["maker_account"] == bot, fills
+                assert all(bot in (sender, receiver) or "swap.admin" in (sender, receiver)
+                           for _, sender, receiver, _ in parse_transfers_from_result(result))
+                filled += 1
+    batcher.close()
+    assert chain.trade_count == filled, (chain.trade_count, filled)
+    return filled, failed, pushes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pairs", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--max-actions", type=int, default=16)
+    parser.add_argument("--window-ms", type=float, default=20)
+    options = parser.parse_args()
+    for fail_ratio in (0.0, 0.01, 0.05, 0.2):
+        started = time.perf_counter()
+        filled, failed, pushes = run_rounds(options, fail_ratio, options.window_ms / 1000)
+        elapsed = time.perf_counter() - started
+        attempts = filled + failed
+        print(f"failing {fail_ratio:4.0%}: {filled} filled, {failed} failed, {len(pushes)} transactions "
+              f"({len(pushes) / attempts:.3f} per attempt, {sum(pushes) / attempts:.2f} action pushes per attempt, "
+              f"largest {max(pushes)}) in {elapsed:.2f}s")
+    print("golden checks passed")
+
+
+if __name__ == "__main__":
+    main()
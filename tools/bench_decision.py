@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Golden check and benchmark for the fixed-point trade decision path.
+
+Checks that forced_side and quote_required_amount give the same decisions as the
+Decimal formulas they replaced, on random markets and on ties and near-ties at
+the target, deadband and band edges. Then times the decision path for many pairs,
+with the caches cold (every row new) and warm (rows unchanged since the last round).
+
+Usage: python tools/bench_decision.py [--pairs 2000] [--cases 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pydexbot.assets import Asset, cached_asset, forced_side, price_bands, quote_required_amount  # noqa: E402
+
+CORRECTION_BAND_MULTIPLIER = Decimal("2.0")
+
+
+def legacy_parse_asset(value):
+    amount, symbol = str(value).strip().split()
+    return Decimal(amount), symbol
+
+
+def legacy_forced_side(market_config, swap_market, deadband_ratio):
+    """
+    predict_trade_side before fixed point, up to the candle plan (None inside the band).
+    Without a deadband, the check possible_trade_sides made.
+    """
+    target_price = Decimal(str(market_config.get("target_price") or "0"))
+    fluctuation_ratio = Decimal(str(market_config.get("fluctuation_ratio") or "0"))
+    left_amount, _ = legacy_parse_asset(swap_market["left_pool_quant"]["quantity"])
+    right_amount, _ = legacy_parse_asset(swap_market["right_pool_quant"]["quantity"])
+    if left_amount <= 0 or right_amount <= 0:
+        return None
+
+    left_price = right_amount / left_amount
+    if deadband_ratio is not None and target_price > 0:
+        target_gap_ratio = abs(left_price - target_price) / target_price
+        if target_gap_ratio > deadband_ratio and left_price < target_price:
+            return "right"
+        if target_gap_ratio > deadband_ratio and left_price > target_price:
+            return "left"
+
+    correction_ratio = min(fluctuation_ratio * CORRECTION_BAND_MULTIPLIER, Decimal("1"))
+    min_price = target_price * (Decimal("1") - correction_ratio)
+    max_price = target_price * (Decimal("1") + correction_ratio)
+    if left_price < min_price:
+        return "right"
+    if left_price > max_price:
+        return "left"
+    return None
+
+
+def legacy_required_amount(market_config, swap_market):
+    min_left_amount, _ = legacy_parse_asset(market_config["min_trade_amount"])
+    left_amount, _ = legacy_parse_asset(swap_market["left_pool_quant"]["quantity"])
+    right_amount, _ = legacy_parse_asset(swap_market["right_pool_quant"]["quantity"])
+    return min_left_amount * (right_amount / left_amount)
+
+
+def new_forced_side(market_config, swap_market, deadband_ratio):
+    left = cached_asset(swap_market["left_pool_quant"]["quantity"])
+    right = cached_asset(swap_market["right_pool_quant"]["quantity"])
+    if left.amount <= 0 or right.amount <= 0:
+        return None
+    bands = price_bands(market_config.get("target_price") or "0", market_config.get("fluctuation_ratio") or "0", deadband_ratio)
+    return forced_side(left, right, bands)
+
+
+def new_required_amount(market_config, swap_market, precision):
+    return quote_required_amount(
+        cached_asset(market_config["min_trade_amount"]),
+        cached_asset(swap_market["left_pool_quant"]["quantity"]),
+        cached_asset(swap_market["right_pool_quant"]["quantity"]),
+        precision,
+    )
+
+
+def quantity(amount, precision, symbol):
+    return str(Asset(amount, precision, symbol))
+
+
+def random_case(rng):
+    while True:
+        case = _random_case(rng)
+        if case:
+            return case
+
+
+def _random_case(rng):
+    left_precision, right_precision = rng.choice((8, 6, 4, 0)), rng.choice((8, 6, 4))
+    left = rng.randrange(1, 10 ** rng.randint(1, 18))
+    target = Decimal(rng.randrange(1, 10 ** 9)).scaleb(-rng.randint(0, 12))
+    # Price near the target, inside or outside the deadband and band
+    price = target * (1 + Decimal(rng.uniform(-0.05, 0.05)))
+    right = max(1, int(Decimal(left) * price * Decimal(10) ** (right_precision - left_precision)))
+    if right >= 2 ** 63:
+        return None
+    config = {
+        "target_price": str(target) if rng.random() < 0.9 else "0",
+        "fluctuation_ratio": rng.choice(("0.01", "0.005", "0.02", "0", "0.6", 0.003)),
+        "min_trade_amount": quantity(rng.randrange(1, 10 ** 10), left_precision, "AAA"),
+    }
+    market = {
+        "left_pool_quant": {"quantity": quantity(left, left_precision, "AAA")},
+        "right_pool_quant": {"quantity": quantity(right, right_precision, "USDT")},
+    }
+    return config, market, Decimal(rng.choice(("0.006", "0.004", "0.01", "0"))), right_precision
+
+
+def edge_cases():
+    """
+    Prices exactly at the target, at deadband and band edges, and one unit off them.
+    """
+    cases = []
+    for left, target in ((10 ** 12, "0.05"), (3, "0.3333"), (7 * 10 ** 8, "1.5"), (10 ** 18 - 1, "0.000001")):
+        for factor in ("1", "1.006", "0.994", "1.02", "0.98", "1.01", "0.99"):
+            right_exact = Decimal(left) * Decimal(target) * Decimal(factor)
+            for right in {int(right_exact) - 1, int(right_exact), int(right_exact) + 1}:
+                if right <= 0:
+                    continue
+                config = {"target_price": target, "fluctuation_ratio": "0.01", "min_trade_amount": "3.00000000 AAA"}
+                market = {
+                    "left_pool_quant": {"quantity": quantity(left, 8, "AAA")},
+                    "right_pool_quant": {"quantity": quantity(right, 8, "USDT")},
+                }
+                for deadband in (Decimal("0.006"), Decimal("0.02"), Decimal("0.01")):
+                    cases.append((config, market, deadband, 8))
+    return cases
+
+
+def check(cases):
+    for config, market, deadband, precision in cases:
+        for ratio in (deadband, None):
+            assert new_forced_side(config, market, ratio) == legacy_forced_side(config, market, ratio), (config, market, ratio)
+        legacy = legacy_required_amount(config, market)
+        required = new_required_amount(config, market, precision)
+        unit = Decimal(1).scaleb(-precision)
+        base = legacy.quantize(unit)
+        for step in range(-2, 3):
+            balance = base + unit * step
+            assert (balance >= legacy) == (balance >= required), (config, market, balance, legacy, required)
+
+
+def rate(fn, items, seconds, repeat=5):
+    """
+    Best items/s over `repeat` runs of about `seconds` each.
+    """
+    best = 0.0
+    for _ in range(repeat):
+        count = 0
+        started = time.perf_counter()
+        while time.perf_counter() - started < seconds:
+            for item in items:
+                fn(*item)
+            count += len(items)
+        best = max(best, count / (time.perf_counter() - started))
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pairs", type=int, default=2000)
+    parser.add_argument("--cases", type=int, default=20000)
+    parser.add_argument("--seconds", type=float, default=0.5)
+    options = parser.parse_args()
+
+    rng = random.Random(15)
+    check(edge_cases())
+    check([random_case(rng) for _ in range(options.cases)])
+    print("golden checks passed")
+
+    pairs = [random_case(rng) for _ in range(options.pairs)]
+
+    # One pair's decisions in a round: possible_trade_sides, predict_trade_side and
+    # the right side's required balance
+    def legacy_round(config, market, deadband, precision):
+        legacy_forced_side(config, market, None)
+        legacy_forced_side(config, market, deadband)
+        legacy_required_amount(config, market)
+
+    def new_round(config, market, deadband, precision):
+        new_forced_side(config, market, None)
+        new_forced_side(config, market, deadband)
+        new_required_amount(config, market, precision)
+
+    def cold_round(config, market, deadband, precision):
+        cached_asset.cache_clear()
+        new_round(config, market, deadband, precision)
+
+    print(f"{'Decimal decision path':<32} {rate(legacy_round, pairs, options.seconds):10.0f} pairs/s")
+    print(f"{'fixed point, cold cache':<32} {rate(cold_round, pairs, options.seconds):10.0f} pairs/s")
+    print(f"{'fixed point, warm cache':<32} {rate(new_round, pairs, options.seconds):10.0f} pairs/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+End-to-end throughput benchmark against the local mock node.
+
+Starts tools/mock_node.py with N pairs and M bots per pair, runs the bot service
+(python -m pydexbot.main) against it for a fixed time, then reports trades/sec,
+RPCs per trade, round-latency percentiles and peak RSS. Results can be saved and
+compared with a saved baseline; a regression beyond --tolerance exits with 1.
+
+Usage:
+  python tools/bench_e2e.py --pairs 20 --bots 16 --duration 30 --save bench.json
+  python tools/bench_e2e.py --pairs 20 --bots 16 --duration 30 --baseline bench.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import base58
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mock_node import MockChain, MockNode, pair_names  # noqa: E402
+
+# (metric, direction): +1 means higher is better
+COMPARED_METRICS = (
+    ("trades_per_sec", 1),
+    ("rpc_per_trade", -1),
+    ("round_latency_p50_ms", -1),
+    ("round_latency_p99_ms", -1),
+    ("peak_rss_mb", -1),
+)
+
+
+def bench_private_key():
+    payload = b"\x80" + hashlib.sha256(b"pydexbot bench key").digest()
+    return base58.b58encode(payload + hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4]).decode()
+
+
+def write_config(config_dir, node_url, pairs, options):
+    with open(os.path.join(ROOT, "config", "config.example.yaml")) as f:
+        config = yaml.safe_load(f)
+    config.update({
+        "node_url": node_url,
+        "trade_privkey": bench_private_key(),
+        "tokenx_mm_contract": "tokenx.mm",
+        "buylowsellhi_contract": "buylowsellhi",
+        "bot_mm_contract": "bot.mm",
+        "dex_contract": "flon.swap",
+        "trade_pairs": pairs,
+        "min_interval_seconds": 1,
+        "max_interval_seconds": 1,
+        "interval_jitter_ratio": 0,
+        "retry_min_interval_seconds": 1,
+        "retry_max_interval_seconds": 1,
+        "ready_jitter_seconds": 0,
+        "local_signing_enabled": options.local_signing,
+        "abi_cache_dir": os.path.join(config_dir, "abi"),
+        "journal_dir": os.path.join(config_dir, "journal"),
+        "warm_start_path": os.path.join(config_dir, "warm_start.json"),
+    })
+    for item in options.set or []:
+        key, _, value = item.partition("=")
+        config[key] = yaml.safe_load(value)
+    with open(os.path.join(config_dir, ".config.yaml"), "w") as f:
+        yaml.safe_dump(config, f)
+
+
+def rss_kb(pid, field):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def percentile(values, ratio):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+
+def run(options):
+    pairs = pair_names(options.pairs)
+    chain = MockChain(pairs, options.bots, schedule_interval_seconds=options.schedule_interval_seconds, seed=1)
+    node = MockNode(chain, latency_ms=options.latency_ms, latency_jitter_ms=options.latency_jitter_ms,
+                    error_rate=options.error_rate, push_error_rate=options.push_error_rate, seed=1)
+    node.start()
+    with tempfile.TemporaryDirectory() as workdir:
+        write_config(workdir, node.url, pairs, options)
+        log_path = os.path.join(workdir, "service.out")
+        with open(log_path, "w") as out:
+            proc = subprocess.Popen(
+                [sys.executable, "-m", "pydexbot.main", "--config-dir", workdir, "--log-dir", os.path.join(workdir, "logs")],
+                cwd=ROOT, stdout=out, stderr=subprocess.STDOUT,
+            )
+            time.sleep(options.warmup)
+            start_stats = node.stats()
+            started = time.monotonic()
+            peak_rss_kb = 0
+            while time.monotonic() - started < options.duration and proc.poll() is None:
+                peak_rss_kb = max(peak_rss_kb, rss_kb(proc.pid, "VmRSS"))
+                time.sleep(0.2)
+            elapsed = time.monotonic() - started
+            end_stats = node.stats()
+            peak_rss_kb = max(peak_rss_kb, rss_kb(proc.pid, "VmHWM"))
+            exited_early = proc.poll() is not None
+            proc.send_signal(signal.SIGTERM)
+            try:
+                proc.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+        node.stop()
+        if exited_early:
+            with open(log_path) as f:
+                sys.stderr.write(f.read()[-4000:])
+            raise SystemExit("bot service exited during the benchmark")
+
+    trades = end_stats["trades"] - start_stats["trades"]
+    rpcs = end_stats["rpc_total"] - start_stats["rpc_total"]
+    latencies = end_stats["round_latencies_ms"][len(start_stats["round_latencies_ms"]):]
+    per_endpoint = {
+        key: round((count - start_stats["requests"].get(key, 0)) / trades, 3) if trades else None
+        for key, count in sorted(end_stats["requests"].items())
+    }
+    return {
+        "pairs": options.pairs,
+        "bots": options.bots,
+        "local_signing": options.local_signing,
+        "duration_seconds": round(elapsed, 2),
+        "trades": trades,
+        "failed_pushes": end_stats["failed_pushes"] - start_stats["failed_pushes"],
+        "trades_per_sec": round(trades / elapsed, 3) if elapsed else 0,
+        "rpc_per_trade": round(rpcs / trades, 3) if trades else None,
+        "rpc_per_trade_by_endpoint": per_endpoint,
+        "round_latency_p50_ms": percentile(latencies, 0.50),
+        "round_latency_p90_ms": percentile(latencies, 0.90),
+        "round_latency_p99_ms": percentile(latencies, 0.99),
+        "round_latency_max_ms": max(latencies) if latencies else None,
+        "peak_rss_mb": round(peak_rss_kb / 1024, 1),
+    }
+
+
+def compare(result, baseline, tolerance):
+    regressions = []
+    for metric, direction in COMPARED_METRICS:
+        new, old = result.get(metric), baseline.get(metric)
+        if new is None or not old:
+            continue
+        change = (new - old) / old
+        regressed = change * direction < -tolerance
+        print(f"{metric:<24} {old:>12.3f} -> {new:>12.3f}  {change:+7.1%}{'  REGRESSION' if regressed else ''}")
+        if regressed:
+            regressions.append(metric)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1], formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pairs", type=int, default=4)
+    parser.add_argument("--bots", type=int, default=8, help="bots per pair")
+    parser.add_argument("--duration", type=float, default=20.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="seconds before measuring")
+    parser.add_argument("--local-signing", action="store_true", help="sign transactions in the bot (local_signing_enabled)")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0, help="share of requests answered with 503")
+    parser.add_argument("--push-error-rate", type=float, default=0, help="share of pushes rejected as no fill")
+    parser.add_argument("--schedule-interval-seconds", type=int, default=0)
+    parser.add_argument("--set", action="append", metavar="KEY=VALUE", help="extra config override, YAML value")
+    parser.add_argument("--save", help="write the result as JSON")
+    parser.add_argument("--baseline", help="compare with a saved result")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative regression")
+    options = parser.parse_args()
+
+    result = run(options)
+    print(json.dumps(result, indent=2))
+    if options.save:
+        with open(options.save, "w") as f:
+            json.dump(result, f, indent=2)
+    if options.baseline:
+        with open(options.baseline) as f:
+            baseline = json.load(f)
+        if compare(result, baseline, options.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
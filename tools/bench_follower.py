@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Golden check and benchmark for the chain follower against the local mock node.
+
+Starts a mock node and follows it with ChainFollower while other traders swap,
+move bot funds and change market configs directly on the mock chain. Once the
+follower has caught up, every mirrored row and balance must equal the chain's.
+Runs once with table_deltas in blocks and once with actions only (re-reads), and
+reports RPCs per second, the share of balances still mirrored and the latency of
+a mirror read against a point read.
+
+Usage: python tools/bench_follower.py [--pairs 50] [--bots 8] [--duration 10]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pydexbot.chain_follower import ChainFollower  # noqa: E402
+from mock_node import ChainError, MockChain, MockNode, format_quantity, pair_names  # noqa: E402
+from pydexbot.node_pool import NodePool  # noqa: E402
+
+TRADEMARKETS = ("buylowsellhi", "buylowsellhi", "trademarkets")
+MARKETS = ("flon.swap", "flon.swap", "markets")
+BOTMARKETS = ("tokenx.mm", "tokenx.mm", "botmarkets")
+SCHEDULES = ("tokenx.mm", "tokenx.mm", "schedules")
+BOTGROUPS = ("bot.mm", "bot.mm", "botgroups")
+TABLES = {
+    TRADEMARKETS: ("name", "trade_pair_name"),
+    MARKETS: "tpcode",
+    BOTMARKETS: "trade_pair_name",
+    SCHEDULES: "trade_pair_name",
+    BOTGROUPS: "name",
+}
+WATCH = {
+    "tokenx.mm": (MARKETS, BOTMARKETS, SCHEDULES),
+    "flon.swap": (MARKETS,),
+    "buylowsellhi": (TRADEMARKETS,),
+    "bot.mm": (BOTGROUPS,),
+}
+
+
+def pair_tokens(chain, pair):
+    market = chain.pairs[pair]
+    return market["base"], market["quote"]
+
+
+def outside_activity(chain, pairs, rng):
+    """
+    One action by someone else: a swap, a transfer between two bots or a new target price.
+    """
+    pair = rng.choice(pairs)
+    bots = chain.tables[BOTGROUPS][pair]["bots"]
+    kind = rng.random()
+    if kind < 0.6:
+        action = {"account": "tokenx.mm", "name": rng.choice(("buy", "sell")), "authorization": [],
+                  "data": {"bot": rng.choice(bots), "trade_pair_name": pair, "memo": ""}}
+    elif kind < 0.9:
+        contract, symbol, precision = rng.choice(pair_tokens(chain, pair))
+        sender, receiver = rng.sample(bots, 2)
+        amount = Decimal(rng.randint(1, 10)).scaleb(-1)
+        action = {"account": contract, "name": "transfer", "authorization": [],
+                  "data": {"from": sender, "to": receiver, "quantity": format_quantity(amount, precision, symbol), "memo": ""}}
+    else:
+        target = Decimal(rng.randint(45, 55)).scaleb(-3)
+        action = {"account": "buylowsellhi", "name": "setmarket", "authorization": [],
+                  "data": {"trade_pair_name": pair, "target_price": str(target)}}
+    try:
+        chain.execute([action])
+    except ChainError:
+        pass
+
+
+def check_mirror(chain, follower, pairs, mirrored):
+    for table_key in TABLES:
+        for pair in pairs:
+            hit, row = follower.row(*table_key, pair)
+            assert hit, (table_key, pair, follower.stats())
+            assert row == chain.tables[table_key].get(pair), (table_key, pair, row, chain.tables[table_key].get(pair))
+    served = 0
+    for contract, account, symbol in mirrored:
+        hit, amount = follower.balance(contract, account, symbol)
+        if hit:
+            served += 1
+            assert amount == chain.balance(contract, account, symbol), (contract, account, symbol, amount)
+    return served
+
+
+def run(options, block_deltas):
+    pairs = pair_names(options.pairs)
+    chain = MockChain(pairs, options.bots, block_deltas=block_deltas, seed=16)
+    node = MockNode(chain, seed=16)
+    node.start()
+    pool = NodePool([node.url], hedge_enabled=False, health_interval_seconds=0)
+    follower = ChainFollower(
+        lambda: pool.read("/v1/chain/get_info", {}, hedge=False),
+        lambda block_num: pool.read("/v1/chain/get_block", {"block_num_or_id": block_num}, hedge=False),
+        pool.get_table_rows,
+        pairs,
+        TABLES,
+        WATCH,
+        poll_seconds=options.poll_seconds,
+        reconcile_seconds=0,
+    )
+    errors = []
+    follower.start(errors.append)
+    try:
+        mirrored = []
+        for pair in pairs:
+            for bot in chain.tables[BOTGROUPS][pair]["bots"]:
+                for contract, symbol, _ in pair_tokens(chain, pair):
+                    read_started = time.monotonic()
+                    resp = pool.get_table_rows(contract, bot, "accounts", symbol, symbol, 1)
+                    amount = Decimal(resp["rows"][0]["balance"].split()[0]) if resp["rows"] else Decimal(0)
+                    follower.record_balance(contract, bot, symbol, amount, read_started)
+                    mirrored.append((contract, bot, symbol))
+
+        rng = random.Random(16)
+        requests_before = node.stats()["rpc_total"]
+        started = time.monotonic()
+        actions = 0
+        while time.monotonic() - started < options.duration:
+            outside_activity(chain, pairs, rng)
+            actions += 1
+            time.sleep(options.action_interval_ms / 1000.0)
+        last_block = chain.head_block_num() + 1
+        while follower.stats()["processed_block_num"] < last_block or follower.stats()["stale_rows"]:
+            time.sleep(0.05)
+            assert time.monotonic() - started < options.duration + 30, follower.stats()
+        elapsed = time.monotonic() - started
+        requests = node.stats()["rpc_total"] - requests_before
+
+        served = check_mirror(chain, follower, pairs, mirrored)
+
+        key = (*MARKETS, pairs[-1])
+        count = 20000
+        read_started = time.perf_counter()
+        for _ in range(count):
+            follower.row(*key)
+        mirror_us = (time.perf_counter() - read_started) / count * 1e6
+        read_started = time.perf_counter()
+        for _ in range(200):
+            pool.get_table_rows(key[0], key[1], key[2], key[3], key[3], 1)
+        point_us = (time.perf_counter() - read_started) / 200 * 1e6
+    finally:
+        follower.stop()
+        node.stop()
+    label = "table_deltas" if block_deltas else "actions only"
+    print(f"{label:<14} {actions:6d} actions  {requests / elapsed:8.1f} RPC/s  "
+          f"balances served {served}/{len(mirrored)}  mirror read {mirror_us:6.2f} us  point read {point_us:8.1f} us"
+          + (f"  poll errors {len(errors)}" if errors else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pairs", type=int, default=50)
+    parser.add_argument("--bots", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--poll-seconds", type=float, default=0.2)
+    parser.add_argument("--action-interval-ms", type=float, default=10)
+    options = parser.parse_args()
+    for block_deltas in (True, False):
+        run(options, block_deltas)
+    print("golden checks passed")
+    print(f"re-reading every row once per second instead: {len(TABLES) * options.pairs} RPC/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Golden check and benchmark for the process-wide RPC budget governor.
+
+Offers one node's token bucket --load times its rate from many threads, as a
+mix of push, schedule, market, balance and background requests, and checks that no more
+requests go out than the rate and burst allow, that pushes are never shed, and
+that lower priorities are shed before higher ones. Reports the queue time per
+priority. Runs trade rounds of several reads and a push against a budget too
+small for them, and checks that rounds are only shed at their first read and
+that almost all of the budget goes to rounds that finish. Then checks that
+scattered 5xx answers leave a node's rate alone, that a 429 halves it down to
+its floor, and that it climbs back within recover_seconds.
+
+Usage: python tools/bench_governor.py [--rate 200] [--load 2] [--threads 64] [--seconds 3]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pydexbot.rpc_governor import BALANCE, MARKET, PRIORITY_NAMES, PUSH, SCHEDULE, RpcGovernor, RpcShed  # noqa: E402
+
+URL = "http://node.test"
+# Share of the offered load per priority: push, schedule, market, balance, background
+MIX = (0.05, 0.15, 0.5, 0.2, 0.1)
+BOUNDS = [sum(MIX[:index + 1]) for index in range(len(MIX))]
+# Requests of one trade round: market config, schedule, bots, markets, botmarkets, two balances, push
+QUEUE_SECONDS = {"schedule": 0.5, "market": 0.25, "balance": 0.1, "background": 0.05}
+ROUND = (MARKET, SCHEDULE, MARKET, MARKET, MARKET, BALANCE, BALANCE, PUSH)
+
+
+def overload(options):
+    governor = RpcGovernor(options.rate, options.rate / 10, QUEUE_SECONDS)
+    sent = {priority: [] for priority in range(len(MIX))}
+    shed = {priority: 0 for priority in range(len(MIX))}
+    waits = {priority: [] for priority in range(len(MIX))}
+    lock = threading.Lock()
+    deadline = time.monotonic() + options.seconds
+    started = time.monotonic()
+
+    interval = options.threads / (options.rate * options.load)
+
+    def worker(index):
+        sequence = 0
+        next_at = started + index * interval / options.threads
+        while next_at < deadline:
+            delay = next_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            next_at += interval
+            # Deterministic mix: thread index and request number pick the priority
+            point = ((index * 7919 + sequence * 104729) % 1000) / 1000
+            sequence += 1
+            priority = next((p for p, bound in enumerate(BOUNDS) if point < bound), len(MIX) - 1)
+            asked_at = time.monotonic()
+            try:
+                governor.acquire(URL, priority)
+            except RpcShed:
+                with lock:
+                    shed[priority] += 1
+                continue
+            now = time.monotonic()
+            with lock:
+                sent[priority].append(now)
+                waits[priority].append(now - asked_at)
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(options.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    total = sum(len(times) for times in sent.values())
+    allowed = options.rate * elapsed + governor.burst
+    assert total <= allowed + 1, (total, allowed)
+    assert total >= options.rate * options.seconds * 0.9, (total, options.rate * options.seconds)
+    assert shed[PUSH] == 0, shed
+    offered = {priority: len(sent[priority]) + shed[priority] for priority in sent}
+    shed_ratio = {priority: shed[priority] / offered[priority] if offered[priority] else 0.0 for priority in sent}
+    for priority in range(1, len(MIX)):
+        assert shed_ratio[priority] >= shed_ratio[priority - 1] - 0.01, shed_ratio
+    print(f"{total} requests sent in {elapsed:.2f}s at {total / elapsed:.0f}/s (cap {options.rate}/s, burst "
+          f"{governor.burst:.0f}); offered {sum(offered.values())}")
+    for priority, name in enumerate(PRIORITY_NAMES):
+        times = sorted(waits[priority]) or [0.0]
+        print(f"  {name:10s} sent {len(sent[priority]):6d}  shed {shed_ratio[priority]:6.1%}  "
+              f"queue p50 {times[len(times) // 2] * 1000:6.1f} ms  p99 {times[int(len(times) * 0.99)] * 1000:6.1f} ms")
+
+
+def rounds(options):
+    governor = RpcGovernor(options.rate, options.rate / 10, QUEUE_SECONDS)
+    finished = []
+    shed = []
+    lock = threading.Lock()
+    started = time.monotonic()
+    deadline = started + options.seconds
+
+    def worker():
+        while time.monotonic() < deadline:
+            governor.begin_round()
+            try:
+                for index, priority in enumerate(ROUND):
+                    try:
+                        governor.acquire(URL, priority)
+                    except RpcShed:
+                        assert index == 0, (index, priority)
+                        with lock:
+                            shed.append(index)
+                        time.sleep(0.05)
+                        break
+                else:
+                    with lock:
+                        finished.append(time.monotonic())
+            finally:
+                governor.end_round()
+
+    threads = [threading.Thread(target=worker) for _ in range(options.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Rounds admitted before the deadline finish after it
+    capacity = (options.rate * (time.monotonic() - started) + governor.burst) / len(ROUND)
+    assert len(finished) >= capacity * 0.9, (len(finished), capacity)
+    print(f"rounds: {len(finished)} finished of {capacity:.0f} the budget allows ({len(finished) / capacity:.0%}), "
+          f"{len(shed)} shed at their first read, none later")
+
+
+def backoff(options):
+    governor = RpcGovernor(options.rate, min_rate_ratio=0.1, recover_seconds=1.0)
+    governor.try_acquire(URL, PUSH)
+    rates = []
+    for number in range(100):
+        # Isolated 5xx answers among successes are not the node pushing back
+        governor.try_acquire(URL, PUSH)
+        governor._buckets[URL].tokens += 1
+        if number % 20 == 0:
+            governor.backoff(URL)
+    assert governor.rates()[URL] == options.rate, governor.rates()
+    for _ in range(6):
+        governor.backoff(URL, throttled=True)
+        governor.backoff(URL, throttled=True)
+        rates.append(governor.rates()[URL])
+        # Rates only drop once per second; fake the second instead of sleeping
+        governor._buckets[URL].backed_off_at -= 1.0
+    floor = options.rate * 0.1
+    assert abs(rates[0] - options.rate / 2) < options.rate * 0.01, rates
+    assert all(later <= earlier + 0.01 for earlier, later in zip(rates, rates[1:])), rates
+    assert min(rates) >= floor - 1e-9 and abs(rates[-1] - floor) < options.rate * 0.01, rates
+    time.sleep(1.1)
+    governor.try_acquire(URL, PUSH)
+    recovered = governor.rates()[URL]
+    assert recovered == options.rate, recovered
+    print("backoff: " + " -> ".join(f"{rate:.0f}" for rate in rates) + f"/s, back to {recovered:.0f}/s after 1.1s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rate", type=float, default=200)
+    parser.add_argument("--load", type=float, default=2)
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=3)
+    options = parser.parse_args()
+    overload(options)
+    rounds(options)
+    backoff(options)
+    print("golden checks passed")
+
+
+if __name__ == "__main__":
+    main()
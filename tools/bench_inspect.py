@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Golden check and benchmark for `pydexbot inspect` against the local mock node.
+
+Moves every pair's pool price and sets random bot wallets on the mock chain, runs
+`python -m pydexbot.main inspect --format json` and checks each pair's price,
+deviation from target_price, inventory bps and funded sell/buy bot counts against
+values computed from the chain state. Checks that the CSV output holds the same
+rows. Reports the time and RPCs of one pass, and the time the same requests take
+one at a time at the node's latency, as the shell tools sent them.
+
+Usage: python tools/bench_inspect.py [--pairs 50] [--bots 8] [--latency-ms 20]
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from decimal import ROUND_UP, Decimal
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_e2e import write_config  # noqa: E402
+from mock_node import MockChain, MockNode, pair_names  # noqa: E402
+
+MIN_TRADE = Decimal("10")
+
+
+def move_chain(chain, rng):
+    for pair, market in chain.pairs.items():
+        market["right"] = (market["left"] * Decimal(rng.choice(("0.040", "0.049", "0.050", "0.051", "0.060")))).quantize(Decimal("0.000001"))
+        chain._refresh_market(pair)
+        bots = chain.tables[(chain.bot_mm_contract, chain.bot_mm_contract, "botgroups")][pair]["bots"]
+        for bot in bots:
+            for contract, symbol, precision in (market["base"], market["quote"]):
+                chain.set_balance(contract, bot, symbol, precision, Decimal(rng.choice((0, 1, 5, 10, 50, 1000))))
+
+
+def expected_rows(chain):
+    rows = {}
+    for pair, market in chain.pairs.items():
+        price = market["right"] / market["left"]
+        target = Decimal(chain.tables[(chain.buylowsellhi_contract, chain.buylowsellhi_contract, "trademarkets")][pair]["target_price"])
+        bots = chain.tables[(chain.bot_mm_contract, chain.bot_mm_contract, "botgroups")][pair]["bots"]
+        base_contract, base_symbol, _ = market["base"]
+        quote_contract, quote_symbol, quote_precision = market["quote"]
+        # A buy must pay at least min_trade_amount of base at the pool price, rounded up to the quote precision
+        quote_need = (MIN_TRADE * price).quantize(Decimal(1).scaleb(-quote_precision), rounding=ROUND_UP)
+        # The mock bot market holds 1000 base and 50 quote
+        left_value = Decimal("1000") * price
+        rows[pair] = {
+            "price": float(price),
+            "deviation": float(price / target - 1),
+            "inventory_bps": int(left_value * 10000 / (left_value + Decimal("50"))),
+            "bots": len(bots),
+            "funded_sell": sum(1 for bot in bots if chain.balance(base_contract, bot, base_symbol) >= MIN_TRADE),
+            "funded_buy": sum(1 for bot in bots if chain.balance(quote_contract, bot, quote_symbol) >= quote_need),
+        }
+    return rows
+
+
+def run_inspect(workdir, *extra):
+    started = time.monotonic()
+    result = subprocess.run(
+        [sys.executable, "-m", "pydexbot.main", "inspect", "--config-dir", workdir,
+         "--log-dir", os.path.join(workdir, "logs"), *extra],
+        cwd=ROOT, capture_output=True, text=True, timeout=300,
+    )
+    if result.returncode != 0:
+        sys.stderr.write(result.stdout[-4000:] + result.stderr[-4000:])
+        raise SystemExit(f"inspect exited with {result.returncode}")
+    return result.stdout, time.monotonic() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pairs", type=int, default=50)
+    parser.add_argument("--bots", type=int, default=8, help="bots per pair")
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    options = parser.parse_args()
+    options.local_signing = False
+    options.set = []
+
+    pairs = pair_names(options.pairs)
+    chain = MockChain(pairs, options.bots, seed=options.seed)
+    move_chain(chain, random.Random(options.seed))
+    expected = expected_rows(chain)
+    node = MockNode(chain, latency_ms=options.latency_ms, seed=options.seed)
+    node.start()
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            write_config(workdir, node.url, pairs, options)
+            before = node.stats()["rpc_total"]
+            output, seconds = run_inspect(workdir, "--format", "json")
+            rpcs = node.stats()["rpc_total"] - before
+            csv_output, _ = run_inspect(workdir, "--format", "csv")
+    finally:
+        node.stop()
+
+    rows = json.loads(output)
+    assert [row["pair"] for row in rows] == list(pairs), [row["pair"] for row in rows]
+    forced = 0
+    for row in rows:
+        want = expected[row["pair"]]
+        assert row["error"] is None, row
+        for field in ("inventory_bps", "bots", "funded_sell", "funded_buy"):
+            assert row[field] == want[field], (row["pair"], field, row[field], want[field])
+        for field in ("price", "deviation"):
+            assert abs(row[field] - want[field]) < 1e-9, (row["pair"], field, row[field], want[field])
+        # Target 0.05 with a 1% band: 0.049 and 0.051 sit on its edges, 0.04 and 0.06 outside
+        if abs(want["deviation"]) > 0.05:
+            assert row["forced_side"] == ("buy" if want["deviation"] < 0 else "sell"), row
+            forced += 1
+    csv_rows = list(csv.DictReader(io.StringIO(csv_output)))
+    assert [(row["pair"], int(row["funded_sell"]), int(row["funded_buy"])) for row in csv_rows] == \
+        [(row["pair"], row["funded_sell"], row["funded_buy"]) for row in rows], "csv and json rows differ"
+
+    serial = rpcs * options.latency_ms / 1000
+    print(f"{len(rows)} pairs, {options.bots} bots each: {seconds:.2f}s for one pass (process start included), "
+          f"{rpcs} RPCs; {serial:.1f}s one request at a time at {options.latency_ms:g} ms")
+    print(f"rows match the chain state; {forced} pairs outside their band report the forced side")
+    print("golden checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Golden check and benchmark for the bot inventory ledger and weighted bot picks.
+
+Checks that InventoryIndex.pick only returns bots holding the requested amount and
+that bots above the requested amount's balance bucket are picked in proportion to
+their balance. Then trades on an in-memory mock chain with bots picked from an
+InventoryLedger that is moved only by the transfers in the trade traces, and
+checks every ledger balance against the chain. Reports pick latency against the
+linear scan over the bot group that it replaces, and balance reads per trade.
+
+Usage: python tools/bench_inventory.py [--trades 2000] [--draws 200000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pydexbot.inventory import InventoryIndex, InventoryLedger, balance_bucket  # noqa: E402
+from mock_node import ChainError, MockChain, pair_names, parse_quantity  # noqa: E402
+from pydexbot.trace_parser import parse_transfers_from_result  # noqa: E402
+
+BOTGROUPS = ("bot.mm", "bot.mm", "botgroups")
+TRADEMARKETS = ("buylowsellhi", "buylowsellhi", "trademarkets")
+
+
+def random_balances(rng, count):
+    return {f"bot{i}": Decimal(round(rng.lognormvariate(3, 1.5), 4)).quantize(Decimal("0.0001")) for i in range(count)}
+
+
+def check_distribution(options):
+    rng = random.Random(17)
+    balances = random_balances(rng, 50)
+    index = InventoryIndex(rng)
+    for bot, amount in balances.items():
+        index.set(bot, amount)
+    need = sorted(balances.values())[len(balances) // 2]
+    floor = balance_bucket(need)
+    counts = dict.fromkeys(balances, 0)
+    for _ in range(options.draws):
+        bot = index.pick(need)
+        assert bot is not None and balances[bot] >= need, (bot, need)
+        counts[bot] += 1
+    weighted = {bot: amount for bot, amount in balances.items() if balance_bucket(amount) > floor}
+    total = sum(weighted.values())
+    distance = 0.0
+    for bot, amount in weighted.items():
+        expected = float(amount / total) * options.draws
+        distance += abs(counts[bot] - expected) / options.draws / 2
+        if expected >= 1000:
+            assert abs(counts[bot] - expected) < 0.1 * expected, (bot, counts[bot], expected)
+    assert distance < 0.02, distance
+    assert index.pick(max(balances.values()) + 1) is None
+
+    # Only need's own bucket holds enough: exact scan of that bucket
+    index = InventoryIndex(rng)
+    for bot, amount in (("a", Decimal("5")), ("b", Decimal("6")), ("c", Decimal("7")), ("d", Decimal("1"))):
+        index.set(bot, amount)
+    assert {index.pick(Decimal("6")) for _ in range(200)} == {"b", "c"}
+    # Balances below 1 and need <= 0
+    index.set("e", Decimal("0.5"))
+    index.set("a", Decimal(0))
+    assert {index.pick(Decimal(0)) for _ in range(2000)} == {"b", "c", "d", "e"}
+    print(f"pick distribution: {options.draws} draws over {len(weighted)} weighted bots, total variation {distance:.4f}")
+
+
+def bench_pick(options):
+    rng = random.Random(17)
+    for size in (8, 100, 1000, 10000):
+        balances = random_balances(rng, size)
+        index = InventoryIndex(rng)
+        for bot, amount in balances.items():
+            index.set(bot, amount)
+        bots = list(balances)
+        need = sorted(balances.values())[size // 2]
+        count = max(2000, 200000 // size)
+        started = time.perf_counter()
+        for _ in range(count):
+            index.pick(need)
+        pick_us = (time.perf_counter() - started) / count * 1e6
+        started = time.perf_counter()
+        for _ in range(count):
+            rng.choice([bot for bot in bots if balances[bot] >= need])
+        scan_us = (time.perf_counter() - started) / count * 1e6
+        print(f"{size:6d} bots  pick {pick_us:7.2f} us  linear scan {scan_us:9.2f} us")
+
+
+def check_ledger(options):
+    pairs = pair_names(options.pairs)
+    chain = MockChain(pairs, options.bots, funded_ratio=0.5, block_deltas=False, seed=17)
+    reads = [0]
+
+    def fetch_balances(contract, symbol, bots):
+        reads[0] += len(bots)
+        return {bot: chain.balance(contract, bot, symbol) for bot in bots}
+
+    rng = random.Random(17)
+    ledger = InventoryLedger(fetch_balances, reconcile_seconds=0, rng=rng)
+    trades = failed = no_bot = 0
+    for _ in range(options.trades):
+        pair = rng.choice(pairs)
+        market = chain.pairs[pair]
+        bots = chain.tables[BOTGROUPS][pair]["bots"]
+        min_base = parse_quantity(chain.tables[TRADEMARKETS][pair]["min_trade_amount"])[0]
+        side = rng.choice(("left", "right"))
+        if side == "left":
+            (contract, symbol, _), need = market["base"], min_base * Decimal("1.5")
+        else:
+            (contract, symbol, _), need = market["quote"], min_base * Decimal("1.5") * market["right"] / market["left"]
+        bot = ledger.pick(pair, contract, symbol, bots, need)
+        if bot is None:
+            no_bot += 1
+            continue
+        action = {"account": "tokenx.mm", "name": "sell" if side == "left" else "buy", "authorization": [],
+                  "data": {"bot": bot, "trade_pair_name": pair, "memo": ""}}
+        try:
+            result = chain.execute([action])
+        except ChainError:
+            failed += 1
+            ledger.invalidate(bot)
+            continue
+        ledger.apply_transfers(parse_transfers_from_result(result))
+        trades += 1
+
+    checked = 0
+    for pair in pairs:
+        for contract, symbol, _ in (chain.pairs[pair]["base"], chain.pairs[pair]["quote"]):
+            if not ledger.seeded(pair, contract, symbol):
+                continue
+            for bot in chain.tables[BOTGROUPS][pair]["bots"]:
+                amount = ledger.balance(pair, contract, symbol, bot)
+                assert amount == chain.balance(contract, bot, symbol), (pair, bot, symbol, amount)
+                checked += 1
+    assert trades and checked
+    print(f"ledger: {trades} trades, {failed} failed, {no_bot} without a funded bot, "
+          f"{checked} balances equal to the chain, {reads[0] / trades:.2f} balance reads per trade")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--trades", type=int, default=2000)
+    parser.add_argument("--draws", type=int, default=200000)
+    parser.add_argument("--pairs", type=int, default=20)
+    parser.add_argument("--bots", type=int, default=8)
+    options = parser.parse_args()
+    check_distribution(options)
+    check_ledger(options)
+    print("golden checks passed")
+    bench_pick(options)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Golden check and benchmark for the columnar trade journal.
+
+Writes random attempts over several days through TradeJournal and checks every
+query grouping and filter against the same aggregation done in plain Python,
+including a flush cut short. Then writes --days days of --rows-per-day attempts
+straight into the column format and times queries over all of them.
+
+Usage: python tools/bench_journal.py [--days 90] [--rows-per-day 100000]
+"""
+import argparse
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pydexbot.journal import (  # noqa: E402
+    COLUMNS, MICROS_PER_DAY, NAMES_FILE, OUTCOMES, SIDES, TradeJournal, day_name, parse_time, query,
+)
+from pydexbot.optional import load_numpy  # noqa: E402
+
+np = load_numpy()
+
+START = parse_time("2026-07-01")
+
+
+def random_attempts(rng, count, days, pairs, bots):
+    attempts = []
+    for _ in range(count):
+        pair = rng.choice(pairs)
+        outcome = rng.choice(OUTCOMES)
+        bot = None if outcome in ("no_funded_bot", "preflight_skip") else rng.choice(bots[pair])
+        side = rng.choice(("sell", "buy"))
+        base = round(rng.uniform(10, 15), 8) if outcome == "trade" else 0
+        quote = round(base * rng.uniform(0.04, 0.06), 6)
+        attempts.append((START / 1e6 + rng.uniform(0, days * 86400), pair, bot, side, outcome, base, quote,
+                         rng.uniform(0.001, 0.2), os.urandom(32).hex()))
+    return sorted(attempts)
+
+
+def expected_rows(attempts, group_by, keep):
+    groups = {}
+    for attempt in attempts:
+        at, pair, bot, side, outcome, base, quote, latency, _ = attempt
+        if not keep(attempt):
+            continue
+        fields = {"pair": pair, "bot": bot or "", "side": side, "outcome": outcome,
+                  "hour": time.strftime("%Y-%m-%dT%H:00", time.gmtime(int(at * 1e6) // 10 ** 6)),
+                  "day": time.strftime("%Y-%m-%d", time.gmtime(int(at * 1e6) // 10 ** 6))}
+        key = tuple(fields[name] for name in group_by)
+        group = groups.setdefault(key, {"attempts": 0, "base": 0.0, "quote": 0.0, "latency": 0.0, "max": 0.0,
+                                        **dict.fromkeys(OUTCOMES, 0)})
+        group["attempts"] += 1
+        group[outcome] += 1
+        if outcome == "trade":
+            group["base"] += base
+            group["quote"] += quote
+        group["latency"] += latency * 1000
+        group["max"] = max(group["max"], latency * 1000)
+    return groups
+
+
+def check_rows(rows, groups, group_by):
+    assert len(rows) == len(groups), (len(rows), len(groups))
+    for row in rows:
+        group = groups[tuple(row[name] for name in group_by)]
+        assert row["attempts"] == group["attempts"]
+        for outcome in OUTCOMES:
+            assert row[outcome] == group[outcome], (row, group)
+        assert math.isclose(row["base_volume"], group["base"], rel_tol=1e-9, abs_tol=1e-9)
+        assert math.isclose(row["quote_volume"], group["quote"], rel_tol=1e-9, abs_tol=1e-9)
+        assert math.isclose(row["latency_ms_avg"], group["latency"] / group["attempts"], rel_tol=1e-5)
+        assert math.isclose(row["latency_ms_max"], group["max"], rel_tol=1e-6)
+
+
+def golden(directory):
+    rng = random.Random(18)
+    pairs = ["flon.usdt", "abc.usdt", "xyz.usdt"]
+    bots = {pair: [f"{pair[:3]}bot{i}" for i in range(5)] for pair in pairs}
+    attempts = random_attempts(rng, 20000, 3, pairs, bots)
+    journal = TradeJournal(directory, flush_interval_seconds=0.05)
+    for attempt in attempts:
+        at, pair, bot, side, outcome, base, quote, latency, trx = attempt
+        journal.record(pair, bot, side, outcome, base, quote, latency, trx, at=at)
+    journal.close()
+
+    # A flush cut short: one column a record longer than the rest
+    last_day = os.path.join(directory, day_name(int(attempts[-1][0] * 1e6)))
+    with open(os.path.join(last_day, "time"), "ab") as f:
+        f.write(b"\x01" * 8)
+
+    cases = [
+        ((), {}, lambda attempt: True),
+        (("pair",), {}, lambda attempt: True),
+        (("bot", "side"), {"pairs": {"flon.usdt"}}, lambda attempt: attempt[1] == "flon.usdt"),
+        (("hour",), {"outcomes": ["trade", "no_fill"]}, lambda attempt: attempt[4] in ("trade", "no_fill")),
+        (("day", "outcome"), {"sides": ["buy"]}, lambda attempt: attempt[3] == "buy"),
+        (("pair",), {"since": START + MICROS_PER_DAY // 2, "until": START + 2 * MICROS_PER_DAY + 3600 * 10 ** 6},
+         lambda attempt: START + MICROS_PER_DAY // 2 <= int(attempt[0] * 1e6) < START + 2 * MICROS_PER_DAY + 3600 * 10 ** 6),
+        (("pair", "bot"), {"bots": {"abcbot1", "xyzbot2"}}, lambda attempt: attempt[2] in ("abcbot1", "xyzbot2")),
+    ]
+    for group_by, filters, keep in cases:
+        rows = query(directory, group_by=group_by, **filters)
+        check_rows(rows, expected_rows(attempts, group_by, keep), group_by)
+    total = query(directory, group_by=())[0]
+    assert total["attempts"] == len(attempts), total
+
+    # The writer drops the partial record when it opens the day again
+    journal = TradeJournal(directory)
+    journal.record("flon.usdt", "flobot0", "sell", "failed", at=attempts[-1][0])
+    journal.close()
+    sizes = {name: os.path.getsize(os.path.join(last_day, name)) // (np.dtype(dtype).itemsize) for name, _, dtype in COLUMNS}
+    assert len(set(sizes.values())) == 1, sizes
+    assert query(directory, group_by=())[0]["attempts"] == len(attempts) + 1
+    print(f"golden checks passed: {len(attempts)} attempts, {len(cases)} queries")
+
+
+def write_days(directory, days, rows_per_day, pair_count, bots_per_pair):
+    rng = np.random.default_rng(18)
+    names = [f"pair{i}" for i in range(pair_count)] + [f"bot{i}" for i in range(pair_count * bots_per_pair)]
+    for day in range(days):
+        path = os.path.join(directory, day_name(START + day * MICROS_PER_DAY))
+        os.makedirs(path)
+        with open(os.path.join(path, NAMES_FILE), "w") as f:
+            f.write("\n" + "".join(f"{name}\n" for name in names))
+        pair = rng.integers(0, pair_count, rows_per_day).astype("<u4")
+        outcome = rng.choice(len(OUTCOMES), rows_per_day, p=[0.78, 0.12, 0.03, 0.05, 0.02]).astype("u1")
+        columns = {
+            "time": np.sort(START + day * MICROS_PER_DAY + rng.integers(0, MICROS_PER_DAY, rows_per_day)).astype("<i8"),
+            "pair": pair + 1,
+            "bot": np.where(outcome >= 3, 0, pair_count + 1 + pair * bots_per_pair + rng.integers(0, bots_per_pair, rows_per_day)).astype("<u4"),
+            "side": rng.integers(1, len(SIDES), rows_per_day).astype("u1"),
+            "outcome": outcome,
+            "base": np.where(outcome == 0, rng.uniform(10, 15, rows_per_day), 0).astype("<f8"),
+            "quote": np.where(outcome == 0, rng.uniform(0.5, 0.75, rows_per_day), 0).astype("<f8"),
+            "latency": rng.uniform(1, 200, rows_per_day).astype("<f4"),
+            "trx": np.zeros(rows_per_day, dtype="S32"),
+        }
+        for name, values in columns.items():
+            values.tofile(os.path.join(path, name))
+
+
+def bench(directory, options):
+    started = time.perf_counter()
+    write_days(directory, options.days, options.rows_per_day, options.pairs, options.bots)
+    rows = options.days * options.rows_per_day
+    print(f"wrote {options.days} days x {options.rows_per_day} attempts ({rows / 1e6:.1f}M) in {time.perf_counter() - started:.1f}s")
+    last = START + options.days * MICROS_PER_DAY
+    cases = [
+        ("fill rate per pair, all days", {"group_by": ("pair",)}),
+        ("per bot and side, one pair", {"group_by": ("bot", "side"), "pairs": {"pair7"}}),
+        ("per hour, last 7 days", {"group_by": ("hour",), "since": last - 7 * MICROS_PER_DAY}),
+        ("no_fill per day", {"group_by": ("day",), "outcomes": ["no_fill"]}),
+    ]
+    for label, arguments in cases:
+        timings = []
+        for _ in range(options.repeat):
+            started = time.perf_counter()
+            result = query(directory, **arguments)
+            timings.append(time.perf_counter() - started)
+        print(f"{label:<32} {len(result):6d} rows  best {min(timings) * 1000:8.1f} ms  first {timings[0] * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--rows-per-day", type=int, default=100000)
+    parser.add_argument("--pairs", type=int, default=50)
+    parser.add_argument("--bots", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    options = parser.parse_args()
+    if np is None:
+        sys.exit("the journal benchmark needs numpy: pip install numpy")
+    directory = tempfile.mkdtemp(prefix="journal-")
+    try:
+        golden(os.path.join(directory, "golden"))
+        bench(os.path.join(directory, "bench"), options)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of per-trade action packing for tokenx.mm trade/buy/sell.
+
+Compares packing from scratch (resolving the ABI struct on every call, as a
+generic serializer does), pyflonkit's pack_args when it is installed, and the
+pre-packed ActionTemplate used by bot_service.
+
+Usage: python tools/bench_packing.py [--iterations 200000]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydexbot.packing import ENCODERS, ActionTemplate, compile_action, struct_fields, action_type  # noqa: E402
+
+TRADE_ABI = {
+    "version": "eosio::abi/1.2",
+    "types": [],
+    "structs": [
+        {"name": action, "base": "", "fields": [
+            {"name": "bot", "type": "name"},
+            {"name": "trade_pair_name", "type": "name"},
+            {"name": "memo", "type": "string"},
+        ]}
+        for action in ("trade", "buy", "sell")
+    ],
+    "actions": [{"name": action, "type": action, "ricardian_contract": ""} for action in ("trade", "buy", "sell")],
+    "tables": [],
+}
+
+
+def pack_from_scratch(abi, action_name, args):
+    return b"".join(ENCODERS[type_name](args[field]) for field, type_name in struct_fields(abi, action_type(abi, action_name)))
+
+
+def make_args(count):
+    bots = [f"botuser1{i:04d}".replace("0", "a").replace("6", "b").replace("7", "c").replace("8", "d").replace("9", "e") for i in range(64)]
+    return [
+        {"bot": random.choice(bots), "trade_pair_name": "flon.usdt", "memo": f"{random.randint(0, 2**32 - 1)}:candle_phase=body"}
+        for _ in range(count)
+    ]
+
+
+def bench(label, fn, samples, iterations):
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(samples[i % len(samples)])
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed / iterations * 1e6:8.2f} us/op")
+    return elapsed / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=200000)
+    options = parser.parse_args()
+
+    samples = make_args(1024)
+    template = ActionTemplate(compile_action(TRADE_ABI, "sell"), {"trade_pair_name": "flon.usdt"})
+    for args in samples[:64]:
+        assert template.pack(args) == pack_from_scratch(TRADE_ABI, "sell", args)
+
+    before = bench("from scratch", lambda args: pack_from_scratch(TRADE_ABI, "sell", args), samples, options.iterations)
+    try:
+        from pyflonkit import eosapi as chainapi
+        chainapi.set_abi("tokenx.mm", json.dumps(TRADE_ABI))
+        bench("pyflonkit pack_args", lambda args: chainapi.pack_args("tokenx.mm", "sell", args), samples, options.iterations)
+    except Exception as e:
+        print(f"{'pyflonkit pack_args':<28} skipped ({e.__class__.__name__}: {e})")
+    after = bench("ActionTemplate.pack", template.pack, samples, options.iterations)
+    print(f"speedup vs from scratch: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Golden check and benchmark for the pre-flight swap simulation.
+
+Trades on an in-memory mock chain whose pools and bot balances are set around the
+points where a swap stops filling: pools so thin that the output rounds to zero
+at some or all inputs, and wallets between nothing and twice the largest input.
+Every attempt is simulated from the rows a round reads and then pushed anyway
+(shadow mode): a FILL verdict must always fill, a NO_FILL verdict must never
+fill, and the simulated output of the filled input must equal the chain's.
+Reports the verdict/outcome matrix, the pushes that enforce mode would skip, and
+the cost of one simulation.
+
+Usage: python tools/bench_preflight.py [--attempts 5000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mock_node import ChainError, MockChain, pair_names  # noqa: E402
+from pydexbot.preflight import FILL, NO_FILL, UNCERTAIN, VERDICTS, SwapPreflight  # noqa: E402
+from pydexbot.trace_parser import parse_fills_from_result  # noqa: E402
+
+FEE_RATIO = Decimal("0.003")
+SCALE_MAX = Decimal("1.5")
+TRADEMARKETS = ("buylowsellhi", "buylowsellhi", "trademarkets")
+BOTMARKETS = ("tokenx.mm", "tokenx.mm", "botmarkets")
+MARKETS = ("flon.swap", "flon.swap", "markets")
+BOTGROUPS = ("bot.mm", "bot.mm", "botgroups")
+
+# Quote reserve of a 200000-base pool: normal, output zero at small inputs only, zero at every input
+QUOTE_RESERVES = (Decimal("10000"), Decimal("0.016"), Decimal("0.01"))
+
+
+def thin_pools(chain, pairs, rng):
+    for pair in pairs:
+        chain.pairs[pair]["right"] = rng.choice(QUOTE_RESERVES)
+        chain._refresh_market(pair)
+
+
+def attempt(chain, pair, side, rng):
+    market = chain.pairs[pair]
+    market_config = chain.tables[TRADEMARKETS][pair]
+    swap_market = chain.tables[MARKETS][pair]
+    check = SwapPreflight(side, market_config, swap_market, FEE_RATIO, SCALE_MAX, Decimal(0))
+    bot = rng.choice(chain.tables[BOTGROUPS][pair]["bots"])
+    contract, symbol, precision = market["base"] if side == "left" else market["quote"]
+    wallet = (check.max_input * Decimal(rng.uniform(0, 2))).quantize(Decimal(1).scaleb(-precision))
+    chain.set_balance(contract, bot, symbol, precision, wallet)
+    pool = chain.tables[BOTMARKETS][pair]["left_pool" if side == "left" else "right_pool"]["balance"]["quantity"]
+    verdict, _ = check.verdict(wallet + Decimal(pool.split()[0]))
+
+    action = {"account": "tokenx.mm", "name": "sell" if side == "left" else "buy", "authorization": [],
+              "data": {"bot": bot, "trade_pair_name": pair, "memo": ""}}
+    try:
+        result = chain.execute([action])
+    except ChainError as exc:
+        assert "no fill" in str(exc), exc
+        return verdict, "no_fill", None
+    fill = parse_fills_from_result(result)[0]
+    if side == "left":
+        amount_in, amount_out = fill["base_amount"], fill["quote_amount"]
+    else:
+        amount_in, amount_out = fill["quote_amount"], fill["base_amount"]
+    assert check.min_input <= amount_in <= check.max_input, (amount_in, check.min_input, check.max_input)
+    return verdict, "trade", check.output(amount_in)[0] == amount_out
+
+
+def golden(options):
+    rng = random.Random(19)
+    pairs = pair_names(options.pairs)
+    chain = MockChain(pairs, options.bots, block_deltas=False, seed=19)
+    matrix = {(verdict, outcome): 0 for verdict in VERDICTS for outcome in ("trade", "no_fill")}
+    exact = 0
+    for number in range(options.attempts):
+        if number % 50 == 0:
+            thin_pools(chain, pairs, rng)
+        pair = rng.choice(pairs)
+        verdict, outcome, output_exact = attempt(chain, pair, rng.choice(("left", "right")), rng)
+        matrix[verdict, outcome] += 1
+        if outcome == "trade":
+            assert output_exact, (pair, verdict)
+            exact += 1
+    assert matrix[FILL, "no_fill"] == 0, matrix
+    assert matrix[NO_FILL, "trade"] == 0, matrix
+    assert matrix[FILL, "trade"] and matrix[NO_FILL, "no_fill"] and matrix[UNCERTAIN, "trade"], matrix
+
+    print(f"{'verdict':<10} {'trade':>7} {'no_fill':>7}")
+    for verdict in VERDICTS:
+        print(f"{verdict:<10} {matrix[verdict, 'trade']:7d} {matrix[verdict, 'no_fill']:7d}")
+    no_fills = sum(matrix[verdict, "no_fill"] for verdict in VERDICTS)
+    print(f"golden checks passed: {options.attempts} attempts, {exact} simulated outputs equal to the fill; "
+          f"enforce would skip {matrix[NO_FILL, 'no_fill']} of {no_fills} no-fill pushes and no trade")
+
+
+def bench(options):
+    chain = MockChain(pair_names(1), options.bots, block_deltas=False, seed=19)
+    pair = next(iter(chain.pairs))
+    market_config = chain.tables[TRADEMARKETS][pair]
+    swap_market = chain.tables[MARKETS][pair]
+    funds = Decimal(12)
+    count = 20000
+    started = time.perf_counter()
+    for _ in range(count):
+        SwapPreflight("left", market_config, swap_market, FEE_RATIO, SCALE_MAX, Decimal("0.01")).verdict(funds)
+    print(f"one simulation and verdict: {(time.perf_counter() - started) / count * 1e6:.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--attempts", type=int, default=5000)
+    parser.add_argument("--pairs", type=int, default=10)
+    parser.add_argument("--bots", type=int, default=8)
+    options = parser.parse_args()
+    golden(options)
+    bench(options)
+
+
+if __name__ == "__main__":
+    main()
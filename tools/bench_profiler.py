@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Golden check and overhead benchmark for the stack dump and the sampling profiler.
+
+Runs --threads worker threads, each tagged as its own trade pair and spinning on
+Decimal math, next to an idle thread pool. Checks that the stack dump names every
+thread with its pair and current function, that a profile holds one tower per
+pair with the hot function in nearly all of its samples, that idle pool threads
+are left out, and that the written file is valid collapsed-stack text. Reports
+how much the profiler slows the workers down at each sampling interval.
+
+Usage: python tools/bench_profiler.py [--threads 8] [--seconds 2] [--intervals-ms 10,1]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pydexbot.profiler import SamplingProfiler, dump_stacks, tag_thread, untag_thread  # noqa: E402
+
+HOT = "decimal_work"
+
+
+def decimal_work(rounds):
+    price = Decimal("1.000001")
+    amount = Decimal("1000")
+    for _ in range(rounds):
+        amount = (amount * price).quantize(Decimal("0.000001"))
+    return amount
+
+
+def run_workers(options, seconds, pairs, on_started=None):
+    stop = threading.Event()
+    done = [0] * len(pairs)
+
+    def worker(index):
+        tag_thread(pairs[index])
+        try:
+            while not stop.is_set():
+                decimal_work(100)
+                done[index] += 1
+        finally:
+            untag_thread()
+
+    threads = [threading.Thread(target=worker, args=(index,), name=f"worker-{index}") for index in range(len(pairs))]
+    for thread in threads:
+        thread.start()
+    if on_started is not None:
+        on_started()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(done)
+
+
+def check_dump(pairs):
+    stop = threading.Event()
+    ready = threading.Barrier(len(pairs) + 1)
+
+    def worker(pair):
+        tag_thread(pair)
+        ready.wait()
+        while not stop.is_set():
+            decimal_work(10)
+        untag_thread()
+
+    threads = [threading.Thread(target=worker, args=(pair,), name=f"dump-{pair}") for pair in pairs]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    text = dump_stacks()
+    stop.set()
+    for thread in threads:
+        thread.join()
+    for pair in pairs:
+        header = f"thread dump-{pair} pair={pair}"
+        assert header in text, header
+        section = text.split(header, 1)[1].split("\nthread ", 1)[0]
+        assert "in worker" in section, section
+    print(f"stack dump: {len(pairs)} tagged threads named with their pair and stack")
+
+
+def check_profile(options, pairs):
+    with tempfile.TemporaryDirectory() as workdir:
+        idle = ThreadPoolExecutor(max_workers=4, thread_name_prefix="idle")
+        # Four tasks that are running at once start all four pool threads
+        started = threading.Barrier(5)
+        for _ in range(4):
+            idle.submit(started.wait)
+        started.wait()
+        profiler = SamplingProfiler(workdir, 0.005)
+        results = []
+        def start():
+            assert profiler.start(options.seconds, lambda path, stats: results.append((path, stats)))
+            assert not profiler.start(options.seconds), "a second profile started while one was running"
+        run_workers(options, options.seconds + 0.2, pairs, start)
+        profiler.stop()
+        idle.shutdown()
+        assert len(results) == 1, results
+        path, stats = results[0]
+        towers = {}
+        hot = {}
+        with open(path) as f:
+            for line in f:
+                stack, _, count = line.rstrip("\n").rpartition(" ")
+                frames = stack.split(";")
+                assert count.isdigit() and len(frames) >= 2, line
+                towers[frames[0]] = towers.get(frames[0], 0) + int(count)
+                if any(frame.startswith(HOT + " ") for frame in frames):
+                    hot[frames[0]] = hot.get(frames[0], 0) + int(count)
+    assert not [tag for tag in towers if tag.startswith("idle")], towers
+    assert stats["idle"] >= 4 * stats["samples"] * 0.9, stats
+    for pair in pairs:
+        # Every tick sees every worker; a few ticks land between two decimal_work calls
+        assert towers.get(pair, 0) >= stats["samples"] * 0.9, (pair, towers.get(pair), stats)
+        assert hot.get(pair, 0) >= towers[pair] * 0.7, (pair, hot.get(pair), towers[pair])
+    print(f"profile: {stats['samples']} samples, {stats['stacks']} stacks, {len(pairs)} pair towers with "
+          f"{min(hot[pair] / towers[pair] for pair in pairs):.0%}+ in {HOT}, {stats['idle']} idle samples left out")
+
+
+def overhead(options, pairs):
+    baseline = run_workers(options, options.seconds, pairs)
+    print(f"workers alone: {baseline / options.seconds:,.0f} batches/s")
+    for interval_ms in options.intervals_ms:
+        with tempfile.TemporaryDirectory() as workdir:
+            profiler = SamplingProfiler(workdir, interval_ms / 1000)
+            results = []
+            profiled = run_workers(options, options.seconds, pairs,
+                                   lambda: profiler.start(options.seconds + 1, lambda path, stats: results.append(stats)))
+            profiler.stop()
+        stats = results[0]
+        # With every thread busy the sampler waits its turn for the GIL, so it takes fewer samples than asked
+        print(f"  profiled every {interval_ms:g} ms: {profiled / options.seconds:,.0f} batches/s "
+              f"({1 - profiled / baseline:.1%} slower), {stats['samples'] / stats['seconds']:.0f} samples/s, "
+              f"sampler busy {stats['overhead_ratio']:.1%} of the time")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=2)
+    parser.add_argument("--intervals-ms", type=lambda text: [float(part) for part in text.split(",")],
+                        default=[10.0, 1.0])
+    options = parser.parse_args()
+    pairs = [f"pair{index}.usdt" for index in range(options.threads)]
+    check_dump(pairs)
+    check_profile(options, pairs)
+    overhead(options, pairs)
+    print("golden checks passed")
+
+
+if __name__ == "__main__":
+    main()
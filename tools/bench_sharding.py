@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Golden check and benchmark for pair sharding with a hash ring and file leases.
+
+Checks how evenly the consistent hash ring spreads pairs over members and that
+adding a member only moves pairs to it. Then runs several ShardMember instances
+against one lease file on a simulated clock while members die, join and leave,
+and checks at every tick that no pair is owned by two members and that every
+pair has an owner again once its leases have run out. Reports the longest time a
+pair went unowned after each event and the cost of one lease file sync.
+
+Usage: python tools/bench_sharding.py [--pairs 500] [--members 4]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mock_node import pair_names  # noqa: E402
+from pydexbot.sharding import HashRing, LeaseFile, ShardMember  # noqa: E402
+
+LEASE_SECONDS = 15
+RENEW_SECONDS = 5
+
+
+def check_ring(options):
+    pairs = pair_names(options.pairs)
+    for count in (2, 4, 8, 16):
+        members = [f"host.{i}" for i in range(count)]
+        ring = HashRing(members)
+        loads = [len(owned) for owned in ring.assign(pairs).values()]
+        assert sum(loads) == len(pairs) and len(loads) == count, loads
+        grown = HashRing(members + ["host.new"])
+        moved = [pair for pair in pairs if grown.owner(pair) != ring.owner(pair)]
+        assert all(grown.owner(pair) == "host.new" for pair in moved)
+        shrunk = HashRing(members[1:])
+        assert all(shrunk.owner(pair) == ring.owner(pair) for pair in pairs if ring.owner(pair) != members[0])
+        print(f"{count:2d} members: load max/avg {max(loads) / (len(pairs) / count):.2f}  "
+              f"min/avg {min(loads) / (len(pairs) / count):.2f}  "
+              f"adding one moves {len(moved) / len(pairs):.1%} (ideal {1 / (count + 1):.1%})")
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def simulate(directory, options):
+    clock = Clock()
+    pairs = pair_names(options.pairs)
+    store = LeaseFile(os.path.join(directory, "leases.json"))
+    members = {}
+    alive = set()
+
+    def join(name, offset):
+        members[name] = (ShardMember(store, name, pairs, LEASE_SECONDS, RENEW_SECONDS, clock=clock, monotonic=clock),
+                         offset)
+        alive.add(name)
+
+    for index in range(options.members):
+        join(f"host.{index}", index % RENEW_SECONDS)
+    events = {60: "kill host.1", 120: "join host.new", 180: "leave host.2", 240: "kill host.0"}
+    unowned_since = {}
+    gaps = {}
+    event = "start"
+    for tick in range(300):
+        if tick in events:
+            event = events[tick]
+            action, name = event.split()
+            if action == "join":
+                join(name, tick % RENEW_SECONDS)
+            else:
+                alive.discard(name)
+                if action == "leave":
+                    members[name][0].leave()
+        for name in sorted(alive):
+            member, offset = members[name]
+            if tick % RENEW_SECONDS == offset:
+                member.sync()
+        for pair in pairs:
+            owners = [name for name, (member, _) in members.items() if name in alive and member.owns(pair)]
+            # A dead member's last view counts too: it might still be pushing
+            owners += [name for name, (member, _) in members.items() if name not in alive and member.owns(pair)]
+            assert len(owners) <= 1, (tick, pair, owners)
+            if owners:
+                started = unowned_since.pop(pair, None)
+                if started is not None:
+                    gaps[event] = max(gaps.get(event, 0), tick - started)
+            else:
+                unowned_since.setdefault(pair, tick)
+        clock.now += 1
+    assert not unowned_since, unowned_since
+    final = {name: len(members[name][0].owned()) for name in sorted(alive)}
+    assert sum(final.values()) == len(pairs), final
+    for name, count in final.items():
+        assert count == len(HashRing(alive).assign(pairs).get(name, [])), final
+    print(f"leases: {len(pairs)} pairs, no pair ever had two owners; longest unowned time per event (s): "
+          + ", ".join(f"{name}: {gap}" for name, gap in gaps.items()))
+    print(f"final holdings: {final}")
+
+
+def bench_sync(directory, options):
+    pairs = pair_names(options.pairs)
+    store = LeaseFile(os.path.join(directory, "bench.json"))
+    members = [ShardMember(store, f"host.{i}", pairs, LEASE_SECONDS, RENEW_SECONDS) for i in range(options.members)]
+    for member in members:
+        member.sync()
+    count = 200
+    started = time.perf_counter()
+    for number in range(count):
+        members[number % len(members)].sync()
+    print(f"one lease file sync ({len(pairs)} pairs, {len(members)} members): "
+          f"{(time.perf_counter() - started) / count * 1000:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pairs", type=int, default=500)
+    parser.add_argument("--members", type=int, default=4)
+    options = parser.parse_args()
+    check_ring(options)
+    directory = tempfile.mkdtemp(prefix="shards-")
+    try:
+        simulate(directory, options)
+        print("golden checks passed")
+        bench_sync(directory, options)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
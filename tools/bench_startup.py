@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Time-to-first-trade benchmark for bot service restarts against the local mock node.
+
+Starts the mock node once and then starts and stops the bot service (python -m
+pydexbot.main) several times in the same working directory, as a deploy would.
+For every start it reports the time from process start to the first filled
+trade, to the first trade of half of the pairs and to the first trade of every
+pair, and the RPCs sent until then. The first start is cold; later starts find
+whatever the previous run left on disk (ABI cache, warm-start snapshot).
+
+Usage: python tools/bench_startup.py [--pairs 200] [--latency-ms 20] [--restarts 2] [--set key=value]
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_e2e import write_config  # noqa: E402
+from mock_node import MockChain, MockNode, pair_names  # noqa: E402
+
+
+def start_once(node, workdir, pairs, options):
+    # Pairs traded by an earlier run count again from this start; no run is active now
+    node.first_trade_at.clear()
+    before = node.stats()
+    log_path = os.path.join(workdir, "service.out")
+    started = time.monotonic()
+    with open(log_path, "a") as out:
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "pydexbot.main", "--config-dir", workdir, "--log-dir", os.path.join(workdir, "logs")],
+            cwd=ROOT, stdout=out, stderr=subprocess.STDOUT,
+        )
+        firsts = {}
+        rpcs_at_all = None
+        while time.monotonic() - started < options.timeout and proc.poll() is None:
+            stats = node.stats()
+            firsts = stats["first_trade_at"]
+            if len(firsts) >= len(pairs):
+                rpcs_at_all = stats["rpc_total"] - before["rpc_total"]
+                break
+            time.sleep(0.02)
+        exited_early = proc.poll() is not None
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+    if exited_early:
+        with open(log_path) as f:
+            sys.stderr.write(f.read()[-4000:])
+        raise SystemExit("bot service exited during the benchmark")
+    times = sorted(at - started for at in firsts.values())
+
+    def at(ratio):
+        if len(times) < len(pairs) * ratio:
+            return None
+        return round(times[max(0, int(len(pairs) * ratio) - 1)], 3)
+
+    return {
+        "first_trade_seconds": round(times[0], 3) if times else None,
+        "half_pairs_seconds": at(0.5),
+        "all_pairs_seconds": at(1.0),
+        "pairs_traded": len(times),
+        "rpcs_until_all_pairs": rpcs_at_all,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pairs", type=int, default=200)
+    parser.add_argument("--bots", type=int, default=8, help="bots per pair")
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--restarts", type=int, default=2, help="starts after the cold one")
+    parser.add_argument("--timeout", type=float, default=60, help="give up on a start after this many seconds")
+    parser.add_argument("--set", action="append", metavar="KEY=VALUE", help="extra config override, YAML value")
+    options = parser.parse_args()
+    options.local_signing = True
+
+    pairs = pair_names(options.pairs)
+    chain = MockChain(pairs, options.bots, seed=1)
+    node = MockNode(chain, latency_ms=options.latency_ms, seed=1)
+    node.start()
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            write_config(workdir, node.url, pairs, options)
+            for number in range(options.restarts + 1):
+                result = start_once(node, workdir, pairs, options)
+                result["start"] = "cold" if number == 0 else f"restart {number}"
+                results.append(result)
+    finally:
+        node.stop()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the trade trace parser.
+
+Reports parse throughput on tests/data/exectrade.result.json and on synthetic
+transactions with many trade actions, nested and flat, next to the float parser
+it replaced and to the JSON decode of the same trace. The parser's golden checks
+are in tests/test_trace_parser.py.
+
+Usage: python tools/bench_trace_parser.py [--actions 50] [--seconds 1.0]
+"""
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+from decimal import Decimal
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pydexbot.trace_parser import format_fill, parse_fills_from_result  # noqa: E402
+
+TRACE_PATH = os.path.join(ROOT, "tests", "data", "exectrade.result.json")
+
+def legacy_parse_price_from_result(trx):
+    """
+    The float-based parser this module replaced, kept as the benchmark baseline.
+    """
+    result = {}
+    if "processed" not in trx:
+        return result
+    if "action_traces" not in trx["processed"]:
+        return result
+    traces = trx["processed"]["action_traces"]
+    for trace in traces:
+        if "act" in trace and "name" in trace["act"] and trace["act"]["name"] in ("trade", "buy", "sell"):
+            if "inline_traces" not in trace or not trace["inline_traces"]:
+                continue
+            if len(trace["inline_traces"]) < 2:
+                continue
+            after_swap = trace["inline_traces"][1]
+            if "act" not in after_swap or "data" not in after_swap["act"]:
+                continue
+            after_swap_data = after_swap["act"]["data"]
+            bot_user = after_swap_data.get("bot", "")
+            side = after_swap_data.get("side", "")
+            for inline in trace["inline_traces"][0].get("inline_traces", []):
+                if "act" not in inline or "data" not in inline["act"]:
+                    continue
+                act = inline["act"]
+                act_data = act["data"]
+                if act["name"] == "transfer" and act_data["from"] == "flon.swap" and act_data["memo"].startswith("flon swap by"):
+                    input_quantity = act_data["quantity"]
+                    memo = act_data["memo"]
+                    in_amount = float(input_quantity.split()[0])
+                    in_symbol = input_quantity.split()[1]
+                    output_quantity = memo.split("by")[1].strip()
+                    output_quantity = output_quantity.split(":")[0].strip()
+                    out_amount = float(output_quantity.split()[0])
+                    out_symbol = output_quantity.split()[1]
+                    price = out_amount / in_amount if in_amount > 0 else 0
+                    price_reverted = in_amount / out_amount if out_amount > 0 else 0
+                    if side == "left":
+                        result["trade_side"] = "sell"
+                        result["execution_price"] = f"{price_reverted:.8f} {in_symbol}/{out_symbol}"
+                        result["inverse_price"] = f"{price:.8f} {out_symbol}/{in_symbol}"
+                        result["base_quantity"] = output_quantity
+                        result["quote_quantity"] = input_quantity
+                    else:
+                        result["trade_side"] = "buy"
+                        result["execution_price"] = f"{price:.8f} {out_symbol}/{in_symbol}"
+                        result["inverse_price"] = f"{price_reverted:.8f} {in_symbol}/{out_symbol}"
+                        result["base_quantity"] = input_quantity
+                        result["quote_quantity"] = output_quantity
+                    result["maker_account"] = bot_user
+                    return result
+    return result
+
+
+def first_fill_fields(trx):
+    fills = parse_fills_from_result(trx)
+    return format_fill(fills[0]) if fills else {}
+
+
+def synthetic_trace(golden, actions):
+    """
+    A transaction with `actions` trade actions, each with its own quantities.
+    """
+    trx = copy.deepcopy(golden)
+    template = golden["processed"]["action_traces"][0]
+    traces = []
+    for i in range(actions):
+        trace = copy.deepcopy(template)
+        quantity = f"{Decimal('13.68536925') + Decimal(i) / 1000:.8f} FLON"
+        for inline in trace["inline_traces"][0]["inline_traces"]:
+            data = inline["act"]["data"]
+            if data.get("memo", "").startswith("flon swap by"):
+                data["memo"] = f"flon swap by {quantity}:18446744073709551615"
+                for nested in inline.get("inline_traces", []):
+                    nested["act"]["data"]["memo"] = data["memo"]
+        traces.append(trace)
+    trx["processed"]["action_traces"] = traces
+    return trx
+
+
+def flatten(trx):
+    """
+    Convert nested inline_traces into nodeos' flat action_traces with ordinals.
+    """
+    flat = []
+
+    def visit(trace, creator):
+        item = {key: value for key, value in trace.items() if key != "inline_traces"}
+        item["action_ordinal"] = len(flat) + 1
+        item["creator_action_ordinal"] = creator
+        flat.append(item)
+        for child in trace.get("inline_traces", []):
+            visit(child, item["action_ordinal"])
+
+    for trace in trx["processed"]["action_traces"]:
+        visit(trace, 0)
+    trx = copy.deepcopy(trx)
+    trx["processed"]["action_traces"] = flat
+    return trx
+
+
+def rate(fn, arg, seconds):
+    count = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(50):
+            fn(arg)
+        count += 50
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--actions", type=int, default=50, help="trade actions per synthetic transaction")
+    parser.add_argument("--seconds", type=float, default=1.0, help="time per measurement")
+    options = parser.parse_args()
+
+    with open(TRACE_PATH, "rb") as f:
+        raw = f.read()
+    golden = json.loads(raw)
+    many = synthetic_trace(golden, options.actions)
+    # Both parsers must agree for the comparison to mean anything
+    assert first_fill_fields(golden) == legacy_parse_price_from_result(golden)
+    assert len(parse_fills_from_result(flatten(many))) == options.actions
+
+    print(f"{'single action, legacy float parser':<40} {rate(legacy_parse_price_from_result, golden, options.seconds):10.0f} trx/s")
+    print(f"{'single action, log fields':<40} {rate(first_fill_fields, golden, options.seconds):10.0f} trx/s")
+    print(f"{'single action, nested':<40} {rate(parse_fills_from_result, golden, options.seconds):10.0f} trx/s")
+    print(f"{'single action, flat':<40} {rate(parse_fills_from_result, flatten(golden), options.seconds):10.0f} trx/s")
+    print(f"{f'{options.actions} actions, nested':<40} {rate(parse_fills_from_result, many, options.seconds):10.0f} trx/s")
+    print(f"{f'{options.actions} actions, flat':<40} {rate(parse_fills_from_result, flatten(many), options.seconds):10.0f} trx/s")
+
+    many_raw = json.dumps(many).encode()
+    print(f"{f'json.loads ({len(many_raw)} bytes)':<40} {rate(json.loads, many_raw, options.seconds):10.0f} trx/s")
+    try:
+        import orjson
+        print(f"{f'orjson.loads ({len(many_raw)} bytes)':<40} {rate(orjson.loads, many_raw, options.seconds):10.0f} trx/s")
+    except ImportError:
+        print(f"{'orjson.loads':<40} skipped (orjson not installed)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,693 @@
+"""
+Local stand-in for a FLON chain API node, for benchmarks and end-to-end runs without a live chain.
+
+Serves the tables the bot reads, accepts pushed transactions for the tokenx.mm
+trade/buy/sell actions, applies them as constant-product swaps on flon.swap and
+answers with traces shaped like a real push_transaction result. Executed
+transactions are served back by get_block, with the rows they changed.
+"""
+import hashlib
+import json
+import os
+import random
+import struct
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from decimal import Decimal, ROUND_DOWN
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pydexbot.packing import NAME_CHARS, decode_name, encode_name  # noqa: E402,F401
+
+SWAP_FEE_RATIO = Decimal("0.003")
+BLOCK_INTERVAL_SECONDS = 0.5
+CHAIN_ID = hashlib.sha256(b"pydexbot mock chain").hexdigest()
+
+TRADE_ABI = {
+    "version": "eosio::abi/1.2",
+    "types": [],
+    "structs": [
+        {"name": action, "base": "", "fields": [
+            {"name": "bot", "type": "name"},
+            {"name": "trade_pair_name", "type": "name"},
+            {"name": "memo", "type": "string"},
+        ]}
+        for action in ("trade", "buy", "sell")
+    ],
+    "actions": [{"name": action, "type": action, "ricardian_contract": ""} for action in ("trade", "buy", "sell")],
+    "tables": [],
+}
+
+
+class ChainError(Exception):
+    """
+    A transaction rejected by the mock chain; answered like an eosio_assert failure.
+    """
+
+
+def pair_names(count):
+    """
+    Valid, distinct trade pair names: flon.usdt, then aaa.usdt, aab.usdt, ...
+    """
+    names = ["flon.usdt"]
+    letters = NAME_CHARS[6:]
+    index = 0
+    while len(names) < count:
+        base = "".join(letters[(index // len(letters) ** power) % len(letters)] for power in (2, 1, 0))
+        names.append(f"{base}.usdt")
+        index += 1
+    return names[:count]
+
+
+def format_quantity(amount, precision, symbol):
+    quantum = Decimal(1).scaleb(-precision)
+    return f"{amount.quantize(quantum, rounding=ROUND_DOWN)} {symbol}"
+
+
+def parse_quantity(value):
+    amount, symbol = str(value).split()
+    return Decimal(amount), symbol
+
+
+def chain_time(seconds):
+    return datetime.fromtimestamp(seconds, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000")
+
+
+def table_sort_key(key):
+    try:
+        return (0, encode_name(str(key)), "")
+    except ValueError:
+        return (1, 0, str(key))
+
+
+class _Reader:
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def take(self, size):
+        chunk = self.data[self.pos:self.pos + size]
+        if len(chunk) != size:
+            raise ChainError("packed_trx is truncated")
+        self.pos += size
+        return chunk
+
+    def varuint32(self):
+        value = 0
+        shift = 0
+        while True:
+            byte = self.take(1)[0]
+            value |= (byte & 0x7f) << shift
+            if not byte & 0x80:
+                return value
+            shift += 7
+
+    def name(self):
+        return decode_name(struct.unpack("<Q", self.take(8))[0])
+
+    def string(self):
+        return self.take(self.varuint32()).decode()
+
+
+def unpack_transaction(packed_trx):
+    """
+    Decode a packed transaction into {"expiration", "actions": [{account, name, authorization, data}]}.
+    Action data is decoded for the trade actions; other actions keep their hex data.
+    """
+    reader = _Reader(packed_trx)
+    expiration, _, _ = struct.unpack("<IHI", reader.take(10))
+    reader.varuint32()
+    reader.take(1)
+    reader.varuint32()
+    if reader.varuint32():
+        raise ChainError("context free actions are not supported")
+    actions = []
+    for _ in range(reader.varuint32()):
+        account, name = reader.name(), reader.name()
+        authorization = [
+            {"actor": reader.name(), "permission": reader.name()} for _ in range(reader.varuint32())
+        ]
+        data = reader.take(reader.varuint32())
+        if name in ("trade", "buy", "sell"):
+            data_reader = _Reader(data)
+            decoded = {"bot": data_reader.name(), "trade_pair_name": data_reader.name(), "memo": data_reader.string()}
+        else:
+            decoded = data.hex()
+        actions.append({"account": account, "name": name, "authorization": authorization, "data": decoded})
+    return {"expiration": expiration, "actions": actions}
+
+
+class MockChain:
+    """
+    In-memory chain state: the bot tables, token balances and the swap pools.
+    """
+
+    def __init__(self, pairs=("flon.usdt",), bots_per_pair=8, funded_ratio=0.5, schedule_interval_seconds=0,
+                 dex_contract="flon.swap", tokenx_mm_contract="tokenx.mm", bot_mm_contract="bot.mm",
+                 buylowsellhi_contract="buylowsellhi", block_deltas=True, seed=None):
+        self.dex_contract = dex_contract
+        self.tokenx_mm_contract = tokenx_mm_contract
+        self.bot_mm_contract = bot_mm_contract
+        self.buylowsellhi_contract = buylowsellhi_contract
+        self.schedule_interval_seconds = int(schedule_interval_seconds)
+        self.block_deltas = bool(block_deltas)
+        self.blocks = {}
+        self._deltas = None
+        self._undo = None
+        self.started_at = time.time()
+        self.lock = threading.Lock()
+        self.tables = {}
+        self.pairs = {}
+        self.trade_count = 0
+        self.failed_count = 0
+        self._random = random.Random(seed)
+        for pair_index, pair in enumerate(pairs):
+            self.add_pair(pair, [f"bot{pair_index:03d}{i:03d}".translate(str.maketrans("06789", "abcde")) for i in range(bots_per_pair)], funded_ratio)
+
+    def add_pair(self, pair, bots, funded_ratio=0.5):
+        base_symbol = pair.split(".")[0].upper()
+        base_contract = "flon.token" if base_symbol == "FLON" else "mock.token"
+        quote_contract = "flon.mtoken"
+        price = Decimal("0.05")
+        left = Decimal("200000")
+        self.pairs[pair] = {
+            "base": (base_contract, base_symbol, 8),
+            "quote": (quote_contract, "USDT", 6),
+            "left": left,
+            "right": left * price,
+        }
+        self._refresh_market(pair)
+        self._put(self.tokenx_mm_contract, self.tokenx_mm_contract, "botmarkets", pair, {
+            "trade_pair_name": pair,
+            "left_pool": {"total_quantity": format_quantity(Decimal("1000"), 8, base_symbol),
+                          "balance": {"quantity": format_quantity(Decimal(0), 8, base_symbol), "contract": base_contract}},
+            "right_pool": {"total_quantity": format_quantity(Decimal("50"), 6, "USDT"),
+                           "balance": {"quantity": format_quantity(Decimal(0), 6, "USDT"), "contract": quote_contract}},
+        })
+        self._put(self.tokenx_mm_contract, self.tokenx_mm_contract, "schedules", pair, {
+            "trade_pair_name": pair,
+            "last_traded_at": chain_time(self.started_at - 3600),
+            "random_interval_seconds": self.schedule_interval_seconds,
+        })
+        self._put(self.buylowsellhi_contract, self.buylowsellhi_contract, "trademarkets", pair, {
+            "trade_pair_name": pair,
+            "target_price": str(price),
+            "fluctuation_ratio": "0.01",
+            "min_trade_amount": format_quantity(Decimal("10"), 8, base_symbol),
+            "max_trade_amount": format_quantity(Decimal("15"), 8, base_symbol),
+            "paused": 0,
+        })
+        self._put(self.bot_mm_contract, self.bot_mm_contract, "botgroups", pair, {"name": pair, "bots": list(bots)})
+        funded = max(1, int(len(bots) * funded_ratio))
+        for index, bot in enumerate(bots):
+            scale = Decimal(1000) if index < funded else Decimal(0)
+            self.set_balance(base_contract, bot, base_symbol, 8, scale)
+            self.set_balance(quote_contract, bot, "USDT", 6, scale / 10)
+
+    def _put(self, code, scope, table, key, row):
+        rows = self.tables.setdefault((code, scope, table), {})
+        if self._undo is not None:
+            self._undo.append((rows, key, rows.get(key)))
+        if self._deltas is not None:
+            self._deltas.append({"code": code, "scope": scope, "table": table, "primary_key": key,
+                                 "present": row is not None, "value": dict(row) if row is not None else None})
+        if row is None:
+            rows.pop(key, None)
+        else:
+            rows[key] = row
+
+    def _refresh_market(self, pair):
+        market = self.pairs[pair]
+        base_contract, base_symbol, base_precision = market["base"]
+        quote_contract, quote_symbol, quote_precision = market["quote"]
+        self._put(self.dex_contract, self.dex_contract, "markets", pair, {
+            "tpcode": pair,
+            "left_pool_quant": {"quantity": format_quantity(market["left"], base_precision, base_symbol), "contract": base_contract},
+            "right_pool_quant": {"quantity": format_quantity(market["right"], quote_precision, quote_symbol), "contract": quote_contract},
+            "fee_ratio": str(SWAP_FEE_RATIO),
+        })
+
+    def balance(self, contract, account, symbol):
+        row = self.tables.get((contract, account, "accounts"), {}).get(symbol)
+        return parse_quantity(row["balance"])[0] if row else Decimal(0)
+
+    def set_balance(self, contract, account, symbol, precision, amount):
+        self._put(contract, account, "accounts", symbol, {"balance": format_quantity(amount, precision, symbol)})
+
+    def head_block_num(self):
+        return 1000 + int((time.time() - self.started_at) / BLOCK_INTERVAL_SECONDS)
+
+    def get_info(self):
+        head = self.head_block_num()
+        lib = head - 2
+        return {
+            "server_version": "mock",
+            "chain_id": CHAIN_ID,
+            "head_block_num": head,
+            "head_block_id": f"{head:08x}" + "00" * 28,
+            "head_block_time": chain_time(time.time()),
+            "last_irreversible_block_num": lib,
+            "last_irreversible_block_id": f"{lib:08x}" + "00" * 28,
+        }
+
+    def get_table_rows(self, payload):
+        rows = self.tables.get((payload.get("code"), str(payload.get("scope")), payload.get("table")), {})
+        lower = payload.get("lower_bound") or ""
+        upper = payload.get("upper_bound") or ""
+        limit = int(payload.get("limit") or 10)
+        with self.lock:
+            if lower and lower == upper:
+                row = rows.get(lower)
+                return {"rows": [row] if row else [], "more": False, "next_key": ""}
+            ordered = sorted(rows.items(), key=lambda item: table_sort_key(item[0]))
+        lower_key = table_sort_key(lower) if lower else None
+        upper_key = table_sort_key(upper) if upper else None
+        selected = [
+            row for key, row in ordered
+            if (lower_key is None or table_sort_key(key) >= lower_key) and (upper_key is None or table_sort_key(key) <= upper_key)
+        ]
+        more = len(selected) > limit
+        next_key = ""
+        if more:
+            next_key = next(key for key, row in ordered if row is selected[limit])
+        return {"rows": selected[:limit], "more": more, "next_key": next_key}
+
+    def push_transaction(self, packed_trx):
+        trx = unpack_transaction(packed_trx)
+        trx_id = hashlib.sha256(packed_trx).hexdigest()
+        return self.execute(trx["actions"], trx_id)
+
+    def execute(self, actions, trx_id=None):
+        """
+        Apply actions as one transaction in the next block.
+        """
+        trx_id = trx_id or hashlib.sha256(f"{time.time()}:{self._random.random()}".encode()).hexdigest()
+        block_num = self.head_block_num() + 1
+        with self.lock:
+            self._deltas = []
+            self._undo = []
+            # A transaction is atomic: a failing action rolls back the ones before it
+            named = {action["data"].get("trade_pair_name") for action in actions if isinstance(action.get("data"), dict)}
+            reserves = {pair: (self.pairs[pair]["left"], self.pairs[pair]["right"]) for pair in named if pair in self.pairs}
+            try:
+                action_traces = [self._apply(action, trx_id, block_num) for action in actions]
+            except ChainError:
+                self.failed_count += 1
+                for rows, key, row in reversed(self._undo):
+                    if row is None:
+                        rows.pop(key, None)
+                    else:
+                        rows[key] = row
+                for pair, (left, right) in reserves.items():
+                    self.pairs[pair]["left"], self.pairs[pair]["right"] = left, right
+                raise
+            finally:
+                deltas, self._deltas, self._undo = self._deltas, None, None
+            self.trade_count += sum(1 for action in actions if action["name"] in ("trade", "buy", "sell"))
+            self._record_block(block_num, trx_id, actions, deltas)
+        return {
+            "transaction_id": trx_id,
+            "processed": {
+                "id": trx_id,
+                "block_num": block_num,
+                "block_time": chain_time(time.time()),
+                "receipt": {"status": "executed", "cpu_usage_us": 300, "net_usage_words": 16},
+                "elapsed": 300,
+                "scheduled": False,
+                "action_traces": action_traces,
+                "except": None,
+                "error_code": None,
+            },
+        }
+
+    def _record_block(self, block_num, trx_id, actions, deltas):
+        block = self.blocks.setdefault(block_num, {"transactions": [], "table_deltas": []})
+        block["transactions"].append({
+            "status": "executed",
+            "cpu_usage_us": 300,
+            "net_usage_words": 16,
+            "trx": {"id": trx_id, "transaction": {"actions": actions}},
+        })
+        block["table_deltas"].extend(deltas)
+        # Keep about an hour of blocks
+        for old in [num for num in self.blocks if num < block_num - 7200]:
+            del self.blocks[old]
+
+    def block_id(self, block_num):
+        return f"{block_num:08x}" + hashlib.sha256(f"{CHAIN_ID}:{block_num}".encode()).hexdigest()[8:]
+
+    def get_block(self, block_num):
+        """
+        get_block for a number up to the head; raises ChainError for later blocks.
+        table_deltas (rows changed by the block, as a state-history bridge would give
+        them) are only served when block_deltas is set.
+        """
+        block_num = int(block_num)
+        if block_num > self.head_block_num() or block_num < 1:
+            raise ChainError(f"Could not find block: {block_num}")
+        with self.lock:
+            recorded = self.blocks.get(block_num) or {"transactions": [], "table_deltas": []}
+            block = {
+                "block_num": block_num,
+                "id": self.block_id(block_num),
+                "previous": self.block_id(block_num - 1),
+                "timestamp": chain_time(self.started_at + (block_num - 1000) * BLOCK_INTERVAL_SECONDS),
+                "producer": "flon",
+                "transactions": list(recorded["transactions"]),
+            }
+            if self.block_deltas:
+                block["table_deltas"] = list(recorded["table_deltas"])
+        return block
+
+    def _apply(self, action, trx_id, block_num):
+        context = {"trx_id": trx_id, "block_num": block_num, "block_time": chain_time(time.time()), "ordinal": 0}
+        if action["name"] == "transfer":
+            return self._apply_transfer(action, context)
+        if action["account"] == self.buylowsellhi_contract and action["name"] == "setmarket":
+            return self._apply_setmarket(action, context)
+        return self._apply_trade(action, trx_id, block_num)
+
+    def _apply_transfer(self, action, context):
+        """
+        A plain token transfer between accounts, e.g. a bot being funded.
+        """
+        data = action["data"]
+        contract = action["account"]
+        amount, symbol = parse_quantity(data["quantity"])
+        precision = max(0, -amount.as_tuple().exponent)
+        balance_from = self.balance(contract, data["from"], symbol)
+        if amount <= 0 or balance_from < amount:
+            raise ChainError("overdrawn balance")
+        self.set_balance(contract, data["from"], symbol, precision, balance_from - amount)
+        self.set_balance(contract, data["to"], symbol, precision, self.balance(contract, data["to"], symbol) + amount)
+        return self._transfer_trace(context, contract, data["from"], data["to"], data["quantity"], data.get("memo", ""),
+                                    [data["from"], data["to"]])
+
+    def _apply_setmarket(self, action, context):
+        """
+        Update fields of a trademarkets row (target_price, fluctuation_ratio, paused, ...).
+        """
+        data = action["data"]
+        pair = data["trade_pair_name"]
+        rows = self.tables[(self.buylowsellhi_contract, self.buylowsellhi_contract, "trademarkets")]
+        if pair not in rows:
+            raise ChainError(f"market {pair} not found")
+        self._put(self.buylowsellhi_contract, self.buylowsellhi_contract, "trademarkets", pair, {**rows[pair], **data})
+        return self._trace(context, self.buylowsellhi_contract, self.buylowsellhi_contract, "setmarket", data,
+                           action.get("authorization", []))
+
+    def _apply_trade(self, action, trx_id, block_num):
+        if action["account"] != self.tokenx_mm_contract or action["name"] not in ("trade", "buy", "sell"):
+            raise ChainError(f"action {action['account']}::{action['name']} is not supported by the mock node")
+        data = action["data"]
+        bot, pair = data["bot"], data["trade_pair_name"]
+        market = self.pairs.get(pair)
+        if market is None:
+            raise ChainError(f"no fill: market {pair} not found")
+        schedule = self.tables[(self.tokenx_mm_contract, self.tokenx_mm_contract, "schedules")][pair]
+        now = time.time()
+        last_traded_at = datetime.fromisoformat(schedule["last_traded_at"].split(".")[0]).replace(tzinfo=timezone.utc).timestamp()
+        if now < last_traded_at + int(schedule["random_interval_seconds"]):
+            raise ChainError(f"no fill: {pair} schedule is not ready")
+
+        price = market["right"] / market["left"]
+        if action["name"] == "trade":
+            target_price = Decimal(self.tables[(self.buylowsellhi_contract, self.buylowsellhi_contract, "trademarkets")][pair]["target_price"])
+            side = "left" if price > target_price else "right"
+        else:
+            side = "left" if action["name"] == "sell" else "right"
+        trade_market = self.tables[(self.buylowsellhi_contract, self.buylowsellhi_contract, "trademarkets")][pair]
+        min_base = parse_quantity(trade_market["min_trade_amount"])[0]
+        max_scale = parse_quantity(trade_market["max_trade_amount"])[0] / min_base
+        scale = Decimal(str(round(self._random.uniform(1.0, float(max_scale)), 4)))
+        if side == "left":
+            (in_contract, in_symbol, in_precision), (out_contract, out_symbol, out_precision) = market["base"], market["quote"]
+            amount_in = min_base * scale
+            reserve_in, reserve_out = market["left"], market["right"]
+        else:
+            (in_contract, in_symbol, in_precision), (out_contract, out_symbol, out_precision) = market["quote"], market["base"]
+            amount_in = min_base * price * scale
+            reserve_in, reserve_out = market["right"], market["left"]
+        amount_in = amount_in.quantize(Decimal(1).scaleb(-in_precision), rounding=ROUND_DOWN)
+        balance_before = self.balance(in_contract, bot, in_symbol)
+        if balance_before < amount_in:
+            raise ChainError(f"no fill: {bot} balance {format_quantity(balance_before, in_precision, in_symbol)} is too low")
+        fee = (amount_in * SWAP_FEE_RATIO).quantize(Decimal(1).scaleb(-in_precision), rounding=ROUND_DOWN)
+        amount_out = ((amount_in - fee) * reserve_out / (reserve_in + amount_in - fee)).quantize(
+            Decimal(1).scaleb(-out_precision), rounding=ROUND_DOWN
+        )
+        if amount_out <= 0:
+            raise ChainError("no fill: output amount is zero")
+
+        if side == "left":
+            market["left"] += amount_in - fee
+            market["right"] -= amount_out
+        else:
+            market["right"] += amount_in - fee
+            market["left"] -= amount_out
+        self._refresh_market(pair)
+        self.set_balance(in_contract, bot, in_symbol, in_precision, balance_before - amount_in)
+        self.set_balance(out_contract, bot, out_symbol, out_precision, self.balance(out_contract, bot, out_symbol) + amount_out)
+        self._put(self.tokenx_mm_contract, self.tokenx_mm_contract, "schedules", pair,
+                  {**schedule, "last_traded_at": chain_time(now)})
+
+        quantity_in = format_quantity(amount_in, in_precision, in_symbol)
+        quantity_out = format_quantity(amount_out, out_precision, out_symbol)
+        context = {"trx_id": trx_id, "block_num": block_num, "block_time": chain_time(now), "ordinal": 0}
+        transfer_in = self._transfer_trace(context, in_contract, bot, self.dex_contract, quantity_in,
+                                           f"swap:{quantity_out}:{pair}", [bot, self.dex_contract])
+        fee_transfer = self._transfer_trace(context, in_contract, self.dex_contract, "swap.admin",
+                                            format_quantity(fee, in_precision, in_symbol), f"swap fee collection: {pair}",
+                                            [self.dex_contract, "swap.admin"])
+        transfer_out = self._transfer_trace(context, out_contract, self.dex_contract, bot, quantity_out,
+                                            f"flon swap by {quantity_in}:18446744073709551615", [self.dex_contract, bot])
+        transfer_in["inline_traces"].extend([fee_transfer, transfer_out])
+        after_swap = self._trace(context, self.tokenx_mm_contract, self.tokenx_mm_contract, "afterswap", {
+            "bot": bot,
+            "side": side,
+            "input_quantity": quantity_in,
+            "bot_balance_before": format_quantity(balance_before, in_precision, in_symbol),
+        }, action["authorization"])
+        trade = self._trace(context, self.tokenx_mm_contract, self.tokenx_mm_contract, action["name"], data, action["authorization"])
+        trade["inline_traces"] = [transfer_in, after_swap]
+        return trade
+
+    def _trace(self, context, receiver, account, name, data, authorization):
+        context["ordinal"] += 1
+        return {
+            "action_ordinal": context["ordinal"],
+            "receiver": receiver,
+            "act": {"account": account, "name": name, "authorization": authorization, "data": data},
+            "context_free": False,
+            "elapsed": 50,
+            "console": "",
+            "trx_id": context["trx_id"],
+            "block_num": context["block_num"],
+            "block_time": context["block_time"],
+            "account_ram_deltas": [],
+            "except": None,
+            "error_code": None,
+            "inline_traces": [],
+        }
+
+    def _transfer_trace(self, context, contract, sender, receiver, quantity, memo, notified):
+        data = {"from": sender, "to": receiver, "quantity": quantity, "memo": memo}
+        authorization = [{"actor": sender, "permission": "active"}]
+        trace = self._trace(context, contract, contract, "transfer", data, authorization)
+        trace["inline_traces"] = [self._trace(context, account, contract, "transfer", data, authorization) for account in notified]
+        return trace
+
+
+class MockNode:
+    """
+    HTTP front end for a MockChain with injectable latency and errors.
+
+    latency_ms (+ up to latency_jitter_ms) delays every answer; error_rate answers
+    that share of requests with HTTP 503; push_error_rate rejects that share of
+    pushes with a no-fill assertion. Request counts are kept per path and table, and
+    round latency is measured from the first read of a pair's rows to its push.
+    first_trade_at keeps the monotonic time of each pair's first filled trade.
+    """
+
+    def __init__(self, chain, host="127.0.0.1", port=0, latency_ms=0, latency_jitter_ms=0,
+                 error_rate=0.0, push_error_rate=0.0, seed=None):
+        self.chain = chain
+        self.latency_ms = float(latency_ms)
+        self.latency_jitter_ms = float(latency_jitter_ms)
+        self.error_rate = float(error_rate)
+        self.push_error_rate = float(push_error_rate)
+        self._random = random.Random(seed)
+        self._stats_lock = threading.Lock()
+        self.requests = {}
+        self.round_latencies_ms = []
+        self.first_trade_at = {}
+        self._round_started = {}
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-node", daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "requests": dict(self.requests),
+                "rpc_total": sum(self.requests.values()),
+                "trades": self.chain.trade_count,
+                "failed_pushes": self.chain.failed_count,
+                "round_latencies_ms": list(self.round_latencies_ms),
+                "first_trade_at": dict(self.first_trade_at),
+            }
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+    def _mark_round(self, pair, event):
+        """
+        event is "read" (first read starts the round), "pushed" (records its latency)
+        or "failed" (drops the round, so retry waits are not counted).
+        """
+        now = time.monotonic()
+        with self._stats_lock:
+            if event == "read":
+                self._round_started.setdefault(pair, now)
+                return
+            started = self._round_started.pop(pair, None)
+            if event == "pushed":
+                self.first_trade_at.setdefault(pair, now)
+            if event == "pushed" and started is not None:
+                self.round_latencies_ms.append((now - started) * 1000.0)
+
+    def handle(self, path, payload):
+        """
+        Answer one API call; returns (status, body dict).
+        """
+        endpoint = path.rsplit("/", 1)[-1]
+        self._count(f"{endpoint}:{payload.get('table')}" if endpoint == "get_table_rows" else endpoint)
+        if self.error_rate and self._random.random() < self.error_rate:
+            return 503, {"code": 503, "message": "Service Unavailable"}
+        chain = self.chain
+        if endpoint == "get_info":
+            return 200, chain.get_info()
+        if endpoint == "get_block":
+            try:
+                return 200, chain.get_block(payload.get("block_num_or_id"))
+            except (ChainError, TypeError, ValueError) as e:
+                return 400, {"code": 400, "message": "Unknown Block",
+                             "error": {"code": 3100002, "name": "unknown_block_exception", "what": str(e), "details": []}}
+        if endpoint == "get_table_rows":
+            if payload.get("lower_bound") in chain.pairs:
+                self._mark_round(payload.get("lower_bound"), "read")
+            return 200, chain.get_table_rows(payload)
+        if endpoint in ("get_abi", "get_raw_abi"):
+            account = payload.get("account_name")
+            return 200, {"account_name": account, "abi": TRADE_ABI if account == chain.tokenx_mm_contract else None}
+        if endpoint == "get_code_hash":
+            return 200, {"account_name": payload.get("account_name"), "code_hash": hashlib.sha256(str(payload.get("account_name")).encode()).hexdigest()}
+        if endpoint == "get_required_keys":
+            return 200, {"required_keys": list(payload.get("available_keys") or [])[:1]}
+        if endpoint in ("push_transaction", "send_transaction"):
+            try:
+                packed_trx = bytes.fromhex(payload.get("packed_trx") or "")
+                pairs = [action["data"]["trade_pair_name"] for action in unpack_transaction(packed_trx)["actions"]
+                         if isinstance(action["data"], dict)]
+                if self.push_error_rate and self._random.random() < self.push_error_rate:
+                    for pair in pairs:
+                        self._mark_round(pair, "failed")
+                    raise ChainError("no fill: injected push failure")
+                try:
+                    result = chain.push_transaction(packed_trx)
+                except ChainError:
+                    for pair in pairs:
+                        self._mark_round(pair, "failed")
+                    raise
+            except (ChainError, ValueError, KeyError) as e:
+                return 500, {
+                    "code": 500,
+                    "message": "Internal Service Error",
+                    "error": {
+                        "code": 3050003,
+                        "name": "eosio_assert_message_exception",
+                        "what": "eosio_assert_message assertion failure",
+                        "details": [{"message": f"assertion failure with message: {e}", "file": "", "line_number": 0, "method": "mock"}],
+                    },
+                }
+            for trace in result["processed"]["action_traces"]:
+                self._mark_round(trace["act"]["data"].get("trade_pair_name"), "pushed")
+            return 200, result
+        return 404, {"code": 404, "message": f"{path} is not served by the mock node"}
+
+    def _handler_class(self):
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                try:
+                    payload = json.loads(body) if body else {}
+                except ValueError:
+                    payload = {}
+                if node.latency_ms or node.latency_jitter_ms:
+                    time.sleep((node.latency_ms + node._random.uniform(0, node.latency_jitter_ms)) / 1000.0)
+                status, answer = node.handle(self.path, payload if isinstance(payload, dict) else {})
+                data = json.dumps(answer).encode()
+                # One write: headers and body in the same segment
+                self.wfile.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data
+                )
+
+            do_GET = do_POST
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Run a local mock FLON node")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument("--pairs", type=int, default=1)
+    parser.add_argument("--bots", type=int, default=8, help="bots per pair")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--push-error-rate", type=float, default=0)
+    parser.add_argument("--schedule-interval-seconds", type=int, default=0)
+    parser.add_argument("--no-block-deltas", action="store_true", help="serve blocks without table_deltas")
+    options = parser.parse_args()
+    chain = MockChain(pair_names(options.pairs), options.bots, schedule_interval_seconds=options.schedule_interval_seconds,
+                      block_deltas=not options.no_block_deltas)
+    node = MockNode(chain, port=options.port, latency_ms=options.latency_ms, latency_jitter_ms=options.latency_jitter_ms,
+                    error_rate=options.error_rate, push_error_rate=options.push_error_rate)
+    print(f"mock node listening on {node.url}, pairs: {', '.join(chain.pairs)}")
+    try:
+        node._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()